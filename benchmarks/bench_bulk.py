@@ -0,0 +1,50 @@
+"""
+Benchmarks for provisioning series against the fake server with 10ms of
+latency per request, comparing one create_series call per key with
+create_series_bulk, and a repeated run where a KeyCache skips every key.
+"""
+
+import itertools
+from tempodb.client import Client
+from tempodb.bulk import KeyCache
+from tempodb.testing import FakeTempoDB
+
+
+N = 200
+LATENCY = 0.01
+
+_servers = []
+_runs = itertools.count()
+
+
+def fresh_keys(n):
+    run = _runs.next()
+    return ['bench-%d-%d' % (run, i) for i in range(n)]
+
+
+def sequential(client, n):
+    for key in fresh_keys(n):
+        client.create_series(key)
+
+
+def benchmarks(max_points):
+    server = FakeTempoDB(latency=LATENCY).start()
+    _servers.append(server)
+    client = Client('id', 'key', 'secret', server.url)
+    n = min(N, max_points)
+    cache = KeyCache()
+    cached = fresh_keys(n)
+    client.create_series_bulk(cached, cache=cache)
+
+    return [
+        ('create_sequential_200', lambda: sequential(client, n)),
+        ('create_bulk_200',
+         lambda: client.create_series_bulk(fresh_keys(n))),
+        ('create_bulk_cached_200',
+         lambda: client.create_series_bulk(cached, cache=cache)),
+    ]
+
+
+def teardown():
+    while _servers:
+        _servers.pop().stop()
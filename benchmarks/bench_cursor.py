@@ -0,0 +1,101 @@
+"""
+Benchmarks for iterating cursors over multi-page responses.  The in-memory
+benchmarks replay pre-built pages to isolate client-side cost, and the
+fake server benchmark includes HTTP.
+"""
+
+import json
+from tempodb.client import Client
+from tempodb.response import Response
+from tempodb.protocol import DataPoint, MultiPoint, DataPointCursor
+from tempodb.testing import FakeTempoDB
+from tempodb.temporal.arrays import datetime_to_epoch_ms
+import fixtures
+
+
+N = 10000
+PAGE_SIZE = 1000
+SERVER_N = 50000
+
+
+class Page(object):
+    def __init__(self, text, next_url):
+        self.text = text
+        self.status_code = 200
+        self.reason = 'OK'
+        self.encoding = None
+        self.links = {}
+        if next_url is not None:
+            self.links = {'next': {'url': next_url}}
+
+
+class Session(object):
+    def __init__(self, texts):
+        self.pages = []
+        for i, text in enumerate(texts):
+            next_url = str(i + 1) if i + 1 < len(texts) else None
+            self.pages.append(Page(text, next_url))
+
+    def get(self, url):
+        return self.pages[int(url)]
+
+    def emit(self, event):
+        pass
+
+
+def open_cursor(session, t):
+    #mirrors what the with_cursor decorator does with the first page
+    resp = Response(session.get('0'), session)
+    return DataPointCursor(json.loads(resp.body), t, resp, None)
+
+
+def iterate(session, t):
+    return [d for d in open_cursor(session, t)]
+
+
+def iterate_values(session):
+    #consumers that never read the timestamps
+    return [d.v for d in open_cursor(session, DataPoint)]
+
+
+def iterate_raw(session):
+    return [v for t, v in open_cursor(session, DataPoint).raw()]
+
+
+_servers = []
+
+
+def fake_server_reader(n):
+    """Start a fake server holding n points and return a function that
+    reads them all back through the client."""
+
+    server = FakeTempoDB(page_size=PAGE_SIZE).start()
+    _servers.append(server)
+    data = [(datetime_to_epoch_ms(DataPoint(p, None).t), p['v'])
+            for p in fixtures.point_dicts(n)]
+    server.store.write('bench', data)
+    client = Client('id', 'key', 'secret', server.url)
+    start = fixtures.START
+    end = start.replace(year=start.year + 1)
+    return lambda: [d for d in client.read_data('bench', start, end,
+                                                limit=5000)]
+
+
+def benchmarks(max_points):
+    n = min(N, max_points)
+    points = Session(fixtures.segment_pages(n, PAGE_SIZE))
+    multis = Session(fixtures.segment_pages(n, PAGE_SIZE, multi=True))
+
+    return [
+        ('cursor_datapoint_10x1k', lambda: iterate(points, DataPoint)),
+        ('cursor_multipoint_10x1k', lambda: iterate(multis, MultiPoint)),
+        ('cursor_values_only_10x1k', lambda: iterate_values(points)),
+        ('cursor_raw_10x1k', lambda: iterate_raw(points)),
+        ('cursor_fake_server_50k',
+         fake_server_reader(min(SERVER_N, max_points))),
+    ]
+
+
+def teardown():
+    while _servers:
+        _servers.pop().stop()
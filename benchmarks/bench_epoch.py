@@ -0,0 +1,85 @@
+"""
+Benchmarks for Datetime timestamps against integer epoch timestamps, for
+parsing and formatting timestamps, building cursor pages and serializing
+points for writes.  The cost per point of each is reported in microseconds
+in the info section of the results.
+"""
+
+import json
+import time
+from tempodb.response import Response
+from tempodb.protocol import DataPoint, DataPointCursor
+from tempodb.temporal.arrays import datetime_to_epoch_ms
+from tempodb.temporal.epoch import iso_to_epoch, epoch_to_iso
+from tempodb.temporal.validate import check_time_param, convert_iso_stamp
+from bench_cursor import Session
+import fixtures
+
+
+N = 10000
+PAGE_SIZE = 1000
+
+_pairs = []
+
+
+def iterate(session, time_format):
+    resp = Response(session.get('0'), session)
+    cursor = DataPointCursor(json.loads(resp.body), DataPoint, resp, None,
+                             time_format)
+    #points parse their timestamps when first read
+    return [d.t for d in cursor]
+
+
+def per_point(f, n, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        f()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 10 ** 6 / n
+
+
+def benchmarks(max_points):
+    n = min(N, max_points)
+    stamps = fixtures.stamps(n)
+    datetimes = [convert_iso_stamp(s) for s in stamps]
+    epochs = [datetime_to_epoch_ms(d) for d in datetimes]
+    session = Session(fixtures.segment_pages(n, PAGE_SIZE))
+    by_datetime = [DataPoint.from_data(t, 1.0) for t in datetimes]
+    by_epoch = [DataPoint.from_data(t, 1.0) for t in epochs]
+
+    pairs = [
+        ('parse', lambda: [convert_iso_stamp(s) for s in stamps],
+         lambda: iso_to_epoch(stamps)),
+        ('format', lambda: [check_time_param(d) for d in datetimes],
+         lambda: epoch_to_iso(epochs)),
+        ('cursor', lambda: iterate(session, 'datetime'),
+         lambda: iterate(session, 'ms')),
+        ('write_body', lambda: [d.to_dictionary() for d in by_datetime],
+         lambda: [d.to_dictionary() for d in by_epoch]),
+    ]
+
+    del _pairs[:]
+    _pairs.extend((n, name, datetime_f, epoch_f)
+                  for name, datetime_f, epoch_f in pairs)
+
+    ret = []
+    for name, datetime_f, epoch_f in pairs:
+        ret.append(('epoch_%s_datetime_10k' % name, datetime_f))
+        ret.append(('epoch_%s_ms_10k' % name, epoch_f))
+    return ret
+
+
+def info():
+    ret = {}
+    for n, name, datetime_f, epoch_f in _pairs:
+        ret['epoch_%s_datetime_us_per_point' % name] = per_point(datetime_f,
+                                                                 n)
+        ret['epoch_%s_ms_us_per_point' % name] = per_point(epoch_f, n)
+    return ret
+
+
+def teardown():
+    del _pairs[:]
@@ -0,0 +1,57 @@
+"""
+Benchmarks for the startup cost of the client, as paid by short-lived
+scripts: a fresh interpreter that imports tempodb.client and constructs a
+Client, and one that also builds the HTTP session, against an interpreter
+that does nothing.  The milliseconds each adds over the bare interpreter are
+reported in the info section of the results, with the slow optional
+dependencies that importing the client loaded.
+"""
+
+import os
+import sys
+import time
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ['requests', 'numpy', 'dateutil.parser', 'multiprocessing.pool',
+         'cProfile', 'pstats', 'mmap']
+
+NOTHING = 'pass'
+CLIENT = ('import tempodb.client\n'
+          'c = tempodb.client.Client("id", "key", "secret")\n')
+SESSION = CLIENT + 'c.session.pool\n'
+LOADED = CLIENT + ('import sys\n'
+                   'print(",".join(m for m in %r if m in sys.modules))\n' %
+                   HEAVY)
+
+
+def python(code):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.check_output([sys.executable, '-c', code], env=env)
+
+
+def best(code, repeat=10):
+    times = []
+    for i in range(repeat):
+        start = time.time()
+        python(code)
+        times.append(time.time() - start)
+    return min(times)
+
+
+def benchmarks(max_points):
+    return [
+        ('import_python', lambda: python(NOTHING)),
+        ('import_client', lambda: python(CLIENT)),
+        ('import_client_session', lambda: python(SESSION))
+    ]
+
+
+def info():
+    nothing = best(NOTHING)
+    return {
+        'import_client_ms': (best(CLIENT) - nothing) * 1000,
+        'import_client_session_ms': (best(SESSION) - nothing) * 1000,
+        'import_client_loads': python(LOADED).strip()
+    }
@@ -0,0 +1,36 @@
+"""
+Benchmarks for local interpolation onto regular grids.
+"""
+
+import datetime
+import numpy
+from tempodb.temporal.interpolate import interpolate, align
+
+
+POINTS = 1000000
+
+
+def make_series(n, seed):
+    #irregularly spaced points averaging one per second
+    rand = numpy.random.RandomState(seed)
+    ts = numpy.cumsum(rand.randint(1, 2000, n)).astype(numpy.int64)
+    vs = rand.random_sample(n) * 100.0
+    return (ts, vs)
+
+
+def benchmarks(max_points=POINTS):
+    n = min(POINTS, max_points)
+    data = make_series(n, 0)
+    grid = numpy.arange(data[0][0], data[0][-1], 1000, dtype=numpy.int64)
+    series = dict(('s%d' % i, make_series(n // 10, i))
+                  for i in range(10))
+    start = datetime.datetime(1970, 1, 1)
+    end = start + datetime.timedelta(seconds=n // 10)
+
+    return [
+        ('interpolate_zoh_1m', lambda: interpolate(data, grid, 'zoh')),
+        ('interpolate_linear_1m', lambda: interpolate(data, grid, 'linear')),
+        ('align_10x100k_linear',
+         lambda: align(series, start, end, '1s', 'linear')),
+    ]
+
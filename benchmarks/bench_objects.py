@@ -0,0 +1,29 @@
+"""
+Benchmarks for building and serializing domain objects.
+"""
+
+from tempodb.protocol import DataPoint, MultiPoint
+import fixtures
+
+
+N = 10000
+
+
+def benchmarks(max_points):
+    n = min(N, max_points)
+    points = fixtures.point_dicts(n)
+    multis = fixtures.multi_dicts(n)
+    built = [DataPoint(d, None) for d in points]
+    built_multis = [MultiPoint(d, None) for d in multis]
+
+    return [
+        ('datapoint_from_json_10k', lambda: [DataPoint(d, None)
+                                             for d in points]),
+        ('multipoint_from_json_10k', lambda: [MultiPoint(d, None)
+                                              for d in multis]),
+        ('datapoint_to_dictionary_10k', lambda: [d.to_dictionary()
+                                                 for d in built]),
+        ('datapoint_to_json_10k', lambda: [d.to_json() for d in built]),
+        ('multipoint_to_json_10k', lambda: [d.to_json()
+                                            for d in built_multis]),
+    ]
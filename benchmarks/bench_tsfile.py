@@ -0,0 +1,81 @@
+"""
+Benchmarks for the binary export format against JSON lines of
+DataPoint.to_json, for both writing and loading 100k points.  The file sizes
+are reported in the info section of the results.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+from tempodb.protocol import DataPoint
+from tempodb.storage.tsfile import ExportWriter, ExportReader
+from tempodb.temporal.arrays import datetime_to_epoch_ms
+import fixtures
+
+
+N = 100000
+
+_dirs = []
+_info = {}
+
+
+def write_tsfile(path, points):
+    with ExportWriter(path) as w:
+        w.write_points('bench', points)
+
+
+def load_tsfile(path):
+    with ExportReader(path) as r:
+        return r.read_arrays('bench')
+
+
+def write_jsonl(path, datapoints):
+    f = open(path, 'w')
+    for d in datapoints:
+        f.write(d.to_json())
+        f.write('\n')
+    f.close()
+
+
+def load_jsonl(path):
+    f = open(path)
+    ret = [DataPoint(json.loads(line), None) for line in f]
+    f.close()
+    return ret
+
+
+def benchmarks(max_points):
+    n = min(N, max_points)
+    d = tempfile.mkdtemp()
+    _dirs.append(d)
+
+    datapoints = [DataPoint(p, None) for p in fixtures.point_dicts(n)]
+    #round values like typical sensor readings, random doubles do not
+    #compress
+    for p in datapoints:
+        p.v = round(p.v, 2)
+    points = [(datetime_to_epoch_ms(p.t), p.v) for p in datapoints]
+
+    tsf = os.path.join(d, 'bench.tsf')
+    jsonl = os.path.join(d, 'bench.jsonl')
+    write_tsfile(tsf, points)
+    write_jsonl(jsonl, datapoints)
+    _info['tsfile_bytes_per_point'] = os.path.getsize(tsf) / float(n)
+    _info['jsonl_bytes_per_point'] = os.path.getsize(jsonl) / float(n)
+
+    return [
+        ('tsfile_write_100k', lambda: write_tsfile(tsf, points)),
+        ('jsonl_write_100k', lambda: write_jsonl(jsonl, datapoints)),
+        ('tsfile_load_100k', lambda: load_tsfile(tsf)),
+        ('jsonl_load_100k', lambda: load_jsonl(jsonl)),
+    ]
+
+
+def info():
+    return dict(_info)
+
+
+def teardown():
+    while _dirs:
+        shutil.rmtree(_dirs.pop())
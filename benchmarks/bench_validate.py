@@ -0,0 +1,42 @@
+"""
+Benchmarks for timestamp handling and URL building.
+"""
+
+import datetime
+from tempodb.temporal.validate import check_time_param, convert_iso_stamp
+from tempodb.endpoint import make_url_args
+import fixtures
+
+
+N = 10000
+
+
+def benchmarks(max_points):
+    n = min(N, max_points)
+    stamps = fixtures.stamps(n)
+    dts = [datetime.datetime(2013, 1, 1) + datetime.timedelta(minutes=i)
+           for i in range(n)]
+    params = {
+        'key': ['series-%d' % i for i in range(10)],
+        'tag': ['foo', 'bar'],
+        'attr': {'host': 'web-1', 'region': 'us-east'},
+        'start': '2013-01-01T00:00:00.000+0000',
+        'end': '2013-01-02T00:00:00.000+0000',
+        'rollup.fold': 'max',
+        'rollup.period': '1hour',
+        'tz': None,
+        'limit': 1000
+    }
+
+    return [
+        ('convert_iso_stamp_10k', lambda: [convert_iso_stamp(t)
+                                           for t in stamps]),
+        ('convert_iso_stamp_tz_10k', lambda: [convert_iso_stamp(t, 'UTC')
+                                              for t in stamps]),
+        ('check_time_param_datetime_10k', lambda: [check_time_param(t)
+                                                   for t in dts]),
+        ('check_time_param_string_10k', lambda: [check_time_param(t)
+                                                 for t in stamps]),
+        ('make_url_args_10k', lambda: [make_url_args(params)
+                                       for i in range(n)]),
+    ]
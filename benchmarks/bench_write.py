@@ -0,0 +1,38 @@
+"""
+Benchmarks for serializing write_multi requests.  The HTTP call is stubbed
+out so only client-side cost is measured.
+"""
+
+from tempodb.client import Client
+import fixtures
+
+
+SIZES = [('1k', 1000), ('100k', 100000), ('1m', 1000000)]
+
+
+class Response(object):
+    status_code = 200
+    reason = 'OK'
+    text = ''
+    encoding = None
+    links = {}
+
+
+class Pool(object):
+    def post(self, url, data=None, **kwargs):
+        self.body = data
+        return Response()
+
+
+def benchmarks(max_points):
+    client = Client('id', 'key', 'secret')
+    client.session.pool = Pool()
+
+    ret = []
+    for name, n in SIZES:
+        if n > max_points:
+            continue
+        points = fixtures.write_points(n)
+        ret.append(('write_multi_%s' % name,
+                    lambda points=points: client.write_multi(points)))
+    return ret
@@ -0,0 +1,65 @@
+"""
+Reproducible synthetic fixtures for the benchmarks.  Everything is generated
+from fixed seeds so runs can be compared against each other.
+"""
+
+import json
+import random
+import datetime
+from tempodb.protocol import DataPoint
+
+
+START = datetime.datetime(2013, 1, 1)
+
+
+def stamps(n, step=60):
+    """ISO8601 timestamps, as sent by the API, spaced step seconds apart."""
+
+    return [(START + datetime.timedelta(seconds=i * step)).strftime(
+        '%Y-%m-%dT%H:%M:%S.000+0000') for i in range(n)]
+
+
+def values(n, seed=0):
+    rand = random.Random(seed)
+    return [rand.random() * 100.0 for i in range(n)]
+
+
+def point_dicts(n, seed=0):
+    """Data point JSON objects as returned in a segment response."""
+
+    return [{'t': t, 'v': v} for t, v in zip(stamps(n), values(n, seed))]
+
+
+def multi_dicts(n, keys=10, seed=0):
+    """Multi point JSON objects as returned in a multi response."""
+
+    names = ['series-%d' % i for i in range(keys)]
+    rand = random.Random(seed)
+    return [{'t': t, 'v': dict((k, rand.random()) for k in names)}
+            for t in stamps(n)]
+
+
+def segment_pages(n, page_size, multi=False):
+    """The JSON text of each page of a segment (or multi) response holding
+    n points in total."""
+
+    data = multi_dicts(n) if multi else point_dicts(n)
+    pages = []
+    for i in range(0, n, page_size):
+        pages.append(json.dumps({'data': data[i:i + page_size], 'tz': 'UTC',
+                                 'rollup': None}))
+    return pages
+
+
+def write_points(n, keys=100, seed=0):
+    """DataPoints ready to be written with write_multi."""
+
+    rand = random.Random(seed)
+    ret = []
+    for i in range(n):
+        t = START + datetime.timedelta(seconds=i // keys)
+        d = DataPoint({'t': None, 'v': rand.random(), 'key': 'series-%d' %
+                       (i % keys)}, None)
+        d.t = t
+        ret.append(d)
+    return ret
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Benchmark runner for the tempodb client.
+
+Each bench_*.py module in this directory has a benchmarks(max_points)
+function returning (name, function) pairs, and optionally an info() function
+returning a dictionary of extra measurements (i.e. file sizes) and a
+teardown() function.  Every function is timed over several repeats and the
+results are written as JSON, which can be saved as a baseline and compared
+against later runs:
+
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --compare baseline.json --threshold 0.1
+
+The comparison exits with status 1 if any benchmark's best time is more than
+the threshold slower than in the baseline.
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import platform
+import optparse
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def discover(only=None):
+    """Import the benchmark modules, optionally only those whose name
+    contains one of the strings in *only*."""
+
+    modules = []
+    for path in sorted(glob.glob(os.path.join(HERE, 'bench_*.py'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if only and not any(o in name for o in only):
+            continue
+        try:
+            modules.append(__import__(name))
+        except ImportError, e:
+            sys.stderr.write('skipping %s: %s\n' % (name, e))
+    return modules
+
+
+def measure(f, repeat, min_time):
+    """Time a function, calling it enough times per repeat to run for at
+    least min_time seconds, and return per-call timings."""
+
+    loops = 1
+    while True:
+        t = time.time()
+        for i in xrange(loops):
+            f()
+        elapsed = time.time() - t
+        if elapsed >= min_time or loops >= 1000:
+            break
+        loops *= 10
+
+    times = [elapsed / loops]
+    for r in xrange(repeat - 1):
+        t = time.time()
+        for i in xrange(loops):
+            f()
+        times.append((time.time() - t) / loops)
+    times.sort()
+    return {'min': times[0], 'median': times[len(times) // 2],
+            'max': times[-1], 'loops': loops, 'repeat': repeat}
+
+
+def run(options):
+    results = {}
+    info = {}
+    for module in discover(options.filter):
+        try:
+            for name, f in module.benchmarks(options.max_points):
+                if options.name and not any(n in name
+                                            for n in options.name):
+                    continue
+                r = measure(f, options.repeat, options.min_time)
+                results[name] = r
+                sys.stderr.write('%-36s %12.3f ms\n' %
+                                 (name, r['min'] * 1000))
+            if hasattr(module, 'info'):
+                info.update(module.info())
+        finally:
+            if hasattr(module, 'teardown'):
+                module.teardown()
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'max_points': options.max_points,
+        'results': results,
+        'info': info
+    }
+
+
+def compare(current, baseline, threshold):
+    """Compare best times against a baseline and return the names of the
+    benchmarks that regressed by more than threshold."""
+
+    if current.get('max_points') != baseline.get('max_points'):
+        sys.stderr.write('warning: baseline was run with --max-points %s\n' %
+                         baseline.get('max_points'))
+
+    regressions = []
+    sys.stderr.write('\n%-36s %12s %12s %8s\n' %
+                     ('benchmark', 'baseline ms', 'current ms', 'change'))
+    for name in sorted(current['results']):
+        if name not in baseline['results']:
+            continue
+        old = baseline['results'][name]['min']
+        new = current['results'][name]['min']
+        change = (new - old) / old if old else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        sys.stderr.write('%-36s %12.3f %12.3f %+7.1f%%%s\n' %
+                         (name, old * 1000, new * 1000, change * 100, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('-o', '--output', help='write results to this file')
+    parser.add_option('-c', '--compare', help='compare to a baseline file')
+    parser.add_option('-t', '--threshold', type='float', default=0.1,
+                      help='allowed slowdown before failing [%default]')
+    parser.add_option('-r', '--repeat', type='int', default=5,
+                      help='timing repeats per benchmark [%default]')
+    parser.add_option('--min-time', type='float', default=0.2,
+                      help='minimum seconds per repeat [%default]')
+    parser.add_option('--max-points', type='int', default=1000000,
+                      help='cap on fixture sizes [%default]')
+    parser.add_option('-f', '--filter', action='append',
+                      help='only run modules matching this (repeatable)')
+    parser.add_option('-n', '--name', action='append',
+                      help='only run benchmarks matching this (repeatable)')
+    options, args = parser.parse_args(argv)
+
+    current = run(options)
+    text = json.dumps(current, indent=2, sort_keys=True)
+    if options.output:
+        f = open(options.output, 'w')
+        f.write(text)
+        f.close()
+    else:
+        print text
+
+    if options.compare:
+        baseline = json.load(open(options.compare))
+        regressions = compare(current, baseline, options.threshold)
+        if regressions:
+            sys.stderr.write('\n%d benchmark(s) regressed by more than '
+                             '%.0f%%\n' % (len(regressions),
+                                           options.threshold * 100))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
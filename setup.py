@@ -20,8 +20,13 @@ install_requires = [
 tests_require = [
     'mock',
     'unittest2',
+    'numpy',
 ]
 
+extras_require = {
+    'numpy': ['numpy'],
+}
+
 setup(
     name="tempodb",
     version="1.0.1",
@@ -29,11 +34,19 @@ setup(
     author_email="dev@tempo-db.com",
     url="http://github.com/tempodb/tempodb-python/",
     description="A client for the TempoDB API",
-    packages=["tempodb", "tempodb.temporal", "tempodb.protocol"],
+    packages=["tempodb", "tempodb.temporal", "tempodb.protocol",
+              "tempodb.testing", "tempodb.storage", "tempodb.tools"],
     long_description="A client for the TempoDB API.",
     dependency_links=[
     ],
     setup_requires=['nose>=1.0'],
     install_requires=install_requires,
+    extras_require=extras_require,
     tests_require=tests_require,
+    entry_points={
+        'console_scripts': [
+            'tempodb-backfill = tempodb.tools.backfill:main',
+            'tempodb-export = tempodb.tools.export:main',
+        ],
+    },
 )
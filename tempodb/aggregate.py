@@ -0,0 +1,172 @@
+import math
+
+
+#the aggregations that can be computed from partial results, and the
+#partial aggregations needed for each.  The standard deviation is merged
+#from the count, mean and standard deviation of each group, since a sum of
+#squares loses all precision for large values with a small spread
+PARTIALS = {
+    'count': ['count'],
+    'sum': ['sum'],
+    'min': ['min'],
+    'max': ['max'],
+    'mult': ['mult'],
+    'ss': ['ss'],
+    'range': ['min', 'max'],
+    'mean': ['count', 'sum'],
+    'avg': ['count', 'sum'],
+    'stddev': ['count', 'mean', 'stddev']
+}
+
+
+def partial_functions(aggregation):
+    """Return the aggregation functions that have to be run on each group of
+    series so that their results can be combined into *aggregation*.
+
+    :param string aggregation: the aggregation to perform
+    :raises ValueError: if the aggregation can not be combined from partial
+                        results (i.e. percentiles)
+    :rtype: list"""
+
+    try:
+        return PARTIALS[aggregation]
+    except KeyError:
+        raise ValueError('Aggregation "%s" can not be computed from partial '
+                         'results' % aggregation)
+
+
+class PartialAggregate(object):
+    """Mergeable partial state of an aggregation at one timestamp.  Each
+    group of series contributes its partial results (count, sum, sum of
+    squares, min, max, product, or mean and standard deviation) and the
+    states are merged to produce the aggregate over all the series.
+
+    The mean and standard deviation of a group can not be added to those of
+    another, so a state holding them must be built from the results of a
+    single group and merged with :meth:`merge`, which combines them with
+    the parallel form of Welford's algorithm."""
+
+    def __init__(self):
+        self.count = None
+        self.sum = None
+        self.ss = None
+        self.min = None
+        self.max = None
+        self.mult = None
+        self.mean = None
+        self.stddev = None
+        self.m2 = None
+
+    def add(self, function, v):
+        """Fold one partial result into the state.
+
+        :param string function: the partial aggregation function
+        :param v: the partial result
+        :type v: int or float
+        :rtype: None"""
+
+        current = getattr(self, function)
+        if current is None or function in ['mean', 'stddev']:
+            setattr(self, function, v)
+        elif function == 'min':
+            self.min = min(current, v)
+        elif function == 'max':
+            self.max = max(current, v)
+        elif function == 'mult':
+            self.mult = current * v
+        else:
+            setattr(self, function, current + v)
+
+    def merge(self, other):
+        """Merge another partial state into this one.
+
+        :param other: the state to merge in
+        :type other: :class:`PartialAggregate`
+        :rtype: :class:`PartialAggregate` (self)"""
+
+        moments = None
+        if other._has_moments():
+            moments = other._moments()
+            if self._has_moments():
+                na, ma, m2a = self._moments()
+                nb, mb, m2b = moments
+                n = na + nb
+                delta = mb - ma
+                moments = (n, ma + delta * nb / n,
+                           m2a + m2b + delta * delta * na * nb / n)
+
+        for f in ['count', 'sum', 'ss', 'min', 'max', 'mult']:
+            v = getattr(other, f)
+            if v is not None:
+                self.add(f, v)
+        if moments is not None:
+            n, self.mean, self.m2 = moments
+            self.stddev = None
+        return self
+
+    def _has_moments(self):
+        return (self.count is not None and self.mean is not None and
+                (self.m2 is not None or self.stddev is not None))
+
+    def _moments(self):
+        #the count, mean and sum of squared deviations from the mean
+        n = float(self.count)
+        m2 = self.m2
+        if m2 is None:
+            m2 = self.stddev * self.stddev * (n - 1)
+        return (n, float(self.mean), m2)
+
+    def result(self, aggregation):
+        """Compute the final value of *aggregation* from the state.  The
+        standard deviation is the sample standard deviation.
+
+        :param string aggregation: the aggregation to compute
+        :rtype: float"""
+
+        if aggregation in ['mean', 'avg']:
+            if self.sum is None:
+                return self.mean
+            return float(self.sum) / self.count
+        if aggregation == 'range':
+            return self.max - self.min
+        if aggregation == 'stddev':
+            if self.count < 2:
+                return 0.0
+            if self._has_moments():
+                n, mean, m2 = self._moments()
+                return math.sqrt(max(m2, 0.0) / (n - 1))
+            m2 = self.ss - float(self.sum) * self.sum / self.count
+            return math.sqrt(max(m2, 0.0) / (self.count - 1))
+        return getattr(self, aggregation)
+
+
+def combine(aggregation, partials):
+    """Combine partial results from several groups of series into the final
+    aggregate series.
+
+    :param string aggregation: the aggregation to perform
+    :param list partials: (function, points, group) tuples, one for each
+                          partial aggregation run on a group, where points
+                          is an iterable of DataPoints and group identifies
+                          the group.  The group is needed to combine means
+                          and standard deviations, and may be left out
+                          otherwise.
+    :rtype: list of (timestamp, value) tuples in time order"""
+
+    groups = {}
+    for partial in partials:
+        function, points = partial[:2]
+        group = partial[2] if len(partial) > 2 else None
+        for d in points:
+            state = groups.get((d.t, group))
+            if state is None:
+                state = groups[(d.t, group)] = PartialAggregate()
+            state.add(function, d.v)
+
+    states = {}
+    for (t, group), state in groups.iteritems():
+        if t in states:
+            states[t].merge(state)
+        else:
+            states[t] = state
+    return [(t, states[t].result(aggregation)) for t in sorted(states)]
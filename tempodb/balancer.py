@@ -0,0 +1,197 @@
+import time
+import random
+import threading
+from metrics import _label
+
+
+LEAST_OUTSTANDING = 'least_outstanding'
+EWMA = 'ewma'
+STRATEGIES = [LEAST_OUTSTANDING, EWMA]
+
+
+class Upstream(object):
+    """One base URL of the API and its health and counters:
+
+        * outstanding: requests in flight
+        * ewma: exponentially weighted moving average of the latency in
+          seconds, or None before the first request
+        * failures: consecutive failed requests
+        * ejected_until: the time until which the upstream is ejected, as a
+          Unix timestamp
+        * requests, errors, ejections: counts since the upstream was created
+        * latency: total seconds spent on requests
+
+    :param string base_url: the base URL"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.outstanding = 0
+        self.ewma = None
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.ejections = 0
+        self.latency = 0.0
+
+    def to_dictionary(self):
+        """Serialize the upstream's state into dictionary form.
+
+        :rtype: dict"""
+
+        return {
+            'outstanding': self.outstanding,
+            'ewma': self.ewma,
+            'failures': self.failures,
+            'ejected': self.ejected_until > time.time(),
+            'requests': self.requests,
+            'errors': self.errors,
+            'ejections': self.ejections,
+            'latency': self.latency
+        }
+
+
+class Balancer(object):
+    """Spreads requests over several base URLs of the API, such as regional
+    proxies, and steers them away from failing ones.  It is used by
+    :class:`tempodb.endpoint.HTTPEndpoint` when it is given a list of base
+    URLs.
+
+    Each request goes to the healthy upstream with the fewest requests in
+    flight (the "least_outstanding" strategy) or with the lowest moving
+    average latency ("ewma").  Health is checked passively: an upstream that
+    fails *max_failures* requests in a row, with a connection error, a
+    timeout or a 5xx status, is ejected for *ejection_time* seconds.  After
+    that it is tried again, and ejected again on its next failure.  If every
+    upstream is ejected the one due back soonest is used.
+
+    :param list base_urls: the base URLs
+    :param string strategy: (optional) "least_outstanding" or "ewma"
+    :param int max_failures: (optional) the consecutive failures that eject
+                             an upstream
+    :param float ejection_time: (optional) seconds to eject an upstream for
+    :param float decay: (optional) the weight of the newest latency in the
+                        moving average"""
+
+    def __init__(self, base_urls, strategy=LEAST_OUTSTANDING, max_failures=3,
+                 ejection_time=30.0, decay=0.3):
+        if not base_urls:
+            raise ValueError('At least one base URL is required')
+        if strategy not in STRATEGIES:
+            raise ValueError('Strategy must be one of %s. Got "%s".' %
+                             (', '.join(STRATEGIES), strategy))
+        self.upstreams = [Upstream(u) for u in base_urls]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.decay = decay
+        self.lock = threading.Lock()
+
+    def split(self, url):
+        """Split a URL into the upstream it belongs to and the rest of the
+        URL after the base URL.
+
+        :param string url: the URL
+        :rtype: tuple of (:class:`Upstream`, string), or (None, url) if the
+                URL does not start with any of the base URLs"""
+
+        for u in self.upstreams:
+            if url.startswith(u.base_url):
+                return (u, url[len(u.base_url):])
+        return (None, url)
+
+    def _score(self, u):
+        if self.strategy == EWMA:
+            #upstreams without a measurement yet are tried first
+            return (u.ewma or 0.0, u.outstanding)
+        return (u.outstanding, u.ewma or 0.0)
+
+    def choose(self, exclude=()):
+        """Pick the upstream for a request and count it as in flight.
+
+        :param exclude: (optional) upstreams not to use, i.e. those already
+                        tried for the request
+        :type exclude: list of :class:`Upstream`
+        :rtype: :class:`Upstream`, or None if every upstream is excluded"""
+
+        now = time.time()
+        with self.lock:
+            candidates = [u for u in self.upstreams if u not in exclude]
+            if not candidates:
+                return None
+            healthy = [u for u in candidates if u.ejected_until <= now]
+            if healthy:
+                best = min(self._score(u) for u in healthy)
+                u = random.choice([u for u in healthy
+                                   if self._score(u) == best])
+            else:
+                u = min(candidates, key=lambda u: u.ejected_until)
+            u.outstanding += 1
+            u.requests += 1
+            return u
+
+    def finish(self, u, seconds, ok):
+        """Record the outcome of a request sent to an upstream.
+
+        :param u: the upstream
+        :type u: :class:`Upstream`
+        :param float seconds: the latency of the request
+        :param bool ok: whether the upstream handled the request
+        :rtype: None"""
+
+        with self.lock:
+            u.outstanding -= 1
+            u.latency += seconds
+            if u.ewma is None:
+                u.ewma = seconds
+            else:
+                u.ewma += self.decay * (seconds - u.ewma)
+            if ok:
+                u.failures = 0
+                return
+            u.errors += 1
+            u.failures += 1
+            if u.failures >= self.max_failures:
+                u.ejected_until = time.time() + self.ejection_time
+                u.ejections += 1
+                #an upstream back from ejection is ejected again on its
+                #next failure, unless a success comes first
+                u.failures = self.max_failures - 1
+
+    def stats(self):
+        """The state and counters of each upstream, keyed by base URL.
+
+        :rtype: dict"""
+
+        with self.lock:
+            return dict((u.base_url, u.to_dictionary())
+                        for u in self.upstreams)
+
+    def to_prometheus(self, prefix='tempodb_client'):
+        """Export the per-upstream counters in the Prometheus text exposition
+        format.
+
+        :param string prefix: (optional) the prefix of the metric names
+        :rtype: string"""
+
+        lines = []
+        with self.lock:
+            for suffix, kind, text, attr in [
+                    ('upstream_requests_total', 'counter',
+                     'Requests sent to each upstream.', 'requests'),
+                    ('upstream_errors_total', 'counter',
+                     'Failed requests by upstream.', 'errors'),
+                    ('upstream_ejections_total', 'counter',
+                     'Times each upstream was ejected.', 'ejections'),
+                    ('upstream_latency_seconds_total', 'counter',
+                     'Time spent on requests by upstream.', 'latency'),
+                    ('upstream_outstanding', 'gauge',
+                     'Requests in flight by upstream.', 'outstanding')]:
+                name = '%s_%s' % (prefix, suffix)
+                lines.append('# HELP %s %s' % (name, text))
+                lines.append('# TYPE %s %s' % (name, kind))
+                for u in self.upstreams:
+                    lines.append('%s{upstream="%s"} %r' %
+                                 (name, _label(u.base_url),
+                                  getattr(u, attr)))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,289 @@
+import json
+import time
+import threading
+from collections import deque
+from protocol import DataPoint
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(Exception):
+    """Raised instead of sending a request while a circuit breaker is open.
+    If the request was a write and the breaker has a fallback, the data was
+    handed to the fallback first and the handed_off attribute is True.
+
+    :param breaker: the breaker that rejected the request
+    :type breaker: :class:`CircuitBreaker`
+    :param bool handed_off: (optional) whether the fallback took the data"""
+
+    def __init__(self, breaker, handed_off=False):
+        self.breaker = breaker
+        self.handed_off = handed_off
+        self.msg = 'Circuit breaker is %s' % breaker.state
+        if handed_off:
+            self.msg += ', data handed to the fallback'
+
+    def __repr__(self):
+        return self.msg
+
+    def __str__(self):
+        return self.msg
+
+
+class CircuitBreaker(object):
+    """Stops requests to an endpoint that is failing, so that workers fail
+    fast during an API incident instead of tying up threads in timeouts.  It
+    is turned on by setting the breaker attribute of the client's endpoint::
+
+        client.session.breaker = CircuitBreaker(error_rate=0.5)
+
+    The breaker is closed, letting requests through, until at least
+    *min_requests* of the last *window* requests have completed and
+    *error_rate* of them or more failed, with a connection error, a timeout
+    or a 5xx status.  It then opens, and every request raises
+    :class:`CircuitOpen` without being sent.  Writes are rejected before
+    their body is serialized.
+
+    After *open_time* seconds the breaker is half open: up to *probes*
+    requests are let through at a time.  If *probes* of them succeed the
+    breaker closes again, and if one fails it opens for another
+    *open_time* seconds.
+
+    Writes rejected while the breaker is open are passed to *fallback*, if
+    given, as fallback(key, data), with a key of None for
+    :meth:`tempodb.client.Client.write_multi`, whose points carry their own
+    keys.  :class:`JSONLinesSink` is a fallback keeping them in a local
+    file to be replayed later.
+
+    :param float error_rate: (optional) the fraction of failed requests that
+                             opens the breaker
+    :param int min_requests: (optional) the number of requests needed before
+                             the error rate is used
+    :param int window: (optional) the number of recent requests the error
+                       rate is computed over
+    :param float open_time: (optional) seconds to stay open before probing
+    :param int probes: (optional) the number of probe requests
+    :param function fallback: (optional) a function taking writes rejected
+                              while open
+    :param function on_state_change: (optional) a function called with the
+                                     breaker, the old state and the new
+                                     state on every change, i.e. to alert"""
+
+    def __init__(self, error_rate=0.5, min_requests=20, window=100,
+                 open_time=30.0, probes=1, fallback=None,
+                 on_state_change=None):
+        if not 0 < error_rate <= 1:
+            raise ValueError('The error rate must be between 0 and 1')
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.open_time = open_time
+        self.probes = probes
+        self.fallback = fallback
+        self.on_state_change = on_state_change
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probing = 0
+        self.probe_successes = 0
+        self.rejected = 0
+        self.handed_off = 0
+        self.lock = threading.Lock()
+
+    def _set_state(self, state):
+        #called with the lock held, returns the change to report
+        old = self.state
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.time()
+        if state != CLOSED:
+            self.probing = 0
+            self.probe_successes = 0
+        else:
+            self.outcomes.clear()
+        return (old, state)
+
+    def _report(self, change):
+        if change is not None and self.on_state_change is not None:
+            self.on_state_change(self, change[0], change[1])
+
+    def rejecting(self):
+        """Whether a request would be rejected now, without taking a probe
+        slot.
+
+        :rtype: bool"""
+
+        with self.lock:
+            if self.state == OPEN:
+                return time.time() < self.opened_at + self.open_time
+            if self.state == HALF_OPEN:
+                return self.probing >= self.probes
+            return False
+
+    def before(self):
+        """Admit a request, or raise :class:`CircuitOpen`.  This is called
+        by :class:`tempodb.endpoint.HTTPEndpoint` before sending a request,
+        which must then be passed to :meth:`record` or :meth:`release`.
+
+        :raises CircuitOpen: if the request is rejected
+        :rtype: None"""
+
+        change = None
+        with self.lock:
+            if (self.state == OPEN and
+                    time.time() >= self.opened_at + self.open_time):
+                change = self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and self.probing < self.probes:
+                self.probing += 1
+                allowed = True
+            else:
+                allowed = self.state == CLOSED
+            if not allowed:
+                self.rejected += 1
+        self._report(change)
+        if not allowed:
+            raise CircuitOpen(self)
+
+    def record(self, ok):
+        """Record the outcome of a request admitted by :meth:`before`.
+
+        :param bool ok: whether the request succeeded
+        :rtype: None"""
+
+        change = None
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probing = max(0, self.probing - 1)
+                if not ok:
+                    change = self._set_state(OPEN)
+                else:
+                    self.probe_successes += 1
+                    if self.probe_successes >= self.probes:
+                        change = self._set_state(CLOSED)
+            elif self.state == CLOSED:
+                self.outcomes.append(ok)
+                n = len(self.outcomes)
+                failed = n - sum(self.outcomes)
+                if (n >= self.min_requests and
+                        failed >= self.error_rate * n):
+                    change = self._set_state(OPEN)
+        self._report(change)
+
+    def release(self):
+        """Give back the probe slot of a request admitted by :meth:`before`
+        that ended without an outcome, i.e. because a hook raised an error,
+        without counting it as a success or a failure.
+
+        :rtype: None"""
+
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probing = max(0, self.probing - 1)
+
+    def shed(self, key, data):
+        """Reject a write if the breaker is open, handing the data to the
+        fallback if there is one.  This is called by
+        :class:`tempodb.client.Client` before serializing a write.
+
+        :param string key: the series key, or None for multi writes
+        :param list data: the data points
+        :raises CircuitOpen: if the write is rejected
+        :rtype: None"""
+
+        if not self.rejecting():
+            return
+        with self.lock:
+            self.rejected += 1
+        if self.fallback is None:
+            raise CircuitOpen(self)
+        self.fallback(key, data)
+        with self.lock:
+            self.handed_off += 1
+        raise CircuitOpen(self, True)
+
+    def stats(self):
+        """The state of the breaker, the error rate over the window, and the
+        counts of requests rejected and writes handed to the fallback.
+
+        :rtype: dict"""
+
+        with self.lock:
+            n = len(self.outcomes)
+            return {'state': self.state,
+                    'error_rate': (n - sum(self.outcomes)) / float(n or 1),
+                    'rejected': self.rejected,
+                    'handed_off': self.handed_off}
+
+
+class JSONLinesSink(object):
+    """A fallback for :class:`CircuitBreaker` that appends rejected writes
+    to a local file, one JSON object per line, so that they can be replayed
+    with :meth:`replay` once the API is back.
+
+    :param string path: the file to append to"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, key, data):
+        line = json.dumps({'key': key,
+                           'data': [d.to_dictionary() for d in data]})
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+    def replay(self, client):
+        """Write the saved data with *client* and empty the file.  If a
+        write fails, the writes not yet replayed are kept in the file.  The
+        file is read and emptied before the writes are sent, so the sink
+        can take writes meanwhile, i.e. those rejected by the breaker it is
+        the fallback of.
+
+        :param client: the client to write with
+        :type client: :class:`tempodb.client.Client`
+        :rtype: int, the number of writes replayed"""
+
+        with self.lock:
+            try:
+                with open(self.path) as f:
+                    lines = [l for l in f if l.strip()]
+            except IOError:
+                return 0
+            open(self.path, 'w').close()
+
+        done = 0
+        try:
+            for line in lines:
+                j = json.loads(line)
+                data = [DataPoint(d, None) for d in j['data']]
+                try:
+                    if j['key'] is None:
+                        client.write_multi(data)
+                    else:
+                        client.write_data(j['key'], data)
+                except CircuitOpen, e:
+                    #the fallback has saved this write again
+                    if e.handed_off:
+                        done += 1
+                    raise
+                done += 1
+        finally:
+            self._restore(lines[done:])
+        return done
+
+    def _restore(self, lines):
+        #put writes that were not replayed back ahead of any saved since
+        if not lines:
+            return
+        with self.lock:
+            try:
+                with open(self.path) as f:
+                    saved = f.readlines()
+            except IOError:
+                saved = []
+            with open(self.path, 'w') as f:
+                f.writelines(lines + saved)
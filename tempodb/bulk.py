@@ -0,0 +1,367 @@
+"""
+Helpers for provisioning, updating and deleting from many series at once,
+used by :meth:`tempodb.client.Client.create_series_bulk`,
+:meth:`tempodb.client.Client.update_series_bulk` and
+:meth:`tempodb.client.Client.delete_bulk`.
+"""
+
+import os
+import math
+import time
+import random
+import hashlib
+import threading
+from dateutil.relativedelta import relativedelta
+from breaker import CircuitOpen
+from deadline import DeadlineExceeded, current as current_deadline
+from response import ResponseException
+from temporal.arrays import epoch_ms_to_datetime, datetime_to_epoch_ms
+from temporal.epoch import MILLISECONDS, NANOSECONDS, to_epoch
+from temporal.period import parse_period, is_fixed, fixed_length_ms
+
+
+CREATED = 'created'
+EXISTS = 'exists'
+SKIPPED = 'skipped'
+UPDATED = 'updated'
+DELETED = 'deleted'
+FAILED = 'failed'
+
+
+class KeyResult(object):
+    """The outcome of a bulk operation for one series key.
+
+    Attributes:
+
+        * key: the series key
+        * status: "created", "exists" (the API reported the series as
+          existing already), "skipped" (the cache knew it existed, so no
+          request was made), "updated", "deleted" or "failed"
+        * response: the last :class:`tempodb.response.Response`, or None
+        * error: the exception of the last attempt if it failed, or None
+        * attempts: the number of requests made
+
+    :param string key: the series key"""
+
+    def __init__(self, key, status=None, response=None, error=None,
+                 attempts=0):
+        self.key = key
+        self.status = status
+        self.response = response
+        self.error = error
+        self.attempts = attempts
+
+    def __repr__(self):
+        return 'KeyResult(%r, %r)' % (self.key, self.status)
+
+    @property
+    def ok(self):
+        return self.status != FAILED
+
+
+class KeyCache(object):
+    """An exact set of series keys known to exist, optionally kept in a
+    file with one key per line so that it survives between runs.
+
+    :param string path: (optional) the file to load from and save to"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.keys = set()
+        self.lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self.keys.update(l.rstrip('\n') for l in f if l.strip())
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        """Record that a series exists.
+
+        :param string key: the series key
+        :rtype: None"""
+
+        with self.lock:
+            self.keys.add(key)
+
+    def save(self):
+        """Write the keys to the file given to the constructor, if one was
+        given.
+
+        :rtype: None"""
+
+        if self.path is None:
+            return
+        with self.lock:
+            with open(self.path, 'w') as f:
+                for key in sorted(self.keys):
+                    f.write(key + '\n')
+
+
+class BloomFilter(object):
+    """A compact, probabilistic set of series keys known to exist, for key
+    sets too large to hold exactly.  A key that was added is always found,
+    but a key that was not may be found too, with a probability of about
+    *error_rate* once *capacity* keys have been added, in which case its
+    creation is skipped wrongly.  Keep the error rate low accordingly.
+
+    :param int capacity: the number of keys expected
+    :param float error_rate: (optional) the false positive rate at capacity"""
+
+    def __init__(self, capacity, error_rate=1e-6):
+        if not 0 < error_rate < 1:
+            raise ValueError('The error rate must be between 0 and 1')
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = int(math.ceil(-capacity * math.log(error_rate) /
+                                  math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.size / float(capacity) *
+                                       math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def _positions(self, key):
+        #double hashing gives as many positions as needed from one digest
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        digest = hashlib.md5(key).hexdigest()
+        h1 = int(digest[:16], 16)
+        h2 = int(digest[16:], 16) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[p >> 3] & (1 << (p & 7))
+                   for p in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, key):
+        """Record that a series exists.
+
+        :param string key: the series key
+        :rtype: None"""
+
+        positions = self._positions(key)
+        with self.lock:
+            for p in positions:
+                self.bits[p >> 3] |= 1 << (p & 7)
+            self.count += 1
+
+
+def _retryable(e):
+    import requests
+    if isinstance(e, ResponseException):
+        return e.response.status >= 500 or e.response.status == 429
+    return isinstance(e, requests.exceptions.RequestException)
+
+
+def attempt(f, result, retries=3, backoff=0.1):
+    """Call *f* until it succeeds, retrying up to *retries* times with
+    exponential backoff and jitter after server errors (5xx and 429) and
+    network errors.  The attempts are counted in *result*, and the error of
+    the last attempt is set on it if they all fail.  Other errors, such as
+    4xx responses, are not retried.  Neither is
+    :class:`tempodb.breaker.CircuitOpen`, which is recorded as the error: an
+    open breaker stays open for longer than the backoff, so a retry would
+    be rejected too.  Under a deadline the backoff is cut short at the time
+    left, and :class:`tempodb.deadline.DeadlineExceeded` is raised once it
+    runs out.
+
+    :param function f: the function making the request
+    :param result: the result to update
+    :type result: :class:`KeyResult`
+    :param int retries: (optional) the number of retries
+    :param float backoff: (optional) the delay before the first retry in
+                          seconds, doubled for each retry after it
+    :rtype: the return value of f, or None if it failed"""
+
+    import requests
+    for i in range(retries + 1):
+        result.attempts += 1
+        try:
+            resp = f()
+        except (ResponseException, CircuitOpen,
+                requests.exceptions.RequestException), e:
+            result.error = e
+            if isinstance(e, ResponseException):
+                result.response = e.response
+            if i == retries or not _retryable(e):
+                return None
+            pause = backoff * (2 ** i) * (0.5 + random.random())
+            deadline = current_deadline()
+            if deadline is not None:
+                pause = min(pause, deadline.remaining())
+            time.sleep(pause)
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded(deadline)
+        else:
+            result.error = None
+            result.response = resp
+            return resp
+    return None
+
+
+def _epoch_ms(t, time_format):
+    #integer times are in the client's unit, which is ms unless it is "ns"
+    if isinstance(t, (int, long)):
+        return t // 10 ** 6 if time_format == NANOSECONDS else t
+    return to_epoch(t, MILLISECONDS)
+
+
+def chunk_range(start, end, chunk, time_format=MILLISECONDS):
+    """Split the time range from *start* to *end* into consecutive chunks
+    of length *chunk*, the last of which may be shorter.  Periods shorter
+    than a day are fixed lengths of time, and longer ones are stepped by
+    calendar in UTC, so "1month" chunks start on the same day of each month.
+
+    :param start: the start of the range
+    :type start: string, Datetime or int
+    :param end: the end of the range
+    :type end: string, Datetime or int
+    :param chunk: the chunk length, i.e. "1day"
+    :type chunk: string or relativedelta
+    :param string time_format: (optional) the time format of the client,
+                               integer times are nanoseconds if it is "ns"
+    :rtype: list of (start, end) tuples of epoch milliseconds"""
+
+    if not isinstance(chunk, relativedelta):
+        chunk = parse_period(chunk)
+    start_ms, end_ms = [_epoch_ms(t, time_format) for t in (start, end)]
+
+    if is_fixed(chunk):
+        step = fixed_length_ms(chunk)
+        if step <= 0:
+            raise ValueError('Chunks must be longer than zero')
+        edges = range(start_ms, end_ms, step) + [end_ms]
+    else:
+        first = epoch_ms_to_datetime(start_ms)
+        edges = [start_ms]
+        i = 1
+        while edges[-1] < end_ms:
+            edges.append(min(end_ms,
+                             datetime_to_epoch_ms(first + chunk * i)))
+            i += 1
+    if len(edges) < 2:
+        return []
+    return zip(edges[:-1], edges[1:])
+
+
+class Checkpoint(object):
+    """A record of the chunks of a bulk delete that have completed, kept in
+    a file with one chunk per line, so that a delete that is interrupted or
+    partly fails can be run again and only delete what is left.
+
+    :param string path: the file to load from and append to"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    parts = line.rstrip('\n').rsplit('\t', 2)
+                    if len(parts) == 3:
+                        self.done.add((parts[0], int(parts[1]),
+                                       int(parts[2])))
+
+    def __contains__(self, chunk):
+        return chunk in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def add(self, key, start, end):
+        """Record a completed chunk.
+
+        :param string key: the series key
+        :param int start: the start of the chunk in epoch milliseconds
+        :param int end: the end of the chunk in epoch milliseconds
+        :rtype: None"""
+
+        with self.lock:
+            self.done.add((key, start, end))
+            with open(self.path, 'a') as f:
+                f.write('%s\t%d\t%d\n' % (key, start, end))
+
+
+class DeleteProgress(object):
+    """Counters for a bulk delete, which can be read from another thread
+    while the delete runs, i.e. to report progress:
+
+        * total: the number of chunks to delete
+        * done: chunks deleted
+        * skipped: chunks skipped because the checkpoint had them
+        * failed: chunks that failed after all retries, as a list of
+          :class:`KeyResult` objects whose key is a (key, start, end)
+          tuple
+        * deleted_ms: the length of time deleted, summed over the chunks
+        * elapsed: seconds since the delete started
+
+    :param int total: (optional) the number of chunks"""
+
+    def __init__(self, total=0):
+        self.total = total
+        self.done = 0
+        self.skipped = 0
+        self.failed = []
+        self.deleted_ms = 0
+        self.started = time.time()
+        self.finished = None
+        self.lock = threading.Lock()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def remaining(self):
+        return self.total - self.done - self.skipped - len(self.failed)
+
+    def record(self, result, start, end):
+        """Count a chunk as deleted or failed.
+
+        :param result: the result of deleting the chunk
+        :type result: :class:`KeyResult`
+        :param int start: the start of the chunk in epoch milliseconds
+        :param int end: the end of the chunk in epoch milliseconds
+        :rtype: None"""
+
+        with self.lock:
+            if result.ok:
+                self.done += 1
+                self.deleted_ms += end - start
+            else:
+                self.failed.append(result)
+
+    def throughput(self):
+        """The chunks deleted per second and the milliseconds of data
+        deleted per second so far.
+
+        :rtype: tuple of (float, float)"""
+
+        elapsed = self.elapsed or 1e-9
+        return (self.done / elapsed, self.deleted_ms / elapsed)
+
+    def to_dictionary(self):
+        """Serialize the counters into dictionary form.
+
+        :rtype: dict"""
+
+        chunks_per_second, ms_per_second = self.throughput()
+        return {
+            'total': self.total,
+            'done': self.done,
+            'skipped': self.skipped,
+            'failed': len(self.failed),
+            'remaining': self.remaining,
+            'elapsed': self.elapsed,
+            'chunks_per_second': chunks_per_second,
+            'ms_per_second': ms_per_second
+        }
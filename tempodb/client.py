@@ -1,11 +1,19 @@
 import functools
+import time
 import urlparse
 import urllib
 import json
 import endpoint
 import protocol
+import bulk
+from parallel import parallel_map, DEFAULT_WORKERS
+from paging import AUTO, PageSizer
+from deadline import Deadline
+from aggregate import partial_functions, combine
+from protocol.merge import merge_cursors
 from response import Response, ResponseException
 from temporal.validate import check_time_param
+from temporal.epoch import DATETIME, check_time_format, epoch_to_iso
 
 
 def make_series_url(key):
@@ -44,10 +52,13 @@ class with_response_type(object):
             #dont try this at home kids
             session = args[0].session
             resp_obj = Response(resp, session)
-            if resp_obj.status == 200:
-                resp_obj._cast_payload(self.t)
-            else:
-                raise ResponseException(resp_obj)
+            try:
+                if resp_obj.status == 200:
+                    resp_obj._cast_payload(self.t, args[0].time_format)
+                else:
+                    raise ResponseException(resp_obj)
+            finally:
+                session.emit(resp_obj.timing)
             return resp_obj
         return wrapper
 
@@ -66,18 +77,42 @@ class with_cursor(object):
     def __call__(self, f, *args, **kwargs):
         @functools.wraps(f)
         def wrapper(*args, **kwargs):
+            #with limit="auto" the page sizes are chosen by a copy of the
+            #client's page sizer, starting with its initial size
+            sizer = None
+            if kwargs.get('limit') == AUTO:
+                sizer = args[0].page_sizer.copy()
+                kwargs['limit'] = sizer.limit
+            sent = time.time()
             resp = f(*args, **kwargs)
             session = args[0].session
             resp_obj = Response(resp, session)
-            if resp_obj.status == 200:
-                data = json.loads(resp_obj.body)
-                if self.cursor_type in [protocol.SeriesCursor,
-                                        protocol.SingleValueCursor]:
-                    return self.cursor_type(data, self.data_type, resp_obj)
+            timing = resp_obj.timing
+            try:
+                if resp_obj.status != 200:
+                    raise ResponseException(resp_obj)
+                start = time.time()
+                body = resp_obj.body
+                data = json.loads(body)
+                parsed = time.time()
+                if self.cursor_type == protocol.SeriesCursor:
+                    cursor = self.cursor_type(data, self.data_type, resp_obj)
                 else:
-                    return self.cursor_type(data, self.data_type, resp_obj,
-                                            kwargs.get('tz'))
-            raise ResponseException(resp_obj)
+                    cursor = self.cursor_type(data, self.data_type, resp_obj,
+                                              kwargs.get('tz'),
+                                              args[0].time_format)
+                if timing is not None:
+                    timing.parse_time += parsed - start
+                    timing.build_time += time.time() - parsed
+                if sizer is not None:
+                    if timing is not None:
+                        timing.page_size = sizer.limit
+                    sizer.observe(cursor._page_length(data), parsed - sent,
+                                  len(body))
+                    cursor.sizer = sizer
+                return cursor
+            finally:
+                session.emit(timing)
         return wrapper
 
 
@@ -91,19 +126,24 @@ class Client(object):
     SERIES
 
         * :meth:`create_series`
+        * :meth:`create_series_bulk`
         * :meth:`delete_series`
         * :meth:`get_series`
         * :meth:`list_series`
         * :meth:`update_series`
+        * :meth:`update_series_bulk`
 
     READING DATA
 
         * :meth:`read_data`
         * :meth:`find_data`
         * :meth:`aggregate_data`
+        * :meth:`aggregate_data_parallel`
         * :meth:`read_multi`
         * :meth:`read_multi_rollups`
+        * :meth:`read_multi_merged`
         * :meth:`get_summary`
+        * :meth:`export`
 
     WRITING DATA
 
@@ -113,20 +153,67 @@ class Client(object):
     DELETING
 
         * :meth:`delete`
+        * :meth:`delete_bulk`
 
     SINGLE VALUE
 
         * :meth:`single_value`
         * :meth:`multi_series_single_value`
 
+    DIAGNOSTICS
+
+        * :meth:`profile`
+
+    DEADLINES
+
+        * :meth:`deadline`
+
+    By default timestamps are read as Datetime objects.  Parsing those is
+    the main client-side cost of reading large ranges, so a time_format of
+    "ms" or "ns" can be given instead to read timestamps as integers since
+    the UNIX epoch in UTC, which are parsed without going through dateutil::
+
+        client = Client(database_id, key, secret, time_format='ms')
+        for d in client.read_data('foo', 1356998400000, 1357084800000):
+            print d.t, d.v
+
+    Whatever the time_format, time parameters can be given as integer epoch
+    times, which are taken as milliseconds unless the time_format is "ns".
+
+    The methods returning cursors accept limit="auto" as a keyword argument
+    to have the size of each page chosen from the latency and size of the
+    pages before it, within the bounds set by the page_sizer attribute, a
+    :class:`tempodb.paging.PageSizer`.
+
+    The base_url can be a list of base URLs, such as regional proxies of the
+    API, to spread requests over them and fail over between them, see
+    :class:`tempodb.endpoint.HTTPEndpoint`.  A
+    :class:`tempodb.breaker.CircuitBreaker` set as the breaker attribute of
+    the endpoint makes calls raise :class:`tempodb.breaker.CircuitOpen`
+    while the API is failing, and writes are then rejected before their
+    data is serialized.
+
     :param string database_id: 32-character identifier for your database
     :param string key: your API key, currently the same as database_id
-    :param string secret: your API secret"""
-
-    def __init__(self, database_id, key, secret, base_url=endpoint.BASE_URL):
+    :param string secret: your API secret
+    :param base_url: (optional) the base URL of the API, or a list of them
+    :type base_url: string or list
+    :param string time_format: (optional) the format of timestamps read, one
+                               of "datetime", "ms" and "ns", defaults to
+                               Datetime objects
+    :param page_sizer: (optional) the settings for limit="auto"
+    :type page_sizer: :class:`tempodb.paging.PageSizer`
+    :param float timeout: (optional) the default timeout in seconds for
+                          connecting and for each read from the socket, see
+                          :meth:`deadline` to bound whole calls"""
+
+    def __init__(self, database_id, key, secret, base_url=endpoint.BASE_URL,
+                 time_format=DATETIME, page_sizer=None, timeout=None):
         self.database_id = database_id
+        self.time_format = check_time_format(time_format)
+        self.page_sizer = page_sizer or PageSizer()
         self.session = endpoint.HTTPEndpoint(database_id, key, secret,
-                                             base_url)
+                                             base_url, timeout)
 
     #SERIES METHODS
     @with_response_type('Nothing')
@@ -144,6 +231,56 @@ class Client(object):
         resp = self.session.post(endpoint.SERIES_ENDPOINT, body)
         return resp
 
+    def create_series_bulk(self, keys, tags=[], attrs={}, cache=None,
+                           workers=DEFAULT_WORKERS, retries=3):
+        """Create many series with the same tags and attributes, making the
+        requests concurrently with a pool of worker threads.  Requests that
+        fail with a server or network error are retried with exponential
+        backoff.  A series the API reports as existing already is not an
+        error.
+
+        Keys found in *cache*, a :class:`tempodb.bulk.KeyCache` or
+        :class:`tempodb.bulk.BloomFilter` of series known to exist, are
+        skipped without a request, and the keys created or found to exist
+        are added to it, so that an interrupted run can be repeated
+        cheaply::
+
+            cache = KeyCache('provisioned.txt')
+            results = client.create_series_bulk(keys, cache=cache)
+            cache.save()
+            failed = [r for r in results.values() if not r.ok]
+
+        :param list keys: the keys of the series to create
+        :param list tags: (optional) the tags to create the series with
+        :param dict attrs: (optional) the attributes to the create the series
+                           with
+        :param cache: (optional) the keys known to exist
+        :param int workers: (optional) the number of concurrent requests
+        :param int retries: (optional) the number of retries per series
+        :rtype: dict of series key to :class:`tempodb.bulk.KeyResult`"""
+
+        def create(key):
+            result = bulk.KeyResult(key)
+            if cache is not None and key in cache:
+                result.status = bulk.SKIPPED
+                return result
+            bulk.attempt(lambda: self.create_series(key, tags, attrs),
+                         result, retries)
+            if result.error is None:
+                result.status = bulk.CREATED
+            elif (result.response is not None and
+                    result.response.status == 409):
+                result.status = bulk.EXISTS
+                result.error = None
+            else:
+                result.status = bulk.FAILED
+            if result.ok and cache is not None:
+                cache.add(key)
+            return result
+
+        results = parallel_map(create, keys, workers)
+        return dict((r.key, r) for r in results)
+
     @with_response_type('Nothing')
     def delete_series(self, keys=None, tags=None, attrs=None,
                       allow_truncation=False):
@@ -232,6 +369,29 @@ class Client(object):
         resp = self.session.put(url, series.to_json())
         return resp
 
+    def update_series_bulk(self, series, workers=DEFAULT_WORKERS,
+                           retries=3):
+        """Update many series concurrently, with retries as for
+        :meth:`create_series_bulk`.  See :meth:`update_series`.
+
+        :param list series: the :class:`tempodb.protocol.objects.Series`
+                            objects to update
+        :param int workers: (optional) the number of concurrent requests
+        :param int retries: (optional) the number of retries per series
+        :rtype: dict of series key to :class:`tempodb.bulk.KeyResult`"""
+
+        def update(s):
+            result = bulk.KeyResult(s.key)
+            bulk.attempt(lambda: self.update_series(s), result, retries)
+            if result.error is None:
+                result.status = bulk.UPDATED
+            else:
+                result.status = bulk.FAILED
+            return result
+
+        results = parallel_map(update, series, workers)
+        return dict((r.key, r) for r in results)
+
     #DATA READING METHODS
     @with_cursor(protocol.DataPointCursor, protocol.DataPoint)
     def read_data(self, key, start=None, end=None, rollup=None,
@@ -272,9 +432,9 @@ class Client(object):
 
         :param string key: the series key to use
         :param start: the start time for the data points
-        :type start: string or Datetime
+        :type start: string, Datetime or int
         :param end: the end time for the data points
-        :type end: string or Datetime
+        :type end: string, Datetime or int
         :param string rollup: (optional) the name of a rollup function to use
         :param string period: (optional) downsampling rate for the data
         :param string interpolationf: (optional) an interpolation function
@@ -289,8 +449,8 @@ class Client(object):
         url = make_series_url(key)
         url = urlparse.urljoin(url + '/', 'segment')
 
-        vstart = check_time_param(start)
-        vend = check_time_param(end)
+        vstart = check_time_param(start, self.time_format)
+        vend = check_time_param(end, self.time_format)
         params = {
             'start': vstart,
             'end': vend,
@@ -314,9 +474,9 @@ class Client(object):
 
         :param string key: the series key to use
         :param start: the start time for the data points
-        :type start: string or Datetime
+        :type start: string, Datetime or int
         :param end: the end time for the data points
-        :type end: string or Datetime
+        :type end: string, Datetime or int
         :param string tz: (optional) the timezone to place the data into
         :rtype: :class:`tempodb.response.Response` with a
                 :class:`tempodb.protocol.objects.SeriesSummary` data payload"""
@@ -324,8 +484,8 @@ class Client(object):
         url = make_series_url(key)
         url = urlparse.urljoin(url + '/', 'summary')
 
-        vstart = check_time_param(start)
-        vend = check_time_param(end)
+        vstart = check_time_param(start, self.time_format)
+        vend = check_time_param(end, self.time_format)
         params = {
             'start': vstart,
             'end': vend,
@@ -347,9 +507,9 @@ class Client(object):
         :param list rollups: the rollup functions to use
         :param list keys: (optional) filter by one or more series keys
         :param start: the start time for the data points
-        :type start: string or Datetime
+        :type start: string, Datetime or int
         :param end: the end time for the data points
-        :type end: string or Datetime
+        :type end: string, Datetime or int
         :param string period: (optional) downsampling rate for the data
         :param string tz: (optional) the timezone to place the data into
         :param string interpolationf: (optional) an interpolation function
@@ -363,8 +523,8 @@ class Client(object):
         url = make_series_url(key)
         url = urlparse.urljoin(url + '/', 'data/rollups/segment')
 
-        vstart = check_time_param(start)
-        vend = check_time_param(end)
+        vstart = check_time_param(start, self.time_format)
+        vend = check_time_param(end, self.time_format)
         params = {
             'start': vstart,
             'end': vend,
@@ -401,9 +561,9 @@ class Client(object):
 
         :param string key: the series key to use
         :param start: the start time for the data points
-        :type start: string or Datetime
+        :type start: string, Datetime or int
         :param end: the end time for the data points
-        :type end: string or Datetime
+        :type end: string, Datetime or int
         :param string predicate: the name of a search function to use
         :param string period: downsampling rate for the data
         :param string tz: (optional) the timezone to place the data into
@@ -414,8 +574,8 @@ class Client(object):
         url = make_series_url(key)
         url = urlparse.urljoin(url + '/', 'find')
 
-        vstart = check_time_param(start)
-        vend = check_time_param(end)
+        vstart = check_time_param(start, self.time_format)
+        vend = check_time_param(end, self.time_format)
         params = {
             'start': vstart,
             'end': vend,
@@ -451,9 +611,9 @@ class Client(object):
         :param dict attrs: (optional) filter by one or more key-value
                            attributes
         :param start: the start time for the data points
-        :type start: string or Datetime
+        :type start: string, Datetime or int
         :param end: the end time for the data points
-        :type end: string or Datetime
+        :type end: string, Datetime or int
         :param string rollup: (optional) the name of a rollup function to use
         :param string period: (optional) downsampling rate for the data
         :param string interpolationf: (optional) an interpolation function
@@ -467,8 +627,8 @@ class Client(object):
 
         url = 'segment'
 
-        vstart = check_time_param(start)
-        vend = check_time_param(end)
+        vstart = check_time_param(start, self.time_format)
+        vend = check_time_param(end, self.time_format)
         params = {
             'start': vstart,
             'end': vend,
@@ -488,6 +648,52 @@ class Client(object):
         resp = self.session.get(url)
         return resp
 
+    def aggregate_data_parallel(self, start, end, aggregation, keys=[],
+                                tags=[], attrs={}, rollup=None, period=None,
+                                interpolationf=None, interpolation_period=None,
+                                tz=None, limit=1000, group_size=500,
+                                workers=DEFAULT_WORKERS):
+        """Perform the same aggregation as :meth:`aggregate_data`, but fan it
+        out client-side for filters that match very many series.  The filter
+        is first resolved to a list of series keys with :meth:`list_series`.
+        The keys are then split into groups of *group_size*, the partial
+        aggregations needed for the result are run on each group in
+        parallel, and the partial results are combined locally.
+
+        The supported aggregations are count, sum, min, max, mult, ss,
+        range, mean (or avg) and stddev.  Percentiles can not be combined
+        from partial results and raise a ValueError.
+
+        See :meth:`aggregate_data` for a description of the other
+        parameters.
+
+        :param int group_size: (optional) the number of series to aggregate
+                               per request
+        :param int workers: (optional) the number of concurrent requests
+        :raises ValueError: if the aggregation is not supported
+        :rtype: list of :class:`tempodb.protocol.objects.DataPoint` objects"""
+
+        functions = partial_functions(aggregation)
+        series = self.list_series(keys=keys, tags=tags, attrs=attrs)
+        found = [s.key for s in series]
+        groups = [found[i:i + group_size]
+                  for i in range(0, len(found), group_size)]
+
+        def read(job):
+            function, i, group = job
+            cursor = self.aggregate_data(
+                start, end, function, keys=group, rollup=rollup,
+                period=period, interpolationf=interpolationf,
+                interpolation_period=interpolation_period, tz=tz,
+                limit=limit)
+            return (function, [d for d in cursor], i)
+
+        jobs = [(f, i, g) for i, g in enumerate(groups) for f in functions]
+        partials = parallel_map(read, jobs, workers)
+        return [protocol.DataPoint.from_data(t, v, tz=tz,
+                                             time_format=self.time_format)
+                for t, v in combine(aggregation, partials)]
+
     @with_cursor(protocol.DataPointCursor, protocol.MultiPoint)
     def read_multi(self, start, end, keys=None, rollup=None, period=None,
                    tz=None, tags=None, attrs=None, interpolationf=None,
@@ -504,9 +710,9 @@ class Client(object):
         :param dict attrs: (optional) filter by one or more key-value
                             attributes
         :param start: the start time for the data points
-        :type start: string or Datetime
+        :type start: string, Datetime or int
         :param end: the end time for the data points
-        :type end: string or Datetime
+        :type end: string, Datetime or int
         :param string rollup: (optional) the name of a rollup function to use
         :param string period: (optional) downsampling rate for the data
         :param string tz: (optional) the timezone to place the data into
@@ -520,8 +726,8 @@ class Client(object):
 
         url = 'multi'
 
-        vstart = check_time_param(start)
-        vend = check_time_param(end)
+        vstart = check_time_param(start, self.time_format)
+        vend = check_time_param(end, self.time_format)
         params = {
             'key': keys,
             'tag': tags,
@@ -540,6 +746,87 @@ class Client(object):
         resp = self.session.get(url)
         return resp
 
+    def read_multi_merged(self, keys, start, end, rollup=None, period=None,
+                          interpolationf=None, interpolation_period=None,
+                          tz=None, limit=1000, workers=DEFAULT_WORKERS):
+        """Read data from many series by key and merge it client-side into
+        one time-ordered stream of MultiPoints.  This is an alternative to
+        :meth:`read_multi` for very large sets of keys, which can run into
+        URL length and page size limits on the server.
+
+        A :meth:`read_data` call is made for each key using a pool of
+        worker threads, and the resulting cursors are then merged lazily by
+        timestamp.  Only one page of data per series (at most *limit* points)
+        is held in memory at any time, with further pages being fetched as
+        the merge consumes them.
+
+        See the :meth:`read_data` method for how to work with the start, end,
+        rollup, period, interpolation, and tz parameters.
+
+        :param list keys: the series keys to read from
+        :param start: the start time for the data points
+        :type start: string, Datetime or int
+        :param end: the end time for the data points
+        :type end: string, Datetime or int
+        :param string rollup: (optional) the name of a rollup function to use
+        :param string period: (optional) downsampling rate for the data
+        :param string interpolationf: (optional) an interpolation function
+                                      to run over the series
+        :param string interpolation_period: (optional) the period to
+                                            interpolate data into
+        :param string tz: (optional) the timezone to place the data into
+        :param limit: (optional) the page size for each series, or "auto"
+        :type limit: int or string
+        :param int workers: (optional) the number of concurrent requests
+        :rtype: generator of :class:`tempodb.protocol.objects.MultiPoint`
+                objects"""
+
+        def read(key):
+            cursor = self.read_data(key, start, end, rollup=rollup,
+                                    period=period,
+                                    interpolationf=interpolationf,
+                                    interpolation_period=interpolation_period,
+                                    tz=tz, limit=limit)
+            return (key, cursor)
+
+        cursors = parallel_map(read, keys, workers)
+        return merge_cursors(cursors, tz=tz, time_format=self.time_format)
+
+    def export(self, keys, start, end, path, limit=1000):
+        """Read data from one or more series and save it to a local file in
+        a compact binary format, which can be read back with
+        :class:`tempodb.storage.tsfile.ExportReader`::
+
+            client.export(['foo', 'bar'], start, end, 'snapshot.tsf')
+            with ExportReader('snapshot.tsf') as r:
+                ts, values = r.read_arrays('foo')
+
+        The series are read one at a time and written as they are read, so
+        only one page of data is held in memory.  The file only appears at
+        *path* once every series has been written.
+
+        :param keys: the series keys to export
+        :type keys: list or string
+        :param start: the start time for the data points
+        :type start: string, Datetime or int
+        :param end: the end time for the data points
+        :type end: string, Datetime or int
+        :param string path: the file to write
+        :param limit: (optional) the page size to read with, or "auto"
+        :type limit: int or string
+        :rtype: dict of series key to the number of points written"""
+
+        if isinstance(keys, basestring):
+            keys = [keys]
+
+        from storage.tsfile import ExportWriter
+        ret = {}
+        with ExportWriter(path) as writer:
+            for key in keys:
+                cursor = self.read_data(key, start, end, limit=limit)
+                ret[key] = writer.write_series(key, cursor)
+        return ret
+
     #WRITE DATA METHODS
     @with_response_type('Nothing')
     def write_data(self, key, data, tags=[], attrs={}):
@@ -562,6 +849,7 @@ class Client(object):
         #url_args = endpoint.make_url_args(params)
         #url = '?'.join([url, url_args])
 
+        self._shed(key, data)
         dlist = [d.to_dictionary() for d in data]
         body = json.dumps(dlist)
         resp = self.session.post(url, body)
@@ -587,11 +875,17 @@ class Client(object):
 
         url = 'multi/'
 
+        self._shed(None, data)
         dlist = [d.to_dictionary() for d in data]
         body = json.dumps(dlist)
         resp = self.session.post(url, body)
         return resp
 
+    def _shed(self, key, data):
+        #reject a write before serializing it if the breaker is open
+        if self.session.breaker is not None:
+            self.session.breaker.shed(key, data)
+
     #INCREMENT METHODS
     #@with_response_type('Nothing')
     #def increment(self, key, data=[]):
@@ -628,7 +922,7 @@ class Client(object):
 
         :param string key: the key for the series to use
         :param ts: (optional) the time to begin searching from
-        :type ts: ISO8601 string or Datetime object
+        :type ts: ISO8601 string, Datetime object or int
         :param string direction: criterion for the search
         :rtype: :class:`tempodb.response.Response` with a
                 :class:`tempodb.protocol.objects.SingleValue` object as the
@@ -638,7 +932,7 @@ class Client(object):
         url = urlparse.urljoin(url + '/', 'single')
 
         if ts is not None:
-            vts = check_time_param(ts)
+            vts = check_time_param(ts, self.time_format)
         else:
             vts = None
 
@@ -667,7 +961,7 @@ class Client(object):
 
         :param string keys: (optional) a list of keys for the series to use
         :param ts: (optional) the time to begin searching from
-        :type ts: ISO8601 string or Datetime object
+        :type ts: ISO8601 string, Datetime object or int
         :param string direction: criterion for the search
         :param tags: filter by one or more tags
         :type tags: list or string
@@ -678,7 +972,7 @@ class Client(object):
 
         url = 'single/'
         if ts is not None:
-            vts = check_time_param(ts)
+            vts = check_time_param(ts, self.time_format)
         else:
             vts = None
 
@@ -702,15 +996,15 @@ class Client(object):
 
         :param string key: a list of keys for the series to use
         :param start: the time to begin deleting from
-        :type start: ISO8601 string or Datetime object
+        :type start: ISO8601 string, Datetime object or int
         :param end: the time to end deleting at
-        :type end: ISO8601 string or Datetime object
+        :type end: ISO8601 string, Datetime object or int
         :rtype: :class:`tempodb.response.Response` object"""
 
         url = make_series_url(key)
         url = urlparse.urljoin(url + '/', 'data')
-        vstart = check_time_param(start)
-        vend = check_time_param(end)
+        vstart = check_time_param(start, self.time_format)
+        vend = check_time_param(end, self.time_format)
 
         params = {
             'start': vstart,
@@ -721,3 +1015,120 @@ class Client(object):
         url = '?'.join([url, url_args])
         resp = self.session.delete(url)
         return resp
+
+    def delete_bulk(self, keys, start, end, chunk='1day',
+                    workers=DEFAULT_WORKERS, retries=3, checkpoint=None,
+                    progress=None):
+        """Delete the data of one or more series over a long time range.
+        The range is split into chunks of length *chunk* (see
+        :func:`tempodb.bulk.chunk_range`), so that no single request has to
+        delete too much, and the chunks of every series are deleted
+        concurrently with a pool of worker threads.  Requests that fail with
+        a server or network error are retried with exponential backoff.
+
+        Completed chunks are recorded in *checkpoint*, a
+        :class:`tempodb.bulk.Checkpoint`, and chunks already in it are
+        skipped, so running the same delete again after an interruption or
+        failure only deletes what is left.  The counters of *progress*, a
+        :class:`tempodb.bulk.DeleteProgress`, can be read from another
+        thread while the delete runs::
+
+            progress = DeleteProgress()
+            checkpoint = Checkpoint('delete-foo.txt')
+            client.delete_bulk(['foo'], '2010-01-01', '2014-01-01',
+                               checkpoint=checkpoint, progress=progress)
+            print progress.to_dictionary()
+
+        :param keys: the keys of the series to delete from
+        :type keys: list or string
+        :param start: the time to begin deleting from
+        :type start: ISO8601 string, Datetime object or int
+        :param end: the time to end deleting at
+        :type end: ISO8601 string, Datetime object or int
+        :param chunk: (optional) the length of each chunk, i.e. "1day"
+        :type chunk: string or relativedelta
+        :param int workers: (optional) the number of concurrent requests
+        :param int retries: (optional) the number of retries per chunk
+        :param checkpoint: (optional) the record of completed chunks
+        :type checkpoint: :class:`tempodb.bulk.Checkpoint`
+        :param progress: (optional) the counters to update
+        :type progress: :class:`tempodb.bulk.DeleteProgress`
+        :rtype: :class:`tempodb.bulk.DeleteProgress`"""
+
+        if isinstance(keys, basestring):
+            keys = [keys]
+        chunks = bulk.chunk_range(start, end, chunk, self.time_format)
+        if progress is None:
+            progress = bulk.DeleteProgress()
+        progress.total = len(keys) * len(chunks)
+
+        jobs = []
+        for cstart, cend in chunks:
+            for key in keys:
+                job = (key, cstart, cend)
+                if checkpoint is not None and job in checkpoint:
+                    progress.skipped += 1
+                else:
+                    jobs.append(job)
+
+        def delete(job):
+            key, cstart, cend = job
+            result = bulk.KeyResult(job)
+            vstart, vend = epoch_to_iso([cstart, cend])
+            bulk.attempt(lambda: self.delete(key, vstart, vend), result,
+                         retries)
+            result.status = bulk.FAILED if result.error else bulk.DELETED
+            if result.ok and checkpoint is not None:
+                checkpoint.add(key, cstart, cend)
+            progress.record(result, cstart, cend)
+
+        try:
+            parallel_map(delete, jobs, workers)
+        finally:
+            progress.finished = time.time()
+        return progress
+
+    def profile(self):
+        """Profile the client work done in a block of code, attributing the
+        time to the phases of the API calls made: building URLs, HTTP,
+        constructing responses, JSON decoding, timestamp parsing and building
+        objects::
+
+            with client.profile() as p:
+                for dp in client.read_data('foo', start, end):
+                    pass
+            print p.report()
+            p.dump('read_data.pstats')
+
+        See :class:`tempodb.profiling.Profile` for the details.
+
+        :rtype: :class:`tempodb.profiling.Profile`"""
+
+        from profiling import Profile
+        return Profile()
+
+    def deadline(self, seconds):
+        """Bound the time taken by the API calls made in a block of code::
+
+            with client.deadline(5.0):
+                cursor = client.read_data('foo', start, end)
+            try:
+                data = collect(cursor)
+            except DeadlineExceeded, e:
+                data = e.partial
+
+        The deadline applies to every request made in the block, to the
+        pages fetched by cursors created in the block (even when they are
+        iterated after it), to hedged requests and to the worker threads of
+        calls that fan out, such as :meth:`read_multi_merged`.  Each request
+        is sent with a timeout no longer than the time left.  Once the
+        deadline has passed, :class:`tempodb.deadline.DeadlineExceeded` is
+        raised, with the results that were complete as its partial
+        attribute where the call can return some (see
+        :func:`tempodb.deadline.collect` and
+        :func:`tempodb.parallel.parallel_map`).
+
+        :param float seconds: the time allowed
+        :rtype: :class:`tempodb.deadline.Deadline`"""
+
+        return Deadline(seconds)
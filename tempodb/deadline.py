@@ -0,0 +1,136 @@
+"""
+Deadlines for API calls.  A deadline is set for a block of code with
+:meth:`tempodb.client.Client.deadline` and applies to every request made in
+the block, including the pages fetched by cursors created in it (even when
+they are iterated later), hedged requests and the requests made by worker
+threads when a call is fanned out.
+"""
+
+import time
+import threading
+
+
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a deadline expires before a call has finished.  Any
+    results that were complete when it expired are available as the partial
+    attribute, whose form depends on the call: the items read so far for
+    :func:`collect`, or a list with None in place of each unfinished item
+    for calls fanned out over several series.
+
+    :param deadline: the deadline that expired
+    :type deadline: :class:`Deadline`
+    :param partial: (optional) the results completed in time"""
+
+    def __init__(self, deadline, partial=None):
+        self.deadline = deadline
+        self.partial = partial
+        self.msg = 'Deadline of %.3fs exceeded' % deadline.seconds
+
+    def __repr__(self):
+        return self.msg
+
+    def __str__(self):
+        return self.msg
+
+
+class Deadline(object):
+    """A point in time by which a call must finish.
+
+    :param float seconds: the time allowed from now"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.time() + seconds
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        _local.stack.pop()
+
+    def remaining(self):
+        """The seconds left before the deadline, which is never negative.
+
+        :rtype: float"""
+
+        return max(0.0, self.expires - time.time())
+
+    @property
+    def expired(self):
+        return time.time() >= self.expires
+
+    def check(self):
+        """Raise :class:`DeadlineExceeded` if the deadline has passed.
+
+        :rtype: None"""
+
+        if self.expired:
+            raise DeadlineExceeded(self)
+
+    def timeout(self, default=None):
+        """The socket timeout to use for a request: the time left, or the
+        default if that is shorter.
+
+        :param float default: (optional) the default timeout
+        :rtype: float"""
+
+        remaining = self.remaining()
+        if default is not None and default < remaining:
+            return default
+        return remaining
+
+
+def current():
+    """The deadline that applies to the current thread, or None.  Where
+    deadlines are nested the earliest applies.
+
+    :rtype: :class:`Deadline` or None"""
+
+    stack = getattr(_local, 'stack', None)
+    if not stack:
+        return None
+    return min(stack, key=lambda d: d.expires)
+
+
+def bind(f, deadline):
+    """Wrap a function so that it runs under *deadline*, i.e. on a worker
+    thread.  If the deadline is None the function is returned as is.
+
+    :param function f: the function to wrap
+    :param deadline: the deadline to apply
+    :type deadline: :class:`Deadline` or None
+    :rtype: function"""
+
+    if deadline is None:
+        return f
+
+    def wrapper(*args, **kwargs):
+        with deadline:
+            return f(*args, **kwargs)
+    return wrapper
+
+
+def collect(iterable):
+    """Read an iterable, such as a cursor, into a list.  If a deadline
+    expires while reading, the :class:`DeadlineExceeded` raised has the items
+    read so far as its partial attribute.
+
+    :param iterable: the iterable to read
+    :raises DeadlineExceeded: if a deadline expires
+    :rtype: list"""
+
+    ret = []
+    try:
+        for i in iterable:
+            ret.append(i)
+    except DeadlineExceeded, e:
+        e.partial = ret
+        raise
+    return ret
@@ -1,7 +1,10 @@
-import requests
-from requests.auth import HTTPBasicAuth
+import time
 import urlparse
 import urllib
+import threading
+from metrics import TimingEvent, LatencyRecorder, url_template
+from deadline import DeadlineExceeded, current as current_deadline
+from balancer import Balancer
 
 
 BASE_URL = 'https://api.tempo-db.com/v1/'
@@ -37,28 +40,243 @@ class HTTPEndpoint(object):
     """Represents an HTTP endpoint for accessing a REST API.  Provides
     utility methods for GET, POST, PUT, and DELETE requests.
 
+    Every request is timed.  A :class:`tempodb.metrics.TimingEvent` is
+    attached to each response as its "timing" attribute, and once the
+    response has been parsed the event is passed to :meth:`emit`, which
+    records it in the latency histograms of the "metrics" attribute (a
+    :class:`tempodb.metrics.LatencyRecorder`) and calls the hooks registered
+    with :meth:`add_hook`.
+
+    Slow GET requests can be hedged by setting the "hedging" attribute to a
+    :class:`tempodb.hedging.HedgePolicy`, and requests can be stopped while
+    the API is failing by setting the "breaker" attribute to a
+    :class:`tempodb.breaker.CircuitBreaker`.
+
+    Requests are sent with the timeout given here, which the requests
+    library applies to connecting and to each read from the socket, or with
+    the time left before the current :class:`tempodb.deadline.Deadline` if
+    that is shorter.  A request that fails because the deadline has passed
+    raises :class:`tempodb.deadline.DeadlineExceeded`.
+
+    The base URL can also be a list of base URLs, such as regional proxies
+    of the API.  Requests are then spread over them by a
+    :class:`tempodb.balancer.Balancer`, kept as the "balancer" attribute.
+    A GET, PUT or DELETE that fails with a connection error, a timeout or a
+    5xx status is retried on another base URL while there is one left to
+    try and the current deadline allows, and the retries are counted in the
+    timing event.  POSTs are not retried, since they may not be idempotent.
+
+    The requests library, which takes longer to import than the rest of
+    this package together, is only imported when the "pool" session or the
+    "auth" attribute is first used, so that constructing a client costs
+    nothing for programs that exit before making a request.  Either can
+    also be assigned, i.e. to share a session between endpoints.
+
     :param string key: the API key for the endpoint
     :param string secret: the API secret for the endpoint
-    :param string base_url: the base URL for the endpoint"""
+    :param base_url: the base URL for the endpoint, or a list of them
+    :type base_url: string or list
+    :param float timeout: (optional) the default timeout in seconds"""
 
-    def __init__(self, database_id, key, secret, base_url=BASE_URL):
-        if base_url.endswith('/'):
-            self.base_url = base_url
+    def __init__(self, database_id, key, secret, base_url=BASE_URL,
+                 timeout=None):
+        if isinstance(base_url, basestring):
+            base_urls = [base_url]
         else:
-            #in case people use their own, it really has to end in a
-            #slash so the urljoins will work properly
-            self.base_url = base_url + '/'
+            base_urls = list(base_url)
+        #in case people use their own, it really has to end in a slash so
+        #the urljoins will work properly
+        base_urls = [u if u.endswith('/') else u + '/' for u in base_urls]
+        self.base_url = base_urls[0]
+        self.balancer = None
+        if len(base_urls) > 1:
+            self.balancer = Balancer(base_urls)
 
         self.database_id = database_id
+        self.timeout = timeout
         self.headers = {
             'User-Agent': 'tempodb-python/%s' % "1.0.1",
             'Accept-Encoding': 'gzip'
         }
-        self.auth = HTTPBasicAuth(key, secret)
-        self.pool = requests.session()
-        for p in ['http://', 'https://']:
-            adapter = requests.adapters.HTTPAdapter()
-            self.pool.mount(p, adapter)
+        self._credentials = (key, secret)
+        self._auth = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self.metrics = LatencyRecorder()
+        self.hooks = {'request': [], 'response': []}
+        self.hedging = None
+        self.breaker = None
+
+    @property
+    def auth(self):
+        if self._auth is None:
+            from requests.auth import HTTPBasicAuth
+            with self._lock:
+                if self._auth is None:
+                    self._auth = HTTPBasicAuth(*self._credentials)
+        return self._auth
+
+    @auth.setter
+    def auth(self, auth):
+        self._auth = auth
+
+    @property
+    def pool(self):
+        #built on first use, once, even when many threads start at once
+        if self._pool is None:
+            import requests
+            with self._lock:
+                if self._pool is None:
+                    pool = requests.session()
+                    for p in ['http://', 'https://']:
+                        adapter = requests.adapters.HTTPAdapter()
+                        pool.mount(p, adapter)
+                    self._pool = pool
+        return self._pool
+
+    @pool.setter
+    def pool(self, pool):
+        self._pool = pool
+
+    def add_hook(self, stage, hook):
+        """Register a function to be called with the
+        :class:`tempodb.metrics.TimingEvent` of every request.  Hooks for the
+        "request" stage are called just before a request is sent, and hooks
+        for the "response" stage are called once the response has been
+        parsed, or the request has failed, with the completed event.
+
+        :param string stage: "request" or "response"
+        :param function hook: the function to call
+        :raises ValueError: if the stage is unknown
+        :rtype: None"""
+
+        if stage not in self.hooks:
+            raise ValueError('Unknown hook stage "%s"' % stage)
+        self.hooks[stage].append(hook)
+
+    def remove_hook(self, stage, hook):
+        """Unregister a hook added with :meth:`add_hook`.
+
+        :param string stage: "request" or "response"
+        :param function hook: the function to remove
+        :rtype: None"""
+
+        self.hooks[stage].remove(hook)
+
+    def emit(self, event):
+        """Record a completed timing event and pass it to the response
+        hooks.  This is called by the code that parses responses, so it
+        should not be needed in user code.
+
+        :param event: the event to emit, None is ignored
+        :type event: :class:`tempodb.metrics.TimingEvent`
+        :rtype: None"""
+
+        if event is None:
+            return
+        self.metrics.observe(event)
+        for hook in self.hooks['response']:
+            hook(event)
+
+    def _send(self, method, send, to_hit, **kwargs):
+        #time a request and attach the timing event to the response
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check()
+        breaker = self.breaker
+        if breaker is not None:
+            breaker.before()
+
+        #the breaker is given exactly one outcome for the request it
+        #admitted: only network errors and 5xx responses are failures, and
+        #errors raised by hooks or by this code just give the slot back
+        event = resp = None
+        try:
+            event = TimingEvent(method, url_template(to_hit, self.base_url),
+                                kwargs.get('data'))
+            resp = self._request(method, send, to_hit, event, deadline,
+                                 **kwargs)
+        finally:
+            if breaker is not None:
+                import requests
+                if resp is not None:
+                    breaker.record(getattr(resp, 'status_code', 200) < 500)
+                elif isinstance(getattr(event, 'error', None),
+                                requests.exceptions.RequestException):
+                    breaker.record(False)
+                else:
+                    breaker.release()
+
+        event.record_response(resp)
+        try:
+            resp.timing = event
+        except AttributeError:
+            pass
+        return resp
+
+    def _request(self, method, send, to_hit, event, deadline, **kwargs):
+        #send a request, failing over between upstreams if there are any
+        for hook in self.hooks['request']:
+            hook(event)
+        start = time.time()
+        upstream, rest = None, to_hit
+        if self.balancer is not None:
+            upstream, rest = self.balancer.split(to_hit)
+
+        tried = []
+        while True:
+            url = to_hit
+            if upstream is not None:
+                u = self.balancer.choose(exclude=tried)
+                tried.append(u)
+                url = u.base_url + rest
+            timeout = self.timeout
+            if deadline is not None:
+                timeout = deadline.timeout(timeout)
+            if timeout is not None:
+                kwargs['timeout'] = timeout
+
+            began = time.time()
+            try:
+                if self.hedging is not None and method == 'GET':
+                    resp = self.hedging.send(send, event.url, event, url,
+                                             auth=self.auth, **kwargs)
+                else:
+                    resp = send(url, auth=self.auth, **kwargs)
+            except Exception, e:
+                if upstream is not None:
+                    import requests
+                    self.balancer.finish(u, time.time() - began, False)
+                    if (isinstance(e, requests.exceptions.RequestException)
+                            and self._can_retry(method, tried, deadline)):
+                        event.retries += 1
+                        continue
+                event.network_time = time.time() - start
+                event.error = e
+                self.emit(event)
+                if deadline is not None and deadline.expired:
+                    raise DeadlineExceeded(deadline)
+                raise
+
+            if upstream is not None:
+                failed = getattr(resp, 'status_code', 200) >= 500
+                self.balancer.finish(u, time.time() - began, not failed)
+                if failed and self._can_retry(method, tried, deadline):
+                    event.retries += 1
+                    resp.close()
+                    continue
+            break
+        event.network_time = time.time() - start
+        return resp
+
+    def _can_retry(self, method, tried, deadline):
+        #fail over to another upstream only for idempotent requests, while
+        #there are upstreams left to try and time to try them
+        if method == 'POST':
+            return False
+        if len(tried) >= len(self.balancer.upstreams):
+            return False
+        return deadline is None or not deadline.expired
 
     def post(self, url, body):
         """Perform a POST request to the given resource with the given
@@ -70,7 +288,7 @@ class HTTPEndpoint(object):
         :rtype: requests.Response object"""
 
         to_hit = urlparse.urljoin(self.base_url, url)
-        resp = self.pool.post(to_hit, data=body, auth=self.auth)
+        resp = self._send('POST', self.pool.post, to_hit, data=body)
         return resp
 
     def get(self, url):
@@ -82,7 +300,7 @@ class HTTPEndpoint(object):
         :rtype: requests.Response object"""
 
         to_hit = urlparse.urljoin(self.base_url, url)
-        resp = self.pool.get(to_hit, auth=self.auth)
+        resp = self._send('GET', self.pool.get, to_hit)
         return resp
 
     def delete(self, url):
@@ -94,7 +312,7 @@ class HTTPEndpoint(object):
         :rtype: requests.Response object"""
 
         to_hit = urlparse.urljoin(self.base_url, url)
-        resp = self.pool.delete(to_hit, auth=self.auth)
+        resp = self._send('DELETE', self.pool.delete, to_hit)
         return resp
 
     def put(self, url, body):
@@ -107,5 +325,5 @@ class HTTPEndpoint(object):
         :rtype: requests.Response object"""
 
         to_hit = urlparse.urljoin(self.base_url, url)
-        resp = self.pool.put(to_hit, data=body, auth=self.auth)
+        resp = self._send('PUT', self.pool.put, to_hit, data=body)
         return resp
@@ -0,0 +1,237 @@
+import time
+import Queue
+import threading
+from collections import deque
+
+
+class HedgePolicy(object):
+    """Settings and state for hedging GET requests.  When a GET has not
+    completed after a delay, a duplicate of it is sent on another connection
+    and whichever response arrives first is used.  The delay is the
+    *percentile* of the recent latencies of the same endpoint, clamped to
+    between *min_delay* and *max_delay*, so only the slowest requests are
+    hedged.  Until *min_samples* latencies have been seen for an endpoint
+    its requests are not hedged.
+
+    Hedges are limited by a budget: every GET earns *budget* hedges, up to a
+    burst of *burst*, and every hedge sent spends one, so at most about
+    *budget* of the requests are hedged even when the API is slow for
+    everyone.
+
+    Hedging is turned on by setting the hedging attribute of the client's
+    endpoint::
+
+        client.session.hedging = HedgePolicy(percentile=0.95, budget=0.05)
+
+    The requests library can not abort a request in flight, so the losing
+    request is left to complete in the background and its response is
+    closed and discarded, its latency still being recorded.  Requests are
+    sent from a set of background threads that is reused between requests,
+    rather than starting a thread for each one, and a request that could
+    not be hedged because the budget is spent is sent on the calling
+    thread.  Only GETs are hedged, since they are idempotent.
+
+    :param float percentile: (optional) the latency percentile to hedge at,
+                             between 0 and 1
+    :param float budget: (optional) the fraction of requests that can be
+                         hedged
+    :param float min_delay: (optional) the shortest delay in seconds
+    :param float max_delay: (optional) the longest delay in seconds
+    :param int min_samples: (optional) the number of latencies needed
+                            before hedging an endpoint
+    :param int window: (optional) the number of recent latencies to keep per
+                       endpoint
+    :param float burst: (optional) the most hedges that can be saved up"""
+
+    def __init__(self, percentile=0.95, budget=0.05, min_delay=0.005,
+                 max_delay=5.0, min_samples=20, window=1000, burst=10.0):
+        if not 0 < percentile < 1:
+            raise ValueError('The percentile must be between 0 and 1')
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.burst = burst
+        self.tokens = burst
+        self.latencies = {}
+        self.requests = 0
+        self.hedged = 0
+        self.won = 0
+        self.denied = 0
+        self.lock = threading.Lock()
+        self.workers = _Workers()
+
+    def delay(self, url):
+        """The time to wait for a response before hedging a request to an
+        endpoint, or None if the endpoint has too few latencies recorded.
+
+        :param string url: the URL template of the endpoint
+        :rtype: float or None"""
+
+        with self.lock:
+            samples = self.latencies.get(url)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        i = min(int(len(ordered) * self.percentile), len(ordered) - 1)
+        return max(self.min_delay, min(self.max_delay, ordered[i]))
+
+    def observe(self, url, seconds):
+        """Record the latency of a completed request.
+
+        :param string url: the URL template of the endpoint
+        :param float seconds: the latency
+        :rtype: None"""
+
+        with self.lock:
+            samples = self.latencies.get(url)
+            if samples is None:
+                samples = self.latencies[url] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def _earn(self):
+        with self.lock:
+            self.requests += 1
+            self.tokens = min(self.burst, self.tokens + self.budget)
+
+    def _can_spend(self):
+        with self.lock:
+            return self.tokens >= 1
+
+    def _spend(self):
+        #take a hedge from the budget, if there is one left
+        with self.lock:
+            if self.tokens < 1:
+                self.denied += 1
+                return False
+            self.tokens -= 1
+            self.hedged += 1
+            return True
+
+    def _win(self):
+        with self.lock:
+            self.won += 1
+
+    def stats(self):
+        """Counts of the requests seen, the hedges sent, the hedges whose
+        response was used and the hedges denied by the budget.
+
+        :rtype: dict"""
+
+        with self.lock:
+            return {'requests': self.requests, 'hedged': self.hedged,
+                    'won': self.won, 'denied': self.denied,
+                    'rate': self.hedged / float(self.requests or 1)}
+
+    def send(self, send, url, event, *args, **kwargs):
+        """Send a request with *send*, hedging it if it is slow.  The hedged
+        and hedge_won attributes of the timing event are set accordingly.
+        This is called by :class:`tempodb.endpoint.HTTPEndpoint`, so it
+        should not be needed in user code.
+
+        :param function send: the function sending the request
+        :param string url: the URL template of the endpoint
+        :param event: the timing event of the request
+        :type event: :class:`tempodb.metrics.TimingEvent`
+        :rtype: requests.Response object"""
+
+        self._earn()
+        delay = self.delay(url)
+        start = time.time()
+        #without a hedge to race against, the request is sent on the calling
+        #thread
+        if delay is None or not self._can_spend():
+            resp = send(*args, **kwargs)
+            seconds = time.time() - start
+            self.observe(url, seconds)
+            if delay is not None and seconds > delay:
+                with self.lock:
+                    self.denied += 1
+            return resp
+
+        results = Queue.Queue()
+
+        def run(index):
+            began = time.time()
+            try:
+                resp = send(*args, **kwargs)
+            except Exception, e:
+                results.put((index, None, e, time.time() - began))
+            else:
+                results.put((index, resp, None, time.time() - began))
+
+        self.workers.submit(run, 0)
+        pending = 1
+        try:
+            first = results.get(timeout=delay)
+        except Queue.Empty:
+            first = None
+            if self._spend():
+                event.hedged = True
+                self.workers.submit(run, 1)
+                pending = 2
+
+        if first is None:
+            first = results.get()
+        pending -= 1
+        #a failure only counts if the other request fails too
+        while first[2] is not None and pending:
+            first = results.get()
+            pending -= 1
+
+        index, resp, error, seconds = first
+        if pending:
+            self.workers.submit(self._discard, url, results)
+        if error is not None:
+            raise error
+        self.observe(url, seconds)
+        if index == 1:
+            event.hedge_won = True
+            self._win()
+        return resp
+
+    def _discard(self, url, results):
+        #record the latency of the losing request once it arrives, so that
+        #the slow requests are not left out of the percentile, and close its
+        #response
+        index, resp, error, seconds = results.get()
+        if resp is not None:
+            self.observe(url, seconds)
+            try:
+                resp.close()
+            except AttributeError:
+                pass
+
+
+class _Workers(object):
+    #daemon threads running functions in the background, reused between
+    #requests; a thread is only started when all of them are busy
+
+    def __init__(self):
+        self.jobs = Queue.Queue()
+        self.idle = 0
+        self.started = 0
+        self.lock = threading.Lock()
+
+    def submit(self, target, *args):
+        with self.lock:
+            if self.idle:
+                self.idle -= 1
+            else:
+                self.started += 1
+                t = threading.Thread(target=self._run)
+                t.daemon = True
+                t.start()
+        self.jobs.put((target, args))
+
+    def _run(self):
+        while True:
+            target, args = self.jobs.get()
+            try:
+                target(*args)
+            except Exception:
+                pass
+            with self.lock:
+                self.idle += 1
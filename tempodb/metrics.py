@@ -0,0 +1,408 @@
+import time
+import bisect
+import urlparse
+import threading
+
+
+#upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0)
+
+#upper bounds of the buckets of the page size histograms
+PAGE_SIZE_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+
+def url_template(url, base_url=None):
+    """Utility function for turning a request URL into the template of the
+    API endpoint it hits, so that requests for different series are counted
+    together.  The query string and the base URL are removed, and the series
+    key is replaced with "{key}"::
+
+        >>> url_template('https://api.tempo-db.com/v1/series/key/foo/data/'
+        ...              '?start=2013-01-01', 'https://api.tempo-db.com/v1/')
+        'series/key/{key}/data/'
+
+    :param string url: the URL of the request
+    :param string base_url: (optional) the base URL of the endpoint
+    :rtype: string"""
+
+    path = urlparse.urlsplit(url).path
+    if base_url:
+        base = urlparse.urlsplit(base_url).path
+        if path.startswith(base):
+            path = path[len(base):]
+    parts = path.lstrip('/').split('/')
+    for i in xrange(len(parts) - 1):
+        if parts[i] == 'key' and parts[i + 1]:
+            parts[i + 1] = '{key}'
+            break
+    return '/'.join(parts)
+
+
+def _bound(b):
+    return '+Inf' if b == float('inf') else repr(float(b))
+
+
+def _seconds(delta):
+    #timedelta.total_seconds is not available on Python 2.6
+    return delta.days * 86400 + delta.seconds + delta.microseconds / 1e6
+
+
+class TimingEvent(object):
+    """Structured timing information about a single API request.  Events
+    are created by the :class:`tempodb.endpoint.HTTPEndpoint` when a request
+    is sent and are completed by the code that parses the response, before
+    being passed to the endpoint's hooks.  The attributes are:
+
+        * method: the HTTP method
+        * url: the template of the endpoint hit, i.e. "series/key/{key}/data/"
+        * status: the HTTP status code, or None if the request failed
+        * bytes_out: the size of the request body
+        * bytes_in: the size of the response body as sent over the wire
+        * retries: the number of times the request was retried
+        * start: the time the request was sent, as a Unix timestamp
+        * wait_time: seconds between sending the request and receiving the
+          response headers, which includes DNS, connecting, TLS and server
+          time
+        * network_time: seconds spent on the request, including downloading
+          the response body
+        * parse_time: seconds spent decoding and parsing the response JSON
+        * build_time: seconds spent constructing objects from the JSON
+        * page_size: the limit requested for a page chosen by a
+          :class:`tempodb.paging.PageSizer`, or None
+        * hedged: whether a hedge of the request was sent by a
+          :class:`tempodb.hedging.HedgePolicy`
+        * hedge_won: whether the response of the hedge was used
+        * error: the exception raised by the request, if any
+
+    :param string method: the HTTP method
+    :param string url: the URL template
+    :param string body: (optional) the request body"""
+
+    def __init__(self, method, url, body=None):
+        self.method = method
+        self.url = url
+        self.status = None
+        self.bytes_out = len(body) if body else 0
+        self.bytes_in = 0
+        self.retries = 0
+        self.start = time.time()
+        self.wait_time = 0.0
+        self.network_time = 0.0
+        self.parse_time = 0.0
+        self.build_time = 0.0
+        self.page_size = None
+        self.hedged = False
+        self.hedge_won = False
+        self.error = None
+
+    @property
+    def total_time(self):
+        """The total time spent on the request, from sending it to having
+        built the result objects.
+
+        :rtype: float"""
+
+        return self.network_time + self.parse_time + self.build_time
+
+    def record_response(self, resp):
+        """Fill in the status, size and wait time of the event from a
+        response object from the requests library.
+
+        :param resp: the response
+        :rtype: None"""
+
+        self.status = getattr(resp, 'status_code', None)
+        try:
+            self.bytes_in = int(resp.headers['Content-Length'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            try:
+                self.bytes_in = len(resp.content)
+            except (TypeError, AttributeError):
+                pass
+        try:
+            self.wait_time = _seconds(resp.elapsed)
+        except (TypeError, AttributeError):
+            pass
+
+    def to_dictionary(self):
+        """Serialize the event into dictionary form.
+
+        :rtype: dict"""
+
+        return {
+            'method': self.method,
+            'url': self.url,
+            'status': self.status,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'retries': self.retries,
+            'start': self.start,
+            'wait_time': self.wait_time,
+            'network_time': self.network_time,
+            'parse_time': self.parse_time,
+            'build_time': self.build_time,
+            'total_time': self.total_time,
+            'page_size': self.page_size,
+            'hedged': self.hedged,
+            'hedge_won': self.hedge_won,
+            'error': repr(self.error) if self.error is not None else None
+        }
+
+
+class LatencyHistogram(object):
+    """A histogram of request latencies with fixed bucket boundaries, in the
+    style of a Prometheus histogram.  It is also used for page sizes, with
+    buckets in numbers of points.
+
+    :param tuple buckets: (optional) the upper bounds of the buckets in
+                          seconds, in increasing order"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        """Add one latency to the histogram.
+
+        :param float seconds: the latency
+        :rtype: None"""
+
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """The cumulative count of latencies at or below each bucket bound,
+        ending with the total count for the "+Inf" bucket.
+
+        :rtype: list of (bound, count) tuples"""
+
+        ret = []
+        total = 0
+        for bound, c in zip(self.buckets + (float('inf'),), self.counts):
+            total += c
+            ret.append((bound, total))
+        return ret
+
+    def to_dictionary(self):
+        """Serialize the histogram into dictionary form.  The buckets are
+        keyed by their upper bound as a string, i.e. "0.25" or "+Inf".
+
+        :rtype: dict"""
+
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict((_bound(b), c) for b, c in self.cumulative())
+        }
+
+
+class EndpointStats(object):
+    """Latency histogram and counters for one API endpoint."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.latency = LatencyHistogram(buckets)
+        self.page_size = LatencyHistogram(PAGE_SIZE_BUCKETS)
+        self.statuses = {}
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.network_time = 0.0
+        self.parse_time = 0.0
+        self.build_time = 0.0
+
+    def observe(self, event):
+        self.latency.observe(event.total_time)
+        if event.error is not None:
+            self.errors += 1
+        else:
+            self.statuses[event.status] = self.statuses.get(event.status,
+                                                            0) + 1
+        self.retries += event.retries
+        if event.hedged:
+            self.hedges += 1
+            if event.hedge_won:
+                self.hedge_wins += 1
+        self.bytes_in += event.bytes_in
+        self.bytes_out += event.bytes_out
+        self.network_time += event.network_time
+        self.parse_time += event.parse_time
+        self.build_time += event.build_time
+        if event.page_size is not None:
+            self.page_size.observe(event.page_size)
+
+    def to_dictionary(self):
+        d = self.latency.to_dictionary()
+        d.update({
+            'page_size': self.page_size.to_dictionary(),
+            'statuses': dict((str(s), c) for s, c in self.statuses.items()),
+            'errors': self.errors,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'network_time': self.network_time,
+            'parse_time': self.parse_time,
+            'build_time': self.build_time
+        })
+        return d
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+class LatencyRecorder(object):
+    """Collects timing events into latency histograms and counters for each
+    endpoint, keyed by HTTP method and URL template.  Every
+    :class:`tempodb.endpoint.HTTPEndpoint` has one as its "metrics"
+    attribute, and the recorder can also be used as a response hook on its
+    own.  The collected metrics can be exported as plain dictionaries or in
+    the Prometheus text exposition format.
+
+    :param tuple buckets: (optional) the upper bounds of the histogram
+                          buckets in seconds"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        self.observe(event)
+
+    def observe(self, event):
+        """Record a completed timing event.
+
+        :param event: the event to record
+        :type event: :class:`TimingEvent`
+        :rtype: None"""
+
+        k = (event.method, event.url)
+        with self.lock:
+            stats = self.endpoints.get(k)
+            if stats is None:
+                stats = self.endpoints[k] = EndpointStats(self.buckets)
+            stats.observe(event)
+
+    def reset(self):
+        """Discard all recorded metrics.
+
+        :rtype: None"""
+
+        with self.lock:
+            self.endpoints = {}
+
+    def to_dictionary(self):
+        """Export the metrics as a dictionary keyed by "METHOD url", i.e.
+        "GET series/key/{key}/data/".
+
+        :rtype: dict"""
+
+        with self.lock:
+            return dict(('%s %s' % k, s.to_dictionary())
+                        for k, s in self.endpoints.items())
+
+    def to_prometheus(self, prefix='tempodb_client'):
+        """Export the metrics in the Prometheus text exposition format.
+
+        :param string prefix: (optional) the prefix of the metric names
+        :rtype: string"""
+
+        with self.lock:
+            items = sorted(self.endpoints.items())
+            lines = []
+
+            name = prefix + '_request_duration_seconds'
+            lines.append('# HELP %s Time spent on API requests.' % name)
+            lines.append('# TYPE %s histogram' % name)
+            for (method, url), s in items:
+                labels = 'method="%s",endpoint="%s"' % (_label(method),
+                                                        _label(url))
+                for b, c in s.latency.cumulative():
+                    lines.append('%s_bucket{%s,le="%s"} %d' %
+                                 (name, labels, _bound(b), c))
+                lines.append('%s_sum{%s} %r' % (name, labels, s.latency.sum))
+                lines.append('%s_count{%s} %d' % (name, labels,
+                                                  s.latency.count))
+
+            name = prefix + '_requests_total'
+            lines.append('# HELP %s API requests by response status.' % name)
+            lines.append('# TYPE %s counter' % name)
+            for (method, url), s in items:
+                statuses = sorted(s.statuses.items())
+                if s.errors:
+                    statuses.append(('error', s.errors))
+                for status, c in statuses:
+                    lines.append(
+                        '%s{method="%s",endpoint="%s",status="%s"} %d' %
+                        (name, _label(method), _label(url), _label(status),
+                         c))
+
+            name = prefix + '_request_phase_seconds_total'
+            lines.append('# HELP %s Time spent in each phase of API '
+                         'requests.' % name)
+            lines.append('# TYPE %s counter' % name)
+            for (method, url), s in items:
+                for phase in ['network', 'parse', 'build']:
+                    lines.append(
+                        '%s{method="%s",endpoint="%s",phase="%s"} %r' %
+                        (name, _label(method), _label(url), phase,
+                         getattr(s, phase + '_time')))
+
+            name = prefix + '_request_bytes_total'
+            lines.append('# HELP %s Bytes sent and received.' % name)
+            lines.append('# TYPE %s counter' % name)
+            for (method, url), s in items:
+                for direction in ['in', 'out']:
+                    lines.append(
+                        '%s{method="%s",endpoint="%s",direction="%s"} %d' %
+                        (name, _label(method), _label(url), direction,
+                         getattr(s, 'bytes_' + direction)))
+
+            name = prefix + '_page_size'
+            lines.append('# HELP %s Page sizes chosen by adaptive paging.' %
+                         name)
+            lines.append('# TYPE %s histogram' % name)
+            for (method, url), s in items:
+                if not s.page_size.count:
+                    continue
+                labels = 'method="%s",endpoint="%s"' % (_label(method),
+                                                        _label(url))
+                for b, c in s.page_size.cumulative():
+                    lines.append('%s_bucket{%s,le="%s"} %d' %
+                                 (name, labels, _bound(b), c))
+                lines.append('%s_sum{%s} %r' % (name, labels,
+                                                s.page_size.sum))
+                lines.append('%s_count{%s} %d' % (name, labels,
+                                                  s.page_size.count))
+
+            name = prefix + '_request_retries_total'
+            lines.append('# HELP %s Retried API requests.' % name)
+            lines.append('# TYPE %s counter' % name)
+            for (method, url), s in items:
+                lines.append('%s{method="%s",endpoint="%s"} %d' %
+                             (name, _label(method), _label(url), s.retries))
+
+            name = prefix + '_request_hedges_total'
+            lines.append('# HELP %s Hedged API requests by which response '
+                         'was used.' % name)
+            lines.append('# TYPE %s counter' % name)
+            for (method, url), s in items:
+                if not s.hedges:
+                    continue
+                for outcome, c in [('won', s.hedge_wins),
+                                   ('lost', s.hedges - s.hedge_wins)]:
+                    lines.append(
+                        '%s{method="%s",endpoint="%s",outcome="%s"} %d' %
+                        (name, _label(method), _label(url), outcome, c))
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,107 @@
+import urllib
+import urlparse
+
+
+#the value of the limit parameter that turns on adaptive page sizing
+AUTO = 'auto'
+
+
+def set_limit(url, limit):
+    """Utility function for replacing the limit parameter in the query
+    string of a URL, such as the link to the next page of a cursor, keeping
+    the other parameters and their order.
+
+    :param string url: the URL to change
+    :param int limit: the new limit
+    :rtype: string"""
+
+    parts = urlparse.urlsplit(url)
+    q = urlparse.parse_qsl(parts.query, keep_blank_values=True)
+    found = False
+    for i, (k, v) in enumerate(q):
+        if k == 'limit':
+            q[i] = (k, str(limit))
+            found = True
+    if not found:
+        q.append(('limit', str(limit)))
+    return urlparse.urlunsplit((parts.scheme, parts.netloc, parts.path,
+                                urllib.urlencode(q), parts.fragment))
+
+
+class PageSizer(object):
+    """Chooses the page size of a cursor from the latency and size of the
+    pages it has fetched so far.  After each page the cost per point is
+    measured, and the next page is sized to take about *target_latency*
+    seconds to fetch and parse, and to be no larger than *max_bytes* of
+    response text.  The size changes by at most a factor of *max_growth*
+    from one page to the next, and always stays between *min_limit* and
+    *max_limit*.
+
+    Adaptive sizing is used by passing limit="auto" to the reading methods
+    of :class:`tempodb.client.Client`, which then copy the sizer in the
+    client's page_sizer attribute for each call::
+
+        client.page_sizer = PageSizer(max_limit=20000, target_latency=0.5)
+        cursor = client.read_data('foo', start, end, limit='auto')
+
+    The size of each page requested is recorded in the sizer's history, as
+    the page_size of the :class:`tempodb.metrics.TimingEvent` of the
+    request, and in the page size histograms of the endpoint metrics.
+
+    :param int min_limit: (optional) the smallest page size to use
+    :param int max_limit: (optional) the largest page size to use
+    :param int initial: (optional) the size of the first page
+    :param float target_latency: (optional) the seconds a page should take
+    :param int max_bytes: (optional) the most response text a page should
+                          hold, or None for no ceiling
+    :param float max_growth: (optional) the largest factor the page size
+                             can change by between pages"""
+
+    def __init__(self, min_limit=100, max_limit=10000, initial=1000,
+                 target_latency=1.0, max_bytes=8 * 2 ** 20, max_growth=2.0):
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError('Page size bounds must satisfy '
+                             '1 <= min_limit <= max_limit')
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.initial = initial
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.max_growth = max_growth
+        self.limit = self._clamp(initial)
+        self.history = []
+
+    def _clamp(self, limit):
+        return int(max(self.min_limit, min(self.max_limit, limit)))
+
+    def copy(self):
+        """A new sizer with the same settings and no history.
+
+        :rtype: :class:`PageSizer`"""
+
+        return PageSizer(self.min_limit, self.max_limit, self.initial,
+                         self.target_latency, self.max_bytes,
+                         self.max_growth)
+
+    def observe(self, points, seconds, size):
+        """Record a fetched page and choose the size of the next one.
+
+        :param int points: the number of points in the page
+        :param float seconds: the time taken to fetch and parse the page
+        :param int size: the length of the response text
+        :rtype: int, the next page size"""
+
+        self.history.append({'limit': self.limit, 'points': points,
+                             'seconds': seconds, 'bytes': size})
+        if points <= 0:
+            return self.limit
+
+        want = self.max_limit
+        if seconds > 0:
+            want = min(want, self.target_latency * points / seconds)
+        if self.max_bytes is not None and size > 0:
+            want = min(want, self.max_bytes * points / float(size))
+        want = max(self.limit / self.max_growth,
+                   min(self.limit * self.max_growth, want))
+        self.limit = self._clamp(want)
+        return self.limit
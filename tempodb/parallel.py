@@ -0,0 +1,50 @@
+from deadline import DeadlineExceeded, bind, current
+
+
+DEFAULT_WORKERS = 8
+
+
+def parallel_map(f, items, workers=DEFAULT_WORKERS):
+    """Utility function for applying a function to every item of a list
+    using a pool of worker threads.  This is mainly used to fan API calls out
+    over many series at once.  The results are returned in the same order as
+    the items.  If any call raises an exception, that exception is re-raised
+    after the pool has shut down.
+
+    The deadline of the calling thread, if any, applies in the worker
+    threads too.  If it expires, the calls that had finished are kept and
+    :class:`tempodb.deadline.DeadlineExceeded` is raised once all the calls
+    have returned, with the results as its partial attribute and None in
+    place of each call that ran out of time.
+
+    :param function f: the function to apply to each item
+    :param list items: the items to apply the function to
+    :param int workers: (optional) the maximum number of threads to use
+    :raises DeadlineExceeded: if the deadline expires
+    :rtype: list"""
+
+    items = list(items)
+    workers = max(1, min(workers, len(items)))
+    f = bind(f, current())
+
+    def run(i):
+        try:
+            return (f(i), None)
+        except DeadlineExceeded, e:
+            return (None, e)
+
+    if workers == 1:
+        results = [run(i) for i in items]
+    else:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(workers)
+        try:
+            results = pool.map(run, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    errors = [e for r, e in results if e is not None]
+    if errors:
+        raise DeadlineExceeded(errors[0].deadline, [r for r, e in results])
+    return [r for r, e in results]
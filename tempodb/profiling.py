@@ -0,0 +1,166 @@
+import os
+import pstats
+import cProfile
+from StringIO import StringIO
+
+
+#the phases of an API call that time is attributed to, in report order
+PHASES = ['make_url_args', 'http', 'response', 'json_decode',
+          'convert_iso_stamp', 'object_building']
+
+
+def _in(filename, *parts):
+    return filename.replace(os.sep, '/').endswith('/'.join(parts))
+
+
+def phase_of(func):
+    """Utility function that gives the phase a profiled function belongs to,
+    or None if it is not part of any phase.
+
+    :param tuple func: a (filename, line number, function name) tuple as
+                       used by the :mod:`pstats` module
+    :rtype: string or None"""
+
+    filename, line, name = func
+    if name == 'make_url_args' and _in(filename, 'tempodb', 'endpoint.py'):
+        return 'make_url_args'
+    if name == '_send' and _in(filename, 'tempodb', 'endpoint.py'):
+        return 'http'
+    if name == '__init__' and _in(filename, 'tempodb', 'response.py'):
+        return 'response'
+    if name == 'loads' and (_in(filename, 'json', '__init__.py') or
+                            _in(filename, 'simplejson', '__init__.py')):
+        return 'json_decode'
+    if name == 'convert_iso_stamp' and _in(filename, 'validate.py'):
+        return 'convert_iso_stamp'
+    if name in ['iso_to_ns', 'iso_to_epoch'] and _in(filename, 'epoch.py'):
+        return 'convert_iso_stamp'
+    if _in(filename, 'tempodb', 'protocol', 'objects.py'):
+        return 'object_building'
+    return None
+
+
+class Profile(object):
+    """Profiles the client code run while it is active, using
+    :mod:`cProfile`, and attributes the time to the phases of an API call:
+
+        * make_url_args: building query strings
+        * http: sending requests and receiving responses
+        * response: constructing :class:`tempodb.response.Response` objects,
+          including decoding the response text
+        * json_decode: parsing JSON
+        * convert_iso_stamp: parsing timestamps, into Datetimes or, for
+          clients with a time_format of "ms" or "ns", epoch integers
+        * object_building: constructing DataPoints, Series and the other
+          objects of the :mod:`tempodb.protocol` module
+
+    The time of each phase excludes the time spent in the other phases it
+    calls directly, so object_building does not include the timestamp
+    parsing done while building DataPoints.  It is normally used through
+    :meth:`tempodb.client.Client.profile`::
+
+        with client.profile() as p:
+            data = list(client.read_data('foo', start, end))
+        print p.report()
+        p.dump('read.pstats')
+
+    **Note:** cursors fetch pages as they are iterated, so iterate them
+    inside the block to include that work.  Only the thread that started the
+    profile is profiled, so calls fanned out over worker threads, such as
+    :meth:`tempodb.client.Client.read_multi_merged`, only show the time the
+    calling thread spends waiting for them."""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self._stats = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+
+    def start(self):
+        """Start profiling.
+
+        :rtype: None"""
+
+        self._stats = None
+        self.profiler.enable()
+
+    def stop(self):
+        """Stop profiling.  Profiling can be started again to accumulate
+        more stats.
+
+        :rtype: None"""
+
+        self.profiler.disable()
+
+    @property
+    def stats(self):
+        """The raw profile as a :class:`pstats.Stats` object.
+
+        :rtype: :class:`pstats.Stats`"""
+
+        if self._stats is None:
+            self._stats = pstats.Stats(self.profiler)
+        return self._stats
+
+    def phases(self):
+        """The time spent in each phase, along with the total time profiled
+        and the time spent outside of all the phases ("other").
+
+        :rtype: dict of phase name to seconds"""
+
+        entries = self.stats.stats
+        inclusive = dict((p, 0.0) for p in PHASES)
+        nested = dict((p, 0.0) for p in PHASES)
+        for func, (cc, nc, tt, ct, callers) in entries.items():
+            phase = phase_of(func)
+            if phase is None:
+                continue
+            if not callers:
+                inclusive[phase] += ct
+            for caller, c in callers.items():
+                caller_phase = phase_of(caller)
+                if caller_phase != phase:
+                    #for cProfile the caller stats are (cc, nc, tt, ct)
+                    inclusive[phase] += c[3]
+                    if caller_phase is not None:
+                        nested[caller_phase] += c[3]
+
+        ret = dict((p, max(inclusive[p] - nested[p], 0.0)) for p in PHASES)
+        ret['total'] = self.stats.total_tt
+        ret['other'] = max(ret['total'] - sum(ret[p] for p in PHASES), 0.0)
+        return ret
+
+    def report(self, limit=20, sort='cumulative'):
+        """Format the phase breakdown followed by the functions with the most
+        time spent in them, in the usual :mod:`pstats` layout.
+
+        :param int limit: (optional) the number of functions to list
+        :param string sort: (optional) the :mod:`pstats` sort key
+        :rtype: string"""
+
+        phases = self.phases()
+        total = phases['total'] or 1.0
+        out = StringIO()
+        out.write('%-20s %10s %7s\n' % ('phase', 'seconds', 'share'))
+        for p in PHASES + ['other', 'total']:
+            out.write('%-20s %10.4f %6.1f%%\n' %
+                      (p, phases[p], phases[p] * 100 / total))
+        out.write('\n')
+
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump(self, path):
+        """Write the profile to a file in the :mod:`pstats` format, which can
+        be loaded with :class:`pstats.Stats` or tools like snakeviz.
+
+        :param string path: the file to write
+        :rtype: None"""
+
+        self.profiler.dump_stats(path)
@@ -1,5 +1,9 @@
 import json
+import time
 from tempodb.temporal.validate import convert_iso_stamp
+from tempodb.temporal.epoch import DATETIME, to_epoch
+from tempodb.paging import set_limit
+from tempodb.deadline import current as current_deadline
 
 
 def make_generator(d):
@@ -34,9 +38,22 @@ class Cursor(object):
     the API returns no more data.  It can be used with the standard
     iterable interface:
 
-        >>> data = [d for d in response.data]"""
+        >>> data = [d for d in response.data]
+
+    If the sizer attribute is set to a :class:`tempodb.paging.PageSizer`,
+    the limit of each page requested is chosen by the sizer from the pages
+    fetched before it.
+
+    A cursor created while a :class:`tempodb.deadline.Deadline` applies
+    keeps it as its deadline attribute, and fetching a page after it has
+    expired raises :class:`tempodb.deadline.DeadlineExceeded`.  The points
+    already yielded are the partial result."""
+
+    sizer = None
+    deadline = None
 
     def __init__(self, data, t, response):
+        self.deadline = current_deadline()
         self.response = response
         self.type = t
         self.data = make_generator(
@@ -53,6 +70,52 @@ class Cursor(object):
     def _fetch_next(self):
         raise StopIteration
 
+    def _page_length(self, j):
+        #the number of items in a page of JSON
+        return len(j)
+
+    def _fetch_page(self, build):
+        #follow the next link, if there is one, and replace the data with
+        #the objects built from the new page by the build function
+        try:
+            link = self.response.resp.links['next']['url']
+        except KeyError:
+            raise StopIteration
+
+        sizer = self.sizer
+        if sizer is not None:
+            link = set_limit(link, sizer.limit)
+
+        session = self.response.session
+        sent = time.time()
+        if self.deadline is None:
+            n = session.get(link)
+        else:
+            self.deadline.check()
+            with self.deadline:
+                n = session.get(link)
+        #HACK: put here to avoid circular import, no performance hit
+        #because the VM will cache the module
+        from tempodb.response import Response
+        self.response = Response(n, session)
+        timing = self.response.timing
+        try:
+            check_response(self.response)
+            start = time.time()
+            body = self.response.body
+            j = json.loads(body)
+            parsed = time.time()
+            self.data = make_generator(build(j))
+            if timing is not None:
+                timing.parse_time += parsed - start
+                timing.build_time += time.time() - parsed
+            if sizer is not None:
+                if timing is not None:
+                    timing.page_size = sizer.limit
+                sizer.observe(self._page_length(j), parsed - sent, len(body))
+        finally:
+            session.emit(timing)
+
 
 class DataPointCursor(Cursor):
     """An iterable cursor over a collection of DataPoint objects.  The
@@ -63,8 +126,13 @@ class DataPointCursor(Cursor):
         * rollup
         * start
         * end
+        * time_format
 
-    The data attribute holds the actual data from the request.
+    The data attribute holds the actual data from the request.  Objects are
+    only built as the cursor is iterated, and the timestamp of each point is
+    only parsed the first time its t attribute is read, so consumers that
+    only look at values do not pay for parsing timestamps.  Consumers that
+    need neither can use :meth:`raw` to skip building objects altogether.
 
     Additionally, the raw response object is available as the response
     attribute of the cursor.
@@ -73,53 +141,74 @@ class DataPointCursor(Cursor):
     :param class type: the type of object construct from the data
     :param response: the raw response object
     :type response: :class:`tempodb.response.Response`
-    :param string tz: the timezone the data is returned in"""
+    :param string tz: the timezone the data is returned in
+    :param string time_format: (optional) "datetime" for Datetime
+                               timestamps, or "ms" or "ns" for integer
+                               epoch timestamps"""
 
-    def __init__(self, data, t, response, tz=None):
+    def __init__(self, data, t, response, tz=None, time_format=DATETIME):
+        self.deadline = current_deadline()
         self.response = response
         self.type = t
         self.tz = tz
+        self.time_format = time_format
         self.rollup = data.get('rollup')
-        self.start = convert_iso_stamp(data.get('start'))
-        self.end = convert_iso_stamp(data.get('end'))
-        self.data = make_generator(
-            [self.type(d, self.response, tz=tz) for d in data['data']])
+        if time_format == DATETIME:
+            self.start = convert_iso_stamp(data.get('start'))
+            self.end = convert_iso_stamp(data.get('end'))
+        else:
+            self.start = to_epoch(data.get('start'), time_format)
+            self.end = to_epoch(data.get('end'), time_format)
+        self.data = self._build(data['data'])
+
+    def _build(self, items):
+        #the rows of the page are shared by the object generator and raw, so
+        #the two can be mixed without skipping or repeating points
+        self._rows = iter(items)
+        response = self.response
+        if self.time_format == DATETIME:
+            return (self.type(d, response, tz=self.tz) for d in self._rows)
+        return (self.type(d, response, tz=self.tz,
+                          time_format=self.time_format) for d in self._rows)
 
     def _fetch_next(self):
-        try:
-            link = self.response.resp.links['next']['url']
-        except KeyError:
-            raise StopIteration
+        self._fetch_page(lambda j: self._build(j['data']))
 
-        n = self.response.session.get(link)
-        #HACK: put here to avoid circular import, no performance hit
-        #because the VM will cache the module
-        from tempodb.response import Response
-        self.response = Response(n, self.response.session)
-        check_response(self.response)
-        j = json.loads(n.text)
-        self.data = make_generator(
-            [self.type(d, self.response, tz=self.tz) for d in j['data']])
+    def _page_length(self, j):
+        return len(j['data'])
+
+    def raw(self):
+        """Iterate over the remaining points as (timestamp, value) tuples,
+        with the timestamps left as the ISO8601 strings sent by the API.
+        Further pages are fetched as needed, like when iterating the cursor
+        itself::
+
+            for t, v in client.read_data('foo', start, end).raw():
+                total += v
+
+        :rtype: generator of (string, value) tuples"""
+
+        while True:
+            for d in self._rows:
+                yield (d['t'], d['v'])
+            self._fetch_next()
 
 
 class SeriesCursor(Cursor):
     """An iterable cursor over a collection of Series objects"""
 
     def _fetch_next(self):
-        try:
-            link = self.response.resp.links['next']['url']
-        except KeyError:
-            raise StopIteration
-
-        n = self.response.session.get(link)
-        from tempodb.response import Response
-        self.response = Response(n, self.response.session)
-        check_response(self.response)
-        j = json.loads(n.text)
-        self.data = make_generator(
-            [self.type(d, self.response) for d in j])
+        self._fetch_page(lambda j: [self.type(d, self.response) for d in j])
 
 
 class SingleValueCursor(Cursor):
-    """An iterable cursor over a collection of SingleValue objects"""
-    pass
+    """An iterable cursor over a collection of SingleValue objects.  The
+    time_format is passed on to the data point of each SingleValue."""
+
+    def __init__(self, data, t, response, tz=None, time_format=DATETIME):
+        self.deadline = current_deadline()
+        self.response = response
+        self.type = t
+        self.time_format = time_format
+        self.data = make_generator(
+            [self.type(d, response, time_format=time_format) for d in data])
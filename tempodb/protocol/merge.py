@@ -0,0 +1,103 @@
+import heapq
+from objects import MultiPoint
+
+
+def _advance(heap, iterator, index, key):
+    #push the next point from a stream onto the heap, if there is one
+    try:
+        d = iterator.next()
+    except StopIteration:
+        return
+    heapq.heappush(heap, (d.t, index, key, d.v, iterator))
+
+
+def merge_cursors(cursors, tz=None, time_format=None):
+    """Perform a k-way merge of several time-ordered cursors of
+    :class:`tempodb.protocol.objects.DataPoint` objects into one time-ordered
+    stream of :class:`tempodb.protocol.objects.MultiPoint` objects, in the same
+    form as returned by :meth:`tempodb.client.Client.read_multi`.  Points from
+    different series that share a timestamp are combined into one MultiPoint.
+
+    The merge is lazy: only the current point of each input is held in
+    memory, plus whatever page of data each cursor has already fetched, so
+    memory use grows with the number of inputs rather than with the size of
+    the time range.
+
+    :param cursors: the series key and cursor for each input
+    :type cursors: dict or list of (key, cursor) tuples
+    :param string tz: (optional) the timezone to give the MultiPoints
+    :param string time_format: (optional) the time format of the cursors,
+                               "datetime", "ms" or "ns"
+    :rtype: generator of :class:`tempodb.protocol.objects.MultiPoint`"""
+
+    if isinstance(cursors, dict):
+        cursors = cursors.items()
+
+    heap = []
+    for i, (key, cursor) in enumerate(cursors):
+        _advance(heap, iter(cursor), i, key)
+
+    while heap:
+        t, i, key, v, iterator = heapq.heappop(heap)
+        values = {key: v}
+        _advance(heap, iterator, i, key)
+        while heap and heap[0][0] == t:
+            t2, i, key, v, iterator = heapq.heappop(heap)
+            values[key] = v
+            _advance(heap, iterator, i, key)
+        yield MultiPoint.from_data(t, values, tz=tz, time_format=time_format)
+
+
+def merge_multi(cursors, tz=None, time_format=None):
+    """Merge several time-ordered cursors of
+    :class:`tempodb.protocol.objects.MultiPoint` objects, such as the results
+    of :meth:`tempodb.client.Client.read_multi` from different databases,
+    into one time-ordered stream.  MultiPoints that share a timestamp are
+    combined into one, with the values of all of them.  Like
+    :func:`merge_cursors` the merge is lazy.
+
+    :param list cursors: the cursors to merge
+    :param string tz: (optional) the timezone to give the MultiPoints
+    :param string time_format: (optional) the time format of the cursors,
+                               "datetime", "ms" or "ns"
+    :rtype: generator of :class:`tempodb.protocol.objects.MultiPoint`"""
+
+    heap = []
+    for i, cursor in enumerate(cursors):
+        _advance(heap, iter(cursor), i, None)
+
+    while heap:
+        t, i, key, v, iterator = heapq.heappop(heap)
+        values = dict(v)
+        _advance(heap, iterator, i, None)
+        while heap and heap[0][0] == t:
+            t2, i, key, v, iterator = heapq.heappop(heap)
+            values.update(v)
+            _advance(heap, iterator, i, None)
+        yield MultiPoint.from_data(t, values, tz=tz, time_format=time_format)
+
+
+def merge_sorted(iterables, key):
+    """Lazily merge several iterables that are each sorted by *key* into one
+    sorted stream, i.e. the series listings of several databases by series
+    key.
+
+    :param list iterables: the iterables to merge
+    :param function key: the function giving the sort key of an item
+    :rtype: generator"""
+
+    heap = []
+
+    def advance(iterator, index):
+        try:
+            item = iterator.next()
+        except StopIteration:
+            return
+        heapq.heappush(heap, (key(item), index, item, iterator))
+
+    for i, iterable in enumerate(iterables):
+        advance(iter(iterable), i)
+    while heap:
+        k, i, item, iterator = heapq.heappop(heap)
+        yield item
+        advance(iterator, i)
@@ -1,8 +1,43 @@
 import json
+import datetime
 from tempodb.temporal.validate import convert_iso_stamp, check_time_param
+from tempodb.temporal.epoch import (DATETIME, MILLISECONDS, to_epoch,
+                                    format_time, check_time_format)
 from cursor import DataPointCursor, SeriesCursor, SingleValueCursor
 
 
+def _epoch_time(time, time_format):
+    #work out the time format of a time given to one of the from_data
+    #methods, and convert it to an epoch integer if that is the format
+    if isinstance(time, (int, long)) and not isinstance(time, bool):
+        time_format = check_time_format(time_format or MILLISECONDS)
+        if time_format == DATETIME:
+            raise ValueError('Epoch times need a time_format of "ms" or "ns"')
+        return (time_format, time)
+    if time_format in [None, DATETIME]:
+        return (DATETIME, None)
+    check_time_format(time_format)
+    return (time_format, to_epoch(time, time_format))
+
+
+def _parse_time(self):
+    #the timestamp of a point is kept as sent by the API until it is first
+    #read, since many consumers only look at the values
+    raw = self._raw_t
+    if raw is not None:
+        if self.time_format == DATETIME:
+            self._t = convert_iso_stamp(raw, self.tz)
+        else:
+            self._t = to_epoch(raw, self.time_format)
+        self._raw_t = None
+    return self._t
+
+
+def _set_time(self, t):
+    self._raw_t = None
+    self._t = t
+
+
 class JSONSerializable(object):
     """Base class for objects that are serializable to and from JSON.
     This class defines default methods for serializing each way that use
@@ -151,17 +186,21 @@ class SingleValue(JSONSerializable):
     Domain object attributes:
 
         * series: :class:`Series` object
-        * data: :class:`DataPoint` object"""
+        * data: :class:`DataPoint` object, with its time in the given
+          time_format"""
 
     properties = ['series', 'data']
+    time_format = DATETIME
 
-    def __init__(self, json_text, response):
+    def __init__(self, json_text, response, time_format=DATETIME):
         #force conversion of the subobjects in this datatype after we get
         #them
         super(SingleValue, self).__init__(json_text, response)
+        self.time_format = time_format
         self.series = Series(self.series, response)
         if self.data is not None:
-            self.data = DataPoint(self.data, response, self.data.get('tz'))
+            self.data = DataPoint(self.data, response, self.data.get('tz'),
+                                  time_format=time_format)
 
     def to_dictionary(self):
         """Serialize an object into dictionary form.  Useful if you have to
@@ -184,10 +223,16 @@ class SingleValue(JSONSerializable):
 
 
 class SeriesSummary(JSONSerializable):
+    """Represents the summary of a series over a time range, as returned
+    by :meth:`tempodb.client.Client.get_summary`.  The start and end are
+    Datetimes, or epoch integers if the time_format is "ms" or "ns"."""
+
     properties = ['series', 'summary', 'tz', 'start', 'end']
+    time_format = DATETIME
 
-    def __init__(self, json_text, response, tz=None):
+    def __init__(self, json_text, response, tz=None, time_format=DATETIME):
         self.tz = tz
+        self.time_format = time_format
         super(SeriesSummary, self).__init__(json_text, response)
         self.series = Series(self.series, response)
         self.summary = Summary(self.summary, response)
@@ -211,7 +256,10 @@ class SeriesSummary(JSONSerializable):
         try:
             for p in self.properties:
                 if p in ['start', 'end']:
-                    val = convert_iso_stamp(j[p], self.tz)
+                    if self.time_format == DATETIME:
+                        val = convert_iso_stamp(j[p], self.tz)
+                    else:
+                        val = to_epoch(j[p], self.time_format)
                     setattr(self, p, val)
                 else:
                     setattr(self, p, j[p])
@@ -232,8 +280,8 @@ class SeriesSummary(JSONSerializable):
         :meth:`to_json` method on each object in the list and then try to
         dump the array, you end up with an array with one string."""
 
-        d = {'start': self.start.isoformat(),
-             'end': self.end.isoformat(),
+        d = {'start': format_time(self.start, self.time_format),
+             'end': format_time(self.end, self.time_format),
              'tz': self.tz,
              'summary': self.summary.to_dictionary(),
              'series': self.series.to_dictionary()
@@ -262,19 +310,27 @@ class DataPoint(JSONSerializable):
 
     Domain object attributes:
 
-        * t: DateTime object
+        * t: DateTime object, or an integer number of milliseconds or
+             nanoseconds since the UNIX epoch if the time_format is "ms" or
+             "ns".  It is parsed the first time it is read.
         * v: int or float
         * key: string (only present when writing DataPoints)
         * id: string (only present when writing DataPoints)"""
 
     properties = ['t', 'v', 'key', 'id']
 
-    def __init__(self, json_text, response, tz=None):
+    def __init__(self, json_text, response, tz=None, time_format=DATETIME):
         self.tz = tz
+        self.time_format = time_format
+        self._t = None
+        self._raw_t = None
         super(DataPoint, self).__init__(json_text, response)
 
+    t = property(_parse_time, _set_time)
+
     @classmethod
-    def from_data(self, time, value, series_id=None, key=None, tz=None):
+    def from_data(self, time, value, series_id=None, key=None, tz=None,
+                  time_format=None):
         """Create a DataPoint object from data, rather than a JSON object or
         string.  This should be used by user code to construct DataPoints from
         Python-based data like Datetime objects and floats.
@@ -287,29 +343,38 @@ class DataPoint(JSONSerializable):
         specifying the time zone for this DataPoint.  This argument is most
         often used internally when reading data from TempoDB.
 
+        The time can also be given as an integer number of milliseconds
+        since the UNIX epoch, or nanoseconds if time_format is "ns".  With a
+        time_format of "ms" or "ns" the point keeps its time as an epoch
+        integer, which is only converted to ISO8601 when it is written.
+
         :param time: the point in time for this reading
-        :type time: ISO8601 string or Datetime
+        :type time: ISO8601 string, Datetime or int
         :param value: the value for this reading
         :type value: int or float
         :param string series_id: (optional) a series ID for this point
         :param string key: (optional) a key for this point
         :param string tz: (optional) a timezone for this point
+        :param string time_format: (optional) "datetime", "ms" or "ns"
         :rtype: :class:`DataPoint`"""
 
-        t = check_time_param(time)
         if type(value) in [float, int]:
             v = value
         else:
             raise ValueError('Values must be int or float. Got "%s".' %
                              str(value))
 
+        time_format, t = _epoch_time(time, time_format)
+        if time_format == DATETIME:
+            t = check_time_param(time)
+
         j = {
             't': t,
             'v': v,
             'id': series_id,
             'key': key
         }
-        return DataPoint(j, None, tz=tz)
+        return DataPoint(j, None, tz=tz, time_format=time_format)
 
     def from_json(self, json_text):
         """Deserialize a JSON object into this object.  This method will
@@ -330,8 +395,7 @@ class DataPoint(JSONSerializable):
         try:
             for p in self.properties:
                 if p == 't':
-                    val = convert_iso_stamp(j[p], self.tz)
-                    setattr(self, p, val)
+                    self._raw_t = j[p]
                 else:
                     setattr(self, p, j[p])
         #overriding this exception allows us to handle optional values like
@@ -356,7 +420,7 @@ class DataPoint(JSONSerializable):
                 continue
             if v is not None:
                 if p == 't':
-                    j[p] = getattr(self, p).isoformat()
+                    j[p] = format_time(v, self.time_format)
                 else:
                     j[p] = getattr(self, p)
 
@@ -376,7 +440,7 @@ class DataPoint(JSONSerializable):
                 continue
             if v is not None:
                 if p == 't':
-                    j[p] = getattr(self, p).isoformat()
+                    j[p] = format_time(v, self.time_format)
                 else:
                     j[p] = getattr(self, p)
 
@@ -399,10 +463,16 @@ class DataPointFound(JSONSerializable):
 
     properties = ['interval', 'found']
 
-    def __init__(self, json_text, response, tz=None):
+    def __init__(self, json_text, response, tz=None, time_format=DATETIME):
         self.tz = tz
+        self.time_format = time_format
         super(DataPointFound, self).__init__(json_text, response)
 
+    def _time(self, t):
+        if self.time_format == DATETIME:
+            return convert_iso_stamp(t, self.tz)
+        return to_epoch(t, self.time_format)
+
     def from_json(self, json_text):
         """Deserialize a JSON object into this object.  This method will
         check that the JSON object has the required keys and will set each
@@ -422,10 +492,10 @@ class DataPointFound(JSONSerializable):
         try:
             for p in self.properties:
                 if p == 'interval':
-                    self.start = convert_iso_stamp(j[p]['start'], self.tz)
-                    self.end = convert_iso_stamp(j[p]['end'], self.tz)
+                    self.start = self._time(j[p]['start'])
+                    self.end = self._time(j[p]['end'])
                 elif p == 'found':
-                    t = convert_iso_stamp(j[p]['t'], self.tz)
+                    t = self._time(j[p]['t'])
                     setattr(self, 't', t)
                     v = j[p]['v']
                     setattr(self, 'v', v)
@@ -442,9 +512,9 @@ class DataPointFound(JSONSerializable):
         dump the array, you end up with an array with one string."""
 
         j = {}
-        j['interval'] = {'start': self.start.isoformat(),
-                         'end': self.end.isoformat()}
-        j['found'] = {'v': self.v, 't': self.t.isoformat()}
+        j['interval'] = {'start': format_time(self.start, self.time_format),
+                         'end': format_time(self.end, self.time_format)}
+        j['found'] = {'v': self.v, 't': format_time(self.t, self.time_format)}
         return j
 
     def to_json(self):
@@ -463,15 +533,51 @@ class MultiPoint(JSONSerializable):
 
     Domain object attributes:
 
-        * t: DateTime object
+        * t: DateTime object, or an integer number of milliseconds or
+             nanoseconds since the UNIX epoch if the time_format is "ms" or
+             "ns".  It is parsed the first time it is read.
         * v: dictionary"""
 
     properties = ['t', 'v']
 
-    def __init__(self, json_text, response, tz=None):
+    def __init__(self, json_text, response, tz=None, time_format=DATETIME):
         self.tz = tz
+        self.time_format = time_format
+        self._t = None
+        self._raw_t = None
         super(MultiPoint, self).__init__(json_text, response)
 
+    t = property(_parse_time, _set_time)
+
+    @classmethod
+    def from_data(self, time, values, tz=None, time_format=None):
+        """Create a MultiPoint object from data, rather than a JSON object or
+        string.  Datetime objects are used as the timestamp directly, without
+        a round trip through ISO8601.  Integer times are taken as epoch
+        milliseconds, or nanoseconds if time_format is "ns".
+
+        :param time: the point in time for these readings
+        :type time: ISO8601 string, Datetime or int
+        :param dict values: a mapping of series key to value
+        :param string tz: (optional) a timezone for this point
+        :param string time_format: (optional) "datetime", "ms" or "ns"
+        :rtype: :class:`MultiPoint`"""
+
+        if not isinstance(values, dict):
+            raise ValueError('Values must be a dict. Got "%s".' %
+                             str(values))
+
+        time_format, t = _epoch_time(time, time_format)
+        p = MultiPoint({'t': None, 'v': values}, None, tz=tz,
+                       time_format=time_format)
+        if time_format != DATETIME:
+            p.t = t
+        elif isinstance(time, datetime.datetime):
+            p.t = time
+        else:
+            p.t = convert_iso_stamp(check_time_param(time), tz)
+        return p
+
     def from_json(self, json_text):
         """Deserialize a JSON object into this object.  This method will
         check that the JSON object has the required keys and will set each
@@ -491,8 +597,7 @@ class MultiPoint(JSONSerializable):
         try:
             for p in self.properties:
                 if p == 't':
-                    t = convert_iso_stamp(j[p], self.tz)
-                    setattr(self, 't', t)
+                    self._raw_t = j[p]
                 else:
                     setattr(self, p, j[p])
         #overriding this exception allows us to handle optional values like
@@ -515,7 +620,7 @@ class MultiPoint(JSONSerializable):
                 continue
             if v is not None:
                 if p == 't':
-                    j[p] = getattr(self, p).isoformat()
+                    j[p] = format_time(v, self.time_format)
                 else:
                     j[p] = getattr(self, p)
 
@@ -1,5 +1,7 @@
 import protocol
 import json
+import time
+from metrics import TimingEvent
 
 
 SUCCESS = 0
@@ -31,6 +33,9 @@ class Response(object):
         * data: an object or list of objects representing the data from the API
         * error: a string if the API returned any additional error information
                  in the response body, None otherwise
+        * timing: the :class:`tempodb.metrics.TimingEvent` for the request,
+                  or None if the request was not made through an
+                  :class:`tempodb.endpoint.HTTPEndpoint`
 
     **Note:** data will be None if the status code was anything other than
     200.
@@ -47,8 +52,11 @@ class Response(object):
     :param obj resp: a response object from the requests library"""
 
     def __init__(self, resp, session):
+        start = time.time()
         self.resp = resp
         self.session = session
+        timing = getattr(resp, 'timing', None)
+        self.timing = timing if isinstance(timing, TimingEvent) else None
         self.status = resp.status_code
         self.reason = resp.reason
         if self.status == 200:
@@ -64,12 +72,31 @@ class Response(object):
         self.resp.encoding = "UTF-8"
         self.body = self.resp.text
         self.data = None
+        if self.timing is not None:
+            self.timing.parse_time += time.time() - start
 
-    def _cast_payload(self, t):
+    def _cast_payload(self, t, time_format=None):
         if type(t) == list:
             obj = getattr(protocol, t[0])
-            l = json.loads(self.resp.text)
-            self.data = [obj(d, self) for d in l]
         else:
             obj = getattr(protocol, t)
-            self.data = obj(self.resp.text, self)
+
+        start = time.time()
+        if type(t) == list or issubclass(obj, protocol.JSONSerializable):
+            j = json.loads(self.body)
+        else:
+            j = self.body
+        parsed = time.time()
+
+        #the types holding timestamps take the time format of the client
+        kwargs = {}
+        if time_format is not None and hasattr(obj, 'time_format'):
+            kwargs['time_format'] = time_format
+        if type(t) == list:
+            self.data = [obj(d, self, **kwargs) for d in j]
+        else:
+            self.data = obj(j, self, **kwargs)
+
+        if self.timing is not None:
+            self.timing.parse_time += parsed - start
+            self.timing.build_time += time.time() - parsed
@@ -0,0 +1,295 @@
+import bisect
+import hashlib
+from parallel import parallel_map, DEFAULT_WORKERS
+from response import ResponseException
+from protocol.merge import merge_multi, merge_sorted
+
+
+def _hash(value):
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return long(hashlib.md5(value).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """A consistent hash ring mapping series keys to shards.  Each shard is
+    placed on the ring at *replicas* points, and a key belongs to the shard
+    at the first point after the hash of the key.  Adding or removing a
+    shard only moves the keys of that shard, about 1/n of them.
+
+    :param list shards: the shard names
+    :param int replicas: (optional) the points on the ring per shard"""
+
+    def __init__(self, shards, replicas=100):
+        self.replicas = replicas
+        self.ring = []
+        self.points = []
+        for shard in shards:
+            self.add(shard)
+
+    def add(self, shard):
+        """Add a shard to the ring.
+
+        :param shard: the shard name
+        :rtype: None"""
+
+        for i in range(self.replicas):
+            bisect.insort(self.ring, (_hash('%s:%d' % (shard, i)), shard))
+        self.points = [h for h, s in self.ring]
+
+    def remove(self, shard):
+        """Remove a shard from the ring.
+
+        :param shard: the shard name
+        :rtype: None"""
+
+        self.ring = [(h, s) for h, s in self.ring if s != shard]
+        self.points = [h for h, s in self.ring]
+
+    def get(self, key):
+        """The shard a key belongs to.
+
+        :param string key: the series key
+        :rtype: the shard name"""
+
+        if not self.ring:
+            raise ValueError('The ring has no shards')
+        i = bisect.bisect(self.points, _hash(key)) % len(self.ring)
+        return self.ring[i][1]
+
+
+class ShardedClient(object):
+    """Spreads series over several databases, each with its own
+    :class:`tempodb.client.Client`, by routing every series key to one of
+    them.  Keys are routed with a :class:`HashRing` over the shard names
+    unless a router function is given, which is called with a series key
+    and returns a shard name::
+
+        shards = {
+            'a': Client(database_a, key_a, secret_a),
+            'b': Client(database_b, key_b, secret_b)
+        }
+        client = ShardedClient(shards)
+        client.write_data('foo', data)
+        for d in client.read_multi(start, end, keys=['foo', 'bar']):
+            print d.t, d.v
+
+    The methods for a single series (:meth:`create_series`,
+    :meth:`get_series`, :meth:`update_series`, :meth:`read_data`,
+    :meth:`write_data`, :meth:`single_value` and :meth:`delete`) take the
+    same arguments as the Client methods and are sent to the shard of the
+    key.  :meth:`write_multi` is split by shard, and :meth:`read_multi`,
+    :meth:`list_series` and :meth:`multi_series_single_value` are sent to
+    the shards of the keys given, or to every shard when filtering by tags
+    or attributes only.  The requests to different shards are made
+    concurrently, using up to *workers* threads, and the results are merged
+    in time order for :meth:`read_multi` and series key order otherwise.
+
+    :param dict clients: the client for each shard, keyed by shard name
+    :param function router: (optional) a function returning the shard name
+                            for a series key
+    :param int workers: (optional) the number of concurrent requests"""
+
+    def __init__(self, clients, router=None, workers=DEFAULT_WORKERS):
+        if not clients:
+            raise ValueError('At least one client is required')
+        self.clients = clients
+        if router is None:
+            self.ring = HashRing(sorted(clients))
+            router = self.ring.get
+        self.router = router
+        self.workers = workers
+        self.time_format = clients.values()[0].time_format
+
+    def shard_for(self, key):
+        """The name of the shard a series key is routed to.
+
+        :param string key: the series key
+        :raises KeyError: if the router returns an unknown shard
+        :rtype: the shard name"""
+
+        shard = self.router(key)
+        if shard not in self.clients:
+            raise KeyError('Unknown shard "%s" for key "%s"' % (shard, key))
+        return shard
+
+    def client_for(self, key):
+        """The client of the shard a series key is routed to.
+
+        :param string key: the series key
+        :rtype: :class:`tempodb.client.Client`"""
+
+        return self.clients[self.shard_for(key)]
+
+    def group_keys(self, keys):
+        """Group series keys by shard.
+
+        :param list keys: the series keys
+        :rtype: dict of shard name to list of keys"""
+
+        groups = {}
+        for key in keys:
+            groups.setdefault(self.shard_for(key), []).append(key)
+        return groups
+
+    def _fan_out(self, f, keys):
+        #call f(client, keys) for each shard concerned, concurrently; no
+        #keys, or an empty list of them, is no key filter as for Client
+        if isinstance(keys, basestring):
+            keys = [keys]
+        if not keys:
+            jobs = [(shard, None) for shard in sorted(self.clients)]
+        else:
+            jobs = sorted(self.group_keys(keys).items())
+
+        def run(job):
+            shard, shard_keys = job
+            return f(self.clients[shard], shard_keys)
+        return parallel_map(run, jobs, self.workers)
+
+    #SINGLE SERIES METHODS
+    def create_series(self, key=None, tags=[], attrs={}):
+        """Create a series on the shard of its key, see
+        :meth:`tempodb.client.Client.create_series`.  The key is required.
+
+        :rtype: :class:`tempodb.response.Response`"""
+
+        if key is None:
+            raise ValueError('A key is required to pick the shard')
+        return self.client_for(key).create_series(key, tags, attrs)
+
+    def get_series(self, key):
+        """See :meth:`tempodb.client.Client.get_series`.
+
+        :rtype: :class:`tempodb.response.Response`"""
+
+        return self.client_for(key).get_series(key)
+
+    def update_series(self, series):
+        """See :meth:`tempodb.client.Client.update_series`.
+
+        :rtype: :class:`tempodb.response.Response`"""
+
+        return self.client_for(series.key).update_series(series)
+
+    def read_data(self, key, *args, **kwargs):
+        """See :meth:`tempodb.client.Client.read_data`.
+
+        :rtype: :class:`tempodb.protocol.cursor.DataPointCursor`"""
+
+        return self.client_for(key).read_data(key, *args, **kwargs)
+
+    def write_data(self, key, data, tags=[], attrs={}):
+        """See :meth:`tempodb.client.Client.write_data`.
+
+        :rtype: :class:`tempodb.response.Response`"""
+
+        return self.client_for(key).write_data(key, data, tags, attrs)
+
+    def single_value(self, key, ts=None, direction=None):
+        """See :meth:`tempodb.client.Client.single_value`.
+
+        :rtype: :class:`tempodb.response.Response`"""
+
+        return self.client_for(key).single_value(key, ts, direction)
+
+    def delete(self, key, start, end):
+        """See :meth:`tempodb.client.Client.delete`.
+
+        :rtype: :class:`tempodb.response.Response`"""
+
+        return self.client_for(key).delete(key, start, end)
+
+    #MULTI SERIES METHODS
+    def write_multi(self, data):
+        """Write data points into multiple series, sending the points of each
+        shard in one request and the requests to different shards
+        concurrently.  Each point is routed by its key, so every point must
+        have one: series ids are assigned by each database and can not be
+        mapped to a shard, so points with only an id are rejected.
+
+        If the write fails on any shard, the
+        :class:`tempodb.response.ResponseException` of the first shard that
+        failed is raised once every shard has finished, with the response of
+        each shard as its responses attribute.
+
+        :param list data: a list of DataPoints to write
+        :raises ValueError: if a point has no key
+        :raises ResponseException: if the write fails on any shard
+        :rtype: dict of shard name to :class:`tempodb.response.Response`"""
+
+        groups = {}
+        for d in data:
+            key = getattr(d, 'key', None)
+            if key is None:
+                raise ValueError('Data points need a key to be routed')
+            groups.setdefault(self.shard_for(key), []).append(d)
+
+        def write(job):
+            shard, points = job
+            try:
+                return (self.clients[shard].write_multi(points), None)
+            except ResponseException, e:
+                return (e.response, e)
+
+        jobs = sorted(groups.items())
+        results = parallel_map(write, jobs, self.workers)
+        responses = dict((shard, resp) for (shard, points), (resp, e)
+                         in zip(jobs, results))
+        errors = [e for resp, e in results if e is not None]
+        if errors:
+            errors[0].responses = responses
+            raise errors[0]
+        return responses
+
+    def read_multi(self, start, end, keys=None, rollup=None, period=None,
+                   tz=None, tags=None, attrs=None, interpolationf=None,
+                   interpolation_period=None, limit=5000):
+        """Read data from multiple series across the shards, see
+        :meth:`tempodb.client.Client.read_multi`.  The first page from each
+        shard is fetched concurrently, and the cursors are then merged
+        lazily by timestamp.
+
+        :rtype: generator of :class:`tempodb.protocol.objects.MultiPoint`
+                objects"""
+
+        def read(client, shard_keys):
+            return client.read_multi(start, end, keys=shard_keys,
+                                     rollup=rollup, period=period, tz=tz,
+                                     tags=tags, attrs=attrs,
+                                     interpolationf=interpolationf,
+                                     interpolation_period=interpolation_period,
+                                     limit=limit)
+
+        cursors = self._fan_out(read, keys)
+        return merge_multi(cursors, tz=tz, time_format=self.time_format)
+
+    def list_series(self, keys=None, tags=None, attrs=None, limit=1000):
+        """List the series matching the given criteria on every shard
+        concerned, see :meth:`tempodb.client.Client.list_series`.
+
+        :rtype: generator of :class:`tempodb.protocol.objects.Series`
+                objects in key order"""
+
+        def read(client, shard_keys):
+            return client.list_series(keys=shard_keys, tags=tags,
+                                      attrs=attrs, limit=limit)
+
+        cursors = self._fan_out(read, keys)
+        return merge_sorted(cursors, lambda s: s.key)
+
+    def multi_series_single_value(self, keys=None, ts=None, direction=None,
+                                  attrs={}, tags=[]):
+        """Return a single value for multiple series across the shards, see
+        :meth:`tempodb.client.Client.multi_series_single_value`.
+
+        :rtype: generator of :class:`tempodb.protocol.objects.SingleValue`
+                objects in series key order"""
+
+        def read(client, shard_keys):
+            return client.multi_series_single_value(keys=shard_keys, ts=ts,
+                                                    direction=direction,
+                                                    attrs=attrs, tags=tags)
+
+        cursors = self._fan_out(read, keys)
+        return merge_sorted(cursors, lambda sv: sv.series.key)
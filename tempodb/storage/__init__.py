@@ -0,0 +1,3 @@
+from tsfile import ExportWriter, ExportReader
+from cache import ColumnarCache
+from pyramid import PyramidCache
@@ -0,0 +1,348 @@
+"""
+A columnar cache of series data on local disk that many processes can share.
+
+Each cached time range of a series is a segment file holding a small header
+followed by an int64 array of epoch milliseconds and a float64 array of
+values::
+
+    MAGIC, point count, start, end (little-endian)
+    timestamps
+    values
+
+Readers memory-map segments read-only and get NumPy arrays that are views of
+the mapped file, so many processes reading the same series share one copy in
+the page cache.  Segments are written to a temporary file and renamed into
+place, so readers only ever see complete segments.
+"""
+
+import os
+import errno
+import struct
+import hashlib
+import tempfile
+import mmap
+from tempodb.parallel import parallel_map, DEFAULT_WORKERS
+from tempodb.temporal.arrays import require_numpy, to_arrays
+from tsfile import to_epoch_ms
+
+
+MAGIC = 'TDBCOL\x01\x00'
+HEADER = struct.Struct('<8sqqq')
+SUFFIX = '.seg'
+
+
+class Segment(object):
+    """A cached time range of one series, from *start* up to, but not
+    including, *end*."""
+
+    def __init__(self, path, start, end):
+        self.path = path
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return 'Segment(%r, %d, %d)' % (self.path, self.start, self.end)
+
+    def load(self):
+        """Map the segment and return views of its arrays.
+
+        :rtype: tuple of (timestamps, values) arrays"""
+
+        np = require_numpy()
+        f = open(self.path, 'rb')
+        try:
+            size = os.fstat(f.fileno()).st_size
+            m = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        finally:
+            #the map stays valid after the file is closed
+            f.close()
+        magic, count, start, end = HEADER.unpack_from(m, 0)
+        if magic != MAGIC or size != HEADER.size + 16 * count:
+            raise ValueError('%s is not a cache segment' % self.path)
+        ts = np.frombuffer(m, dtype='<i8', count=count, offset=HEADER.size)
+        vs = np.frombuffer(m, dtype='<f8', count=count,
+                           offset=HEADER.size + 8 * count)
+        return (ts, vs)
+
+
+class ColumnarCache(object):
+    """A cache of raw series data in memory-mappable segment files under
+    *directory*.  One process fills the cache from the API and any number of
+    processes on the host can read from it::
+
+        cache = ColumnarCache('/var/cache/tempodb', max_bytes=2 ** 30)
+
+        #in the process that keeps the cache fresh
+        cache.fill_many(client, keys, start, end)
+
+        #in the workers
+        ts, values = cache.get('foo', start, end)
+
+    Each time range that has been filled is a segment, and :meth:`get`
+    returns data if the segments of a series cover the requested range.  If
+    a single segment covers it the arrays are zero-copy views of the mapped
+    file; otherwise the pieces from each segment are concatenated.
+
+    When *max_bytes* is set, the oldest segments are removed after each
+    :meth:`put` until the cache fits.  Processes that already have a removed
+    segment mapped keep working with it until they drop their arrays.
+
+    :param string directory: the directory to keep the cache in
+    :param int max_bytes: (optional) the maximum total size of the segments"""
+
+    def __init__(self, directory, max_bytes=None):
+        require_numpy()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(directory)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def _series_dir(self, key):
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        return os.path.join(self.directory, hashlib.sha1(key).hexdigest())
+
+    def segments(self, key):
+        """The segments cached for a series, in order of their start time.
+
+        :param string key: the series key
+        :rtype: list of :class:`Segment`"""
+
+        d = self._series_dir(key)
+        try:
+            names = os.listdir(d)
+        except OSError, e:
+            if e.errno == errno.ENOENT:
+                return []
+            raise
+
+        ret = []
+        for name in names:
+            if not name.endswith(SUFFIX):
+                continue
+            try:
+                start, end = [int(p) for p in name[:-len(SUFFIX)].split('_')]
+            except ValueError:
+                continue
+            ret.append(Segment(os.path.join(d, name), start, end))
+        ret.sort(key=lambda s: (s.start, -s.end))
+        return ret
+
+    def put(self, key, timestamps, values, start, end):
+        """Publish the data of a series over a time range as a new segment.
+        The range says which times the data is complete for, so empty
+        stretches of the series are cached too.  Segments of the series that
+        the new one covers are removed.
+
+        :param string key: the series key
+        :param timestamps: epoch milliseconds for each point, in time order
+        :type timestamps: array or list of int
+        :param values: the value for each point
+        :type values: array or list of float
+        :param start: the start of the time range
+        :type start: int, ISO8601 string or Datetime
+        :param end: the end of the time range (exclusive)
+        :type end: int, ISO8601 string or Datetime
+        :rtype: :class:`Segment`"""
+
+        np = require_numpy()
+        start = to_epoch_ms(start)
+        end = to_epoch_ms(end)
+        ts = np.ascontiguousarray(timestamps, dtype='<i8')
+        vs = np.ascontiguousarray(values, dtype='<f8')
+        if ts.shape != vs.shape:
+            raise ValueError('Timestamps and values must be the same length')
+
+        d = self._series_dir(key)
+        try:
+            os.mkdir(d)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        fd, tmp = tempfile.mkstemp(dir=d, suffix='.tmp')
+        try:
+            f = os.fdopen(fd, 'wb')
+            f.write(HEADER.pack(MAGIC, len(ts), start, end))
+            f.write(ts.tostring())
+            f.write(vs.tostring())
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+            path = os.path.join(d, '%d_%d%s' % (start, end, SUFFIX))
+            os.rename(tmp, path)
+        except:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        for s in self.segments(key):
+            if s.path != path and s.start >= start and s.end <= end:
+                self._remove(s.path)
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes)
+        return Segment(path, start, end)
+
+    def get(self, key, start, end):
+        """Read the data of a series over a time range from the cache.
+
+        :param string key: the series key
+        :param start: the start of the time range
+        :type start: int, ISO8601 string or Datetime
+        :param end: the end of the time range (exclusive)
+        :type end: int, ISO8601 string or Datetime
+        :rtype: tuple of (timestamps, values) arrays, or None if the cached
+                segments do not cover the range"""
+
+        np = require_numpy()
+        start = to_epoch_ms(start)
+        end = to_epoch_ms(end)
+
+        #greedily pick the segments reaching furthest past what is covered
+        pos = start
+        chosen = []
+        segments = self.segments(key)
+        while pos < end:
+            best = None
+            for s in segments:
+                if s.start <= pos < s.end and (best is None or
+                                               s.end > best.end):
+                    best = s
+            if best is None:
+                return None
+            chosen.append((best, pos, min(best.end, end)))
+            pos = best.end
+
+        ts_parts = []
+        vs_parts = []
+        for s, lo, hi in chosen:
+            try:
+                ts, vs = s.load()
+            except (IOError, OSError):
+                #evicted since it was listed
+                return None
+            i, j = np.searchsorted(ts, [lo, hi])
+            ts_parts.append(ts[i:j])
+            vs_parts.append(vs[i:j])
+
+        if len(ts_parts) == 1:
+            return (ts_parts[0], vs_parts[0])
+        if not ts_parts:
+            return (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+        return (np.concatenate(ts_parts), np.concatenate(vs_parts))
+
+    def fill(self, client, key, start, end, limit=1000):
+        """Read raw data for a series from the API and publish it to the
+        cache.
+
+        :param client: the client to read with
+        :type client: :class:`tempodb.client.Client`
+        :param string key: the series key
+        :param start: the start of the time range
+        :type start: ISO8601 string or Datetime
+        :param end: the end of the time range (exclusive)
+        :type end: ISO8601 string or Datetime
+        :param int limit: (optional) the page size to read with
+        :rtype: :class:`Segment`"""
+
+        ts, vs = to_arrays(client.read_data(key, start, end, limit=limit))
+        return self.put(key, ts, vs, start, end)
+
+    def fill_many(self, client, keys, start, end, limit=1000,
+                  workers=DEFAULT_WORKERS):
+        """Fill the cache for many series at once using a pool of worker
+        threads.
+
+        :param client: the client to read with
+        :type client: :class:`tempodb.client.Client`
+        :param list keys: the series keys
+        :param start: the start of the time range
+        :type start: ISO8601 string or Datetime
+        :param end: the end of the time range (exclusive)
+        :type end: ISO8601 string or Datetime
+        :param int limit: (optional) the page size to read with
+        :param int workers: (optional) the number of concurrent requests
+        :rtype: list of :class:`Segment`"""
+
+        return parallel_map(
+            lambda key: self.fill(client, key, start, end, limit), keys,
+            workers)
+
+    def read_data(self, client, key, start, end, limit=1000):
+        """Read data for a series from the cache, filling the cache from the
+        API first if it does not cover the time range.
+
+        :param client: the client to read with
+        :type client: :class:`tempodb.client.Client`
+        :param string key: the series key
+        :param start: the start of the time range
+        :type start: ISO8601 string or Datetime
+        :param end: the end of the time range (exclusive)
+        :type end: ISO8601 string or Datetime
+        :param int limit: (optional) the page size to read with
+        :rtype: tuple of (timestamps, values) arrays"""
+
+        ret = self.get(key, start, end)
+        if ret is None:
+            self.fill(client, key, start, end, limit)
+            ret = self.get(key, start, end)
+        return ret
+
+    def size(self):
+        """The total size of the cached segments in bytes.
+
+        :rtype: int"""
+
+        return sum(size for mtime, size, path in self._all_segments())
+
+    def _all_segments(self):
+        ret = []
+        for d in os.listdir(self.directory):
+            d = os.path.join(self.directory, d)
+            if not os.path.isdir(d):
+                continue
+            for name in os.listdir(d):
+                if not name.endswith(SUFFIX):
+                    continue
+                path = os.path.join(d, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                ret.append((st.st_mtime, st.st_size, path))
+        return ret
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def evict(self, max_bytes):
+        """Remove the oldest segments until the cache is no larger than
+        *max_bytes*.
+
+        :param int max_bytes: the size to shrink the cache to
+        :rtype: int, the number of bytes removed"""
+
+        segments = sorted(self._all_segments())
+        total = sum(s[1] for s in segments)
+        removed = 0
+        for mtime, size, path in segments:
+            if total - removed <= max_bytes:
+                break
+            self._remove(path)
+            removed += size
+        return removed
+
+    def clear(self):
+        """Remove every segment from the cache.
+
+        :rtype: None"""
+
+        for mtime, size, path in self._all_segments():
+            self._remove(path)
@@ -0,0 +1,244 @@
+"""
+A multi-resolution cache of rollups for zoomable charts.
+
+Every series gets a pyramid of levels, each holding rollups of the series at
+one resolution (by default 1min, 1hour and 1day).  Each level is split into
+tiles of a fixed number of periods, aligned to the UNIX epoch, so the tiles
+needed for any view can be found with integer arithmetic and a view that
+pans or zooms mostly reuses tiles that are already cached.  Rollups are
+computed in UTC.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from tempodb.parallel import parallel_map, DEFAULT_WORKERS
+from tempodb.temporal.period import parse_period, fixed_length_ms
+from tempodb.temporal.arrays import point_epoch_ms, epoch_ms_to_datetime
+from tsfile import to_epoch_ms
+
+
+DEFAULT_LEVELS = ['1min', '1hour', '1day']
+TILE_PERIODS = 1000
+DAY_MS = 86400000
+
+
+def period_ms(period):
+    """Utility function giving the length of a period in milliseconds, with
+    days taken to be 24 hours as they are in UTC.
+
+    :param string period: the period, i.e. "1min" or "1day"
+    :raises ValueError: if the period is in months or years
+    :rtype: int"""
+
+    delta = parse_period(period)
+    if delta.years or delta.months:
+        raise ValueError('Period "%s" does not have a fixed length' % period)
+    ms = fixed_length_ms(delta) + delta.days * DAY_MS
+    if ms <= 0:
+        raise ValueError('Period "%s" must be positive' % period)
+    return ms
+
+
+class Level(object):
+    """One resolution of the pyramid."""
+
+    def __init__(self, period, tile_periods):
+        self.period = period
+        self.period_ms = period_ms(period)
+        self.tile_ms = self.period_ms * tile_periods
+
+    def tiles(self, start, end):
+        """The indexes of the tiles covering [start, end) in epoch ms."""
+
+        return range(start // self.tile_ms, (end - 1) // self.tile_ms + 1)
+
+
+class PyramidCache(object):
+    """Caches rollups of series at several fixed resolutions and answers
+    reads from the level that best fits a point budget::
+
+        pyramid = PyramidCache(client, function='mean')
+        period, points = pyramid.read('foo', start, end, max_points=800)
+
+    A read uses the finest level that gives at most *max_points* points over
+    the requested range, or the coarsest level if none does.  Only the tiles
+    of that level that are not cached yet are read from the API, with one
+    :meth:`tempodb.client.Client.read_data` call per run of consecutive
+    missing tiles.  Tiles reaching into the future are never cached, since
+    their rollups can still change.
+
+    The cache holds at most *max_tiles* tiles in memory and drops the least
+    recently used ones beyond that.
+
+    :param client: the client to read with
+    :type client: :class:`tempodb.client.Client`
+    :param list levels: (optional) the periods of the levels
+    :param string function: (optional) the rollup function
+    :param int tile_periods: (optional) the number of periods in a tile
+    :param int max_tiles: (optional) the number of tiles to keep
+    :param int workers: (optional) the number of concurrent requests used to
+                        fill missing tiles"""
+
+    def __init__(self, client, levels=DEFAULT_LEVELS, function='mean',
+                 tile_periods=TILE_PERIODS, max_tiles=10000,
+                 workers=DEFAULT_WORKERS):
+        self.client = client
+        self.function = function
+        self.levels = sorted([Level(p, tile_periods) for p in levels],
+                             key=lambda l: l.period_ms)
+        if not self.levels:
+            raise ValueError('At least one level is required')
+        self.max_tiles = max_tiles
+        self.workers = workers
+        self.tiles = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def choose_level(self, start, end, max_points):
+        """Pick the level for a read: the finest one with at most
+        *max_points* periods in the range, or the coarsest.
+
+        :param int start: the start of the range in epoch ms
+        :param int end: the end of the range in epoch ms
+        :param int max_points: the point budget
+        :rtype: :class:`Level`"""
+
+        for level in self.levels:
+            if (end - start) // level.period_ms <= max_points:
+                return level
+        return self.levels[-1]
+
+    def _get(self, k):
+        with self.lock:
+            tile = self.tiles.get(k)
+            if tile is not None:
+                #mark as recently used
+                del self.tiles[k]
+                self.tiles[k] = tile
+            return tile
+
+    def _put(self, k, tile):
+        with self.lock:
+            self.tiles.pop(k, None)
+            self.tiles[k] = tile
+            while len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+
+    def _fetch(self, key, level, first, last):
+        #read a run of tiles and split the points between them
+        start = first * level.tile_ms
+        end = (last + 1) * level.tile_ms
+        cursor = self.client.read_data(
+            key, epoch_ms_to_datetime(start), epoch_ms_to_datetime(end),
+            rollup=self.function, period=level.period, tz='UTC',
+            limit=5000)
+        ret = dict((i, []) for i in xrange(first, last + 1))
+        for d in cursor:
+            t = point_epoch_ms(d)
+            i = t // level.tile_ms
+            if i in ret:
+                ret[i].append((t, d.v))
+        return ret
+
+    def read(self, key, start, end, max_points=1000):
+        """Read rollups of a series over [start, end) at the level that fits
+        the point budget.
+
+        :param string key: the series key
+        :param start: the start of the range
+        :type start: int, ISO8601 string or Datetime
+        :param end: the end of the range (exclusive)
+        :type end: int, ISO8601 string or Datetime
+        :param int max_points: (optional) the point budget
+        :rtype: tuple of (period, points), where points is a list of (epoch
+                milliseconds, value) tuples"""
+
+        start = to_epoch_ms(start)
+        end = to_epoch_ms(end)
+        if end <= start:
+            return (self.levels[0].period, [])
+
+        level = self.choose_level(start, end, max_points)
+        indexes = level.tiles(start, end)
+        found = {}
+        missing = []
+        for i in indexes:
+            tile = self._get((key, level.period, i))
+            if tile is None:
+                missing.append(i)
+            else:
+                found[i] = tile
+
+        #group the missing tiles into runs of consecutive ones
+        runs = []
+        for i in missing:
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+
+        with self.lock:
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        now = int(time.time() * 1000)
+        fetched = parallel_map(
+            lambda run: self._fetch(key, level, run[0], run[1]), runs,
+            self.workers)
+        for tiles in fetched:
+            for i, tile in tiles.items():
+                found[i] = tile
+                if (i + 1) * level.tile_ms <= now:
+                    self._put((key, level.period, i), tile)
+
+        points = []
+        for i in indexes:
+            points.extend(p for p in found[i] if start <= p[0] < end)
+        return (level.period, points)
+
+    def read_data(self, key, start, end, max_points=1000, tz=None):
+        """Like :meth:`read`, but returns DataPoints.
+
+        :param string key: the series key
+        :param start: the start of the range
+        :type start: int, ISO8601 string or Datetime
+        :param end: the end of the range (exclusive)
+        :type end: int, ISO8601 string or Datetime
+        :param int max_points: (optional) the point budget
+        :param string tz: (optional) the timezone to give the points
+        :rtype: tuple of (period, list of
+                :class:`tempodb.protocol.objects.DataPoint`)"""
+
+        from tempodb.protocol.objects import DataPoint
+        period, points = self.read(key, start, end, max_points)
+        ret = []
+        for t, v in points:
+            d = DataPoint({'t': None, 'v': v}, None, tz=tz)
+            d.t = epoch_ms_to_datetime(t, tz)
+            ret.append(d)
+        return (period, ret)
+
+    def invalidate(self, key=None):
+        """Drop the cached tiles of a series, or of every series, i.e. after
+        writing data into the past.
+
+        :param string key: (optional) the series key
+        :rtype: None"""
+
+        with self.lock:
+            if key is None:
+                self.tiles.clear()
+            else:
+                for k in [k for k in self.tiles if k[0] == key]:
+                    del self.tiles[k]
+
+    def stats(self):
+        """Tile hit and miss counts and the number of tiles cached.
+
+        :rtype: dict"""
+
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'tiles': len(self.tiles)}
@@ -0,0 +1,488 @@
+"""
+A compact binary file format for local snapshots of series data.
+
+Each series is stored as a run of blocks of up to BLOCK_POINTS points.  A
+block starts with its first timestamp (epoch milliseconds) and value in
+full, followed by a bit stream in which timestamps are encoded as
+delta-of-deltas and values as the XOR with the previous value, as described
+in the Gorilla paper (Pelkonen et al., VLDB 2015).  Regularly spaced series
+of slowly changing values take a few bits per point.
+
+The layout of a file is::
+
+    MAGIC
+    block, block, ...
+    index (JSON)
+    index offset and length (two big-endian unsigned 64-bit ints)
+    MAGIC
+
+The index lists the blocks of every series with their offset, length, point
+count and time range, so the reader can memory-map the file and decode only
+the blocks that overlap a requested time range.
+"""
+
+import os
+import json
+import mmap
+import struct
+import datetime
+from tempodb.temporal.validate import convert_iso_stamp
+from tempodb.temporal.arrays import (require_numpy, datetime_to_epoch_ms,
+                                     epoch_ms_to_datetime, point_epoch_ms)
+
+
+MAGIC = 'TEMPODB\x01'
+FOOTER = struct.Struct('>QQ')
+BLOCK_HEAD = struct.Struct('>qQ')
+BLOCK_POINTS = 1024
+
+MASK64 = (1 << 64) - 1
+
+
+def float_to_bits(v):
+    return struct.unpack('>Q', struct.pack('>d', v))[0]
+
+
+def bits_to_float(b):
+    return struct.unpack('>d', struct.pack('>Q', b))[0]
+
+
+def to_epoch_ms(t):
+    """Utility function for converting a time given as epoch milliseconds,
+    an ISO8601 string or a Datetime into epoch milliseconds.
+
+    :param t: the time to convert
+    :type t: int, string or Datetime
+    :rtype: int"""
+
+    if isinstance(t, basestring):
+        t = convert_iso_stamp(t)
+    if isinstance(t, datetime.datetime):
+        return datetime_to_epoch_ms(t)
+    return int(t)
+
+
+class BitWriter(object):
+    """Writes a stream of bits, most significant bit first."""
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.acc = 0
+        self.n = 0
+
+    def write(self, v, bits):
+        self.acc = (self.acc << bits) | (v & ((1 << bits) - 1))
+        self.n += bits
+        while self.n >= 8:
+            self.n -= 8
+            self.buf.append((self.acc >> self.n) & 0xff)
+        self.acc &= (1 << self.n) - 1
+
+    def getvalue(self):
+        ret = bytearray(self.buf)
+        if self.n:
+            ret.append((self.acc << (8 - self.n)) & 0xff)
+        return str(ret)
+
+
+class BitReader(object):
+    """Reads a stream of bits written by :class:`BitWriter`."""
+
+    def __init__(self, data):
+        self.buf = bytearray(data)
+        self.pos = 0
+
+    def read_bit(self):
+        b = (self.buf[self.pos >> 3] >> (7 - (self.pos & 7))) & 1
+        self.pos += 1
+        return b
+
+    def read(self, bits):
+        first = self.pos >> 3
+        last = (self.pos + bits + 7) >> 3
+        v = 0
+        for b in self.buf[first:last]:
+            v = (v << 8) | b
+        v >>= last * 8 - self.pos - bits
+        self.pos += bits
+        return v & ((1 << bits) - 1)
+
+
+#delta-of-delta buckets: (control bits, control bit count, value bits); the
+#values are stored offset so they are never negative
+DOD_BUCKETS = [(0x2, 2, 7), (0x6, 3, 9), (0xe, 4, 12)]
+
+
+def encode_block(timestamps, values):
+    """Encode one block of points.
+
+    :param list timestamps: epoch milliseconds
+    :param list values: float values
+    :rtype: string"""
+
+    t0 = timestamps[0]
+    prev_v = float_to_bits(float(values[0]))
+    head = BLOCK_HEAD.pack(t0, prev_v)
+    w = BitWriter()
+
+    prev_t = t0
+    prev_delta = 0
+    leading = trailing = -1
+    for i in xrange(1, len(timestamps)):
+        t = timestamps[i]
+        delta = t - prev_t
+        dod = delta - prev_delta
+        prev_t = t
+        prev_delta = delta
+        if dod == 0:
+            w.write(0, 1)
+        else:
+            for control, cbits, vbits in DOD_BUCKETS:
+                offset = (1 << (vbits - 1)) - 1
+                if -offset <= dod <= offset + 1:
+                    w.write(control, cbits)
+                    w.write(dod + offset, vbits)
+                    break
+            else:
+                w.write(0xf, 4)
+                w.write(dod & MASK64, 64)
+
+        v = float_to_bits(float(values[i]))
+        xor = v ^ prev_v
+        prev_v = v
+        if xor == 0:
+            w.write(0, 1)
+            continue
+        lz = min(64 - xor.bit_length(), 31)
+        tz = (xor & -xor).bit_length() - 1
+        if leading >= 0 and lz >= leading and tz >= trailing:
+            #the meaningful bits fit in the previous window
+            w.write(0x2, 2)
+            w.write(xor >> trailing, 64 - leading - trailing)
+        else:
+            leading = lz
+            trailing = tz
+            meaningful = 64 - lz - tz
+            w.write(0x3, 2)
+            w.write(lz, 5)
+            w.write(meaningful & 0x3f, 6)
+            w.write(xor >> tz, meaningful)
+
+    return head + w.getvalue()
+
+
+def decode_block(data, count):
+    """Decode one block of points.
+
+    :param string data: the encoded block
+    :param int count: the number of points in the block
+    :rtype: tuple of (timestamps, values) lists"""
+
+    t, prev_v = BLOCK_HEAD.unpack_from(data, 0)
+    ts = [t]
+    vs = [bits_to_float(prev_v)]
+    r = BitReader(buffer(data, BLOCK_HEAD.size))
+    bit = r.read_bit
+    read = r.read
+    append_t = ts.append
+    append_v = vs.append
+
+    delta = 0
+    leading = trailing = 0
+    for i in xrange(1, count):
+        if bit() == 0:
+            dod = 0
+        elif bit() == 0:
+            dod = read(7) - 63
+        elif bit() == 0:
+            dod = read(9) - 255
+        elif bit() == 0:
+            dod = read(12) - 2047
+        else:
+            dod = read(64)
+            if dod >> 63:
+                dod -= 1 << 64
+        delta += dod
+        t += delta
+        append_t(t)
+
+        if bit() == 1:
+            if bit() == 1:
+                leading = read(5)
+                meaningful = read(6) or 64
+                trailing = 64 - leading - meaningful
+            prev_v ^= read(64 - leading - trailing) << trailing
+        append_v(bits_to_float(prev_v))
+
+    return (ts, vs)
+
+
+class ExportWriter(object):
+    """Writes series to a file in the binary export format.  Points are
+    buffered and encoded a block at a time, so series of any length can be
+    written in constant memory.  The file is written under a temporary name
+    and only moved into place by :meth:`close`::
+
+        with ExportWriter('snapshot.tsf') as w:
+            w.write_series('foo', client.read_data('foo', start, end))
+
+    :param string path: the file to write
+    :param int block_points: (optional) the maximum number of points in a
+                             block"""
+
+    def __init__(self, path, block_points=BLOCK_POINTS):
+        self.path = path
+        self.block_points = block_points
+        self.tmp_path = '%s.tmp.%d' % (path, os.getpid())
+        self.file = open(self.tmp_path, 'wb')
+        self.file.write(MAGIC)
+        self.offset = len(MAGIC)
+        self.series = []
+        self.keys = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write_block(self, entry, ts, vs):
+        data = encode_block(ts, vs)
+        self.file.write(data)
+        entry['blocks'].append([self.offset, len(data), len(ts), min(ts),
+                                max(ts)])
+        entry['count'] += len(ts)
+        self.offset += len(data)
+
+    def write_points(self, key, points):
+        """Write a series from an iterable of (epoch milliseconds, value)
+        tuples.
+
+        :param string key: the series key
+        :param points: the points of the series, ideally in time order
+        :type points: iterable of (int, float) tuples
+        :raises ValueError: if the key has already been written
+        :rtype: int, the number of points written"""
+
+        if key in self.keys:
+            raise ValueError('Series "%s" was already written' % key)
+        self.keys.add(key)
+        entry = {'key': key, 'count': 0, 'blocks': []}
+        self.series.append(entry)
+
+        ts = []
+        vs = []
+        for t, v in points:
+            ts.append(int(t))
+            vs.append(v)
+            if len(ts) == self.block_points:
+                self._write_block(entry, ts, vs)
+                ts = []
+                vs = []
+        if ts:
+            self._write_block(entry, ts, vs)
+        return entry['count']
+
+    def write_series(self, key, data):
+        """Write a series of DataPoints, such as a
+        :class:`tempodb.protocol.cursor.DataPointCursor`.
+
+        :param string key: the series key
+        :param data: the points of the series
+        :type data: iterable of DataPoints
+        :rtype: int, the number of points written"""
+
+        return self.write_points(
+            key, ((point_epoch_ms(d), d.v) for d in data))
+
+    def write_arrays(self, key, timestamps, values):
+        """Write a series in columnar form.
+
+        :param string key: the series key
+        :param timestamps: epoch milliseconds for each point
+        :type timestamps: array or list of int
+        :param values: the value for each point
+        :type values: array or list of float
+        :rtype: int, the number of points written"""
+
+        if len(timestamps) != len(values):
+            raise ValueError('Timestamps and values must be the same length')
+        return self.write_points(key, zip(timestamps, values))
+
+    def close(self):
+        """Write the index and move the file into place.
+
+        :rtype: None"""
+
+        index = json.dumps({'block_points': self.block_points,
+                            'series': self.series})
+        self.file.write(index)
+        self.file.write(FOOTER.pack(self.offset, len(index)))
+        self.file.write(MAGIC)
+        self.file.close()
+        if os.name == 'nt' and os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(self.tmp_path, self.path)
+
+    def abort(self):
+        """Discard the partially written file.
+
+        :rtype: None"""
+
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class ExportReader(object):
+    """Reads a file in the binary export format.  The file is memory-mapped,
+    and reading a time range only touches and decodes the blocks that
+    overlap it.
+
+    :param string path: the file to read
+    :raises ValueError: if the file is not in the export format"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            self.file.close()
+            raise ValueError('%s is not a TempoDB export file' % path)
+
+        size = len(self.map)
+        tail = FOOTER.size + len(MAGIC)
+        if (size < len(MAGIC) + tail or self.map[:len(MAGIC)] != MAGIC or
+                self.map[size - len(MAGIC):] != MAGIC):
+            self.close()
+            raise ValueError('%s is not a TempoDB export file' % path)
+
+        offset, length = FOOTER.unpack_from(self.map, size - tail)
+        index = json.loads(self.map[offset:offset + length])
+        self.block_points = index['block_points']
+        self.series = dict((s['key'], s) for s in index['series'])
+        self.order = [s['key'] for s in index['series']]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def close(self):
+        """Unmap and close the file.
+
+        :rtype: None"""
+
+        self.map.close()
+        self.file.close()
+
+    def keys(self):
+        """The keys of the series in the file, in the order they were
+        written.
+
+        :rtype: list"""
+
+        return list(self.order)
+
+    def count(self, key):
+        """The number of points stored for a series.
+
+        :param string key: the series key
+        :rtype: int"""
+
+        return self.series[key]['count']
+
+    def time_range(self, key):
+        """The first and last timestamps of a series, in epoch milliseconds,
+        or None if the series has no points.
+
+        :param string key: the series key
+        :rtype: tuple of (int, int)"""
+
+        blocks = self.series[key]['blocks']
+        if not blocks:
+            return None
+        return (min(b[3] for b in blocks), max(b[4] for b in blocks))
+
+    def _blocks(self, key, start, end):
+        try:
+            blocks = self.series[key]['blocks']
+        except KeyError:
+            raise KeyError('Series "%s" is not in %s' % (key, self.path))
+        for offset, length, count, lo, hi in blocks:
+            if (start is not None and hi < start) or \
+                    (end is not None and lo >= end):
+                continue
+            data = buffer(self.map, offset, length)
+            yield decode_block(data, count)
+
+    def read_points(self, key, start=None, end=None):
+        """Read a series as (epoch milliseconds, value) tuples, optionally
+        limited to the points at or after *start* and before *end*.
+
+        :param string key: the series key
+        :param start: (optional) the start of the time range
+        :type start: int, ISO8601 string or Datetime
+        :param end: (optional) the end of the time range (exclusive)
+        :type end: int, ISO8601 string or Datetime
+        :raises KeyError: if the series is not in the file
+        :rtype: generator of (int, float) tuples"""
+
+        start = to_epoch_ms(start) if start is not None else None
+        end = to_epoch_ms(end) if end is not None else None
+        for ts, vs in self._blocks(key, start, end):
+            for t, v in zip(ts, vs):
+                if (start is None or t >= start) and (end is None or t < end):
+                    yield (t, v)
+
+    def read_series(self, key, start=None, end=None, tz=None):
+        """Read a series as DataPoints.
+
+        :param string key: the series key
+        :param start: (optional) the start of the time range
+        :type start: int, ISO8601 string or Datetime
+        :param end: (optional) the end of the time range (exclusive)
+        :type end: int, ISO8601 string or Datetime
+        :param string tz: (optional) the timezone to give the points
+        :rtype: generator of :class:`tempodb.protocol.objects.DataPoint`"""
+
+        from tempodb.protocol.objects import DataPoint
+        for t, v in self.read_points(key, start, end):
+            d = DataPoint({'t': None, 'v': v}, None, tz=tz)
+            d.t = epoch_ms_to_datetime(t, tz)
+            yield d
+
+    def read_arrays(self, key, start=None, end=None):
+        """Read a series in columnar form.  Requires NumPy.
+
+        :param string key: the series key
+        :param start: (optional) the start of the time range
+        :type start: int, ISO8601 string or Datetime
+        :param end: (optional) the end of the time range (exclusive)
+        :type end: int, ISO8601 string or Datetime
+        :rtype: tuple of (timestamps, values) arrays"""
+
+        np = require_numpy()
+        start = to_epoch_ms(start) if start is not None else None
+        end = to_epoch_ms(end) if end is not None else None
+        ts = []
+        vs = []
+        for bt, bv in self._blocks(key, start, end):
+            ts.append(np.array(bt, dtype=np.int64))
+            vs.append(np.array(bv, dtype=np.float64))
+        if not ts:
+            return (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+        ts = np.concatenate(ts)
+        vs = np.concatenate(vs)
+        mask = np.ones(len(ts), dtype=bool)
+        if start is not None:
+            mask &= ts >= start
+        if end is not None:
+            mask &= ts < end
+        return (ts[mask], vs[mask])
@@ -0,0 +1,131 @@
+import calendar
+import datetime
+import pytz
+
+
+#imported by require_numpy on first use, since it is slow to import
+numpy = None
+
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+
+def require_numpy():
+    """Utility function for the modules that work on columnar data.  Raises
+    an exception if NumPy is not available.
+
+    :raises ImportError: if NumPy is not installed
+    :rtype: the numpy module"""
+
+    global numpy
+    if numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('NumPy is required for columnar data support. '
+                              'Install it with "pip install numpy".')
+    return numpy
+
+
+def datetime_to_epoch_ms(dt):
+    """Convert a Datetime object into integer milliseconds since the UNIX
+    epoch.  Naive Datetimes are assumed to be in UTC.
+
+    :param Datetime dt: the datetime to convert
+    :rtype: int"""
+
+    if dt.tzinfo is not None:
+        tt = dt.utctimetuple()
+    else:
+        tt = dt.timetuple()
+    return calendar.timegm(tt) * 1000 + dt.microsecond // 1000
+
+
+def epoch_ms_to_datetime(ms, tz=None):
+    """Convert integer milliseconds since the UNIX epoch into a timezone
+    aware Datetime object.
+
+    :param int ms: the timestamp to convert
+    :param string tz: (optional) the timezone for the result, default UTC
+    :rtype: Datetime"""
+
+    dt = EPOCH + datetime.timedelta(milliseconds=int(ms))
+    if tz is not None:
+        dt = dt.astimezone(pytz.timezone(tz))
+    return dt
+
+
+def point_epoch_ms(d):
+    """Utility function giving the time of a DataPoint or MultiPoint in epoch
+    milliseconds, whether the point holds its time as a Datetime or as an
+    epoch integer.
+
+    :param d: the point
+    :type d: :class:`tempodb.protocol.objects.DataPoint`
+    :rtype: int"""
+
+    t = d.t
+    if isinstance(t, datetime.datetime):
+        return datetime_to_epoch_ms(t)
+    if getattr(d, 'time_format', None) == 'ns':
+        return t // 10 ** 6
+    return t
+
+
+def to_arrays(points):
+    """Convert an iterable of :class:`tempodb.protocol.objects.DataPoint`
+    objects, such as a :class:`tempodb.protocol.cursor.DataPointCursor`, into
+    columnar form: an int64 array of epoch milliseconds and a float64 array
+    of values.
+
+    :param points: the data points to convert
+    :type points: iterable of DataPoint
+    :rtype: tuple of (timestamps, values) arrays"""
+
+    np = require_numpy()
+    ts = []
+    vs = []
+    for d in points:
+        ts.append(point_epoch_ms(d))
+        vs.append(d.v)
+    return (np.array(ts, dtype=np.int64), np.array(vs, dtype=np.float64))
+
+
+def from_epoch_ms(ms, tz=None, time_format='datetime'):
+    """Convert integer milliseconds since the UNIX epoch into a time in
+    *time_format*: a timezone aware Datetime for "datetime", or an epoch
+    integer for "ms" or "ns".
+
+    :param int ms: the timestamp to convert
+    :param string tz: (optional) the timezone of a Datetime result
+    :param string time_format: (optional) "datetime", "ms" or "ns"
+    :rtype: Datetime or int"""
+
+    if time_format == 'ms':
+        return int(ms)
+    if time_format == 'ns':
+        return int(ms) * 10 ** 6
+    return epoch_ms_to_datetime(ms, tz)
+
+
+def to_datapoints(timestamps, values, tz=None, time_format='datetime'):
+    """Convert columnar timestamps and values back into a list of
+    :class:`tempodb.protocol.objects.DataPoint` objects.
+
+    :param timestamps: epoch milliseconds for each point
+    :type timestamps: array or list of int
+    :param values: the value for each point
+    :type values: array or list of float
+    :param string tz: (optional) the timezone to give the points
+    :param string time_format: (optional) the time format of the points,
+                               "datetime", "ms" or "ns"
+    :rtype: list of DataPoint"""
+
+    from tempodb.protocol.objects import DataPoint
+    ret = []
+    for t, v in zip(timestamps, values):
+        d = DataPoint({'t': None, 'v': float(v)}, None, tz=tz,
+                      time_format=time_format)
+        d.t = from_epoch_ms(t, tz, time_format)
+        ret.append(d)
+    return ret
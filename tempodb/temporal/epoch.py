@@ -0,0 +1,166 @@
+import re
+import datetime
+from arrays import datetime_to_epoch_ms
+
+
+DATETIME = 'datetime'
+MILLISECONDS = 'ms'
+NANOSECONDS = 'ns'
+TIME_FORMATS = [DATETIME, MILLISECONDS, NANOSECONDS]
+
+#nanoseconds per unit
+SCALE = {MILLISECONDS: 10 ** 6, NANOSECONDS: 1}
+
+ISO = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:[.,](\d+))?'
+    r'\s*(Z|[+-]\d\d(?::?\d\d)?)?$')
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+#caches shared by all conversions: days since the epoch by date string,
+#offset seconds by offset string, and date strings by days since the epoch
+_days = {}
+_offsets = {'Z': 0, '': 0, None: 0}
+_dates = {}
+
+
+def datetime_to_epoch_ns(dt):
+    """Convert a Datetime object into integer nanoseconds since the UNIX
+    epoch.  Naive Datetimes are assumed to be in UTC.
+
+    :param Datetime dt: the datetime to convert
+    :rtype: int"""
+
+    return datetime_to_epoch_ms(dt) * 10 ** 6 + dt.microsecond % 1000 * 1000
+
+
+def check_time_format(time_format):
+    """Utility function for validating a time format option.
+
+    :param string time_format: one of "datetime", "ms" or "ns"
+    :raises ValueError: if the format is not supported
+    :rtype: string"""
+
+    if time_format not in TIME_FORMATS:
+        raise ValueError('Time format must be one of %s. Got "%s".' %
+                         (', '.join(TIME_FORMATS), time_format))
+    return time_format
+
+
+def _offset(s):
+    ret = _offsets.get(s)
+    if ret is None:
+        sign = -1 if s[0] == '-' else 1
+        digits = s[1:].replace(':', '')
+        minutes = int(digits[:2]) * 60
+        if len(digits) > 2:
+            minutes += int(digits[2:4])
+        ret = _offsets[s] = sign * minutes * 60
+    return ret
+
+
+def _day(s):
+    ret = _days.get(s)
+    if ret is None:
+        d = datetime.date(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+        ret = _days[s] = d.toordinal() - EPOCH_ORDINAL
+    return ret
+
+
+def iso_to_ns(s):
+    """Convert an ISO8601 timestamp, as sent by the TempoDB API, into
+    integer nanoseconds since the UNIX epoch without going through a
+    Datetime.  Timestamps without an offset are taken to be UTC.
+
+    :param string s: the timestamp to convert
+    :rtype: int"""
+
+    m = ISO.match(s)
+    if m is None:
+        import dateutil.parser
+        return datetime_to_epoch_ns(dateutil.parser.parse(s))
+
+    date, hh, mm, ss, frac, off = (s[:10],) + m.groups()[3:]
+    secs = _day(date) * 86400 + int(hh) * 3600 + int(mm) * 60 + int(ss)
+    if off is not None and off != 'Z':
+        secs -= _offset(off)
+    ns = secs * 1000000000
+    if frac:
+        ns += int(frac[:9].ljust(9, '0'))
+    return ns
+
+
+def iso_to_epoch(stamps, time_format=MILLISECONDS):
+    """Convert many ISO8601 timestamps into integer epoch milliseconds or
+    nanoseconds at once.  This is much faster than parsing each into a
+    Datetime, since dates and offsets repeat and are only parsed once.
+
+    :param list stamps: the timestamps to convert
+    :param string time_format: (optional) "ms" or "ns"
+    :rtype: list of int"""
+
+    scale = SCALE[time_format]
+    if scale == 1:
+        return [iso_to_ns(s) for s in stamps]
+    return [iso_to_ns(s) // scale for s in stamps]
+
+
+def epoch_to_iso(values, time_format=MILLISECONDS):
+    """Convert many epoch milliseconds or nanoseconds into ISO8601
+    timestamps in UTC, i.e. "2013-01-01T00:00:00.000+00:00", as accepted by
+    the TempoDB API.  Sub-millisecond precision is dropped.
+
+    :param list values: the times to convert
+    :param string time_format: (optional) "ms" or "ns"
+    :rtype: list of string"""
+
+    div = 10 ** 6 if time_format == NANOSECONDS else 1
+    ret = []
+    for v in values:
+        ms = v // div
+        day, rest = divmod(ms, 86400000)
+        date = _dates.get(day)
+        if date is None:
+            date = _dates[day] = datetime.date.fromordinal(
+                day + EPOCH_ORDINAL).isoformat()
+        secs, millis = divmod(rest, 1000)
+        minutes, secs = divmod(secs, 60)
+        hours, minutes = divmod(minutes, 60)
+        ret.append('%sT%02d:%02d:%02d.%03d+00:00' %
+                   (date, hours, minutes, secs, millis))
+    return ret
+
+
+def to_epoch(t, time_format=MILLISECONDS):
+    """Convert a time given as an ISO8601 string, a Datetime or an integer
+    that is already in epoch *time_format* into an integer epoch time.
+
+    :param t: the time to convert
+    :type t: string, Datetime or int
+    :param string time_format: (optional) "ms" or "ns"
+    :rtype: int or None"""
+
+    if t is None or isinstance(t, (int, long)):
+        return t
+    if isinstance(t, datetime.datetime):
+        ns = datetime_to_epoch_ns(t)
+    else:
+        ns = iso_to_ns(t)
+    return ns // SCALE[time_format]
+
+
+def format_time(t, time_format=DATETIME):
+    """Convert a timestamp attribute of a DataPoint or MultiPoint, either a
+    Datetime or an epoch integer, into ISO8601 for sending to the API.
+
+    :param t: the time to format
+    :type t: Datetime or int
+    :param string time_format: (optional) the unit of integer times
+    :rtype: string"""
+
+    if isinstance(t, (int, long)):
+        if time_format == DATETIME:
+            time_format = MILLISECONDS
+        return epoch_to_iso([t], time_format)[0]
+    return t.isoformat()
+
@@ -0,0 +1,136 @@
+from validate import convert_iso_stamp
+from arrays import require_numpy, to_arrays, datetime_to_epoch_ms
+from period import period_edges, localize
+
+
+FUNCTIONS = ['zoh', 'linear']
+
+
+def _arrays(data):
+    #accept either a (timestamps, values) pair or an iterable of DataPoints,
+    #and return sorted arrays
+    np = require_numpy()
+    if isinstance(data, tuple) and len(data) == 2:
+        ts = np.asarray(data[0], dtype=np.int64)
+        vs = np.asarray(data[1], dtype=np.float64)
+    else:
+        ts, vs = to_arrays(data)
+    if ts.shape != vs.shape:
+        raise ValueError('Timestamps and values must be the same length')
+    if len(ts) > 1 and (ts[1:] < ts[:-1]).any():
+        order = np.argsort(ts, kind='mergesort')
+        ts = ts[order]
+        vs = vs[order]
+    return (ts, vs)
+
+
+def make_grid(start, end, period, tz=None):
+    """Build a regular grid of timestamps from *start* up to, but not
+    including, *end*, spaced *period* apart.  Calendar periods (days and
+    longer) follow the wall clock of *tz*.
+
+    :param start: the first grid point
+    :type start: ISO8601 string or Datetime
+    :param end: the end of the grid (exclusive)
+    :type end: ISO8601 string or Datetime
+    :param string period: the grid spacing, i.e. "1min"
+    :param string tz: (optional) the timezone to align the grid in
+    :rtype: int64 array of epoch milliseconds"""
+
+    if isinstance(start, basestring):
+        start = convert_iso_stamp(start, tz)
+    if isinstance(end, basestring):
+        end = convert_iso_stamp(end, tz)
+    edges = period_edges(start, end, period, tz)
+    return edges[edges < datetime_to_epoch_ms(localize(end, tz))]
+
+
+def interpolate(data, grid, function='zoh'):
+    """Resample a series onto the timestamps of *grid*.  The function can be
+    one of the interpolation functions of the TempoDB API:
+
+        * zoh: zero order hold, each grid point takes the value of the last
+          point at or before it
+        * linear: each grid point takes the value of the line between the
+          points on either side of it
+
+    Grid points before the first point of the series, and for linear
+    interpolation after the last one, are NaN.
+
+    :param data: the series to resample
+    :type data: (timestamps, values) tuple of arrays, or an iterable of
+                DataPoints such as a DataPointCursor
+    :param grid: epoch milliseconds to resample onto
+    :type grid: array or list of int
+    :param string function: (optional) the interpolation function
+    :raises ValueError: if the function is not supported
+    :rtype: float64 array"""
+
+    np = require_numpy()
+    if function not in FUNCTIONS:
+        raise ValueError('Unknown interpolation function "%s"' % function)
+
+    ts, vs = _arrays(data)
+    grid = np.asarray(grid, dtype=np.int64)
+    if len(ts) == 0:
+        return np.full(len(grid), np.nan)
+
+    if function == 'zoh':
+        idx = np.searchsorted(ts, grid, 'right') - 1
+        ret = vs[np.maximum(idx, 0)]
+        ret[idx < 0] = np.nan
+        return ret
+
+    #interpolate on offsets from the first point to keep float precision
+    base = ts[0]
+    return np.interp((grid - base).astype(np.float64),
+                     (ts - base).astype(np.float64), vs,
+                     left=np.nan, right=np.nan)
+
+
+def resample(data, start, end, period, function='zoh', tz=None):
+    """Resample a series onto a regular grid, like calling
+    :meth:`tempodb.client.Client.read_data` with the interpolationf and
+    interpolation_period parameters, but without another trip to the API.
+
+    :param data: the series to resample
+    :type data: (timestamps, values) tuple of arrays, or an iterable of
+                DataPoints such as a DataPointCursor
+    :param start: the first grid point
+    :type start: ISO8601 string or Datetime
+    :param end: the end of the grid (exclusive)
+    :type end: ISO8601 string or Datetime
+    :param string period: the grid spacing, i.e. "1min"
+    :param string function: (optional) the interpolation function
+    :param string tz: (optional) the timezone to align the grid in
+    :rtype: tuple of (timestamps, values) arrays"""
+
+    grid = make_grid(start, end, period, tz)
+    return (grid, interpolate(data, grid, function))
+
+
+def align(series, start, end, period, function='zoh', tz=None):
+    """Resample many series onto one common grid, producing a dense matrix
+    with a row for each series and a column for each grid point.  Missing
+    values are NaN.
+
+    :param dict series: a mapping of series key to data, where the data is
+                        a (timestamps, values) tuple of arrays or an iterable
+                        of DataPoints
+    :param start: the first grid point
+    :type start: ISO8601 string or Datetime
+    :param end: the end of the grid (exclusive)
+    :type end: ISO8601 string or Datetime
+    :param string period: the grid spacing, i.e. "1min"
+    :param string function: (optional) the interpolation function
+    :param string tz: (optional) the timezone to align the grid in
+    :rtype: tuple of (keys, timestamps, matrix), where keys is the sorted
+            list of series keys giving the order of the rows"""
+
+    np = require_numpy()
+    grid = make_grid(start, end, period, tz)
+    keys = sorted(series.keys())
+    matrix = np.empty((len(keys), len(grid)), dtype=np.float64)
+    for i, key in enumerate(keys):
+        matrix[i] = interpolate(series[key], grid, function)
+    return (keys, grid, matrix)
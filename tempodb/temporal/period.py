@@ -0,0 +1,148 @@
+import re
+import pytz
+from dateutil.relativedelta import relativedelta
+from arrays import require_numpy, datetime_to_epoch_ms
+
+
+SHORT_PERIOD = re.compile(r'^(\d+)\s*([a-zA-Z]+)$')
+ISO_PERIOD = re.compile(
+    r'^P(?:(\d+)Y)?(?:(\d+)M)?(?:(\d+)W)?(?:(\d+)D)?'
+    r'(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+UNITS = {
+    'ms': 'milliseconds',
+    'millis': 'milliseconds',
+    'millisecond': 'milliseconds',
+    'milliseconds': 'milliseconds',
+    's': 'seconds',
+    'sec': 'seconds',
+    'secs': 'seconds',
+    'second': 'seconds',
+    'seconds': 'seconds',
+    'min': 'minutes',
+    'mins': 'minutes',
+    'minute': 'minutes',
+    'minutes': 'minutes',
+    'h': 'hours',
+    'hour': 'hours',
+    'hours': 'hours',
+    'd': 'days',
+    'day': 'days',
+    'days': 'days',
+    'w': 'weeks',
+    'week': 'weeks',
+    'weeks': 'weeks',
+    'month': 'months',
+    'months': 'months',
+    'y': 'years',
+    'year': 'years',
+    'years': 'years'
+}
+
+
+def parse_period(period):
+    """Parse a period string as accepted by the TempoDB API (i.e. "1min",
+    "2day", "1hour", or an ISO8601 duration such as "PT1H") into a
+    relativedelta object.
+
+    :param string period: the period to parse
+    :raises ValueError: if the period can not be parsed
+    :rtype: relativedelta"""
+
+    m = SHORT_PERIOD.match(period.strip())
+    if m is not None:
+        unit = UNITS.get(m.group(2).lower())
+        if unit is None:
+            raise ValueError('Unknown unit in period "%s"' % period)
+        n = int(m.group(1))
+        if unit == 'milliseconds':
+            return relativedelta(microseconds=n * 1000)
+        return relativedelta(**{unit: n})
+
+    m = ISO_PERIOD.match(period.strip().upper())
+    if m is not None and any(m.groups()):
+        names = ['years', 'months', 'weeks', 'days', 'hours', 'minutes',
+                 'seconds']
+        args = {}
+        for name, value in zip(names, m.groups()):
+            if value is not None:
+                args[name] = int(value)
+        return relativedelta(**args)
+
+    raise ValueError('Period "%s" is not a valid period' % period)
+
+
+def is_fixed(delta):
+    """Return whether a relativedelta covers a fixed amount of time, as
+    opposed to a calendar based one such as days or months.
+
+    :param relativedelta delta: the period to check
+    :rtype: bool"""
+
+    return not (delta.years or delta.months or delta.days)
+
+
+def fixed_length_ms(delta):
+    """Return the length of a fixed relativedelta in milliseconds.
+
+    :param relativedelta delta: the period to measure
+    :rtype: int"""
+
+    return (((delta.hours * 60 + delta.minutes) * 60 + delta.seconds) * 1000 +
+            delta.microseconds // 1000)
+
+
+def localize(dt, tz=None):
+    """Attach a timezone to a naive Datetime, or convert an aware one into
+    the timezone.  Naive Datetimes with no timezone are assumed to be UTC.
+
+    :param Datetime dt: the datetime to localize
+    :param string tz: (optional) the timezone to use
+    :rtype: Datetime"""
+
+    timezone = pytz.utc if tz is None else pytz.timezone(tz)
+    if dt.tzinfo is None:
+        return timezone.localize(dt)
+    return dt.astimezone(timezone)
+
+
+def period_edges(start, end, period, tz=None):
+    """Compute the boundaries of the intervals of length *period* that
+    cover the time range from *start* to *end*, as epoch milliseconds.  The
+    first boundary is *start* itself.  Naive Datetimes are taken to be in
+    *tz*, or UTC if no timezone is given.  Calendar periods (days and longer)
+    are stepped in the wall clock time of *tz*, so they stay aligned to
+    local midnight across daylight saving changes.
+
+    :param Datetime start: the start of the range
+    :param Datetime end: the end of the range
+    :param period: the interval length
+    :type period: string or relativedelta
+    :param string tz: (optional) the timezone to align intervals in
+    :rtype: int64 array of epoch milliseconds"""
+
+    np = require_numpy()
+    if not isinstance(period, relativedelta):
+        period = parse_period(period)
+
+    start = localize(start, tz)
+    start_ms = datetime_to_epoch_ms(start)
+    end_ms = datetime_to_epoch_ms(localize(end, tz))
+    #units shorter than a day are fixed lengths of time, longer ones follow
+    #the wall clock of the timezone (a day is not always 24 hours)
+    if is_fixed(period):
+        step = fixed_length_ms(period)
+        if step <= 0:
+            raise ValueError('Period must be longer than zero')
+        n = max(1, -(-(end_ms - start_ms) // step))
+        return start_ms + step * np.arange(n + 1, dtype=np.int64)
+
+    timezone = pytz.utc if tz is None else pytz.timezone(tz)
+    wall = start.replace(tzinfo=None)
+    edges = [start_ms]
+    i = 1
+    while edges[-1] < end_ms:
+        dt = timezone.localize(wall + period * i)
+        edges.append(datetime_to_epoch_ms(dt))
+        i += 1
+    return np.array(edges, dtype=np.int64)
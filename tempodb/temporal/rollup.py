@@ -0,0 +1,248 @@
+from validate import convert_iso_stamp
+from arrays import require_numpy, to_arrays, to_datapoints
+from arrays import datetime_to_epoch_ms, epoch_ms_to_datetime, from_epoch_ms
+from epoch import DATETIME, NANOSECONDS
+from period import period_edges, localize
+
+
+FUNCTIONS = ['count', 'sum', 'mult', 'min', 'max', 'stddev', 'ss', 'range',
+             'mean', 'percentile']
+ALIASES = {'avg': 'mean'}
+
+
+def parse_function(function):
+    """Split a rollup function name as accepted by the TempoDB API into its
+    name and argument.  For example, "percentile,95" becomes
+    ("percentile", 95.0) and "max" becomes ("max", None).
+
+    :param string function: the rollup function
+    :raises ValueError: if the function is not supported
+    :rtype: tuple"""
+
+    parts = function.split(',', 1)
+    name = parts[0].strip().lower()
+    name = ALIASES.get(name, name)
+    if name not in FUNCTIONS:
+        raise ValueError('Unknown rollup function "%s"' % function)
+
+    if name == 'percentile':
+        try:
+            arg = float(parts[1])
+        except (IndexError, ValueError):
+            raise ValueError('Rollup function "%s" requires a numeric '
+                             'percentile (i.e. "percentile,95")' % function)
+        if not 0 < arg <= 100:
+            raise ValueError('Percentile must be in (0, 100], got %s' % arg)
+        return (name, arg)
+
+    if len(parts) > 1:
+        raise ValueError('Rollup function "%s" takes no argument' % function)
+    return (name, None)
+
+
+def _as_datetime(t, tz, time_format=DATETIME):
+    #epoch integers are milliseconds unless the time format is "ns"
+    if isinstance(t, (int, long)):
+        if time_format == NANOSECONDS:
+            t //= 10 ** 6
+        return epoch_ms_to_datetime(t, tz)
+    if t is None or not isinstance(t, basestring):
+        return t
+    return convert_iso_stamp(t, tz)
+
+
+class RollupEngine(object):
+    """Computes rollups locally from raw data that has already been fetched,
+    so that one read of the raw data can serve any number of rollups without
+    further trips to the API.  The supported functions are the same as the
+    rollup functions of the TempoDB API:
+
+        * count
+        * sum
+        * mult
+        * min
+        * max
+        * stddev (the sample standard deviation)
+        * ss (the sum of squares)
+        * range
+        * mean (or avg)
+        * percentile,N (using the (n + 1) interpolated estimator)
+
+    Like the API, intervals start at the *start* of the range and each
+    output point is stamped with the start of its interval.  Intervals with
+    no data are omitted.  Periods of a day or longer follow the wall clock
+    of *tz*.  All the calculations are vectorized with NumPy, and the
+    grouping of points into intervals is cached per period.
+
+    :param timestamps: epoch milliseconds for each raw point
+    :type timestamps: array or list of int
+    :param values: the value of each raw point
+    :type values: array or list of float
+    :param start: (optional) the start of the range, defaults to the first
+                  timestamp
+    :type start: ISO8601 string, Datetime or int
+    :param end: (optional) the end of the range (exclusive), defaults to just
+                after the last timestamp
+    :type end: ISO8601 string, Datetime or int
+    :param string tz: (optional) the timezone to roll the data up in
+    :param string time_format: (optional) the time format of the points
+                               returned, "datetime", "ms" or "ns", which
+                               is also the unit of an integer start and
+                               end"""
+
+    def __init__(self, timestamps, values, start=None, end=None, tz=None,
+                 time_format=DATETIME):
+        np = require_numpy()
+        ts = np.asarray(timestamps, dtype=np.int64)
+        vs = np.asarray(values, dtype=np.float64)
+        if ts.shape != vs.shape:
+            raise ValueError('Timestamps and values must be the same length')
+
+        order = np.argsort(ts, kind='mergesort')
+        self.timestamps = ts[order]
+        self.values = vs[order]
+        self.tz = tz
+        self.time_format = time_format
+
+        start = _as_datetime(start, tz, time_format)
+        end = _as_datetime(end, tz, time_format)
+        if start is None and len(ts) > 0:
+            start = epoch_ms_to_datetime(self.timestamps[0], tz)
+        if end is None and len(ts) > 0:
+            end = epoch_ms_to_datetime(self.timestamps[-1] + 1, tz)
+        self.start = None if start is None else localize(start, tz)
+        self.end = None if end is None else localize(end, tz)
+        self._groups = {}
+
+    @classmethod
+    def from_cursor(self, cursor, tz=None):
+        """Create a RollupEngine from a cursor of raw data, as returned by
+        :meth:`tempodb.client.Client.read_data`.  The range, timezone and
+        time format of the cursor are used unless a timezone is given.
+
+        :param cursor: the cursor to read
+        :type cursor: :class:`tempodb.protocol.cursor.DataPointCursor`
+        :param string tz: (optional) the timezone to roll the data up in
+        :rtype: :class:`RollupEngine`"""
+
+        ts, vs = to_arrays(cursor)
+        tz = tz or getattr(cursor, 'tz', None)
+        return RollupEngine(ts, vs, getattr(cursor, 'start', None),
+                            getattr(cursor, 'end', None), tz,
+                            getattr(cursor, 'time_format', DATETIME))
+
+    def _group(self, period):
+        #the slice of raw data in range, the start offset and size of each
+        #non-empty interval, and the interval timestamps
+        if period in self._groups:
+            return self._groups[period]
+
+        np = require_numpy()
+        if self.start is None or len(self.timestamps) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            group = (0, 0, empty, empty, empty)
+        else:
+            edges = period_edges(self.start, self.end, period, self.tz)
+            ts = self.timestamps
+            lo = np.searchsorted(ts, edges[0], 'left')
+            hi = np.searchsorted(ts, datetime_to_epoch_ms(self.end), 'left')
+            bucket = np.searchsorted(edges, ts[lo:hi], 'right') - 1
+            if len(bucket) > 0:
+                change = np.flatnonzero(bucket[1:] != bucket[:-1]) + 1
+                starts = np.concatenate(([0], change))
+            else:
+                starts = np.zeros(0, dtype=np.int64)
+            counts = np.diff(np.append(starts, len(bucket)))
+            group = (lo, hi, starts, counts, edges[bucket[starts]])
+
+        self._groups[period] = group
+        return group
+
+    def rollup(self, function, period):
+        """Apply a rollup function over intervals of length *period*.
+
+        :param string function: the rollup function, i.e. "max" or
+                                "percentile,95"
+        :param string period: the interval length, i.e. "1hour"
+        :rtype: tuple of (timestamps, values) arrays, with timestamps as
+                epoch milliseconds"""
+
+        np = require_numpy()
+        name, arg = parse_function(function)
+        lo, hi, starts, counts, stamps = self._group(period)
+        v = self.values[lo:hi]
+        if len(starts) == 0:
+            return (stamps, np.zeros(0, dtype=np.float64))
+
+        if name == 'count':
+            ret = counts.astype(np.float64)
+        elif name == 'sum':
+            ret = np.add.reduceat(v, starts)
+        elif name == 'mult':
+            ret = np.multiply.reduceat(v, starts)
+        elif name == 'min':
+            ret = np.minimum.reduceat(v, starts)
+        elif name == 'max':
+            ret = np.maximum.reduceat(v, starts)
+        elif name == 'range':
+            ret = (np.maximum.reduceat(v, starts) -
+                   np.minimum.reduceat(v, starts))
+        elif name == 'ss':
+            ret = np.add.reduceat(v * v, starts)
+        elif name == 'mean':
+            ret = np.add.reduceat(v, starts) / counts
+        elif name == 'stddev':
+            mean = np.add.reduceat(v, starts) / counts
+            dev = v - np.repeat(mean, counts)
+            m2 = np.add.reduceat(dev * dev, starts)
+            ret = np.sqrt(m2 / np.maximum(counts - 1, 1))
+        else:
+            ret = self._percentile(v, starts, counts, arg)
+        return (stamps, ret)
+
+    def _percentile(self, v, starts, counts, p):
+        np = require_numpy()
+        group = np.repeat(np.arange(len(starts)), counts)
+        s = v[np.lexsort((v, group))]
+
+        #1-based position of the percentile within each sorted interval
+        pos = p / 100.0 * (counts + 1)
+        floor = np.floor(pos)
+        d = pos - floor
+        lower = np.clip(floor, 1, counts).astype(np.int64) - 1
+        upper = np.clip(floor + 1, 1, counts).astype(np.int64) - 1
+        d[(pos < 1) | (pos >= counts)] = 0.0
+        return s[starts + lower] + d * (s[starts + upper] - s[starts + lower])
+
+    def read_data(self, function, period):
+        """Apply a rollup function and return the result as a list of
+        :class:`tempodb.protocol.objects.DataPoint` objects, like the data
+        from :meth:`tempodb.client.Client.read_data` with a rollup.
+
+        :param string function: the rollup function
+        :param string period: the interval length
+        :rtype: list of DataPoint"""
+
+        ts, vs = self.rollup(function, period)
+        return to_datapoints(ts, vs, self.tz, self.time_format)
+
+    def read_multi_rollups(self, functions, period):
+        """Apply several rollup functions over the same intervals and return
+        the results as a list of :class:`tempodb.protocol.objects.MultiPoint`
+        objects keyed by function name, like the data from
+        :meth:`tempodb.client.Client.read_multi_rollups`.
+
+        :param list functions: the rollup functions
+        :param string period: the interval length
+        :rtype: list of MultiPoint"""
+
+        from tempodb.protocol.objects import MultiPoint
+        results = [(f, self.rollup(f, period)[1]) for f in functions]
+        stamps = self._group(period)[4]
+        ret = []
+        for i, t in enumerate(stamps):
+            values = dict((f, float(r[i])) for f, r in results)
+            t = from_epoch_ms(t, self.tz, self.time_format)
+            ret.append(MultiPoint.from_data(t, values, tz=self.tz,
+                                            time_format=self.time_format))
+        return ret
@@ -0,0 +1,503 @@
+import math
+import datetime
+from collections import deque
+from arrays import point_epoch_ms, epoch_ms_to_datetime
+from epoch import DATETIME, MILLISECONDS, NANOSECONDS, to_epoch
+from period import parse_period, is_fixed, fixed_length_ms, localize
+
+
+class RunningStats(object):
+    """Online summary statistics over a stream of values, using Welford's
+    algorithm for the mean and variance.  Memory use is constant no matter
+    how many values are added, and two RunningStats can be merged, so a
+    stream can be summarized in parts (i.e. in parallel) and combined.
+
+    The attributes match the summary returned by
+    :meth:`tempodb.client.Client.get_summary`:
+
+        * count
+        * sum
+        * min
+        * max
+        * mean
+        * stddev (the sample standard deviation)"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, v):
+        """Add a value to the statistics.
+
+        :param v: the value to add
+        :type v: int or float
+        :rtype: None"""
+
+        self.count += 1
+        self.sum += v
+        if self.min is None or v < self.min:
+            self.min = v
+        if self.max is None or v > self.max:
+            self.max = v
+        delta = v - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (v - self.mean)
+
+    def merge(self, other):
+        """Merge the statistics of another RunningStats into this one.
+
+        :param other: the statistics to merge in
+        :type other: :class:`RunningStats`
+        :rtype: :class:`RunningStats` (self)"""
+
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.mean += delta * other.count / n
+        self.count = n
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """The sample variance of the values, or 0.0 for fewer than two
+        values."""
+
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stddev(self):
+        """The sample standard deviation of the values."""
+
+        return math.sqrt(self.variance)
+
+    def to_dictionary(self):
+        """Return the statistics as a dictionary with the same keys as the
+        summary from :meth:`tempodb.client.Client.get_summary`.
+
+        :rtype: dict"""
+
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean if self.count else None,
+            'stddev': self.stddev
+        }
+
+    def to_summary(self):
+        """Return the statistics as a
+        :class:`tempodb.protocol.objects.Summary` object, for comparison
+        with the summary part of a
+        :class:`tempodb.protocol.objects.SeriesSummary`.
+
+        :rtype: :class:`tempodb.protocol.objects.Summary`"""
+
+        from tempodb.protocol.objects import Summary
+        return Summary(self.to_dictionary(), None)
+
+
+class QuantileSketch(object):
+    """A mergeable sketch for approximate percentiles over a stream of values
+    (DDSketch).  Values are counted in logarithmically sized bins, so any
+    percentile is returned with a relative error of at most
+    *relative_accuracy*.  Memory is bounded by *max_bins*: if there are more
+    bins than that, the bins closest to zero are collapsed together, which
+    only affects the accuracy of the lowest percentiles.
+
+    :param float relative_accuracy: (optional) the relative error allowed
+    :param int max_bins: (optional) the maximum number of bins to keep"""
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('Relative accuracy must be between 0 and 1')
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _key(self, v):
+        return int(math.ceil(math.log(v) / self._log_gamma))
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, v):
+        """Add a value to the sketch.
+
+        :param v: the value to add
+        :type v: int or float
+        :rtype: None"""
+
+        self.count += 1
+        if v > 0:
+            k = self._key(v)
+            self.positive[k] = self.positive.get(k, 0) + 1
+        elif v < 0:
+            k = self._key(-v)
+            self.negative[k] = self.negative.get(k, 0) + 1
+        else:
+            self.zeros += 1
+        if len(self.positive) + len(self.negative) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        #fold the bins nearest zero into their neighbours until the sketch
+        #fits in max_bins again
+        while len(self.positive) + len(self.negative) > self.max_bins:
+            if len(self.negative) > 1:
+                store, keys = self.negative, sorted(self.negative)
+            elif len(self.positive) > 1:
+                store, keys = self.positive, sorted(self.positive)
+            else:
+                break
+            store[keys[1]] += store.pop(keys[0])
+
+    def merge(self, other):
+        """Merge another sketch into this one.  Both sketches must have the
+        same relative accuracy.
+
+        :param other: the sketch to merge in
+        :type other: :class:`QuantileSketch`
+        :raises ValueError: if the sketches are not compatible
+        :rtype: :class:`QuantileSketch` (self)"""
+
+        if other.gamma != self.gamma:
+            raise ValueError('Can not merge sketches with different accuracy')
+        for k, n in other.positive.iteritems():
+            self.positive[k] = self.positive.get(k, 0) + n
+        for k, n in other.negative.iteritems():
+            self.negative[k] = self.negative.get(k, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        self._collapse()
+        return self
+
+    def quantile(self, q):
+        """Return the approximate value at quantile *q* (between 0 and 1),
+        or None if the sketch is empty.
+
+        :param float q: the quantile, i.e. 0.95
+        :rtype: float"""
+
+        if not 0 <= q <= 1:
+            raise ValueError('Quantile must be between 0 and 1')
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for k in sorted(self.negative, reverse=True):
+            seen += self.negative[k]
+            if seen > rank:
+                return -self._value(k)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.positive):
+            seen += self.positive[k]
+            if seen > rank:
+                return self._value(k)
+        return self._value(max(self.positive))
+
+    def percentile(self, p):
+        """Return the approximate value at percentile *p* (between 0 and
+        100), matching the "percentile,N" rollup function.
+
+        :param float p: the percentile, i.e. 95
+        :rtype: float"""
+
+        return self.quantile(p / 100.0)
+
+
+def summarize(stream, sketch=None):
+    """Summarize a stream of :class:`tempodb.protocol.objects.DataPoint`
+    objects, such as a :class:`tempodb.protocol.cursor.DataPointCursor`,
+    without holding it in memory.  If a :class:`QuantileSketch` is given,
+    it is fed the values as well.
+
+    :param stream: the data points to summarize
+    :type stream: iterable of DataPoint
+    :param sketch: (optional) a sketch to add the values to
+    :type sketch: :class:`QuantileSketch`
+    :rtype: :class:`RunningStats`"""
+
+    stats = RunningStats()
+    for d in stream:
+        stats.update(d.v)
+        if sketch is not None:
+            sketch.add(d.v)
+    return stats
+
+
+def summarize_multi(stream):
+    """Summarize each series in a stream of
+    :class:`tempodb.protocol.objects.MultiPoint` objects, such as the cursor
+    returned by :meth:`tempodb.client.Client.read_multi`.
+
+    :param stream: the multi points to summarize
+    :type stream: iterable of MultiPoint
+    :rtype: dict of series key to :class:`RunningStats`"""
+
+    ret = {}
+    for d in stream:
+        for key, v in d.v.iteritems():
+            if v is None:
+                continue
+            stats = ret.get(key)
+            if stats is None:
+                stats = ret[key] = RunningStats()
+            stats.update(v)
+    return ret
+
+
+def _time_format(d):
+    #the time format of a point: "datetime", or the unit of its epoch time
+    if isinstance(d.t, datetime.datetime):
+        return DATETIME
+    fmt = getattr(d, 'time_format', DATETIME)
+    return MILLISECONDS if fmt == DATETIME else fmt
+
+
+def _as_datetime(t, tz, time_format):
+    if not isinstance(t, (int, long)):
+        return localize(t, tz)
+    if time_format == NANOSECONDS:
+        t //= 10 ** 6
+    return epoch_ms_to_datetime(t, tz)
+
+
+def tumbling(stream, period, start=None, tz=None, factory=RunningStats):
+    """Aggregate a time-ordered stream into consecutive, non-overlapping
+    windows of length *period*, yielding each window as soon as it is
+    complete.  Windows start at *start* (or the first point) and empty
+    windows are skipped, like the rollups of the TempoDB API.  Periods of a
+    day or longer follow the wall clock of *tz*.
+
+    For a stream of DataPoints, each window is summarized by an object
+    created with *factory* and fed with its update method.  For a stream of
+    MultiPoints, each window is a dict of series key to such an object.
+
+    Points with epoch times, as read by a client with a time_format of "ms"
+    or "ns", give window starts in the same unit, which is also the unit of
+    an integer *start*.
+
+    :param stream: the points to aggregate
+    :type stream: iterable of DataPoint or MultiPoint
+    :param string period: the window length, i.e. "1hour"
+    :param start: (optional) the start of the first window
+    :type start: Datetime or int
+    :param string tz: (optional) the timezone to align windows in
+    :param factory: (optional) a callable returning an empty aggregate
+    :rtype: generator of (window start, aggregate) tuples"""
+
+    delta = parse_period(period)
+    fixed = None
+    if is_fixed(delta):
+        fixed = datetime.timedelta(milliseconds=fixed_length_ms(delta))
+        if fixed <= datetime.timedelta(0):
+            raise ValueError('Period must be longer than zero')
+
+    origin = None
+    window_start = window_end = None
+    current = None
+    fmt = DATETIME
+    for d in stream:
+        if origin is None:
+            fmt = _time_format(d)
+        t = _as_datetime(d.t, tz, fmt)
+        if origin is None:
+            origin = t
+            if start is not None:
+                origin = _as_datetime(start, tz, fmt)
+            wall = origin.replace(tzinfo=None)
+            step = 0
+            window_start = origin
+            window_end = _edge(origin, wall, delta, fixed, 1)
+        if t < window_start:
+            continue
+
+        if t >= window_end:
+            if current is not None:
+                yield (_window_time(window_start, fmt), current)
+                current = None
+            if fixed is not None:
+                step = int((t - origin).total_seconds() * 1000 //
+                           (fixed.total_seconds() * 1000))
+            else:
+                while _edge(origin, wall, delta, fixed, step + 1) <= t:
+                    step += 1
+            window_start = _edge(origin, wall, delta, fixed, step)
+            window_end = _edge(origin, wall, delta, fixed, step + 1)
+
+        if current is None:
+            current = {} if isinstance(d.v, dict) else factory()
+        if isinstance(current, dict):
+            for key, v in d.v.iteritems():
+                if v is None:
+                    continue
+                if key not in current:
+                    current[key] = factory()
+                current[key].update(v)
+        else:
+            current.update(d.v)
+
+    if current is not None:
+        yield (_window_time(window_start, fmt), current)
+
+
+def _window_time(dt, time_format):
+    if time_format == DATETIME:
+        return dt
+    return to_epoch(dt, time_format)
+
+
+def _edge(origin, wall, delta, fixed, i):
+    #the i-th window boundary after origin
+    if fixed is not None:
+        return origin + fixed * i
+    return origin.tzinfo.localize(wall + delta * i)
+
+
+class SlidingWindow(object):
+    """Statistics over the values seen in the last *width* of time, updated
+    as points are pushed in time order.  The minimum and maximum are kept
+    with monotonic queues, so every push is amortized O(1).  Memory use is
+    proportional to the number of points in one window, not to the length of
+    the stream.  The mean and variance are kept with Welford's algorithm,
+    adding each point as it enters the window and removing it as it leaves,
+    so they stay accurate for large values with a small spread.
+
+    :param width: the window width
+    :type width: string (i.e. "5min") or timedelta
+    :param string time_format: (optional) "datetime" for points pushed with
+                               Datetime times, or "ms" or "ns" for epoch
+                               times"""
+
+    def __init__(self, width, time_format=DATETIME):
+        if not isinstance(width, datetime.timedelta):
+            delta = parse_period(width)
+            if not is_fixed(delta):
+                raise ValueError('Sliding window width must be a fixed '
+                                 'length of time, got "%s"' % width)
+            width = datetime.timedelta(milliseconds=fixed_length_ms(delta))
+        self.width = width
+        self.time_format = time_format
+        #the width in the unit of the times pushed
+        self._span = width
+        if time_format != DATETIME:
+            ms = ((width.days * 86400 + width.seconds) * 1000 +
+                  width.microseconds // 1000)
+            self._span = ms * 10 ** 6 if time_format == NANOSECONDS else ms
+        self.points = deque()
+        self._min = deque()
+        self._max = deque()
+        self.sum = 0.0
+        self._mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, t, v):
+        """Add a point to the window and drop the points that have slid out
+        of it.
+
+        :param t: the time of the point
+        :type t: Datetime or int
+        :param v: the value of the point
+        :type v: int or float
+        :rtype: None"""
+
+        self.points.append((t, v))
+        self.sum += v
+        delta = v - self._mean
+        self._mean += delta / len(self.points)
+        self.m2 += delta * (v - self._mean)
+        while self._min and self._min[-1][1] > v:
+            self._min.pop()
+        self._min.append((t, v))
+        while self._max and self._max[-1][1] < v:
+            self._max.pop()
+        self._max.append((t, v))
+
+        cutoff = t - self._span
+        while self.points[0][0] <= cutoff:
+            old_t, old_v = self.points.popleft()
+            self.sum -= old_v
+            n = len(self.points)
+            if n == 0:
+                self._mean = self.m2 = 0.0
+            else:
+                delta = old_v - self._mean
+                self._mean -= delta / n
+                self.m2 -= delta * (old_v - self._mean)
+        while self._min[0][0] <= cutoff:
+            self._min.popleft()
+        while self._max[0][0] <= cutoff:
+            self._max.popleft()
+
+    @property
+    def count(self):
+        return len(self.points)
+
+    @property
+    def mean(self):
+        return self._mean if self.points else None
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    @property
+    def stddev(self):
+        n = self.count
+        if n < 2:
+            return 0.0
+        return math.sqrt(max(self.m2, 0.0) / (n - 1))
+
+
+def sliding(stream, width):
+    """Compute statistics over a sliding time window for each point of a
+    time-ordered stream of DataPoints.  For each point, the window covers the
+    points in (t - width, t].
+
+    **Note:** the same :class:`SlidingWindow` object is yielded each time and
+    is updated in place, so read what you need from it before advancing.
+
+    :param stream: the points to aggregate
+    :type stream: iterable of DataPoint
+    :param width: the window width
+    :type width: string (i.e. "5min") or timedelta
+    :rtype: generator of (time, :class:`SlidingWindow`) tuples"""
+
+    window = SlidingWindow(width)
+    first = True
+    for d in stream:
+        if first:
+            first = False
+            fmt = _time_format(d)
+            if fmt != DATETIME:
+                window = SlidingWindow(window.width, fmt)
+        window.push(d.t, d.v)
+        yield (d.t, window)
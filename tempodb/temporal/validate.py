@@ -1,6 +1,6 @@
 import re
-import dateutil.parser
 import pytz
+from epoch import NANOSECONDS, MILLISECONDS, epoch_to_iso
 
 
 ISO = re.compile(
@@ -8,15 +8,22 @@ ISO = re.compile(
     '((.\d{3,6})?([+-](\d{4|\d{2}:\d{2}}))?)?')
 
 
-def check_time_param(t):
+def check_time_param(t, time_format=MILLISECONDS):
     """Check whether a string sent in matches the ISO8601 format.  If a
     Datetime object is passed instead, it will be converted into an ISO8601
-    compliant string.
+    compliant string.  Integers are taken as milliseconds since the UNIX
+    epoch, or nanoseconds if the time_format is "ns", and are converted into
+    ISO8601 in UTC.
 
     :param t: the datetime to check
-    :type t: string or Datetime
+    :type t: string, Datetime or int
+    :param string time_format: (optional) the unit of integer times
     :rtype: string"""
 
+    if isinstance(t, (int, long)) and not isinstance(t, bool):
+        if time_format != NANOSECONDS:
+            time_format = MILLISECONDS
+        return epoch_to_iso([t], time_format)[0]
     if type(t) is str:
         if not ISO.match(t):
             raise ValueError('Date string "%s" does not match ISO8601 format' %
@@ -37,6 +44,7 @@ def convert_iso_stamp(t, tz=None):
     if t is None:
         return None
 
+    import dateutil.parser
     dt = dateutil.parser.parse(t)
     if tz is not None:
         timezone = pytz.timezone(tz)
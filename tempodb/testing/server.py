@@ -0,0 +1,758 @@
+import gzip
+import json
+import math
+import time
+import random
+import socket
+import bisect
+import urllib
+import urlparse
+import threading
+import StringIO
+import BaseHTTPServer
+import SocketServer
+from tempodb.temporal.validate import convert_iso_stamp
+from tempodb.temporal.arrays import datetime_to_epoch_ms, epoch_ms_to_datetime
+from tempodb.temporal.stream import RunningStats
+
+
+DEFAULT_LIMIT = 5000
+
+
+class FakeError(Exception):
+    """Raised inside the fake server to send an error response."""
+
+    def __init__(self, status, msg):
+        self.status = status
+        self.msg = msg
+
+    def __str__(self):
+        return '%d: %s' % (self.status, self.msg)
+
+
+def format_stamp(ms, tz=None):
+    """Format epoch milliseconds the way the TempoDB API does, i.e.
+    2012-01-08T00:21:54.000+0000.
+
+    :param int ms: the timestamp to format
+    :param string tz: (optional) the timezone to format the timestamp in
+    :rtype: string"""
+
+    dt = epoch_ms_to_datetime(ms, tz)
+    return '%s.%03d%s' % (dt.strftime('%Y-%m-%dT%H:%M:%S'),
+                          dt.microsecond // 1000, dt.strftime('%z'))
+
+
+def parse_stamp(t, tz=None):
+    """Parse an ISO8601 timestamp into epoch milliseconds.  Naive timestamps
+    are taken to be in *tz*, or UTC.
+
+    :param string t: the timestamp to parse
+    :param string tz: (optional) the timezone for naive timestamps
+    :rtype: int"""
+
+    try:
+        return datetime_to_epoch_ms(convert_iso_stamp(t, tz or 'UTC'))
+    except (ValueError, TypeError, OverflowError):
+        raise FakeError(400, 'Invalid timestamp "%s"' % t)
+
+
+def fold(function, values):
+    """Apply a rollup or aggregation function to a list of values.
+
+    :param string function: the function name, i.e. "sum" or
+                            "percentile,95"
+    :param list values: the values to fold
+    :rtype: float"""
+
+    n = len(values)
+    if function == 'count':
+        return n
+    if function == 'sum':
+        return sum(values)
+    if function == 'mult':
+        return reduce(lambda a, b: a * b, values)
+    if function == 'min':
+        return min(values)
+    if function == 'max':
+        return max(values)
+    if function == 'range':
+        return max(values) - min(values)
+    if function == 'ss':
+        return sum(v * v for v in values)
+    if function in ['mean', 'avg']:
+        return float(sum(values)) / n
+    if function == 'stddev':
+        stats = RunningStats()
+        for v in values:
+            stats.update(v)
+        return stats.stddev
+    if function.startswith('percentile,'):
+        s = sorted(values)
+        pos = float(function.split(',')[1]) / 100.0 * (n + 1)
+        if pos < 1:
+            return s[0]
+        if pos >= n:
+            return s[-1]
+        lower = int(math.floor(pos))
+        return s[lower - 1] + (pos - lower) * (s[lower] - s[lower - 1])
+    raise FakeError(400, 'Unknown function "%s"' % function)
+
+
+class FakeStore(object):
+    """Thread-safe in-memory storage for the fake server: series metadata,
+    and for each series two sorted lists of epoch milliseconds and values."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.series = {}
+        self.times = {}
+        self.values = {}
+
+    def create_series(self, key, tags=None, attrs=None):
+        """Create a series, returning its metadata."""
+
+        with self.lock:
+            if key in self.series:
+                raise FakeError(409, 'Series "%s" already exists' % key)
+            s = {'key': key, 'name': '', 'tags': tags or [],
+                 'attributes': attrs or {}}
+            self.series[key] = s
+            self.times[key] = []
+            self.values[key] = []
+            return s
+
+    def ensure_series(self, key):
+        """Return a series' metadata, creating the series if needed."""
+
+        with self.lock:
+            if key not in self.series:
+                return self.create_series(key)
+            return self.series[key]
+
+    def get_series(self, key):
+        """Return a series' metadata."""
+
+        with self.lock:
+            try:
+                return self.series[key]
+            except KeyError:
+                raise FakeError(404, 'Series "%s" not found' % key)
+
+    def match(self, keys=None, tags=None, attrs=None):
+        """Return the metadata of the series matching a filter, sorted by
+        key.  Keys are a union, tags and attributes an intersection."""
+
+        with self.lock:
+            ret = []
+            for key in sorted(self.series):
+                s = self.series[key]
+                if keys and key not in keys:
+                    continue
+                if tags and not set(tags).issubset(s['tags']):
+                    continue
+                if attrs and any(s['attributes'].get(k) != v
+                                 for k, v in attrs.items()):
+                    continue
+                ret.append(s)
+            return ret
+
+    def delete_series(self, key):
+        with self.lock:
+            for d in [self.series, self.times, self.values]:
+                d.pop(key, None)
+
+    def write(self, key, points):
+        """Write (epoch ms, value) points into a series, replacing any
+        values already at those times."""
+
+        with self.lock:
+            self.ensure_series(key)
+            times = self.times[key]
+            values = self.values[key]
+            for t, v in points:
+                i = bisect.bisect_left(times, t)
+                if i < len(times) and times[i] == t:
+                    values[i] = v
+                elif i == len(times):
+                    times.append(t)
+                    values.append(v)
+                else:
+                    times.insert(i, t)
+                    values.insert(i, v)
+
+    def read(self, key, start, end, offset=0, limit=None):
+        """Read the (epoch ms, value) points of a series from *start* up
+        to, but not including, *end*."""
+
+        with self.lock:
+            self.get_series(key)
+            times = self.times[key]
+            lo = bisect.bisect_left(times, start) + offset
+            hi = bisect.bisect_left(times, end)
+            if limit is not None:
+                hi = min(hi, lo + limit)
+            return zip(times[lo:hi], self.values[key][lo:hi])
+
+    def count(self, key, start, end):
+        with self.lock:
+            times = self.times[key]
+            return (bisect.bisect_left(times, end) -
+                    bisect.bisect_left(times, start))
+
+    def delete(self, key, start, end):
+        """Delete the points of a series from *start* up to *end*."""
+
+        with self.lock:
+            self.get_series(key)
+            times = self.times[key]
+            lo = bisect.bisect_left(times, start)
+            hi = bisect.bisect_left(times, end)
+            del times[lo:hi]
+            del self.values[key][lo:hi]
+
+
+class TokenBucket(object):
+    """Simple token bucket rate limiter."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self.tokens = self.burst
+        self.last = time.time()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Take a token, returning False if the bucket is empty."""
+
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class FakeHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Request handler implementing the v1 TempoDB API routes."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else ''
+        parsed = urlparse.urlparse(self.path)
+        path = parsed.path
+        if path.startswith('/v1/'):
+            path = path[4:]
+        self.params = urlparse.parse_qs(parsed.query)
+        fake._record(method, path, self.params, body)
+
+        if fake.latency or fake.jitter:
+            time.sleep(fake.latency + random.random() * fake.jitter)
+        if fake.rate_limiter is not None and not fake.rate_limiter.take():
+            return self._send(429, 'Too Many Requests',
+                              {'Retry-After': '1'})
+        status = fake._injected_error()
+        if status is not None:
+            return self._send(status, 'Injected error')
+
+        try:
+            status, payload, headers = self._route(method, path, body)
+        except FakeError, e:
+            return self._send(e.status, e.msg)
+        if not isinstance(payload, basestring):
+            payload = json.dumps(payload)
+        self._send(status, payload, headers)
+
+    def _send(self, status, text, headers=None):
+        headers = headers or {}
+        if text and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            buf = StringIO.StringIO()
+            f = gzip.GzipFile(fileobj=buf, mode='wb')
+            f.write(text)
+            f.close()
+            text = buf.getvalue()
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(text)))
+        self.end_headers()
+        self.wfile.write(text)
+
+    def _param(self, name, default=None):
+        return self.params.get(name, [default])[0]
+
+    def _filter(self):
+        attrs = {}
+        for k, v in self.params.items():
+            if k.startswith('attr[') and k.endswith(']'):
+                attrs[k[5:-1]] = v[0]
+        return (self.params.get('key', []), self.params.get('tag', []),
+                attrs)
+
+    def _range(self, tz):
+        start = self._param('start')
+        end = self._param('end')
+        if start is None or end is None:
+            raise FakeError(400, 'start and end are required')
+        return (parse_stamp(start, tz), parse_stamp(end, tz))
+
+    def _page(self, rows, total=None):
+        #slice out one page of rows and build the Link header for the next
+        offset = int(self._param('cursor', 0))
+        limit = int(self._param('limit', self.server.fake.page_size))
+        if total is None:
+            total = len(rows)
+            rows = rows[offset:offset + limit]
+        headers = {}
+        if offset + limit < total:
+            q = dict(self.params)
+            q['cursor'] = [str(offset + limit)]
+            url = 'http://%s%s?%s' % (self.headers.get('Host'),
+                                      urlparse.urlparse(self.path).path,
+                                      urllib.urlencode(q, True))
+            headers['Link'] = '<%s>; rel="next"' % url
+        return (rows, headers)
+
+    def _route(self, method, path, body):
+        store = self.server.fake.store
+        parts = [urllib.unquote(p) for p in path.strip('/').split('/')]
+
+        if parts == ['series']:
+            if method == 'POST':
+                j = self._json(body)
+                return (200, store.create_series(
+                    j.get('key'), j.get('tags'), j.get('attributes')), {})
+            keys, tags, attrs = self._filter()
+            if method == 'DELETE':
+                truncate = self._param('allow_truncation') == 'true'
+                if not (keys or tags or attrs or truncate):
+                    raise FakeError(400, 'Refusing to delete all series')
+                matched = store.match(keys, tags, attrs)
+                for s in matched:
+                    store.delete_series(s['key'])
+                return (200, {'deleted': len(matched)}, {})
+            rows, headers = self._page(store.match(keys, tags, attrs))
+            return (200, rows, headers)
+
+        if len(parts) >= 3 and parts[:2] == ['series', 'key']:
+            return self._series_route(method, parts[2], parts[3:], body)
+
+        if parts == ['multi'] and method == 'POST':
+            return self._write_multi(body)
+        if parts == ['multi']:
+            return self._read_multi()
+        if parts == ['segment']:
+            return self._aggregate()
+        if parts == ['single']:
+            keys, tags, attrs = self._filter()
+            rows = [self._single(s['key']) for s in
+                    store.match(keys, tags, attrs)]
+            return (200, rows, {})
+        raise FakeError(404, 'No route for %s %s' % (method, path))
+
+    def _series_route(self, method, key, rest, body):
+        store = self.server.fake.store
+        tz = self._param('tz')
+        if rest == []:
+            if method == 'PUT':
+                j = self._json(body)
+                s = store.get_series(key)
+                s['name'] = j.get('name', s['name'])
+                s['tags'] = j.get('tags', s['tags'])
+                s['attributes'] = j.get('attributes', s['attributes'])
+                return (200, s, {})
+            return (200, store.get_series(key), {})
+        if rest == ['data']:
+            if method == 'POST':
+                points = [(parse_stamp(d['t']), d['v'])
+                          for d in self._json(body)]
+                store.write(key, points)
+                return (200, '', {})
+            if method == 'DELETE':
+                start, end = self._range(tz)
+                store.delete(key, start, end)
+                return (200, '', {})
+        if rest == ['segment']:
+            return self._segment(key)
+        if rest == ['data', 'rollups', 'segment']:
+            return self._multi_rollups(key)
+        if rest == ['summary']:
+            start, end = self._range(tz)
+            stats = RunningStats()
+            for t, v in store.read(key, start, end):
+                stats.update(v)
+            return (200, {'series': store.get_series(key),
+                          'summary': stats.to_dictionary(),
+                          'tz': tz or 'UTC',
+                          'start': format_stamp(start, tz),
+                          'end': format_stamp(end, tz)}, {})
+        if rest == ['find']:
+            return self._find(key)
+        if rest == ['single']:
+            return (200, self._single(key), {})
+        raise FakeError(404, 'No route for %s series/key/%s/%s' %
+                        (method, key, '/'.join(rest)))
+
+    def _json(self, body):
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise FakeError(400, 'Request body is not valid JSON')
+
+    def _points(self, key, start, end):
+        #the points of a series with any rollup and interpolation applied
+        store = self.server.fake.store
+        tz = self._param('tz')
+        points = store.read(key, start, end)
+        function = self._param('rollup.fold')
+        period = self._param('rollup.period')
+        if function is not None and period is not None:
+            points = self._rollup(points, [function], period, start, end)
+            points = [(t, v[function]) for t, v in points]
+        interp = self._param('interpolation.function')
+        interp_period = self._param('interpolation.period')
+        if interp is not None and interp_period is not None and points:
+            from tempodb.temporal.interpolate import interpolate, make_grid
+            grid = make_grid(epoch_ms_to_datetime(start, tz),
+                             epoch_ms_to_datetime(end, tz), interp_period, tz)
+            ts = [t for t, v in points]
+            vs = [v for t, v in points]
+            values = interpolate((ts, vs), grid, interp)
+            points = [(int(t), float(v)) for t, v in zip(grid, values)
+                      if not math.isnan(v)]
+        return points
+
+    def _rollup(self, points, functions, period, start, end):
+        from tempodb.temporal.period import period_edges
+        tz = self._param('tz')
+        edges = list(period_edges(epoch_ms_to_datetime(start, tz),
+                                  epoch_ms_to_datetime(end, tz), period, tz))
+        buckets = {}
+        for t, v in points:
+            i = bisect.bisect_right(edges, t) - 1
+            buckets.setdefault(edges[i], []).append(v)
+        return [(t, dict((f, fold(f, buckets[t])) for f in functions))
+                for t in sorted(buckets)]
+
+    def _segment(self, key):
+        store = self.server.fake.store
+        tz = self._param('tz')
+        start, end = self._range(tz)
+        function = self._param('rollup.fold')
+        period = self._param('rollup.period')
+        if function is None and self._param('interpolation.function') is None:
+            #read raw pages straight out of the store
+            offset = int(self._param('cursor', 0))
+            limit = int(self._param('limit', self.server.fake.page_size))
+            points = store.read(key, start, end, offset, limit)
+            points, headers = self._page(points,
+                                         store.count(key, start, end))
+        else:
+            points, headers = self._page(self._points(key, start, end))
+
+        rollup = None
+        if function is not None:
+            rollup = {'interval': period, 'function': function,
+                      'tz': tz or 'UTC'}
+        data = [{'t': format_stamp(t, tz), 'v': v} for t, v in points]
+        return (200, {'series': store.get_series(key), 'tz': tz or 'UTC',
+                      'rollup': rollup, 'start': format_stamp(start, tz),
+                      'end': format_stamp(end, tz), 'data': data}, headers)
+
+    def _multi_rollups(self, key):
+        store = self.server.fake.store
+        tz = self._param('tz')
+        start, end = self._range(tz)
+        functions = self.params.get('rollup.fold', [])
+        period = self._param('rollup.period')
+        points = self._rollup(store.read(key, start, end), functions, period,
+                              start, end)
+        points, headers = self._page(points)
+        data = [{'t': format_stamp(t, tz), 'v': v} for t, v in points]
+        return (200, {'series': store.get_series(key), 'tz': tz or 'UTC',
+                      'start': format_stamp(start, tz),
+                      'end': format_stamp(end, tz), 'data': data}, headers)
+
+    def _find(self, key):
+        from tempodb.temporal.period import period_edges
+        store = self.server.fake.store
+        tz = self._param('tz')
+        start, end = self._range(tz)
+        function = self._param('predicate.function')
+        period = self._param('predicate.period')
+        if function not in ['max', 'min', 'first', 'last']:
+            raise FakeError(400, 'Unknown predicate "%s"' % function)
+        edges = list(period_edges(epoch_ms_to_datetime(start, tz),
+                                  epoch_ms_to_datetime(end, tz), period, tz))
+        rows = []
+        for a, b in zip(edges[:-1], edges[1:]):
+            points = store.read(key, a, min(b, end))
+            if not points:
+                continue
+            if function == 'first':
+                found = points[0]
+            elif function == 'last':
+                found = points[-1]
+            elif function == 'max':
+                found = max(points, key=lambda p: p[1])
+            else:
+                found = min(points, key=lambda p: p[1])
+            rows.append({'interval': {'start': format_stamp(a, tz),
+                                      'end': format_stamp(b, tz)},
+                         'found': {'t': format_stamp(found[0], tz),
+                                   'v': found[1]}})
+        rows, headers = self._page(rows)
+        return (200, {'series': store.get_series(key), 'tz': tz or 'UTC',
+                      'predicate': {'function': function, 'period': period},
+                      'data': rows}, headers)
+
+    def _single(self, key):
+        store = self.server.fake.store
+        s = store.get_series(key)
+        ts = self._param('ts')
+        t = parse_stamp(ts) if ts else int(time.time() * 1000)
+        direction = self._param('direction', 'exact')
+        with store.lock:
+            times = store.times[key]
+            values = store.values[key]
+            found = None
+            i = bisect.bisect_left(times, t)
+            exact = i < len(times) and times[i] == t
+            if exact:
+                found = i
+            elif direction in ['before', 'nearest'] and i > 0:
+                found = i - 1
+            if direction in ['after', 'nearest'] and not exact and \
+                    i < len(times):
+                if found is None or times[i] - t < t - times[found]:
+                    found = i
+            data = None
+            if found is not None:
+                data = {'t': format_stamp(times[found]), 'v': values[found]}
+        return {'series': s, 'data': data}
+
+    def _write_multi(self, body):
+        store = self.server.fake.store
+        statuses = []
+        failed = False
+        for d in self._json(body):
+            key = d.get('key') or d.get('id')
+            v = d.get('v')
+            messages = []
+            if key is None:
+                messages.append('Must provide a series key or id')
+            if type(v) not in [int, long, float]:
+                messages.append('Value must be a number')
+            if 't' not in d:
+                messages.append('Must provide a timestamp')
+            if not messages:
+                try:
+                    store.write(key, [(parse_stamp(d['t']), v)])
+                except FakeError, e:
+                    messages.append(e.msg)
+            if messages:
+                failed = True
+                statuses.append({'status': 422, 'messages': messages})
+            else:
+                statuses.append({'status': 200, 'messages': []})
+        if failed:
+            return (207, {'multistatus': statuses}, {})
+        return (200, '', {})
+
+    def _read_multi(self):
+        store = self.server.fake.store
+        tz = self._param('tz')
+        start, end = self._range(tz)
+        keys, tags, attrs = self._filter()
+        rows = {}
+        for s in store.match(keys, tags, attrs):
+            for t, v in self._points(s['key'], start, end):
+                rows.setdefault(t, {})[s['key']] = v
+        rows, headers = self._page([(t, rows[t]) for t in sorted(rows)])
+        data = [{'t': format_stamp(t, tz), 'v': v} for t, v in rows]
+        return (200, {'tz': tz or 'UTC', 'start': format_stamp(start, tz),
+                      'end': format_stamp(end, tz), 'data': data}, headers)
+
+    def _aggregate(self):
+        store = self.server.fake.store
+        tz = self._param('tz')
+        start, end = self._range(tz)
+        function = self._param('aggregation.fold')
+        keys, tags, attrs = self._filter()
+        rows = {}
+        for s in store.match(keys, tags, attrs):
+            for t, v in self._points(s['key'], start, end):
+                rows.setdefault(t, []).append(v)
+        points = [(t, fold(function, rows[t])) for t in sorted(rows)]
+        points, headers = self._page(points)
+        data = [{'t': format_stamp(t, tz), 'v': v} for t, v in points]
+        return (200, {'tz': tz or 'UTC',
+                      'aggregation': {'function': function},
+                      'start': format_stamp(start, tz),
+                      'end': format_stamp(end, tz), 'data': data}, headers)
+
+
+class ThreadedHTTPServer(SocketServer.ThreadingMixIn,
+                         BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, *args, **kwargs):
+        BaseHTTPServer.HTTPServer.__init__(self, *args, **kwargs)
+        self.connections = set()
+        self.closing = False
+
+    def process_request_thread(self, request, client_address):
+        self.connections.add(request)
+        try:
+            SocketServer.ThreadingMixIn.process_request_thread(
+                self, request, client_address)
+        finally:
+            self.connections.discard(request)
+
+    def handle_error(self, request, client_address):
+        #connections are cut on shutdown, which is not an error
+        if not self.closing:
+            BaseHTTPServer.HTTPServer.handle_error(self, request,
+                                                   client_address)
+
+    def close_connections(self):
+        """Close the keep-alive connections still open to the server."""
+
+        self.closing = True
+        for request in list(self.connections):
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        deadline = time.time() + 1.0
+        while self.connections and time.time() < deadline:
+            time.sleep(0.001)
+
+
+class FakeTempoDB(object):
+    """An in-process stand-in for the v1 TempoDB API, for integration tests
+    and benchmarks without a network.  It serves the series, segment,
+    multi, single, find and summary resources from an in-memory store, and
+    paginates responses with Link headers like the real API.  Responses are
+    gzipped when the client asks for it, and multi writes with invalid
+    points return 207 partial results.
+
+    Latency, errors and throttling can be injected to test client behavior
+    under adverse conditions::
+
+        >>> with FakeTempoDB(latency=0.05, error_rate=0.01) as server:
+        ...     client = Client('id', 'key', 'secret', server.url)
+
+    **Note:** rollups, interpolation and find need NumPy.
+
+    :param string host: (optional) the interface to listen on
+    :param int port: (optional) the port to listen on, 0 picks a free port
+    :param float latency: (optional) seconds to delay each response
+    :param float jitter: (optional) extra random delay of up to this many
+                         seconds per response
+    :param float error_rate: (optional) the fraction of requests to fail
+    :param int error_status: (optional) the status code for injected errors
+    :param float rate_limit: (optional) requests per second to allow before
+                             returning 429 responses
+    :param int page_size: (optional) the default page size
+    :param int seed: (optional) a seed for the random error injection"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, rate_limit=None,
+                 page_size=DEFAULT_LIMIT, seed=None):
+        self.store = FakeStore()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limiter = None
+        if rate_limit is not None:
+            self.rate_limiter = TokenBucket(rate_limit)
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        self.requests = []
+        self._failures = []
+        self._lock = threading.Lock()
+        self.httpd = ThreadedHTTPServer((host, port), FakeHandler)
+        self.httpd.fake = self
+        self.thread = None
+
+    @property
+    def url(self):
+        """The base URL to give to :class:`tempodb.client.Client`."""
+
+        host, port = self.httpd.server_address[:2]
+        return 'http://%s:%d/v1/' % (host, port)
+
+    def start(self):
+        """Start serving requests in a background thread.
+
+        :rtype: :class:`FakeTempoDB` (self)"""
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever,
+                                       args=(0.05,))
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server and close its socket."""
+
+        self.httpd.shutdown()
+        self.httpd.close_connections()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def fail_next(self, n=1, status=None):
+        """Make the next *n* requests fail with *status* (by default the
+        server's error_status).
+
+        :param int n: the number of requests to fail
+        :param int status: (optional) the status code to return"""
+
+        with self._lock:
+            self._failures.extend([status or self.error_status] * n)
+
+    def _injected_error(self):
+        with self._lock:
+            if self._failures:
+                return self._failures.pop(0)
+            if self.error_rate and self.random.random() < self.error_rate:
+                return self.error_status
+        return None
+
+    def _record(self, method, path, params, body):
+        with self._lock:
+            self.requests.append((method, path, params, len(body)))
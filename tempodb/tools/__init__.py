@@ -0,0 +1,4 @@
+"""
+Command line tools built on the client.  Each module has a main() function
+that is installed as a console script.
+"""
@@ -0,0 +1,404 @@
+"""
+Backfill historical data from CSV files into TempoDB.
+
+Files are read in chunks of lines, which are parsed in a pool of processes
+while the points of earlier chunks are uploaded with
+:meth:`tempodb.client.Client.write_multi` over several connections.  After
+each chunk has been written in full its end offset is saved to a checkpoint
+file, so a backfill that crashes or is interrupted can be run again and
+continues from the first chunk not written.  The chunk in flight when it
+stopped is written again, which is harmless since writing a point at the
+same timestamp overwrites it.
+
+Two layouts of CSV are read, with timestamps as ISO8601 strings or epoch
+milliseconds:
+
+    * long: one point per row, as key,timestamp,value
+    * wide: a header row of timestamp,key1,key2,... and one row per
+      timestamp, with empty cells for missing values
+
+Usage::
+
+    tempodb-backfill --database-id ID --key KEY --secret SECRET \\
+        --checkpoint backfill.json data/*.csv
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import optparse
+import threading
+import multiprocessing
+from collections import deque
+from StringIO import StringIO
+from tempodb import bulk
+from tempodb.parallel import parallel_map, DEFAULT_WORKERS
+from tempodb.protocol import DataPoint
+from tempodb.temporal.epoch import iso_to_ns, MILLISECONDS
+from cli import add_client_options, make_client, size_pool, report
+
+
+LONG = 'long'
+WIDE = 'wide'
+LAYOUTS = [LONG, WIDE]
+
+
+def parse_time(s):
+    """Parse a CSV timestamp, either an ISO8601 string or an integer number
+    of milliseconds since the UNIX epoch, into epoch milliseconds.
+
+    :param string s: the timestamp
+    :rtype: int"""
+
+    s = s.strip()
+    if s.isdigit() or (s[:1] == '-' and s[1:].isdigit()):
+        return int(s)
+    return iso_to_ns(s) // 10 ** 6
+
+
+def parse_chunk(job):
+    """Parse a chunk of CSV text into (key, epoch ms, value) tuples.  This
+    runs in the worker processes, so it takes a single picklable tuple of
+    (layout, header, text), where header is the list of column names for
+    the wide layout.
+
+    :param tuple job: the chunk to parse
+    :raises ValueError: if a row can not be parsed
+    :rtype: list of tuples"""
+
+    layout, header, text = job
+    ret = []
+    for row in csv.reader(StringIO(text)):
+        if not row:
+            continue
+        if layout == LONG:
+            if len(row) != 3:
+                raise ValueError('Expected key,timestamp,value. Got "%s".' %
+                                 ','.join(row))
+            ret.append((row[0], parse_time(row[1]), float(row[2])))
+        else:
+            t = parse_time(row[0])
+            for key, v in zip(header[1:], row[1:]):
+                if v.strip():
+                    ret.append((key, t, float(v)))
+    return ret
+
+
+def _read_record(f):
+    #read one CSV record, which spans several lines if a quoted field holds
+    #a newline: a record ends on a line leaving an even number of quotes,
+    #as an escaped quote is written twice
+    record = f.readline()
+    while record.count('"') % 2:
+        line = f.readline()
+        if not line:
+            break
+        record += line
+    return record
+
+
+def read_chunks(path, layout, chunk_lines, offset=0):
+    """Read a CSV file in chunks of lines from a byte offset, skipping the
+    header row of the wide layout, or of the long layout if its timestamp
+    column can not be parsed.  Chunks are cut between records, so a quoted
+    field holding a newline is never split.
+
+    :param string path: the file to read
+    :param string layout: "long" or "wide"
+    :param int chunk_lines: the number of records per chunk
+    :param int offset: (optional) the byte offset to start at
+    :rtype: generator of (end offset, (layout, header, text)) tuples"""
+
+    with open(path, 'rb') as f:
+        header = None
+        first = _read_record(f)
+        row = next(csv.reader([first]), [])
+        if layout == WIDE:
+            header = [c.strip() for c in row]
+        elif len(row) == 3:
+            try:
+                parse_time(row[1])
+            except (ValueError, OverflowError):
+                pass
+            else:
+                #no header, the first line is data
+                f.seek(0)
+        if offset > f.tell():
+            f.seek(offset)
+
+        while True:
+            lines = []
+            for i in xrange(chunk_lines):
+                line = _read_record(f)
+                if not line:
+                    break
+                lines.append(line)
+            if not lines:
+                return
+            yield (f.tell(), (layout, header, ''.join(lines)))
+
+
+class Checkpoint(object):
+    """The byte offset up to which each input file has been written, saved
+    as JSON after every chunk.  The file is replaced atomically, so a crash
+    while saving leaves the previous checkpoint.
+
+    :param string path: the file to load from and save to"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.offsets = json.load(f)
+
+    def get(self, name):
+        """The offset reached in an input file.
+
+        :param string name: the input file
+        :rtype: int"""
+
+        return self.offsets.get(os.path.abspath(name), 0)
+
+    def set(self, name, offset):
+        """Record the offset reached in an input file and save the
+        checkpoint.
+
+        :param string name: the input file
+        :param int offset: the byte offset
+        :rtype: None"""
+
+        self.offsets[os.path.abspath(name)] = offset
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.offsets, f)
+        os.rename(tmp, self.path)
+
+
+class BackfillStats(object):
+    """Counters for a backfill, which can be read from another thread while
+    it runs: the points and batches written, the bytes of input read, the
+    files finished and the time elapsed."""
+
+    def __init__(self):
+        self.points = 0
+        self.batches = 0
+        self.bytes = 0
+        self.files = 0
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    @property
+    def elapsed(self):
+        return time.time() - self.started
+
+    def points_per_second(self):
+        """The average rate at which points have been written.
+
+        :rtype: float"""
+
+        return self.points / (self.elapsed or 1e-9)
+
+    def add(self, points):
+        with self.lock:
+            self.points += points
+            self.batches += 1
+
+    def to_dictionary(self):
+        """Serialize the counters into dictionary form.
+
+        :rtype: dict"""
+
+        return {
+            'points': self.points,
+            'batches': self.batches,
+            'bytes': self.bytes,
+            'files': self.files,
+            'elapsed': self.elapsed,
+            'points_per_second': self.points_per_second()
+        }
+
+    def __str__(self):
+        return ('%d points in %d batches, %.1fs, %.0f points/s' %
+                (self.points, self.batches, self.elapsed,
+                 self.points_per_second()))
+
+
+class BackfillError(Exception):
+    """Raised when a batch can not be written after all retries.  The
+    checkpoint holds the offsets written up to the chunk that failed.
+
+    :param result: the result of the last attempt
+    :type result: :class:`tempodb.bulk.KeyResult`"""
+
+    def __init__(self, result):
+        self.result = result
+        self.msg = 'Writing a batch failed after %d attempts: %s' % (
+            result.attempts, result.error)
+
+    def __repr__(self):
+        return self.msg
+
+    def __str__(self):
+        return self.msg
+
+
+class Backfill(object):
+    """Writes the points of CSV files into a database, see the module
+    documentation::
+
+        backfill = Backfill(client, checkpoint='backfill.json')
+        stats = backfill.run(['2012.csv', '2013.csv'])
+
+    :param client: the client to write with
+    :type client: :class:`tempodb.client.Client`
+    :param string layout: (optional) the layout of the files, "long" or
+                          "wide"
+    :param int batch_size: (optional) the points per write_multi request
+    :param int workers: (optional) the number of concurrent requests
+    :param int processes: (optional) the number of parsing processes, 0 to
+                          parse in this process, or None for one per CPU
+    :param int chunk_lines: (optional) the records of input per chunk
+    :param string checkpoint: (optional) the checkpoint file
+    :param int retries: (optional) the retries per batch
+    :param function progress: (optional) a function called with the
+                              :class:`BackfillStats` after each chunk"""
+
+    def __init__(self, client, layout=LONG, batch_size=5000,
+                 workers=DEFAULT_WORKERS, processes=None, chunk_lines=None,
+                 checkpoint=None, retries=3, progress=None):
+        if layout not in LAYOUTS:
+            raise ValueError('Layout must be one of %s. Got "%s".' %
+                             (', '.join(LAYOUTS), layout))
+        self.client = client
+        self.layout = layout
+        self.batch_size = batch_size
+        self.workers = workers
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.processes = processes
+        #enough lines to keep every connection busy for each chunk
+        self.chunk_lines = chunk_lines or batch_size * workers
+        self.checkpoint = None
+        if checkpoint is not None:
+            self.checkpoint = Checkpoint(checkpoint)
+        self.retries = retries
+        self.progress = progress
+        self.stats = BackfillStats()
+
+    def _write(self, batch):
+        result = bulk.KeyResult(None)
+        bulk.attempt(lambda: self.client.write_multi(batch), result,
+                     self.retries)
+        if result.error is not None:
+            raise BackfillError(result)
+        self.stats.add(len(batch))
+
+    def _upload(self, rows):
+        points = [DataPoint.from_data(t, v, key=key,
+                                      time_format=MILLISECONDS)
+                  for key, t, v in rows]
+        batches = [points[i:i + self.batch_size]
+                   for i in xrange(0, len(points), self.batch_size)]
+        parallel_map(self._write, batches, self.workers)
+
+    def _parsed(self, chunks, pool):
+        #parse chunks ahead of the upload, a bounded number at a time
+        if pool is None:
+            for end, job in chunks:
+                yield end, parse_chunk(job)
+            return
+        pending = deque()
+        for end, job in chunks:
+            pending.append((end, pool.apply_async(parse_chunk, (job,))))
+            if len(pending) > self.processes * 2:
+                end, result = pending.popleft()
+                yield end, result.get()
+        while pending:
+            end, result = pending.popleft()
+            yield end, result.get()
+
+    def run(self, paths):
+        """Write the points of the files in order.
+
+        :param list paths: the files to read
+        :raises BackfillError: if a batch can not be written
+        :rtype: :class:`BackfillStats`"""
+
+        pool = None
+        if self.processes:
+            pool = multiprocessing.Pool(self.processes)
+        try:
+            for path in paths:
+                offset = 0
+                if self.checkpoint is not None:
+                    offset = self.checkpoint.get(path)
+                chunks = read_chunks(path, self.layout, self.chunk_lines,
+                                     offset)
+                for end, rows in self._parsed(chunks, pool):
+                    self._upload(rows)
+                    self.stats.bytes += end - offset
+                    offset = end
+                    if self.checkpoint is not None:
+                        self.checkpoint.set(path, end)
+                    if self.progress is not None:
+                        self.progress(self.stats)
+                self.stats.files += 1
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        return self.stats
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(
+        usage='%prog [options] FILE...',
+        description='Write the points of CSV files into TempoDB, resuming '
+                    'from the checkpoint if there is one.')
+    add_client_options(parser)
+    parser.add_option('--layout', choices=LAYOUTS, default=LONG,
+                      help='"long" (key,timestamp,value rows) or "wide" '
+                           '(timestamp,key1,key2,... columns) [%default]')
+    parser.add_option('-c', '--checkpoint',
+                      help='the checkpoint file to resume from and update')
+    parser.add_option('-b', '--batch-size', type='int', default=5000,
+                      help='points per request [%default]')
+    parser.add_option('-w', '--workers', type='int', default=DEFAULT_WORKERS,
+                      help='concurrent requests [%default]')
+    parser.add_option('-p', '--processes', type='int',
+                      help='parsing processes [one per CPU]')
+    parser.add_option('--retries', type='int', default=3,
+                      help='retries per batch [%default]')
+    parser.add_option('-q', '--quiet', action='store_true',
+                      help='do not report progress')
+    options, args = parser.parse_args(argv)
+    if not args:
+        parser.error('no input files')
+    client = make_client(parser, options)
+    size_pool(client, options.workers)
+
+    progress = None
+    if not options.quiet:
+        progress = lambda stats: report(str(stats))
+    backfill = Backfill(client, options.layout, options.batch_size,
+                        options.workers, options.processes,
+                        checkpoint=options.checkpoint,
+                        retries=options.retries, progress=progress)
+    try:
+        stats = backfill.run(args)
+    except (BackfillError, ValueError, IOError), e:
+        sys.stderr.write('\nerror: %s\n' % e)
+        return 1
+    except KeyboardInterrupt:
+        sys.stderr.write('\ninterrupted\n')
+        return 130
+    if not options.quiet:
+        sys.stderr.write('\ndone: %s\n' % stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
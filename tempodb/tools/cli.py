@@ -0,0 +1,72 @@
+import os
+import sys
+from tempodb.client import Client
+from tempodb.endpoint import BASE_URL
+
+
+def add_client_options(parser):
+    """Add the options for connecting to the API to an
+    :class:`optparse.OptionParser`.  The credentials default to the
+    TEMPODB_DATABASE_ID, TEMPODB_API_KEY and TEMPODB_API_SECRET environment
+    variables, and the base URL to TEMPODB_BASE_URL.
+
+    :param parser: the parser to add to
+    :type parser: :class:`optparse.OptionParser`
+    :rtype: None"""
+
+    env = os.environ.get
+    parser.add_option('--database-id', default=env('TEMPODB_DATABASE_ID'),
+                      help='the database ID [$TEMPODB_DATABASE_ID]')
+    parser.add_option('--key', default=env('TEMPODB_API_KEY'),
+                      help='the API key [$TEMPODB_API_KEY]')
+    parser.add_option('--secret', default=env('TEMPODB_API_SECRET'),
+                      help='the API secret [$TEMPODB_API_SECRET]')
+    parser.add_option('--base-url', default=env('TEMPODB_BASE_URL', BASE_URL),
+                      help='the base URL of the API [%default]')
+    parser.add_option('--timeout', type='float',
+                      help='the timeout of each request in seconds')
+
+
+def make_client(parser, options, **kwargs):
+    """Create a client from the options added by :func:`add_client_options`,
+    exiting with an error if any credential is missing.
+
+    :param parser: the parser the options came from
+    :type parser: :class:`optparse.OptionParser`
+    :param options: the parsed options
+    :rtype: :class:`tempodb.client.Client`"""
+
+    for name in ['database_id', 'key', 'secret']:
+        if not getattr(options, name):
+            parser.error('--%s is required' % name.replace('_', '-'))
+    return Client(options.database_id, options.key, options.secret,
+                  options.base_url, timeout=options.timeout, **kwargs)
+
+
+def size_pool(client, workers):
+    """Make the connection pool of a client large enough to keep a
+    connection open for each of *workers* threads.  The requests library
+    keeps 10 per host by default, and closes any more after use.
+
+    :param client: the client
+    :type client: :class:`tempodb.client.Client`
+    :param int workers: the number of threads
+    :rtype: None"""
+
+    for adapter in client.session.pool.adapters.values():
+        adapter.init_poolmanager(workers, max(workers, 10))
+
+
+def report(line, stream=None):
+    """Write a status line to stderr, overwriting the previous one when
+    stderr is a terminal.
+
+    :param string line: the line to write
+    :rtype: None"""
+
+    stream = stream or sys.stderr
+    if stream.isatty():
+        stream.write('\r' + line)
+    else:
+        stream.write(line + '\n')
+    stream.flush()
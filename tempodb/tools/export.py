@@ -0,0 +1,323 @@
+"""
+Export series from TempoDB to local files.
+
+The series to export are listed with filters, and each series is split into
+time shards that are read concurrently with
+:meth:`tempodb.client.Client.read_data`, so that even a single long series
+is read over several connections.  Each shard of each series is streamed a
+page at a time into its own part file in the output directory, named after
+the series key and the start of the shard, in one of three formats:
+
+    * csv: rows of key,timestamp,value after a header row, as read by
+      tempodb-backfill
+    * jsonl: one {"key": ..., "t": ..., "v": ...} object per line
+    * tsf: the compact binary format of
+      :class:`tempodb.storage.tsfile.ExportWriter`
+
+A part file is written under a temporary name and renamed when complete, so
+the parts present in the directory are exactly the shards exported.  Running
+the same export again skips them, which makes an interrupted export
+resumable.  A manifest.json listing every part is written at the end.
+
+Usage::
+
+    tempodb-export --database-id ID --key KEY --secret SECRET \\
+        --tag building-7 --start 2012-01-01 --end 2014-01-01 \\
+        --format tsf --workers 32 export/
+"""
+
+import os
+import sys
+import json
+import time
+import urllib
+import optparse
+import threading
+from tempodb.bulk import chunk_range
+from tempodb.parallel import parallel_map
+from tempodb.storage.tsfile import ExportWriter
+from tempodb.temporal.epoch import iso_to_ns, epoch_to_iso
+from backfill import parse_time
+from cli import add_client_options, make_client, size_pool, report
+
+
+CSV = 'csv'
+JSONL = 'jsonl'
+TSF = 'tsf'
+FORMATS = [CSV, JSONL, TSF]
+
+DEFAULT_WORKERS = 16
+
+
+def part_name(key, start, format):
+    """The file name of the part holding a shard of a series.  The key is
+    percent-encoded so that any key makes a valid file name.
+
+    :param string key: the series key
+    :param int start: the start of the shard in epoch milliseconds
+    :param string format: the file format
+    :rtype: string"""
+
+    if isinstance(key, unicode):
+        key = key.encode('utf-8')
+    return '%s.%d.%s' % (urllib.quote(key, safe=''), start, format)
+
+
+def write_text(path, key, rows, format):
+    """Write (ISO8601 timestamp, value) rows of a series to a CSV or JSON
+    lines file.
+
+    :param string path: the file to write
+    :param string key: the series key
+    :param rows: the points of the series
+    :type rows: iterable of (string, float) tuples
+    :param string format: "csv" or "jsonl"
+    :rtype: int, the number of points written"""
+
+    n = 0
+    with open(path, 'wb') as f:
+        if format == CSV:
+            f.write('key,t,v\n')
+            quoted = key
+            if any(c in key for c in ',"\n'):
+                quoted = '"%s"' % key.replace('"', '""')
+            if isinstance(quoted, unicode):
+                quoted = quoted.encode('utf-8')
+            for t, v in rows:
+                f.write('%s,%s,%r\n' % (quoted, str(t), v))
+                n += 1
+        else:
+            for t, v in rows:
+                f.write(json.dumps({'key': key, 't': t, 'v': v}) + '\n')
+                n += 1
+    return n
+
+
+class ExportStats(object):
+    """Counters for an export, which can be read from another thread while
+    it runs: the parts written and skipped, the points and bytes written,
+    and the time elapsed.
+
+    :param int total: (optional) the number of parts to export"""
+
+    def __init__(self, total=0):
+        self.total = total
+        self.parts = 0
+        self.skipped = 0
+        self.points = 0
+        self.bytes = 0
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    @property
+    def elapsed(self):
+        return time.time() - self.started
+
+    def add(self, points, size):
+        with self.lock:
+            self.parts += 1
+            self.points += points
+            self.bytes += size
+
+    def to_dictionary(self):
+        """Serialize the counters into dictionary form.
+
+        :rtype: dict"""
+
+        elapsed = self.elapsed or 1e-9
+        return {
+            'total': self.total,
+            'parts': self.parts,
+            'skipped': self.skipped,
+            'points': self.points,
+            'bytes': self.bytes,
+            'elapsed': self.elapsed,
+            'points_per_second': self.points / elapsed,
+            'bytes_per_second': self.bytes / elapsed
+        }
+
+    def __str__(self):
+        elapsed = self.elapsed or 1e-9
+        return ('%d/%d parts, %d points, %.1fs, %.0f points/s, %.1f MB/s' %
+                (self.parts + self.skipped, self.total, self.points,
+                 self.elapsed, self.points / elapsed,
+                 self.bytes / elapsed / 1e6))
+
+
+class Export(object):
+    """Exports series to a directory of part files, see the module
+    documentation::
+
+        export = Export(client, 'export/', format='tsf', workers=32)
+        keys = export.list_keys(tags=['building-7'])
+        stats = export.run(keys, '2012-01-01', '2014-01-01')
+
+    :param client: the client to read with
+    :type client: :class:`tempodb.client.Client`
+    :param string directory: the directory to write to, which is created if
+                             needed
+    :param string format: (optional) "csv", "jsonl" or "tsf"
+    :param int workers: (optional) the number of concurrent requests
+    :param shard: (optional) the length of the time shards, i.e. "30day"
+    :type shard: string or relativedelta
+    :param limit: (optional) the page size to read with, or "auto"
+    :type limit: int or string
+    :param function progress: (optional) a function called with the
+                              :class:`ExportStats` after each part"""
+
+    def __init__(self, client, directory, format=CSV,
+                 workers=DEFAULT_WORKERS, shard='30day', limit=5000,
+                 progress=None):
+        if format not in FORMATS:
+            raise ValueError('Format must be one of %s. Got "%s".' %
+                             (', '.join(FORMATS), format))
+        self.client = client
+        self.directory = directory
+        self.format = format
+        self.workers = workers
+        self.shard = shard
+        self.limit = limit
+        self.progress = progress
+        self.stats = ExportStats()
+
+    def list_keys(self, keys=None, tags=None, attrs=None):
+        """The keys of the series matching the filters, see
+        :meth:`tempodb.client.Client.list_series`.
+
+        :rtype: list of string"""
+
+        return [s.key for s in self.client.list_series(keys=keys, tags=tags,
+                                                       attrs=attrs)]
+
+    def _export(self, job):
+        key, start, end = job
+        path = os.path.join(self.directory,
+                            part_name(key, start, self.format))
+        vstart, vend = epoch_to_iso([start, end])
+        cursor = self.client.read_data(key, vstart, vend, limit=self.limit)
+        if self.format == TSF:
+            points = ((iso_to_ns(t) // 10 ** 6, v) for t, v in cursor.raw())
+            with ExportWriter(path) as writer:
+                n = writer.write_points(key, points)
+        else:
+            tmp = '%s.tmp.%d' % (path, os.getpid())
+            try:
+                n = write_text(tmp, key, cursor.raw(), self.format)
+            except Exception:
+                os.remove(tmp)
+                raise
+            os.rename(tmp, path)
+        self.stats.add(n, os.path.getsize(path))
+        if self.progress is not None:
+            self.progress(self.stats)
+        return {'key': key, 'start': start, 'end': end, 'points': n,
+                'file': os.path.basename(path)}
+
+    def run(self, keys, start, end):
+        """Export the series over the time range from *start* to *end*,
+        skipping the parts already in the directory.
+
+        :param list keys: the series keys
+        :param start: the start of the range
+        :type start: string, Datetime or int
+        :param end: the end of the range
+        :type end: string, Datetime or int
+        :rtype: :class:`ExportStats`"""
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        shards = chunk_range(start, end, self.shard, self.client.time_format)
+        self.stats.total = len(keys) * len(shards)
+
+        jobs = []
+        done = []
+        for key in keys:
+            for s, e in shards:
+                name = part_name(key, s, self.format)
+                if os.path.exists(os.path.join(self.directory, name)):
+                    self.stats.skipped += 1
+                    done.append({'key': key, 'start': s, 'end': e,
+                                 'points': None, 'file': name})
+                else:
+                    jobs.append((key, s, e))
+
+        parts = parallel_map(self._export, jobs, self.workers)
+        manifest = {'format': self.format, 'start': shards[0][0] if shards
+                    else None, 'end': shards[-1][1] if shards else None,
+                    'parts': sorted(done + parts,
+                                    key=lambda p: (p['key'], p['start']))}
+        with open(os.path.join(self.directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return self.stats
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(
+        usage='%prog [options] DIRECTORY',
+        description='Export series from TempoDB into part files in '
+                    'DIRECTORY, skipping the parts already there.')
+    add_client_options(parser)
+    parser.add_option('-k', '--series-key', action='append', dest='keys',
+                      help='export this series (repeatable)')
+    parser.add_option('-t', '--tag', action='append', dest='tags',
+                      help='export series with this tag (repeatable)')
+    parser.add_option('-a', '--attr', action='append', dest='attrs',
+                      metavar='NAME=VALUE',
+                      help='export series with this attribute (repeatable)')
+    parser.add_option('-s', '--start',
+                      help='the start of the time range, as ISO8601 or '
+                           'epoch milliseconds')
+    parser.add_option('-e', '--end', help='the end of the time range')
+    parser.add_option('-f', '--format', choices=FORMATS, default=CSV,
+                      help='csv, jsonl or tsf [%default]')
+    parser.add_option('-w', '--workers', type='int', default=DEFAULT_WORKERS,
+                      help='concurrent requests [%default]')
+    parser.add_option('--shard', default='30day',
+                      help='the length of each time shard [%default]')
+    parser.add_option('-l', '--limit', default='5000',
+                      help='the page size, or "auto" [%default]')
+    parser.add_option('-q', '--quiet', action='store_true',
+                      help='do not report progress')
+    options, args = parser.parse_args(argv)
+    if len(args) != 1:
+        parser.error('an output directory is required')
+    if not options.start or not options.end:
+        parser.error('--start and --end are required')
+    attrs = None
+    if options.attrs:
+        try:
+            attrs = dict(a.split('=', 1) for a in options.attrs)
+        except ValueError:
+            parser.error('attributes must be given as NAME=VALUE')
+    try:
+        start, end = parse_time(options.start), parse_time(options.end)
+    except (ValueError, OverflowError):
+        parser.error('--start and --end must be ISO8601 or epoch '
+                     'milliseconds')
+    limit = options.limit
+    if limit != 'auto':
+        limit = int(limit)
+    client = make_client(parser, options)
+    size_pool(client, options.workers)
+
+    progress = None
+    if not options.quiet:
+        progress = lambda stats: report(str(stats))
+    export = Export(client, args[0], options.format, options.workers,
+                    options.shard, limit, progress)
+    try:
+        keys = export.list_keys(options.keys, options.tags, attrs)
+        stats = export.run(keys, start, end)
+    except (ValueError, IOError), e:
+        sys.stderr.write('\nerror: %s\n' % e)
+        return 1
+    except KeyboardInterrupt:
+        sys.stderr.write('\ninterrupted\n')
+        return 130
+    if not options.quiet:
+        sys.stderr.write('\ndone: %s\n' % stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
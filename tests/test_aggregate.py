@@ -0,0 +1,89 @@
+import math
+import random
+import unittest
+import datetime
+from tempodb.protocol.objects import DataPoint
+from tempodb.aggregate import partial_functions, PartialAggregate, combine
+
+
+T = datetime.datetime(2013, 1, 1)
+
+
+class TestAggregate(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(0)
+        self.values = [rand.random() * 10.0 for i in range(100)]
+        self.groups = [self.values[i:i + 30] for i in range(0, 100, 30)]
+
+    def partials(self, aggregation, groups=None):
+        ret = []
+        for i, group in enumerate(groups or self.groups):
+            n = len(group)
+            mean = sum(group) / n
+            results = {
+                'count': len(group),
+                'sum': sum(group),
+                'ss': sum(v * v for v in group),
+                'min': min(group),
+                'max': max(group),
+                'mult': reduce(lambda a, b: a * b, group),
+                'mean': mean,
+                'stddev': math.sqrt(sum((v - mean) ** 2
+                                        for v in group) / (n - 1))
+            }
+            for f in partial_functions(aggregation):
+                ret.append((f, [DataPoint.from_data(T, results[f])], i))
+        return ret
+
+    def test_partial_functions(self):
+        self.assertEquals(partial_functions('mean'), ['count', 'sum'])
+        self.assertRaises(ValueError, partial_functions, 'percentile,50')
+
+    def test_combine_matches_single_pass(self):
+        n = len(self.values)
+        mean = sum(self.values) / n
+        expected = {
+            'count': n,
+            'sum': sum(self.values),
+            'min': min(self.values),
+            'max': max(self.values),
+            'range': max(self.values) - min(self.values),
+            'mean': mean,
+            'stddev': math.sqrt(sum((v - mean) ** 2
+                                    for v in self.values) / (n - 1)),
+            'mult': reduce(lambda a, b: a * b, self.values)
+        }
+        for aggregation, value in expected.items():
+            ret = combine(aggregation, self.partials(aggregation))
+            self.assertEquals(len(ret), 1)
+            self.assertEquals(ret[0][0], DataPoint.from_data(T, 1).t)
+            self.assertTrue(abs(ret[0][1] - value) <= 1e-9 * abs(value),
+                            aggregation)
+
+    def test_combine_stddev_large_values(self):
+        #a sum of squares would cancel to nothing at this magnitude
+        values = [1e9 + v for v in self.values]
+        groups = [values[i:i + 30] for i in range(0, 100, 30)]
+        mean = sum(values) / len(values)
+        expected = math.sqrt(sum((v - mean) ** 2 for v in values) /
+                             (len(values) - 1))
+        ret = combine('stddev', self.partials('stddev', groups))
+        self.assertTrue(abs(ret[0][1] - expected) <= 1e-6 * expected)
+
+    def test_combine_orders_by_time(self):
+        later = T + datetime.timedelta(minutes=1)
+        partials = [('sum', [DataPoint.from_data(later, 1.0)]),
+                    ('sum', [DataPoint.from_data(T, 2.0),
+                             DataPoint.from_data(later, 3.0)])]
+        ret = combine('sum', partials)
+        self.assertEquals([v for t, v in ret], [2.0, 4.0])
+
+    def test_partial_aggregate_merge(self):
+        a = PartialAggregate()
+        a.add('min', 3.0)
+        b = PartialAggregate()
+        b.add('min', 1.0)
+        b.add('count', 2)
+        a.merge(b)
+        self.assertEquals(a.min, 1.0)
+        self.assertEquals(a.count, 2)
@@ -0,0 +1,152 @@
+import time
+import unittest
+from tempodb import endpoint as p
+from tempodb.balancer import Balancer
+from tempodb.client import Client
+from tempodb.response import ResponseException
+from tempodb.testing import FakeTempoDB
+
+
+START = 1356998400000
+
+
+class TestBalancer(unittest.TestCase):
+    def setUp(self):
+        self.balancer = Balancer(['http://a/v1/', 'http://b/v1/'],
+                                 max_failures=2, ejection_time=60.0)
+        self.a, self.b = self.balancer.upstreams
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Balancer, [])
+        self.assertRaises(ValueError, Balancer, ['http://a/'], 'random')
+
+    def test_split(self):
+        self.assertEquals(self.balancer.split('http://b/v1/series/'),
+                          (self.b, 'series/'))
+        self.assertEquals(self.balancer.split('http://c/v1/series/'),
+                          (None, 'http://c/v1/series/'))
+
+    def test_least_outstanding(self):
+        first = self.balancer.choose()
+        second = self.balancer.choose()
+        self.assertTrue(first is not second)
+        self.balancer.finish(first, 0.01, True)
+        self.assertTrue(self.balancer.choose() is first)
+
+    def test_exclude(self):
+        self.assertTrue(self.balancer.choose(exclude=[self.a]) is self.b)
+        self.assertEquals(self.balancer.choose(exclude=[self.a, self.b]),
+                          None)
+
+    def test_ewma(self):
+        balancer = Balancer(['http://a/', 'http://b/'], strategy='ewma',
+                            decay=0.5)
+        a, b = balancer.upstreams
+        balancer.choose()
+        balancer.finish(a, 1.0, True)
+        balancer.choose()
+        balancer.finish(b, 0.1, True)
+        self.assertTrue(balancer.choose() is b)
+        balancer.finish(b, 0.3, True)
+        self.assertAlmostEquals(b.ewma, 0.2)
+
+    def test_ejection(self):
+        for i in range(2):
+            self.balancer.choose(exclude=[self.b])
+            self.balancer.finish(self.a, 0.01, False)
+        self.assertEquals(self.a.ejections, 1)
+        for i in range(3):
+            u = self.balancer.choose()
+            self.assertTrue(u is self.b)
+            self.balancer.finish(u, 0.01, True)
+
+        #back from ejection, one failure ejects it again
+        self.a.ejected_until = 0.0
+        self.balancer.finish(self.balancer.choose(exclude=[self.b]), 0.01,
+                             False)
+        self.assertEquals(self.a.ejections, 2)
+
+    def test_all_ejected(self):
+        self.a.ejected_until = time.time() + 10
+        self.b.ejected_until = time.time() + 20
+        self.assertTrue(self.balancer.choose() is self.a)
+
+    def test_stats(self):
+        u = self.balancer.choose()
+        self.balancer.finish(u, 0.5, False)
+        stats = self.balancer.stats()[u.base_url]
+        self.assertEquals(stats['requests'], 1)
+        self.assertEquals(stats['errors'], 1)
+        self.assertEquals(stats['outstanding'], 0)
+        self.assertEquals(stats['latency'], 0.5)
+        text = self.balancer.to_prometheus()
+        self.assertTrue('tempodb_client_upstream_errors_total'
+                        '{upstream="%s"} 1' % u.base_url in text)
+
+
+class TestEndpointFailover(unittest.TestCase):
+    def setUp(self):
+        self.servers = [FakeTempoDB(page_size=10).start() for i in range(2)]
+        for server in self.servers:
+            server.store.write('foo', [(START + i * 1000, float(i))
+                                       for i in range(50)])
+        self.client = Client('db', 'key', 'secret',
+                             [s.url for s in self.servers])
+        self.session = self.client.session
+
+    def tearDown(self):
+        for server in self.servers:
+            if server.thread.is_alive():
+                server.stop()
+
+    def test_single_url(self):
+        end = p.HTTPEndpoint('my_id', 'foo', 'bar', 'http://www.nothing.com')
+        self.assertEquals(end.base_url, 'http://www.nothing.com/')
+        self.assertEquals(end.balancer, None)
+
+    def test_spread(self):
+        for i in range(10):
+            self.client.get_series('foo')
+        self.assertTrue(self.servers[0].requests)
+        self.assertTrue(self.servers[1].requests)
+
+    def test_server_down(self):
+        self.servers[0].stop()
+        self.session.balancer.upstreams[1].outstanding = 1
+        retries = []
+        self.session.add_hook('response', lambda e: retries.append(e.retries))
+        data = list(self.client.read_data('foo', START, START + 50000,
+                                          limit=10))
+        self.assertEquals(len(data), 50)
+        self.assertTrue(sum(retries) >= 1)
+        down = self.session.balancer.upstreams[0]
+        self.assertEquals(down.errors, 3)
+        self.assertEquals(down.ejections, 1)
+
+    def test_server_error(self):
+        #steer the first attempt to the failing server
+        self.session.balancer.upstreams[1].outstanding = 1
+        self.servers[0].fail_next(1, 503)
+        resp = self.client.get_series('foo')
+        self.assertEquals(resp.status, 200)
+        self.assertEquals(resp.timing.retries, 1)
+
+    def test_all_failing(self):
+        for server in self.servers:
+            server.fail_next(2, 503)
+        try:
+            self.client.get_series('foo')
+            self.fail('ResponseException not raised')
+        except ResponseException, e:
+            self.assertEquals(e.response.status, 503)
+            self.assertEquals(e.response.timing.retries, 1)
+
+    def test_post_not_retried(self):
+        for server in self.servers:
+            server.fail_next(1, 503)
+        try:
+            self.client.write_data('foo', [])
+            self.fail('ResponseException not raised')
+        except ResponseException, e:
+            self.assertEquals(e.response.status, 503)
+            self.assertEquals(e.response.timing.retries, 0)
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+import threading
+import mock
+from monkey import monkeypatch_requests
+from tempodb import endpoint as p
+from tempodb.breaker import (CircuitBreaker, CircuitOpen, JSONLinesSink,
+                             CLOSED, OPEN, HALF_OPEN)
+from tempodb.client import Client
+from tempodb.protocol import DataPoint
+from tempodb.testing import FakeTempoDB
+
+
+START = 1356998400000
+
+
+def fail(breaker, n):
+    for i in range(n):
+        breaker.before()
+        breaker.record(False)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.changes = []
+        self.breaker = CircuitBreaker(
+            error_rate=0.5, min_requests=4, window=10, open_time=0.05,
+            on_state_change=lambda b, old, new: self.changes.append(
+                (old, new)))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, CircuitBreaker, error_rate=0.0)
+
+    def test_min_requests(self):
+        fail(self.breaker, 3)
+        self.assertEquals(self.breaker.state, CLOSED)
+        fail(self.breaker, 1)
+        self.assertEquals(self.breaker.state, OPEN)
+        self.assertEquals(self.changes, [(CLOSED, OPEN)])
+
+    def test_error_rate(self):
+        for i in range(10):
+            self.breaker.before()
+            self.breaker.record(i % 4 != 0)
+        self.assertEquals(self.breaker.state, CLOSED)
+        fail(self.breaker, 3)
+        self.assertEquals(self.breaker.state, OPEN)
+
+    def test_open_rejects(self):
+        fail(self.breaker, 4)
+        self.assertTrue(self.breaker.rejecting())
+        self.assertRaises(CircuitOpen, self.breaker.before)
+        self.assertEquals(self.breaker.stats()['rejected'], 1)
+
+    def test_probe_closes(self):
+        fail(self.breaker, 4)
+        time.sleep(0.06)
+        self.assertFalse(self.breaker.rejecting())
+        self.breaker.before()
+        self.assertEquals(self.breaker.state, HALF_OPEN)
+        #only one probe at a time
+        self.assertRaises(CircuitOpen, self.breaker.before)
+        self.breaker.record(True)
+        self.assertEquals(self.breaker.state, CLOSED)
+        self.assertEquals(self.changes, [(CLOSED, OPEN), (OPEN, HALF_OPEN),
+                                         (HALF_OPEN, CLOSED)])
+        #the error rate starts over
+        fail(self.breaker, 3)
+        self.assertEquals(self.breaker.state, CLOSED)
+
+    def test_probe_reopens(self):
+        fail(self.breaker, 4)
+        time.sleep(0.06)
+        fail(self.breaker, 1)
+        self.assertEquals(self.breaker.state, OPEN)
+        self.assertTrue(self.breaker.rejecting())
+
+    def test_shed(self):
+        self.breaker.shed('foo', [])
+        fail(self.breaker, 4)
+        self.assertRaises(CircuitOpen, self.breaker.shed, 'foo', [])
+        self.breaker.fallback = mock.Mock()
+        try:
+            self.breaker.shed('foo', [1])
+            self.fail('CircuitOpen not raised')
+        except CircuitOpen, e:
+            self.assertTrue(e.handed_off)
+        self.breaker.fallback.assert_called_once_with('foo', [1])
+        self.assertEquals(self.breaker.stats()['handed_off'], 1)
+
+
+class TestEndpointBreaker(unittest.TestCase):
+    def setUp(self):
+        self.end = p.HTTPEndpoint('my_id', 'foo', 'bar',
+                                  'http://www.nothing.com')
+        monkeypatch_requests(self.end)
+        self.end.breaker = CircuitBreaker(min_requests=2)
+
+    def test_server_errors_open(self):
+        self.end.pool.get.return_value.status_code = 503
+        self.end.get('series/')
+        self.end.get('series/')
+        self.assertEquals(self.end.breaker.state, OPEN)
+        self.assertRaises(CircuitOpen, self.end.get, 'series/')
+        self.assertEquals(self.end.pool.get.call_count, 2)
+
+    def test_success(self):
+        self.end.pool.get.return_value.status_code = 200
+        for i in range(5):
+            self.end.get('series/')
+        self.assertEquals(self.end.breaker.state, CLOSED)
+
+    def probe(self):
+        #open the breaker and let the next request through as a probe
+        breaker = self.end.breaker
+        breaker.open_time = 0.0
+        fail(breaker, 2)
+        self.assertEquals(breaker.state, OPEN)
+
+    def test_hook_error_releases_probe(self):
+        self.probe()
+        self.end.pool.get.return_value.status_code = 200
+
+        def hook(event):
+            raise ValueError('boom')
+
+        self.end.hooks['request'].append(hook)
+        self.assertRaises(ValueError, self.end.get, 'series/')
+        breaker = self.end.breaker
+        self.assertEquals(breaker.state, HALF_OPEN)
+        self.assertEquals(breaker.probing, 0)
+        self.assertFalse(self.end.pool.get.called)
+
+        self.end.hooks['request'].remove(hook)
+        self.end.get('series/')
+        self.assertEquals(breaker.state, CLOSED)
+
+    def test_emit_error_records_failure(self):
+        import requests
+        self.probe()
+        self.end.pool.get.side_effect = requests.exceptions.ConnectionError()
+        self.end.emit = mock.Mock(side_effect=ValueError('boom'))
+        self.assertRaises(ValueError, self.end.get, 'series/')
+        self.assertEquals(self.end.breaker.state, OPEN)
+        self.assertEquals(self.end.breaker.probing, 0)
+
+    def test_programming_error_not_counted(self):
+        self.end.pool.get.side_effect = TypeError('boom')
+        for i in range(3):
+            self.assertRaises(TypeError, self.end.get, 'series/')
+        self.assertEquals(self.end.breaker.state, CLOSED)
+
+
+class TestClientBreaker(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTempoDB().start()
+        self.client = Client('db', 'key', 'secret', self.server.url)
+        self.dir = tempfile.mkdtemp()
+        self.sink = JSONLinesSink(os.path.join(self.dir, 'spill.jsonl'))
+        self.client.session.breaker = CircuitBreaker(
+            min_requests=1, open_time=60.0, fallback=self.sink)
+        self.data = [DataPoint.from_data(START + i, float(i))
+                     for i in range(3)]
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def test_write_not_serialized_when_open(self):
+        breaker = self.client.session.breaker
+        breaker.fallback = mock.Mock()
+        fail(breaker, 1)
+        with mock.patch('json.dumps') as dumps:
+            try:
+                self.client.write_multi([])
+                self.fail('CircuitOpen not raised')
+            except CircuitOpen, e:
+                self.assertTrue(e.handed_off)
+            self.assertFalse(dumps.called)
+        self.assertFalse(self.server.requests)
+
+    def test_fallback_replay(self):
+        fail(self.client.session.breaker, 1)
+        self.assertRaises(CircuitOpen, self.client.write_data, 'foo',
+                          self.data)
+        points = [DataPoint.from_data(START, 5.0, key='bar')]
+        self.assertRaises(CircuitOpen, self.client.write_multi, points)
+        self.assertFalse(self.server.requests)
+
+        self.client.session.breaker = None
+        self.assertEquals(self.sink.replay(self.client), 2)
+        self.assertEquals(self.sink.replay(self.client), 0)
+        data = list(self.client.read_data('foo', START, START + 100))
+        self.assertEquals([d.v for d in data], [0.0, 1.0, 2.0])
+        data = list(self.client.read_data('bar', START, START + 100))
+        self.assertEquals([d.v for d in data], [5.0])
+
+    def test_replay_while_open(self):
+        breaker = self.client.session.breaker
+        fail(breaker, 1)
+        self.assertRaises(CircuitOpen, self.client.write_data, 'foo',
+                          self.data)
+        self.assertRaises(CircuitOpen, self.client.write_data, 'bar',
+                          self.data)
+        errors = []
+
+        def replay():
+            try:
+                self.sink.replay(self.client)
+            except CircuitOpen, e:
+                errors.append(e)
+
+        t = threading.Thread(target=replay)
+        t.daemon = True
+        t.start()
+        t.join(5)
+        self.assertFalse(t.is_alive())
+        self.assertTrue(errors[0].handed_off)
+        self.assertFalse(self.server.requests)
+        with open(self.sink.path) as f:
+            keys = sorted(json.loads(line)['key'] for line in f)
+        self.assertEquals(keys, ['bar', 'foo'])
+
+        self.client.session.breaker = None
+        self.assertEquals(self.sink.replay(self.client), 2)
+        data = list(self.client.read_data('bar', START, START + 100))
+        self.assertEquals([d.v for d in data], [0.0, 1.0, 2.0])
+
+    def test_reads_fail_fast(self):
+        fail(self.client.session.breaker, 1)
+        self.assertRaises(CircuitOpen, self.client.read_data, 'foo', START,
+                          START + 100)
+        self.assertFalse(self.server.requests)
@@ -0,0 +1,262 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from tempodb.breaker import CircuitBreaker, CircuitOpen
+from tempodb.bulk import (KeyCache, BloomFilter, KeyResult, Checkpoint,
+                          attempt, chunk_range, CREATED, EXISTS, SKIPPED,
+                          UPDATED, FAILED)
+from tempodb.client import Client
+from tempodb.deadline import Deadline, DeadlineExceeded
+from tempodb.response import ResponseException
+from tempodb.temporal.arrays import epoch_ms_to_datetime
+from tempodb.testing import FakeTempoDB
+
+
+KEYS = ['series-%d' % i for i in range(30)]
+START = 1356998400000
+
+
+class TestKeyCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'keys.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_save_load(self):
+        cache = KeyCache(self.path)
+        cache.add('foo')
+        cache.add('bar')
+        cache.save()
+        cache = KeyCache(self.path)
+        self.assertEquals(len(cache), 2)
+        self.assertTrue('foo' in cache)
+        self.assertFalse('baz' in cache)
+
+    def test_save_without_path(self):
+        cache = KeyCache()
+        cache.add('foo')
+        cache.save()
+        self.assertEquals(os.listdir(self.dir), [])
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_members(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add('key-%d' % i)
+        self.assertTrue(all(('key-%d' % i) in bloom for i in range(1000)))
+        false = sum(1 for i in range(10000) if ('other-%d' % i) in bloom)
+        self.assertTrue(false < 300)
+        self.assertEquals(len(bloom), 1000)
+
+    def test_unicode(self):
+        bloom = BloomFilter(10)
+        bloom.add(u'caf\xe9')
+        self.assertTrue(u'caf\xe9' in bloom)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, BloomFilter, 10, 0.0)
+
+
+class TestAttempt(unittest.TestCase):
+    def test_gives_up_on_client_errors(self):
+        class Resp(object):
+            status = 400
+        calls = []
+
+        def f():
+            calls.append(1)
+            raise ResponseException(Resp())
+
+        result = KeyResult('foo')
+        self.assertEquals(attempt(f, result, retries=3, backoff=0), None)
+        self.assertEquals(len(calls), 1)
+        self.assertEquals(result.response.status, 400)
+
+    def test_backoff_bounded_by_deadline(self):
+        class Resp(object):
+            status = 503
+        calls = []
+
+        def f():
+            calls.append(1)
+            raise ResponseException(Resp())
+
+        result = KeyResult('foo')
+        start = time.time()
+        with Deadline(0.2):
+            self.assertRaises(DeadlineExceeded, attempt, f, result,
+                              retries=3, backoff=10)
+        self.assertTrue(time.time() - start < 1)
+        self.assertEquals(len(calls), 1)
+        self.assertEquals(result.response.status, 503)
+
+
+class TestClientBulk(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTempoDB().start()
+        self.client = Client('db', 'key', 'secret', self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def posts(self):
+        return [r for r in self.server.requests if r[0] == 'POST']
+
+    def test_create(self):
+        results = self.client.create_series_bulk(KEYS, tags=['fleet'])
+        self.assertEquals(sorted(results), sorted(KEYS))
+        self.assertTrue(all(r.status == CREATED for r in results.values()))
+        self.assertEquals(sorted(self.server.store.series), sorted(KEYS))
+        self.assertEquals(self.server.store.series['series-1']['tags'],
+                          ['fleet'])
+
+    def test_exists(self):
+        self.client.create_series('series-1')
+        results = self.client.create_series_bulk(KEYS[:3])
+        self.assertEquals(results['series-1'].status, EXISTS)
+        self.assertEquals(results['series-1'].error, None)
+        self.assertTrue(results['series-1'].ok)
+
+    def test_cache(self):
+        cache = KeyCache()
+        cache.add('series-0')
+        results = self.client.create_series_bulk(KEYS[:3], cache=cache)
+        self.assertEquals(results['series-0'].status, SKIPPED)
+        self.assertEquals(len(self.posts()), 2)
+        self.assertEquals(len(cache), 3)
+
+        results = self.client.create_series_bulk(KEYS[:3], cache=cache)
+        self.assertTrue(all(r.status == SKIPPED for r in results.values()))
+        self.assertEquals(len(self.posts()), 2)
+
+    def test_retries(self):
+        self.server.fail_next(2, 503)
+        results = self.client.create_series_bulk(['foo'], retries=3)
+        self.assertEquals(results['foo'].status, CREATED)
+        self.assertEquals(results['foo'].attempts, 3)
+
+    def test_failed(self):
+        self.server.fail_next(3, 503)
+        cache = KeyCache()
+        results = self.client.create_series_bulk(['foo'], retries=2,
+                                                 cache=cache)
+        self.assertEquals(results['foo'].status, FAILED)
+        self.assertEquals(results['foo'].response.status, 503)
+        self.assertFalse(results['foo'].ok)
+        self.assertFalse('foo' in cache)
+
+    def test_circuit_open(self):
+        breaker = CircuitBreaker(min_requests=1, open_time=60.0)
+        breaker.before()
+        breaker.record(False)
+        self.client.session.breaker = breaker
+        results = self.client.create_series_bulk(['foo'], retries=3)
+        self.assertEquals(results['foo'].status, FAILED)
+        self.assertEquals(results['foo'].attempts, 1)
+        self.assertTrue(isinstance(results['foo'].error, CircuitOpen))
+        self.assertFalse(self.posts())
+
+    def test_update(self):
+        self.client.create_series_bulk(KEYS[:5])
+        series = [self.client.get_series(k).data for k in KEYS[:5]]
+        for s in series:
+            s.tags = ['updated']
+        self.server.fail_next(1, 503)
+        results = self.client.update_series_bulk(series)
+        self.assertTrue(all(r.status == UPDATED for r in results.values()))
+        self.assertEquals(self.server.store.series['series-3']['tags'],
+                          ['updated'])
+
+
+class TestChunkRange(unittest.TestCase):
+    def test_fixed(self):
+        self.assertEquals(chunk_range(0, 25 * 60000, '10min'),
+                          [(0, 600000), (600000, 1200000),
+                           (1200000, 1500000)])
+
+    def test_calendar(self):
+        chunks = chunk_range('2013-01-15T00:00:00Z', '2013-04-01T00:00:00Z',
+                             '1month')
+        days = [epoch_ms_to_datetime(s).day for s, e in chunks]
+        self.assertEquals(days, [15, 15, 15])
+        self.assertEquals(epoch_ms_to_datetime(chunks[-1][1]).month, 4)
+
+    def test_ns(self):
+        self.assertEquals(chunk_range(0, 2 * 10 ** 9, '1sec', 'ns'),
+                          [(0, 1000), (1000, 2000)])
+
+    def test_empty(self):
+        self.assertEquals(chunk_range(10, 10, '1min'), [])
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'checkpoint.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_reload(self):
+        Checkpoint(self.path).add('a\tb', 0, 1000)
+        checkpoint = Checkpoint(self.path)
+        self.assertTrue(('a\tb', 0, 1000) in checkpoint)
+        self.assertFalse(('a\tb', 1000, 2000) in checkpoint)
+
+
+class TestClientDeleteBulk(unittest.TestCase):
+    DAY = 86400000
+
+    def setUp(self):
+        self.server = FakeTempoDB().start()
+        self.client = Client('db', 'key', 'secret', self.server.url)
+        for key in ['foo', 'bar']:
+            self.server.store.write(key, [(START + i * self.DAY / 2, i)
+                                          for i in range(20)])
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'checkpoint.txt')
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def deletes(self):
+        return [r for r in self.server.requests if r[0] == 'DELETE']
+
+    def remaining(self, key):
+        return list(self.client.read_data(key, START, START + 20 * self.DAY))
+
+    def test_delete(self):
+        progress = self.client.delete_bulk(['foo', 'bar'], START,
+                                           START + 5 * self.DAY)
+        self.assertEquals(progress.total, 10)
+        self.assertEquals(progress.done, 10)
+        self.assertEquals(progress.deleted_ms, 10 * self.DAY)
+        self.assertEquals(len(self.deletes()), 10)
+        self.assertEquals(len(self.remaining('foo')), 10)
+        stats = progress.to_dictionary()
+        self.assertEquals(stats['remaining'], 0)
+        self.assertTrue(stats['chunks_per_second'] > 0)
+
+    def test_resume(self):
+        self.server.fail_next(1, 400)
+        checkpoint = Checkpoint(self.path)
+        progress = self.client.delete_bulk('foo', START, START + 4 * self.DAY,
+                                           workers=1, checkpoint=checkpoint)
+        self.assertEquals(progress.done, 3)
+        self.assertEquals(len(progress.failed), 1)
+        failed = progress.failed[0]
+        self.assertEquals(failed.key, ('foo', START, START + self.DAY))
+        self.assertEquals(failed.status, FAILED)
+
+        progress = self.client.delete_bulk('foo', START, START + 4 * self.DAY,
+                                           checkpoint=Checkpoint(self.path))
+        self.assertEquals(progress.skipped, 3)
+        self.assertEquals(progress.done, 1)
+        self.assertEquals(len(self.deletes()), 5)
+        self.assertEquals(len(self.remaining('foo')), 12)
@@ -149,6 +149,37 @@ class TestClient(unittest.TestCase):
         self.assertEquals(len([a for a in r]), 1)
         self.client.session.pool.get.assert_called_once()
 
+    def test_aggregate_data_parallel(self):
+        series = DummyResponse()
+        series.text = json.dumps([
+            {"key": k, "name": "", "tags": [], "attributes": {}}
+            for k in ['a', 'b', 'c']])
+        values = {'a': 1.0, 'b': 2.0, 'c': 4.0}
+
+        def get(url, auth):
+            if 'aggregation.fold' not in url:
+                return series
+            keys = [k for k in values if 'key=%s' % k in url]
+            fold = url.split('aggregation.fold=')[1].split('&')[0]
+            group = [values[k] for k in keys]
+            result = {'count': len(group), 'sum': sum(group)}[fold]
+            resp = DummyResponse()
+            resp.text = json.dumps({
+                "data": [{"t": "2013-12-18T00:00:00Z", "v": result}],
+                "tz": "UTC"
+            })
+            return resp
+
+        self.client.session.pool.get.side_effect = get
+        start = datetime.datetime.now()
+        end = datetime.datetime.now()
+        r = self.client.aggregate_data_parallel(start, end, 'mean',
+                                                tags='foo', group_size=2)
+        self.assertEquals(len(r), 1)
+        self.assertAlmostEquals(r[0].v, 7.0 / 3)
+        #one list call, then count and sum for each of two groups
+        self.assertEquals(self.client.session.pool.get.call_count, 5)
+
     def test_find_data(self):
         resp_data = DummyResponse()
         resp_data.text = json.dumps({
@@ -196,6 +227,25 @@ class TestClient(unittest.TestCase):
         self.assertEquals(len([a for a in r]), 2)
         self.client.session.pool.get.assert_called_once()
 
+    def test_read_multi_merged(self):
+        resp_data = DummyResponse()
+        resp_data.text = json.dumps({
+            "data": [
+                {"t": "2013-12-18T00:00:00", "v": 1.0},
+                {"t": "2013-12-19T00:00:00", "v": 2.0},
+            ],
+            "tz": "UTC",
+            "rollup": None
+        })
+        self.client.session.pool.get.return_value = resp_data
+        start = datetime.datetime.now()
+        end = datetime.datetime.now()
+        r = self.client.read_multi_merged(['foo', 'bar'], start, end)
+        d = [a for a in r]
+        self.assertEquals(len(d), 2)
+        self.assertEquals(d[0].v, {'foo': 1.0, 'bar': 1.0})
+        self.assertEquals(self.client.session.pool.get.call_count, 2)
+
     def test_write_data(self):
         test = [
             DataPoint.from_data(datetime.datetime.now(), 1.0),
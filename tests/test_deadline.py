@@ -0,0 +1,135 @@
+import time
+import unittest
+from monkey import monkeypatch_requests
+from tempodb import endpoint as p
+from tempodb.client import Client
+from tempodb.deadline import (Deadline, DeadlineExceeded, current, bind,
+                              collect)
+from tempodb.parallel import parallel_map
+from tempodb.testing import FakeTempoDB
+
+
+START = 1356998400000
+
+
+class TestDeadline(unittest.TestCase):
+    def test_remaining(self):
+        d = Deadline(10.0)
+        self.assertTrue(9.0 < d.remaining() <= 10.0)
+        self.assertFalse(d.expired)
+        d.check()
+
+    def test_expired(self):
+        d = Deadline(0.0)
+        self.assertTrue(d.expired)
+        self.assertEquals(d.remaining(), 0.0)
+        self.assertRaises(DeadlineExceeded, d.check)
+
+    def test_timeout(self):
+        d = Deadline(10.0)
+        self.assertEquals(d.timeout(2.0), 2.0)
+        self.assertTrue(d.timeout(20.0) <= 10.0)
+        self.assertTrue(d.timeout() <= 10.0)
+
+    def test_current_nested(self):
+        self.assertEquals(current(), None)
+        outer = Deadline(1.0)
+        inner = Deadline(10.0)
+        with outer:
+            self.assertTrue(current() is outer)
+            with inner:
+                self.assertTrue(current() is outer)
+        self.assertEquals(current(), None)
+
+    def test_bind(self):
+        d = Deadline(1.0)
+        self.assertTrue(bind(current, d)() is d)
+        f = lambda: 1
+        self.assertTrue(bind(f, None) is f)
+
+    def test_collect(self):
+        def items():
+            yield 1
+            yield 2
+            raise DeadlineExceeded(Deadline(0.0))
+
+        try:
+            collect(items())
+            self.fail('DeadlineExceeded not raised')
+        except DeadlineExceeded, e:
+            self.assertEquals(e.partial, [1, 2])
+        self.assertEquals(collect(iter([1, 2])), [1, 2])
+
+    def test_parallel_map_partial(self):
+        def f(i):
+            if i >= 2:
+                time.sleep(0.2)
+                current().check()
+            return i
+
+        with Deadline(0.1):
+            try:
+                parallel_map(f, range(4), 4)
+                self.fail('DeadlineExceeded not raised')
+            except DeadlineExceeded, e:
+                self.assertEquals(e.partial, [0, 1, None, None])
+
+    def test_parallel_map_without_deadline(self):
+        self.assertEquals(parallel_map(lambda i: i * 2, range(3), 2),
+                          [0, 2, 4])
+
+
+class TestEndpointTimeout(unittest.TestCase):
+    def setUp(self):
+        self.end = p.HTTPEndpoint('my_id', 'foo', 'bar',
+                                  'http://www.nothing.com', timeout=3.0)
+        monkeypatch_requests(self.end)
+
+    def test_default_timeout(self):
+        self.end.get('series/')
+        self.assertEquals(self.end.pool.get.call_args[1]['timeout'], 3.0)
+
+    def test_deadline_timeout(self):
+        with Deadline(1.0):
+            self.end.get('series/')
+        self.assertTrue(self.end.pool.get.call_args[1]['timeout'] <= 1.0)
+
+    def test_expired_deadline(self):
+        with Deadline(0.0):
+            self.assertRaises(DeadlineExceeded, self.end.get, 'series/')
+        self.assertFalse(self.end.pool.get.called)
+
+
+class TestClientDeadline(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTempoDB(latency=0.05).start()
+        self.server.store.write('foo', [(START + i * 1000, float(i))
+                                        for i in range(100)])
+        self.client = Client('db', 'key', 'secret', self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_cursor_partial(self):
+        with self.client.deadline(0.2):
+            cursor = self.client.read_data('foo', START, START + 100000,
+                                           limit=10)
+        try:
+            collect(cursor)
+            self.fail('DeadlineExceeded not raised')
+        except DeadlineExceeded, e:
+            self.assertTrue(0 < len(e.partial) < 100)
+            self.assertEquals(e.partial[0].v, 0.0)
+
+    def test_within_deadline(self):
+        with self.client.deadline(5.0):
+            cursor = self.client.read_data('foo', START, START + 100000)
+            self.assertEquals(len(collect(cursor)), 100)
+
+    def test_request_timeout(self):
+        self.server.latency = 2.0
+        start = time.time()
+        with self.client.deadline(0.2):
+            self.assertRaises(DeadlineExceeded, self.client.read_data, 'foo',
+                              START, START + 100000)
+        self.assertTrue(time.time() - start < 1.0)
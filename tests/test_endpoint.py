@@ -1,4 +1,8 @@
+import os
+import sys
 import unittest
+import subprocess
+import threading
 from monkey import monkeypatch_requests
 from tempodb import endpoint as p
 
@@ -104,3 +108,37 @@ class TestEndpoint(unittest.TestCase):
         self.end.pool.delete.assert_called_once_with(
             'http://www.nothing.com/series/',
             auth=self.end.auth)
+
+
+class TestLazySession(unittest.TestCase):
+    def setUp(self):
+        self.end = p.HTTPEndpoint('my_id', 'foo', 'bar',
+                                  'http://www.nothing.com')
+
+    def test_built_once(self):
+        self.assertEquals(self.end._pool, None)
+        pools = []
+        threads = [threading.Thread(target=lambda: pools.append(self.end.pool))
+                   for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertTrue(all(pool is pools[0] for pool in pools))
+        self.assertTrue(self.end.auth is self.end.auth)
+        self.assertEquals(self.end.auth.username, 'foo')
+
+    def test_assign(self):
+        other = p.HTTPEndpoint('my_id', 'foo', 'bar', 'http://a.com')
+        self.end.pool = other.pool
+        self.assertTrue(self.end.pool is other.pool)
+
+    def test_import_is_lazy(self):
+        code = ('import sys, tempodb.client\n'
+                'tempodb.client.Client("id", "key", "secret")\n'
+                'print(",".join(m for m in ["requests", "numpy", '
+                '"dateutil.parser"] if m in sys.modules))\n')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root)
+        out = subprocess.check_output([sys.executable, '-c', code], env=env)
+        self.assertEquals(out.strip(), '')
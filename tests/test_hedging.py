@@ -0,0 +1,195 @@
+import time
+import unittest
+import threading
+import mock
+from monkey import monkeypatch_requests
+from tempodb import endpoint as p
+from tempodb.hedging import HedgePolicy
+from tempodb.metrics import TimingEvent
+
+
+class Sender(object):
+    #sends take the given number of seconds in turn, the last one repeating
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, url, **kwargs):
+        with self.lock:
+            i = self.calls
+            self.calls += 1
+        delay = self.delays[min(i, len(self.delays) - 1)]
+        if isinstance(delay, Exception):
+            raise delay
+        time.sleep(delay)
+        resp = mock.Mock()
+        resp.index = i
+        return resp
+
+
+def warm(policy, url='u', seconds=0.01, n=20):
+    for i in range(n):
+        policy.observe(url, seconds)
+
+
+class TestHedgePolicy(unittest.TestCase):
+    def test_invalid_percentile(self):
+        self.assertRaises(ValueError, HedgePolicy, percentile=1.5)
+
+    def test_delay_needs_samples(self):
+        policy = HedgePolicy(min_samples=5)
+        warm(policy, n=4)
+        self.assertEquals(policy.delay('u'), None)
+        policy.observe('u', 0.01)
+        self.assertEquals(policy.delay('u'), 0.01)
+
+    def test_delay_percentile(self):
+        policy = HedgePolicy(percentile=0.9, min_samples=1, min_delay=0.0)
+        for i in range(100):
+            policy.observe('u', i / 1000.0)
+        self.assertEquals(policy.delay('u'), 0.09)
+        self.assertEquals(policy.delay('other'), None)
+
+    def test_delay_clamped(self):
+        policy = HedgePolicy(min_samples=1, min_delay=0.05, max_delay=0.1)
+        policy.observe('u', 0.001)
+        self.assertEquals(policy.delay('u'), 0.05)
+        policy = HedgePolicy(min_samples=1, min_delay=0.05, max_delay=0.1)
+        policy.observe('u', 3.0)
+        self.assertEquals(policy.delay('u'), 0.1)
+
+    def test_no_hedge_when_cold(self):
+        policy = HedgePolicy()
+        send = Sender(0.0)
+        event = TimingEvent('GET', 'u')
+        policy.send(send, 'u', event, 'http://x')
+        self.assertEquals(send.calls, 1)
+        self.assertFalse(event.hedged)
+
+    def test_no_hedge_when_fast(self):
+        policy = HedgePolicy(min_delay=0.2)
+        warm(policy)
+        send = Sender(0.0)
+        event = TimingEvent('GET', 'u')
+        policy.send(send, 'u', event, 'http://x')
+        self.assertEquals(send.calls, 1)
+        self.assertFalse(event.hedged)
+
+    def test_hedge_wins(self):
+        policy = HedgePolicy(burst=1)
+        warm(policy)
+        send = Sender(1.0, 0.0)
+        event = TimingEvent('GET', 'u')
+        start = time.time()
+        resp = policy.send(send, 'u', event, 'http://x')
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertEquals(resp.index, 1)
+        self.assertTrue(event.hedged)
+        self.assertTrue(event.hedge_won)
+        stats = policy.stats()
+        self.assertEquals(stats['hedged'], 1)
+        self.assertEquals(stats['won'], 1)
+
+    def test_primary_wins(self):
+        policy = HedgePolicy(burst=1)
+        warm(policy)
+        send = Sender(0.1, 1.0)
+        event = TimingEvent('GET', 'u')
+        resp = policy.send(send, 'u', event, 'http://x')
+        self.assertEquals(resp.index, 0)
+        self.assertTrue(event.hedged)
+        self.assertFalse(event.hedge_won)
+
+    def test_budget(self):
+        policy = HedgePolicy(budget=0.0, burst=1)
+        warm(policy)
+        policy.send(Sender(0.05), 'u', TimingEvent('GET', 'u'), 'http://x')
+        event = TimingEvent('GET', 'u')
+        send = Sender(0.05)
+        policy.send(send, 'u', event, 'http://x')
+        self.assertEquals(send.calls, 1)
+        self.assertFalse(event.hedged)
+        self.assertEquals(policy.stats()['denied'], 1)
+
+    def test_failed_primary_falls_back_to_hedge(self):
+        policy = HedgePolicy(burst=1)
+        warm(policy)
+        hedge = Sender(0.1)
+        calls = []
+
+        def send(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                time.sleep(0.05)
+                raise ValueError('boom')
+            return hedge(url, **kwargs)
+
+        resp = policy.send(send, 'u', TimingEvent('GET', 'u'), 'http://x')
+        self.assertEquals(hedge.calls, 1)
+        self.assertEquals(resp.index, 0)
+
+    def test_threads_reused(self):
+        policy = HedgePolicy()
+        warm(policy, seconds=0.2)
+        for i in range(5):
+            policy.send(Sender(0.0), 'u', TimingEvent('GET', 'u'), 'http://x')
+            time.sleep(0.01)
+        self.assertEquals(policy.workers.started, 1)
+
+    def test_spent_budget_sends_on_calling_thread(self):
+        policy = HedgePolicy(budget=0.0, burst=0)
+        warm(policy)
+        threads = []
+
+        def send(url, **kwargs):
+            threads.append(threading.current_thread())
+            return Sender(0.0)(url)
+
+        policy.send(send, 'u', TimingEvent('GET', 'u'), 'http://x')
+        self.assertEquals(threads, [threading.current_thread()])
+        self.assertEquals(policy.workers.started, 0)
+
+    def test_loser_latency_observed(self):
+        policy = HedgePolicy(burst=1, min_samples=2, window=3)
+        warm(policy, n=2)
+        event = TimingEvent('GET', 'u')
+        policy.send(Sender(0.3, 0.0), 'u', event, 'http://x')
+        self.assertTrue(event.hedge_won)
+        time.sleep(0.5)
+        self.assertTrue(max(policy.latencies['u']) >= 0.3)
+
+    def test_error_without_hedge(self):
+        policy = HedgePolicy()
+        warm(policy, seconds=0.2)
+        send = Sender(ValueError('boom'))
+        self.assertRaises(ValueError, policy.send, send, 'u',
+                          TimingEvent('GET', 'u'), 'http://x')
+
+
+class TestEndpointHedging(unittest.TestCase):
+    def setUp(self):
+        self.end = p.HTTPEndpoint('my_id', 'foo', 'bar',
+                                  'http://www.nothing.com')
+        monkeypatch_requests(self.end)
+        self.end.hedging = HedgePolicy(burst=1)
+        warm(self.end.hedging, 'series/')
+
+    def test_get_hedged(self):
+        send = Sender(1.0, 0.0)
+        self.end.pool.get = send
+        resp = self.end.get('series/')
+        self.assertEquals(resp.index, 1)
+        self.assertTrue(resp.timing.hedged)
+        self.end.emit(resp.timing)
+        stats = self.end.metrics.to_dictionary()['GET series/']
+        self.assertEquals(stats['hedges'], 1)
+        self.assertEquals(stats['hedge_wins'], 1)
+        self.assertTrue('tempodb_client_request_hedges_total' in
+                        self.end.metrics.to_prometheus())
+
+    def test_post_not_hedged(self):
+        send = Sender(0.05)
+        self.end.pool.post = send
+        self.end.post('series/', '{}')
+        self.assertEquals(send.calls, 1)
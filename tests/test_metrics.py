@@ -0,0 +1,144 @@
+import unittest
+import datetime
+from tempodb.client import Client
+from tempodb.metrics import (TimingEvent, LatencyHistogram, LatencyRecorder,
+                             url_template)
+from tempodb.protocol import DataPoint
+from tempodb.testing import FakeTempoDB
+
+
+def make_event(method='GET', url='series/key/{key}/data/', status=200,
+               network_time=0.02):
+    e = TimingEvent(method, url, 'abc')
+    e.status = status
+    e.bytes_in = 100
+    e.network_time = network_time
+    e.parse_time = 0.001
+    e.build_time = 0.002
+    return e
+
+
+class TestURLTemplate(unittest.TestCase):
+    def test_url_template(self):
+        ret = url_template(
+            'https://api.tempo-db.com/v1/series/key/foo/data/?start=2013',
+            'https://api.tempo-db.com/v1/')
+        self.assertEquals(ret, 'series/key/{key}/data/')
+
+    def test_url_template_relative(self):
+        self.assertEquals(url_template('series/key/foo%2Fbar'),
+                          'series/key/{key}')
+
+    def test_url_template_no_key(self):
+        self.assertEquals(url_template('multi/?key=foo'), 'multi/')
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_observe(self):
+        h = LatencyHistogram([0.1, 1.0])
+        for v in [0.05, 0.1, 0.5, 2.0]:
+            h.observe(v)
+        self.assertEquals(h.count, 4)
+        self.assertAlmostEqual(h.sum, 2.65)
+        self.assertEquals(h.cumulative(),
+                          [(0.1, 2), (1.0, 3), (float('inf'), 4)])
+
+    def test_to_dictionary(self):
+        h = LatencyHistogram([0.1])
+        h.observe(0.5)
+        self.assertEquals(h.to_dictionary(),
+                          {'count': 1, 'sum': 0.5,
+                           'buckets': {'0.1': 0, '+Inf': 1}})
+
+
+class TestLatencyRecorder(unittest.TestCase):
+    def setUp(self):
+        self.recorder = LatencyRecorder([0.01, 0.1])
+        self.recorder(make_event())
+        self.recorder(make_event(status=404, network_time=0.002))
+        self.recorder(make_event(method='POST', url='multi/'))
+
+    def test_to_dictionary(self):
+        d = self.recorder.to_dictionary()
+        self.assertEquals(sorted(d.keys()),
+                          ['GET series/key/{key}/data/', 'POST multi/'])
+        get = d['GET series/key/{key}/data/']
+        self.assertEquals(get['count'], 2)
+        self.assertEquals(get['statuses'], {'200': 1, '404': 1})
+        self.assertEquals(get['buckets'],
+                          {'0.01': 1, '0.1': 2, '+Inf': 2})
+        self.assertEquals(get['bytes_in'], 200)
+        self.assertEquals(get['bytes_out'], 6)
+
+    def test_to_prometheus(self):
+        text = self.recorder.to_prometheus()
+        labels = 'method="GET",endpoint="series/key/{key}/data/"'
+        self.assertTrue('# TYPE tempodb_client_request_duration_seconds '
+                        'histogram' in text)
+        self.assertTrue('tempodb_client_request_duration_seconds_bucket'
+                        '{%s,le="0.01"} 1\n' % labels in text)
+        self.assertTrue('tempodb_client_request_duration_seconds_bucket'
+                        '{%s,le="+Inf"} 2\n' % labels in text)
+        self.assertTrue('tempodb_client_request_duration_seconds_count'
+                        '{%s} 2\n' % labels in text)
+        self.assertTrue('tempodb_client_requests_total{%s,status="404"} 1\n'
+                        % labels in text)
+
+    def test_reset(self):
+        self.recorder.reset()
+        self.assertEquals(self.recorder.to_dictionary(), {})
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTempoDB(page_size=10).start()
+        self.client = Client('db', 'key', 'secret', self.server.url)
+        start = datetime.datetime(2013, 1, 1)
+        data = [DataPoint.from_data(start + datetime.timedelta(minutes=i), i)
+                for i in range(25)]
+        self.client.write_data('foo', data)
+        self.client.session.metrics.reset()
+        self.events = []
+        self.client.session.add_hook('response', self.events.append)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_cursor_pages_emit_events(self):
+        cursor = self.client.read_data('foo', datetime.datetime(2013, 1, 1),
+                                       datetime.datetime(2013, 1, 2),
+                                       limit=10)
+        self.assertEquals(len(list(cursor)), 25)
+        self.assertEquals(len(self.events), 3)
+        for e in self.events:
+            self.assertEquals(e.method, 'GET')
+            self.assertEquals(e.url, 'series/key/{key}/segment')
+            self.assertEquals(e.status, 200)
+            self.assertTrue(e.bytes_in > 0)
+            self.assertTrue(e.network_time > 0)
+            self.assertTrue(e.total_time >= e.network_time)
+
+        stats = self.client.session.metrics.to_dictionary()
+        self.assertEquals(stats['GET series/key/{key}/segment']['count'], 3)
+
+    def test_response_type_emits_events(self):
+        self.client.get_series('foo')
+        self.assertEquals(len(self.events), 1)
+        self.assertEquals(self.events[0].url, 'series/key/{key}')
+        self.assertTrue(self.events[0].parse_time > 0)
+
+    def test_error_emits_event(self):
+        self.assertRaises(Exception, self.client.get_series, 'missing')
+        self.assertEquals(len(self.events), 1)
+        self.assertEquals(self.events[0].status, 404)
+
+    def test_request_hook(self):
+        seen = []
+        self.client.session.add_hook('request', seen.append)
+        self.client.get_series('foo')
+        self.assertEquals(len(seen), 1)
+        self.assertEquals(seen[0].method, 'GET')
+
+    def test_unknown_hook_stage(self):
+        self.assertRaises(ValueError, self.client.session.add_hook, 'foo',
+                          self.events.append)
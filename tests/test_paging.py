@@ -0,0 +1,107 @@
+import unittest
+from tempodb.client import Client
+from tempodb.paging import PageSizer, set_limit
+from tempodb.testing import FakeTempoDB
+
+
+START = 1356998400000
+
+
+class TestSetLimit(unittest.TestCase):
+    def test_replace(self):
+        url = set_limit('http://host/v1/series?a=1&limit=10&cursor=20', 50)
+        self.assertEquals(url, 'http://host/v1/series?a=1&limit=50&cursor=20')
+
+    def test_add(self):
+        self.assertEquals(set_limit('http://host/v1/series?a=1', 50),
+                          'http://host/v1/series?a=1&limit=50')
+
+
+class TestPageSizer(unittest.TestCase):
+    def test_initial(self):
+        self.assertEquals(PageSizer(initial=500).limit, 500)
+        self.assertEquals(PageSizer(initial=50, min_limit=100).limit, 100)
+
+    def test_invalid_bounds(self):
+        self.assertRaises(ValueError, PageSizer, min_limit=10, max_limit=5)
+
+    def test_grows_when_fast(self):
+        s = PageSizer(initial=1000, target_latency=1.0, max_bytes=None)
+        self.assertEquals(s.observe(1000, 0.01, 50000), 2000)
+        self.assertEquals(s.observe(2000, 0.02, 100000), 4000)
+
+    def test_targets_latency(self):
+        s = PageSizer(initial=1000, target_latency=1.0, max_bytes=None)
+        self.assertEquals(s.observe(1000, 0.8, 50000), 1250)
+
+    def test_shrinks_when_slow(self):
+        s = PageSizer(initial=1000, target_latency=1.0, max_bytes=None)
+        self.assertEquals(s.observe(1000, 10.0, 50000), 500)
+
+    def test_memory_ceiling(self):
+        s = PageSizer(initial=1000, target_latency=1.0, max_bytes=60000)
+        self.assertEquals(s.observe(1000, 0.01, 50000), 1200)
+
+    def test_bounds(self):
+        s = PageSizer(initial=1000, max_limit=1500, max_bytes=None)
+        self.assertEquals(s.observe(1000, 0.01, 50000), 1500)
+        s = PageSizer(initial=150, min_limit=100, max_bytes=None)
+        self.assertEquals(s.observe(150, 100.0, 50000), 100)
+
+    def test_empty_page(self):
+        s = PageSizer(initial=1000)
+        self.assertEquals(s.observe(0, 0.01, 20), 1000)
+        self.assertEquals(len(s.history), 1)
+
+    def test_copy(self):
+        s = PageSizer(initial=300, max_limit=400)
+        s.observe(300, 0.01, 100)
+        c = s.copy()
+        self.assertEquals(c.limit, 300)
+        self.assertEquals(c.max_limit, 400)
+        self.assertEquals(c.history, [])
+
+
+class TestAutoPaging(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTempoDB().start()
+        self.server.store.write('foo', [(START + i * 1000, float(i))
+                                        for i in range(1000)])
+        sizer = PageSizer(min_limit=10, initial=50, max_limit=400,
+                          max_bytes=None)
+        self.client = Client('db', 'key', 'secret', self.server.url,
+                             page_sizer=sizer)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def limits(self):
+        return [int(params['limit'][0])
+                for method, path, params, size in self.server.requests]
+
+    def test_read_data_auto(self):
+        cursor = self.client.read_data('foo', START, START + 1000000,
+                                       limit='auto')
+        data = [d.v for d in cursor]
+        self.assertEquals(data, [float(i) for i in range(1000)])
+        limits = self.limits()
+        self.assertEquals(limits[:4], [50, 100, 200, 400])
+        self.assertTrue(sum(limits[:-1]) < 1000 <= sum(limits))
+        self.assertEquals([h['limit'] for h in cursor.sizer.history],
+                          limits)
+
+    def test_auto_page_size_metrics(self):
+        list(self.client.read_data('foo', START, START + 1000000,
+                                   limit='auto'))
+        stats = self.client.session.metrics.to_dictionary()
+        page_size = stats['GET series/key/{key}/segment']['page_size']
+        self.assertEquals(page_size['count'], len(self.server.requests))
+        self.assertTrue('tempodb_client_page_size_count' in
+                        self.client.session.metrics.to_prometheus())
+
+    def test_fixed_limit_unchanged(self):
+        cursor = self.client.read_data('foo', START, START + 1000000,
+                                       limit=300)
+        self.assertEquals(len(list(cursor)), 1000)
+        self.assertEquals(self.limits(), [300] * 4)
+        self.assertEquals(cursor.sizer, None)
@@ -0,0 +1,18 @@
+import unittest
+from tempodb.parallel import parallel_map
+
+
+class TestParallel(unittest.TestCase):
+    def test_parallel_map_keeps_order(self):
+        ret = parallel_map(lambda x: x * 2, range(100), workers=4)
+        self.assertEquals(ret, [x * 2 for x in range(100)])
+
+    def test_parallel_map_empty(self):
+        self.assertEquals(parallel_map(lambda x: x, []), [])
+
+    def test_parallel_map_raises(self):
+        def f(x):
+            if x == 3:
+                raise ValueError('bad')
+            return x
+        self.assertRaises(ValueError, parallel_map, f, range(10), 4)
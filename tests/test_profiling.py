@@ -0,0 +1,72 @@
+import os
+import pstats
+import tempfile
+import unittest
+import datetime
+from tempodb.client import Client
+from tempodb.profiling import PHASES, phase_of
+from tempodb.protocol import DataPoint
+from tempodb.testing import FakeTempoDB
+
+
+class TestPhaseOf(unittest.TestCase):
+    def test_phase_of(self):
+        self.assertEquals(
+            phase_of(('/x/tempodb/endpoint.py', 10, 'make_url_args')),
+            'make_url_args')
+        self.assertEquals(phase_of(('/x/tempodb/endpoint.py', 10, '_send')),
+                          'http')
+        self.assertEquals(phase_of(('/x/json/__init__.py', 10, 'loads')),
+                          'json_decode')
+        self.assertEquals(
+            phase_of(('/x/tempodb/protocol/objects.py', 10, 'from_json')),
+            'object_building')
+        self.assertEquals(
+            phase_of(('/x/tempodb/temporal/epoch.py', 10, 'iso_to_ns')),
+            'convert_iso_stamp')
+        self.assertEquals(phase_of(('/x/tempodb/client.py', 10, 'read_data')),
+                          None)
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTempoDB().start()
+        self.client = Client('db', 'key', 'secret', self.server.url)
+        start = datetime.datetime(2013, 1, 1)
+        data = [DataPoint.from_data(start + datetime.timedelta(minutes=i), i)
+                for i in range(500)]
+        self.client.write_data('foo', data)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_profile_phases(self):
+        with self.client.profile() as p:
+            cursor = self.client.read_data('foo',
+                                           datetime.datetime(2013, 1, 1),
+                                           datetime.datetime(2013, 1, 2),
+                                           limit=100)
+            self.assertEquals(len(list(cursor)), 500)
+
+        phases = p.phases()
+        for phase in PHASES:
+            self.assertTrue(phases[phase] > 0, phase)
+        self.assertAlmostEqual(sum(phases[ph] for ph in PHASES) +
+                               phases['other'], phases['total'], 6)
+
+        text = p.report(limit=5)
+        self.assertTrue('convert_iso_stamp' in text)
+        self.assertTrue('function calls' in text)
+
+    def test_profile_dump(self):
+        with self.client.profile() as p:
+            self.client.get_series('foo')
+
+        fd, path = tempfile.mkstemp(suffix='.pstats')
+        os.close(fd)
+        try:
+            p.dump(path)
+            stats = pstats.Stats(path)
+            self.assertTrue(stats.total_calls > 0)
+        finally:
+            os.remove(path)
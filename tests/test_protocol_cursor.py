@@ -68,6 +68,42 @@ class TestCursor(unittest.TestCase):
             got_value_error = True
         self.assertTrue(got_value_error)
 
+    def test_data_point_cursor_builds_lazily(self):
+        built = []
+
+        class Counted(DummyType):
+            def __init__(self, data, response, tz=None):
+                built.append(data)
+                DummyType.__init__(self, data, response, tz)
+
+        resp = DummyResponse()
+        c = DataPointCursor({'data': [1, 2, 3]}, Counted, resp)
+        self.assertEquals(built, [])
+        it = iter(c)
+        it.next()
+        self.assertEquals(built, [1])
+
+    def test_data_point_cursor_raw(self):
+        second = json.dumps({'data': [{'t': 'b', 'v': 2}]})
+        resp = DummyResponse()
+        secondary_response = DummyResponse()
+        secondary_response.text = second
+        secondary_response.resp.links = {}
+        resp.session.get.return_value = secondary_response
+        resp.resp.links = {'next': {'url': '<...>'}}
+        c = DataPointCursor({'data': [{'t': 'a', 'v': 1}]}, DummyType, resp)
+        self.assertEquals(list(c.raw()), [('a', 1), ('b', 2)])
+
+    def test_data_point_cursor_raw_after_iterating(self):
+        resp = DummyResponse()
+        resp.resp.links = {}
+        rows = [{'t': 'a', 'v': 1}, {'t': 'b', 'v': 2}, {'t': 'c', 'v': 3}]
+        c = DataPointCursor({'data': rows}, DummyType, resp)
+        it = iter(c)
+        self.assertEquals(it.next().data, rows[0])
+        self.assertEquals(list(c.raw()), [('b', 2), ('c', 3)])
+        self.assertEquals(list(it), [])
+
     def test_series_cursor_iterator(self):
         second = json.dumps([4, 5, 6])
         resp = DummyResponse()
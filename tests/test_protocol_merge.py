@@ -0,0 +1,49 @@
+import unittest
+import datetime
+from tempodb.protocol.objects import DataPoint
+from tempodb.protocol.merge import merge_cursors
+
+
+def make_points(minutes, value):
+    base = datetime.datetime(2013, 12, 18)
+    return [DataPoint.from_data(base + datetime.timedelta(minutes=m),
+                                value + m) for m in minutes]
+
+
+class TestMerge(unittest.TestCase):
+    def test_merge_orders_by_time(self):
+        cursors = [('foo', make_points([0, 2, 4], 0.0)),
+                   ('bar', make_points([1, 3], 10.0))]
+        d = [p for p in merge_cursors(cursors)]
+        self.assertEquals(len(d), 5)
+        self.assertEquals([p.v.keys()[0] for p in d],
+                          ['foo', 'bar', 'foo', 'bar', 'foo'])
+        self.assertEquals(d, sorted(d, key=lambda p: p.t))
+
+    def test_merge_combines_equal_timestamps(self):
+        cursors = {'foo': make_points([0, 1], 0.0),
+                   'bar': make_points([1, 2], 10.0)}
+        d = [p for p in merge_cursors(cursors, tz='UTC')]
+        self.assertEquals(len(d), 3)
+        self.assertEquals(d[1].v, {'foo': 1.0, 'bar': 11.0})
+        self.assertEquals(d[1].get('bar'), 11.0)
+        self.assertEquals(d[1].tz, 'UTC')
+
+    def test_merge_empty_inputs(self):
+        cursors = [('foo', []), ('bar', make_points([0], 1.0))]
+        d = [p for p in merge_cursors(cursors)]
+        self.assertEquals(len(d), 1)
+        self.assertEquals(d[0].v, {'bar': 1.0})
+
+    def test_merge_is_lazy(self):
+        consumed = []
+
+        def stream():
+            for p in make_points(range(1000), 0.0):
+                consumed.append(p)
+                yield p
+
+        m = merge_cursors([('foo', stream())])
+        m.next()
+        m.next()
+        self.assertEquals(len(consumed), 3)
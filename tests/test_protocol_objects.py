@@ -89,6 +89,21 @@ class TestProtocolObjects(unittest.TestCase):
         self.assertEquals(d.key, 'foo')
         self.assertEquals(d.id, 'bar')
 
+    def test_data_point_parses_time_lazily(self):
+        d = DataPoint({'t': 'not a timestamp', 'v': 1.0}, None)
+        self.assertEquals(d.v, 1.0)
+        self.assertRaises(ValueError, getattr, d, 't')
+
+    def test_data_point_time_is_cached(self):
+        d = DataPoint({'t': '2013-01-01T00:00:00Z', 'v': 1.0}, None)
+        self.assertTrue(d.t is d.t)
+
+    def test_data_point_set_time(self):
+        d = DataPoint({'t': '2013-01-01T00:00:00Z', 'v': 1.0}, None)
+        t = datetime.datetime(2014, 1, 1)
+        d.t = t
+        self.assertEquals(d.t, t)
+
     def test_data_point_to_json(self):
         d = {'t': '2013-12-18T00:00:00', 'v': 1.0}
         d = DataPoint(d, None)
@@ -322,3 +337,18 @@ class TestProtocolObjects(unittest.TestCase):
         del d['series']['id']
         self.maxDiff = None
         self.assertEqual(dj, d)
+
+    def test_multi_point_from_data(self):
+        t = datetime.datetime(2013, 12, 18)
+        m = MultiPoint.from_data(t, {'foo': 1.0})
+        self.assertEquals(m.t, t)
+        self.assertEquals(m.get('foo'), 1.0)
+
+    def test_multi_point_from_data_with_string(self):
+        m = MultiPoint.from_data('2013-12-18T00:00:00', {'foo': 1.0},
+                                 tz='America/Chicago')
+        self.assertEquals(m.t.tzinfo.zone, 'America/Chicago')
+
+    def test_multi_point_from_data_invalid(self):
+        t = datetime.datetime(2013, 12, 18)
+        self.assertRaises(ValueError, MultiPoint.from_data, t, 1.0)
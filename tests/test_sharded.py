@@ -0,0 +1,166 @@
+import unittest
+from tempodb.client import Client
+from tempodb.protocol import DataPoint
+from tempodb.protocol.merge import merge_sorted
+from tempodb.response import ResponseException
+from tempodb.sharded import HashRing, ShardedClient
+from tempodb.testing import FakeTempoDB
+
+
+START = 1356998400000
+KEYS = ['series-%d' % i for i in range(20)]
+
+
+class TestHashRing(unittest.TestCase):
+    def test_stable(self):
+        ring = HashRing(['a', 'b', 'c'])
+        self.assertEquals([ring.get(k) for k in KEYS],
+                          [HashRing(['c', 'b', 'a']).get(k) for k in KEYS])
+        self.assertEquals(ring.get(u'series-1'), ring.get('series-1'))
+
+    def test_spread(self):
+        ring = HashRing(['a', 'b'])
+        shards = set(ring.get('key-%d' % i) for i in range(100))
+        self.assertEquals(shards, set(['a', 'b']))
+
+    def test_minimal_movement(self):
+        keys = ['key-%d' % i for i in range(1000)]
+        ring = HashRing(['a', 'b', 'c'])
+        before = dict((k, ring.get(k)) for k in keys)
+        ring.add('d')
+        moved = [k for k in keys if ring.get(k) != before[k]]
+        self.assertTrue(all(ring.get(k) == 'd' for k in moved))
+        self.assertTrue(100 < len(moved) < 400)
+        ring.remove('d')
+        self.assertEquals(dict((k, ring.get(k)) for k in keys), before)
+
+    def test_empty(self):
+        self.assertRaises(ValueError, HashRing([]).get, 'foo')
+
+    def test_unicode_shards(self):
+        ring = HashRing([u'caf\xe9', u'na\xefve'])
+        self.assertEquals(set(ring.get(k) for k in KEYS),
+                          set([u'caf\xe9', u'na\xefve']))
+        self.assertEquals(HashRing(['a']).ring, HashRing([u'a']).ring)
+
+
+class TestMergeSorted(unittest.TestCase):
+    def test_merge(self):
+        merged = merge_sorted([[1, 4, 5], [], [2, 3, 6]], lambda x: x)
+        self.assertEquals(list(merged), [1, 2, 3, 4, 5, 6])
+
+
+class TestShardedClient(unittest.TestCase):
+    def setUp(self):
+        self.servers = {}
+        clients = {}
+        for name in ['a', 'b']:
+            server = self.servers[name] = FakeTempoDB().start()
+            clients[name] = Client('db', 'key', 'secret', server.url,
+                                   time_format='ms')
+        self.client = ShardedClient(clients)
+        for i, key in enumerate(KEYS):
+            self.client.write_data(key, [DataPoint.from_data(START + i, i)])
+
+    def tearDown(self):
+        for server in self.servers.values():
+            server.stop()
+
+    def keys_on(self, name):
+        return sorted(self.servers[name].store.series)
+
+    def test_routing(self):
+        a, b = self.keys_on('a'), self.keys_on('b')
+        self.assertTrue(a and b)
+        self.assertEquals(sorted(a + b), sorted(KEYS))
+        for key in a:
+            self.assertEquals(self.client.shard_for(key), 'a')
+
+    def test_router(self):
+        client = ShardedClient(self.client.clients, router=lambda k: 'c')
+        self.assertRaises(KeyError, client.shard_for, 'foo')
+
+    def test_read_data(self):
+        data = list(self.client.read_data('series-3', START, START + 100))
+        self.assertEquals([(d.t, d.v) for d in data], [(START + 3, 3)])
+
+    def test_write_multi(self):
+        data = [DataPoint.from_data(START + 100, i, key=key)
+                for i, key in enumerate(KEYS)]
+        responses = self.client.write_multi(data)
+        self.assertEquals(sorted(responses), ['a', 'b'])
+        for server in self.servers.values():
+            posts = [r for r in server.requests if r[0] == 'POST'
+                     and r[1] == 'multi/']
+            self.assertEquals(len(posts), 1)
+        data = list(self.client.read_data('series-5', START, START + 1000))
+        self.assertEquals([d.v for d in data], [5, 5])
+
+    def test_write_multi_failure(self):
+        self.servers['a'].fail_next(1, 503)
+        data = [DataPoint.from_data(START + 100, i, key=key)
+                for i, key in enumerate(KEYS)]
+        try:
+            self.client.write_multi(data)
+            self.fail('ResponseException not raised')
+        except ResponseException, e:
+            self.assertEquals(e.responses['a'].status, 503)
+            self.assertEquals(e.responses['b'].status, 200)
+
+    def test_write_multi_unroutable(self):
+        self.assertRaises(ValueError, self.client.write_multi,
+                          [DataPoint.from_data(START, 1)])
+        self.assertRaises(ValueError, self.client.write_multi,
+                          [DataPoint.from_data(START, 1, series_id='abc')])
+
+    def test_read_multi(self):
+        data = list(self.client.read_multi(START, START + 100,
+                                           keys=KEYS[:6]))
+        self.assertEquals([d.t for d in data],
+                          [START + i for i in range(6)])
+        self.assertEquals(data[2].v, {'series-2': 2})
+
+    def test_read_multi_shared_timestamps(self):
+        for i, key in enumerate(KEYS):
+            self.client.write_data(key, [DataPoint.from_data(START + 50, i)])
+        data = list(self.client.read_multi(START + 50, START + 51,
+                                           keys=KEYS))
+        self.assertEquals(len(data), 1)
+        self.assertEquals(data[0].v, dict((k, i) for i, k in
+                                          enumerate(KEYS)))
+
+    def test_read_multi_only_shards_needed(self):
+        key = self.keys_on('a')[0]
+        list(self.client.read_multi(START, START + 100, keys=[key]))
+        self.assertFalse([r for r in self.servers['b'].requests
+                          if r[1] == 'multi'])
+
+    def test_list_series(self):
+        series = list(self.client.list_series())
+        self.assertEquals([s.key for s in series], sorted(KEYS))
+        series = list(self.client.list_series(keys=['series-1', 'series-2']))
+        self.assertEquals([s.key for s in series], ['series-1', 'series-2'])
+
+    def test_empty_keys_like_client(self):
+        server = FakeTempoDB().start()
+        try:
+            client = Client('db', 'key', 'secret', server.url,
+                            time_format='ms')
+            for i, key in enumerate(KEYS):
+                client.write_data(key, [DataPoint.from_data(START + i, i)])
+            self.assertEquals(
+                [s.key for s in self.client.list_series(keys=[])],
+                [s.key for s in client.list_series(keys=[])])
+            self.assertEquals(
+                [(d.t, d.v) for d in self.client.read_multi(
+                    START, START + 100, keys=[])],
+                [(d.t, d.v) for d in client.read_multi(
+                    START, START + 100, keys=[])])
+        finally:
+            server.stop()
+
+    def test_multi_series_single_value(self):
+        values = list(self.client.multi_series_single_value(
+            keys=KEYS[:4], ts=START + 100, direction='before'))
+        self.assertEquals([v.series.key for v in values], KEYS[:4])
+        self.assertEquals([v.data.v for v in values], [0, 1, 2, 3])
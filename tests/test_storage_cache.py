@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+import datetime
+import numpy
+from tempodb.client import Client
+from tempodb.protocol import DataPoint
+from tempodb.storage.cache import ColumnarCache
+from tempodb.testing import FakeTempoDB
+
+
+START = 1356998400000
+MINUTE = 60000
+
+
+def series(n, offset=0):
+    ts = numpy.arange(n, dtype=numpy.int64) * MINUTE + START + offset
+    vs = numpy.arange(n, dtype=numpy.float64)
+    return (ts, vs)
+
+
+class TestColumnarCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = ColumnarCache(self.dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_put_get(self):
+        ts, vs = series(100)
+        self.cache.put('foo', ts, vs, START, START + 100 * MINUTE)
+        ret = self.cache.get('foo', START + 10 * MINUTE, START + 20 * MINUTE)
+        self.assertEquals(list(ret[0]), list(ts[10:20]))
+        self.assertEquals(list(ret[1]), list(vs[10:20]))
+
+    def test_get_is_a_view(self):
+        ts, vs = series(100)
+        self.cache.put('foo', ts, vs, START, START + 100 * MINUTE)
+        rts, rvs = self.cache.get('foo', START, START + 100 * MINUTE)
+        self.assertFalse(rts.flags.owndata)
+        self.assertFalse(rvs.flags.writeable)
+
+    def test_get_uncovered(self):
+        ts, vs = series(100)
+        self.cache.put('foo', ts, vs, START, START + 100 * MINUTE)
+        self.assertEquals(self.cache.get('foo', START - 1, START + 10), None)
+        self.assertEquals(self.cache.get('bar', START, START + 10), None)
+
+    def test_get_across_segments(self):
+        ts, vs = series(100)
+        self.cache.put('foo', ts[:50], vs[:50], START, START + 50 * MINUTE)
+        self.cache.put('foo', ts[50:], vs[50:], START + 50 * MINUTE,
+                       START + 100 * MINUTE)
+        ret = self.cache.get('foo', START + 40 * MINUTE, START + 60 * MINUTE)
+        self.assertEquals(list(ret[0]), list(ts[40:60]))
+
+    def test_empty_range(self):
+        self.cache.put('foo', [], [], START, START + MINUTE)
+        ret = self.cache.get('foo', START, START + MINUTE)
+        self.assertEquals(len(ret[0]), 0)
+
+    def test_covering_segment_replaces_old(self):
+        ts, vs = series(100)
+        self.cache.put('foo', ts[:50], vs[:50], START, START + 50 * MINUTE)
+        self.cache.put('foo', ts, vs, START, START + 100 * MINUTE)
+        self.assertEquals(len(self.cache.segments('foo')), 1)
+
+    def test_no_partial_files(self):
+        ts, vs = series(10)
+        self.cache.put(u'f\xf6o', ts, vs, START, START + 10 * MINUTE)
+        for d in os.listdir(self.dir):
+            for name in os.listdir(os.path.join(self.dir, d)):
+                self.assertTrue(name.endswith('.seg'))
+
+    def test_eviction(self):
+        cache = ColumnarCache(self.dir, max_bytes=5000)
+        for i, key in enumerate(['a', 'b', 'c']):
+            ts, vs = series(100)
+            cache.put(key, ts, vs, START, START + 100 * MINUTE)
+            path = cache.segments(key)[0].path
+            os.utime(path, (1000 + i, 1000 + i))
+        #each segment is 1632 bytes
+        cache.put('d', *(series(100) + (START, START + 100 * MINUTE)))
+        self.assertTrue(cache.size() <= 5000)
+        self.assertEquals(cache.segments('a'), [])
+        self.assertEquals(len(cache.segments('d')), 1)
+
+    def test_clear(self):
+        ts, vs = series(10)
+        self.cache.put('foo', ts, vs, START, START + 10 * MINUTE)
+        self.cache.clear()
+        self.assertEquals(self.cache.size(), 0)
+
+
+class TestCacheFill(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.server = FakeTempoDB().start()
+        self.client = Client('db', 'key', 'secret', self.server.url)
+        start = datetime.datetime(2013, 1, 1)
+        for key in ['foo', 'bar']:
+            data = [DataPoint.from_data(start + datetime.timedelta(minutes=i),
+                                        float(i)) for i in range(120)]
+            self.client.write_data(key, data)
+        self.cache = ColumnarCache(self.dir)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def test_fill_many(self):
+        start = datetime.datetime(2013, 1, 1)
+        end = datetime.datetime(2013, 1, 1, 1)
+        self.cache.fill_many(self.client, ['foo', 'bar'], start, end)
+        ts, vs = self.cache.get('bar', start, end)
+        self.assertEquals(len(ts), 60)
+        self.assertEquals(ts[0], START)
+
+    def test_read_data(self):
+        start = datetime.datetime(2013, 1, 1)
+        end = datetime.datetime(2013, 1, 1, 2)
+        ts, vs = self.cache.read_data(self.client, 'foo', start, end)
+        self.assertEquals(len(ts), 120)
+        n = len(self.server.requests)
+        ts, vs = self.cache.read_data(self.client, 'foo', start, end)
+        self.assertEquals(len(ts), 120)
+        self.assertEquals(len(self.server.requests), n)
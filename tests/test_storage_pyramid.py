@@ -0,0 +1,94 @@
+import unittest
+from tempodb.client import Client
+from tempodb.storage.pyramid import PyramidCache, period_ms
+from tempodb.testing import FakeTempoDB
+
+
+START = 1356998400000
+HOUR = 3600000
+
+
+class TestPeriodMs(unittest.TestCase):
+    def test_period_ms(self):
+        self.assertEquals(period_ms('1min'), 60000)
+        self.assertEquals(period_ms('1day'), 86400000)
+        self.assertEquals(period_ms('PT2H'), 7200000)
+
+    def test_period_ms_calendar(self):
+        self.assertRaises(ValueError, period_ms, '1month')
+
+
+class TestPyramidCache(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTempoDB().start()
+        self.client = Client('db', 'key', 'secret', self.server.url)
+        self.server.store.write('foo', [(START + i * 60000, float(i))
+                                        for i in range(3 * 24 * 60)])
+        self.pyramid = PyramidCache(self.client, levels=['1min', '1hour'],
+                                    tile_periods=24)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_choose_level(self):
+        self.assertEquals(
+            self.pyramid.choose_level(START, START + HOUR, 100).period,
+            '1min')
+        self.assertEquals(
+            self.pyramid.choose_level(START, START + 24 * HOUR, 100).period,
+            '1hour')
+        self.assertEquals(
+            self.pyramid.choose_level(START, START + 1000 * HOUR, 10).period,
+            '1hour')
+
+    def test_read_rollups(self):
+        period, points = self.pyramid.read('foo', START, START + 24 * HOUR,
+                                           max_points=100)
+        self.assertEquals(period, '1hour')
+        self.assertEquals(len(points), 24)
+        self.assertEquals(points[0], (START, 29.5))
+        self.assertEquals(points[5], (START + 5 * HOUR, 329.5))
+
+    def test_read_hits_cache(self):
+        self.pyramid.read('foo', START, START + HOUR, max_points=100)
+        n = len(self.server.requests)
+        self.assertEquals(self.pyramid.stats()['misses'], 3)
+
+        #panning within the cached tiles is served from the cache
+        period, points = self.pyramid.read('foo', START + 30 * 60000,
+                                           START + 50 * 60000, max_points=100)
+        self.assertEquals(len(points), 20)
+        self.assertEquals(points[0], (START + 30 * 60000, 30.0))
+        self.assertEquals(len(self.server.requests), n)
+        self.assertEquals(self.pyramid.stats()['hits'], 2)
+
+    def test_fills_only_missing_tiles(self):
+        self.pyramid.read('foo', START, START + HOUR, max_points=100)
+        n = len(self.server.requests)
+        #a wider view at the same level reuses the three cached tiles and
+        #reads the four after them in one request
+        self.pyramid.read('foo', START, START + 150 * 60000, max_points=200)
+        self.assertEquals(self.pyramid.stats(),
+                          {'hits': 3, 'misses': 7, 'tiles': 7})
+        self.assertEquals(len(self.server.requests), n + 1)
+
+    def test_read_data(self):
+        period, points = self.pyramid.read_data('foo', START,
+                                                START + 2 * HOUR,
+                                                max_points=10,
+                                                tz='US/Central')
+        self.assertEquals(len(points), 2)
+        self.assertEquals(points[1].v, 89.5)
+        self.assertEquals(points[1].t.tzinfo.zone, 'US/Central')
+
+    def test_max_tiles(self):
+        pyramid = PyramidCache(self.client, levels=['1min'], tile_periods=60,
+                               max_tiles=2)
+        for h in range(4):
+            pyramid.read('foo', START + h * HOUR, START + (h + 1) * HOUR)
+        self.assertEquals(pyramid.stats()['tiles'], 2)
+
+    def test_invalidate(self):
+        self.pyramid.read('foo', START, START + HOUR, max_points=100)
+        self.pyramid.invalidate('foo')
+        self.assertEquals(self.pyramid.stats()['tiles'], 0)
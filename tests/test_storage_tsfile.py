@@ -0,0 +1,146 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import datetime
+import pytz
+from tempodb.client import Client
+from tempodb.protocol import DataPoint
+from tempodb.storage.tsfile import (ExportWriter, ExportReader, encode_block,
+                                    decode_block)
+from tempodb.testing import FakeTempoDB
+
+
+START = 1356998400000
+
+
+class TestBlockEncoding(unittest.TestCase):
+    def roundtrip(self, ts, vs):
+        ret_ts, ret_vs = decode_block(encode_block(ts, vs), len(ts))
+        self.assertEquals(ret_ts, ts)
+        self.assertEquals([repr(v) for v in ret_vs],
+                          [repr(float(v)) for v in vs])
+
+    def test_regular(self):
+        ts = [START + 60000 * i for i in range(100)]
+        vs = [1.5] * 50 + [2.25 + i for i in range(50)]
+        self.roundtrip(ts, vs)
+
+    def test_single_point(self):
+        self.roundtrip([START], [3.0])
+
+    def test_irregular(self):
+        rand = random.Random(0)
+        ts = [START]
+        for i in range(500):
+            ts.append(ts[-1] + rand.choice([0, 1, 999, 1000, 250000,
+                                            -5000, 10 ** 12]))
+        vs = [rand.choice([0.0, -0.0, 1e300, 5e-324, float('inf'),
+                           rand.random(), rand.randint(-100, 100)])
+              for t in ts]
+        self.roundtrip(ts, vs)
+
+    def test_compact(self):
+        ts = [START + 1000 * i for i in range(1000)]
+        vs = [20.0] * 1000
+        self.assertTrue(len(encode_block(ts, vs)) < 300)
+
+
+class TestExportFile(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'data.tsf')
+        self.ts = [START + 60000 * i for i in range(2500)]
+        self.vs = [float(i % 17) for i in range(2500)]
+        with ExportWriter(self.path, block_points=100) as w:
+            w.write_arrays('foo', self.ts, self.vs)
+            w.write_points('empty', [])
+            w.write_points('bar', [(START, 1.0), (START + 5, 2.0)])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_keys(self):
+        with ExportReader(self.path) as r:
+            self.assertEquals(r.keys(), ['foo', 'empty', 'bar'])
+            self.assertEquals(r.count('foo'), 2500)
+            self.assertEquals(r.count('empty'), 0)
+            self.assertEquals(r.time_range('foo'),
+                              (self.ts[0], self.ts[-1]))
+            self.assertEquals(r.time_range('empty'), None)
+
+    def test_read_points(self):
+        with ExportReader(self.path) as r:
+            self.assertEquals(list(r.read_points('foo')),
+                              zip(self.ts, self.vs))
+            self.assertEquals(list(r.read_points('bar')),
+                              [(START, 1.0), (START + 5, 2.0)])
+            self.assertEquals(list(r.read_points('empty')), [])
+
+    def test_read_range(self):
+        with ExportReader(self.path) as r:
+            ret = list(r.read_points('foo', self.ts[150], self.ts[1234]))
+            self.assertEquals(ret, zip(self.ts[150:1234], self.vs[150:1234]))
+
+    def test_read_range_datetime(self):
+        start = datetime.datetime(2013, 1, 1, 1, 0, tzinfo=pytz.utc)
+        end = '2013-01-01T02:00:00Z'
+        with ExportReader(self.path) as r:
+            ret = list(r.read_series('foo', start, end, tz='US/Eastern'))
+        self.assertEquals(len(ret), 60)
+        self.assertEquals(ret[0].t, start)
+        self.assertEquals(ret[0].t.tzinfo.zone, 'US/Eastern')
+        self.assertEquals(ret[0].v, self.vs[60])
+
+    def test_read_arrays(self):
+        with ExportReader(self.path) as r:
+            ts, vs = r.read_arrays('foo', self.ts[10], self.ts[20])
+        self.assertEquals(list(ts), self.ts[10:20])
+        self.assertEquals(list(vs), self.vs[10:20])
+
+    def test_missing_key(self):
+        with ExportReader(self.path) as r:
+            self.assertRaises(KeyError, list, r.read_points('baz'))
+
+    def test_duplicate_key(self):
+        w = ExportWriter(os.path.join(self.dir, 'other.tsf'))
+        w.write_points('foo', [])
+        self.assertRaises(ValueError, w.write_points, 'foo', [])
+        w.abort()
+        self.assertEquals(sorted(os.listdir(self.dir)), ['data.tsf'])
+
+    def test_not_an_export(self):
+        path = os.path.join(self.dir, 'bad.tsf')
+        f = open(path, 'wb')
+        f.write('{"t": "2013-01-01T00:00:00.000Z", "v": 1}\n')
+        f.close()
+        self.assertRaises(ValueError, ExportReader, path)
+
+
+class TestClientExport(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.server = FakeTempoDB().start()
+        self.client = Client('db', 'key', 'secret', self.server.url)
+        start = datetime.datetime(2013, 1, 1)
+        for key, n in [('foo', 250), ('bar', 10)]:
+            data = [DataPoint.from_data(start + datetime.timedelta(minutes=i),
+                                        i * 0.5) for i in range(n)]
+            self.client.write_data(key, data)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def test_export(self):
+        path = os.path.join(self.dir, 'snapshot.tsf')
+        ret = self.client.export(['foo', 'bar'],
+                                 datetime.datetime(2013, 1, 1),
+                                 datetime.datetime(2013, 1, 2), path,
+                                 limit=100)
+        self.assertEquals(ret, {'foo': 250, 'bar': 10})
+        with ExportReader(path) as r:
+            points = list(r.read_points('foo'))
+        self.assertEquals(len(points), 250)
+        self.assertEquals(points[3], (START + 3 * 60000, 1.5))
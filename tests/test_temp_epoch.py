@@ -0,0 +1,196 @@
+import unittest
+import json
+import datetime
+import pytz
+from tempodb.client import Client
+from tempodb.protocol.objects import DataPoint, MultiPoint
+from tempodb.temporal.arrays import point_epoch_ms
+from tempodb.temporal.rollup import RollupEngine
+from tempodb.temporal.stream import tumbling, sliding
+from tempodb.temporal.epoch import (iso_to_ns, iso_to_epoch, epoch_to_iso,
+                                    to_epoch, format_time, check_time_format)
+from tempodb.temporal.validate import check_time_param
+from tempodb.testing import FakeTempoDB
+
+
+START = 1356998400000
+
+
+class TestTempEpoch(unittest.TestCase):
+    def test_iso_to_ns_utc(self):
+        self.assertEquals(iso_to_ns('2013-01-01T00:00:00.000Z'),
+                          START * 10 ** 6)
+        self.assertEquals(iso_to_ns('2013-01-01T00:00:00'), START * 10 ** 6)
+
+    def test_iso_to_ns_offset(self):
+        self.assertEquals(iso_to_ns('2013-01-01T01:00:00.000+01:00'),
+                          START * 10 ** 6)
+        self.assertEquals(iso_to_ns('2012-12-31T19:00:00.000-0500'),
+                          START * 10 ** 6)
+
+    def test_iso_to_ns_fraction(self):
+        self.assertEquals(iso_to_ns('2013-01-01T00:00:00.123456789Z'),
+                          START * 10 ** 6 + 123456789)
+        self.assertEquals(iso_to_ns('2013-01-01T00:00:00.5Z'),
+                          START * 10 ** 6 + 500000000)
+
+    def test_iso_to_ns_fallback(self):
+        self.assertEquals(iso_to_ns('20130101T000000Z'), START * 10 ** 6)
+
+    def test_iso_to_epoch(self):
+        stamps = ['2013-01-01T00:00:00.000Z', '2013-01-01T00:00:01.250Z']
+        self.assertEquals(iso_to_epoch(stamps), [START, START + 1250])
+        self.assertEquals(iso_to_epoch(stamps, 'ns'),
+                          [START * 10 ** 6, (START + 1250) * 10 ** 6])
+
+    def test_epoch_to_iso(self):
+        self.assertEquals(epoch_to_iso([START, START + 86461001]),
+                          ['2013-01-01T00:00:00.000+00:00',
+                           '2013-01-02T00:01:01.001+00:00'])
+        self.assertEquals(epoch_to_iso([START * 10 ** 6 + 999], 'ns'),
+                          ['2013-01-01T00:00:00.000+00:00'])
+
+    def test_epoch_round_trip(self):
+        times = [START + i * 997 for i in range(100)]
+        self.assertEquals(iso_to_epoch(epoch_to_iso(times)), times)
+
+    def test_to_epoch(self):
+        dt = datetime.datetime(2013, 1, 1, 1, tzinfo=pytz.timezone('UTC'))
+        self.assertEquals(to_epoch(dt), START + 3600000)
+        self.assertEquals(to_epoch('2013-01-01T00:00:00Z', 'ns'),
+                          START * 10 ** 6)
+        self.assertEquals(to_epoch(START), START)
+        self.assertEquals(to_epoch(None), None)
+
+    def test_format_time(self):
+        self.assertEquals(format_time(START, 'ms'),
+                          '2013-01-01T00:00:00.000+00:00')
+        self.assertEquals(format_time(START, 'datetime'),
+                          '2013-01-01T00:00:00.000+00:00')
+        dt = datetime.datetime(2013, 1, 1)
+        self.assertEquals(format_time(dt), dt.isoformat())
+
+    def test_check_time_format(self):
+        self.assertEquals(check_time_format('ns'), 'ns')
+        self.assertRaises(ValueError, check_time_format, 'seconds')
+
+    def test_check_time_param_epoch(self):
+        self.assertEquals(check_time_param(START),
+                          '2013-01-01T00:00:00.000+00:00')
+        self.assertEquals(check_time_param(START * 10 ** 6, 'ns'),
+                          '2013-01-01T00:00:00.000+00:00')
+
+    def test_datapoint_from_data_epoch(self):
+        d = DataPoint.from_data(START, 1.0)
+        self.assertEquals(d.t, START)
+        self.assertEquals(d.time_format, 'ms')
+        self.assertEquals(d.to_dictionary()['t'],
+                          '2013-01-01T00:00:00.000+00:00')
+
+    def test_datapoint_from_data_string_as_epoch(self):
+        d = DataPoint.from_data('2013-01-01T00:00:00Z', 1.0, time_format='ns')
+        self.assertEquals(d.t, START * 10 ** 6)
+        self.assertEquals(point_epoch_ms(d), START)
+
+    def test_datapoint_from_json_epoch(self):
+        d = DataPoint({'t': '2013-01-01T00:00:01.000Z', 'v': 1}, None,
+                      time_format='ms')
+        self.assertEquals(d.t, START + 1000)
+
+    def test_multipoint_from_data_epoch(self):
+        m = MultiPoint.from_data(START, {'foo': 1.0})
+        self.assertEquals(m.t, START)
+        self.assertEquals(json.loads(m.to_json())['t'],
+                          '2013-01-01T00:00:00.000+00:00')
+
+
+class TestClientEpoch(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTempoDB().start()
+        self.server.store.write('foo', [(START + i * 1000, float(i))
+                                        for i in range(10)])
+        self.server.store.write('bar', [(START + i * 2000, float(i))
+                                        for i in range(5)])
+
+    def tearDown(self):
+        self.server.stop()
+
+    def client(self, time_format):
+        return Client('db', 'key', 'secret', self.server.url,
+                      time_format=time_format)
+
+    def test_invalid_time_format(self):
+        self.assertRaises(ValueError, self.client, 'seconds')
+
+    def test_read_data_ms(self):
+        data = list(self.client('ms').read_data('foo', START, START + 10000,
+                                                limit=3))
+        self.assertEquals([d.t for d in data],
+                          [START + i * 1000 for i in range(10)])
+        self.assertEquals([d.v for d in data], [float(i) for i in range(10)])
+
+    def test_read_data_ns(self):
+        start = START * 10 ** 6
+        cursor = self.client('ns').read_data('foo', start,
+                                             start + 2000 * 10 ** 6)
+        self.assertEquals(cursor.start, START * 10 ** 6)
+        self.assertEquals([d.t for d in cursor],
+                          [START * 10 ** 6, (START + 1000) * 10 ** 6])
+
+    def test_read_data_epoch_params_with_datetimes(self):
+        data = list(self.client('datetime').read_data('foo', START,
+                                                      START + 2000))
+        self.assertEquals(len(data), 2)
+        self.assertTrue(isinstance(data[0].t, datetime.datetime))
+
+    def test_read_multi_merged_ms(self):
+        merged = list(self.client('ms').read_multi_merged(
+            ['foo', 'bar'], START, START + 4000))
+        self.assertEquals([m.t for m in merged],
+                          [START + i * 1000 for i in range(4)])
+        self.assertEquals(merged[2].v, {'foo': 2.0, 'bar': 1.0})
+
+    def test_single_value_and_summary(self):
+        for fmt, scale in [('ms', 1), ('ns', 10 ** 6)]:
+            client = self.client(fmt)
+            single = client.single_value('foo', (START + 1000) * scale,
+                                         'exact').data
+            self.assertEquals(single.data.t, (START + 1000) * scale)
+            found = list(client.multi_series_single_value(
+                keys=['foo', 'bar'], ts=(START + 2000) * scale,
+                direction='exact'))
+            self.assertEquals([s.data.t for s in found],
+                              [(START + 2000) * scale] * 2)
+            summary = client.get_summary('foo', START * scale,
+                                         (START + 5000) * scale).data
+            self.assertEquals((summary.start, summary.end),
+                              (START * scale, (START + 5000) * scale))
+            self.assertEquals(summary.to_dictionary()['start'],
+                              '2013-01-01T00:00:00.000+00:00')
+
+    def test_rollup_engine_from_cursor(self):
+        for fmt, scale in [('ms', 1), ('ns', 10 ** 6)]:
+            cursor = self.client(fmt).read_data('foo', START * scale,
+                                                (START + 10000) * scale)
+            engine = RollupEngine.from_cursor(cursor)
+            data = engine.read_data('sum', '5s')
+            self.assertEquals([(d.t, d.v) for d in data],
+                              [(START * scale, 10.0),
+                               ((START + 5000) * scale, 35.0)])
+            multi = engine.read_multi_rollups(['min', 'max'], '5s')
+            self.assertEquals(multi[1].t, (START + 5000) * scale)
+            self.assertEquals(multi[1].v, {'min': 5.0, 'max': 9.0})
+
+    def test_stream_helpers(self):
+        for fmt, scale in [('ms', 1), ('ns', 10 ** 6)]:
+            client = self.client(fmt)
+            windows = list(tumbling(client.read_data(
+                'foo', START * scale, (START + 10000) * scale), '4s'))
+            self.assertEquals([(t, w.count) for t, w in windows],
+                              [(START * scale, 4),
+                               ((START + 4000) * scale, 4),
+                               ((START + 8000) * scale, 2)])
+            windows = [(t, w.count, w.mean) for t, w in sliding(
+                client.read_data('foo', START * scale, (START + 4000) * scale),
+                '2s')]
+            self.assertEquals(windows[-1], ((START + 3000) * scale, 2, 2.5))
@@ -0,0 +1,68 @@
+import math
+import unittest
+import datetime
+from tempodb.protocol.objects import DataPoint
+from tempodb.temporal.interpolate import make_grid, interpolate, resample
+from tempodb.temporal.interpolate import align
+
+
+class TestInterpolate(unittest.TestCase):
+    def setUp(self):
+        #points at 0s, 60s and 180s
+        self.data = ([0, 60000, 180000], [1.0, 2.0, 4.0])
+
+    def test_make_grid(self):
+        grid = make_grid(datetime.datetime(1970, 1, 1),
+                         datetime.datetime(1970, 1, 1, 0, 4), '1min')
+        self.assertEquals(list(grid), [0, 60000, 120000, 180000])
+
+    def test_make_grid_with_strings(self):
+        grid = make_grid('1970-01-01T00:00:00Z', '1970-01-01T00:01:00Z',
+                         '30s')
+        self.assertEquals(list(grid), [0, 30000])
+
+    def test_zoh(self):
+        ret = interpolate(self.data, [-1, 0, 30000, 120000, 240000], 'zoh')
+        self.assertTrue(math.isnan(ret[0]))
+        self.assertEquals(list(ret[1:]), [1.0, 1.0, 2.0, 4.0])
+
+    def test_linear(self):
+        ret = interpolate(self.data, [-1, 0, 30000, 120000, 240000],
+                          'linear')
+        self.assertTrue(math.isnan(ret[0]))
+        self.assertEquals(list(ret[1:4]), [1.0, 1.5, 3.0])
+        self.assertTrue(math.isnan(ret[4]))
+
+    def test_interpolate_unsorted(self):
+        data = ([60000, 0], [2.0, 1.0])
+        self.assertEquals(list(interpolate(data, [30000], 'linear')), [1.5])
+
+    def test_interpolate_invalid_function(self):
+        self.assertRaises(ValueError, interpolate, self.data, [0], 'cubic')
+
+    def test_interpolate_empty(self):
+        ret = interpolate(([], []), [0, 1], 'zoh')
+        self.assertEquals(len(ret), 2)
+        self.assertTrue(math.isnan(ret[0]))
+
+    def test_resample_datapoints(self):
+        base = datetime.datetime(2013, 1, 1)
+        points = [DataPoint.from_data(base, 1.0),
+                  DataPoint.from_data(base + datetime.timedelta(hours=1),
+                                      3.0)]
+        points = [DataPoint(p.to_dictionary(), None, tz='UTC')
+                  for p in points]
+        grid, vs = resample(points, base,
+                            base + datetime.timedelta(hours=1), '30min',
+                            'linear')
+        self.assertEquals(list(vs), [1.0, 2.0])
+
+    def test_align(self):
+        series = {'b': self.data, 'a': ([0, 120000], [0.0, 1.0])}
+        keys, grid, matrix = align(series, datetime.datetime(1970, 1, 1),
+                                   datetime.datetime(1970, 1, 1, 0, 3),
+                                   '1min', 'linear')
+        self.assertEquals(keys, ['a', 'b'])
+        self.assertEquals(matrix.shape, (2, 3))
+        self.assertEquals(list(matrix[0]), [0.0, 0.5, 1.0])
+        self.assertEquals(list(matrix[1]), [1.0, 2.0, 3.0])
@@ -0,0 +1,41 @@
+import unittest
+import datetime
+from dateutil.relativedelta import relativedelta
+from tempodb.temporal.period import parse_period, period_edges
+
+
+class TestPeriod(unittest.TestCase):
+    def test_parse_short_period(self):
+        self.assertEquals(parse_period('1min'), relativedelta(minutes=1))
+        self.assertEquals(parse_period('2day'), relativedelta(days=2))
+        self.assertEquals(parse_period('15s'), relativedelta(seconds=15))
+
+    def test_parse_iso_period(self):
+        self.assertEquals(parse_period('PT1H'), relativedelta(hours=1))
+        self.assertEquals(parse_period('P1M'), relativedelta(months=1))
+
+    def test_parse_invalid_period(self):
+        self.assertRaises(ValueError, parse_period, 'foo')
+        self.assertRaises(ValueError, parse_period, '1fortnight')
+        self.assertRaises(ValueError, parse_period, 'P')
+
+    def test_fixed_edges(self):
+        start = datetime.datetime(2013, 1, 1)
+        end = datetime.datetime(2013, 1, 1, 0, 2, 30)
+        edges = period_edges(start, end, '1min')
+        self.assertEquals(len(edges), 4)
+        self.assertEquals(edges[1] - edges[0], 60000)
+
+    def test_calendar_edges_across_dst(self):
+        start = datetime.datetime(2013, 11, 2)
+        end = datetime.datetime(2013, 11, 5)
+        edges = period_edges(start, end, '1day', 'America/Chicago')
+        hours = [(b - a) // 3600000 for a, b in zip(edges[:-1], edges[1:])]
+        self.assertEquals(hours, [24, 25, 24])
+
+    def test_month_edges(self):
+        start = datetime.datetime(2013, 1, 1)
+        end = datetime.datetime(2013, 4, 1)
+        edges = period_edges(start, end, '1month')
+        days = [(b - a) // 86400000 for a, b in zip(edges[:-1], edges[1:])]
+        self.assertEquals(days, [31, 28, 31])
@@ -0,0 +1,73 @@
+import os
+import json
+import unittest
+import datetime
+from tempodb.protocol.cursor import DataPointCursor
+from tempodb.protocol.objects import DataPoint
+from tempodb.temporal.validate import convert_iso_stamp
+from tempodb.temporal.arrays import datetime_to_epoch_ms
+from tempodb.temporal.rollup import RollupEngine, parse_function
+from test_protocol_cursor import DummyResponse
+
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'rollup.json')
+
+
+class TestRollup(unittest.TestCase):
+    def setUp(self):
+        self.fixture = json.load(open(FIXTURE))
+        raw = self.fixture['raw']
+        resp = DummyResponse()
+        resp.resp.links = {}
+        cursor = DataPointCursor(raw, DataPoint, resp, raw['tz'])
+        self.engine = RollupEngine.from_cursor(cursor)
+
+    def test_parse_function(self):
+        self.assertEquals(parse_function('max'), ('max', None))
+        self.assertEquals(parse_function('avg'), ('mean', None))
+        self.assertEquals(parse_function('percentile,95'),
+                          ('percentile', 95.0))
+        self.assertRaises(ValueError, parse_function, 'median')
+        self.assertRaises(ValueError, parse_function, 'percentile')
+        self.assertRaises(ValueError, parse_function, 'percentile,101')
+
+    def test_rollups_match_api_fixtures(self):
+        for function, expected in self.fixture['rollups'].items():
+            got = self.engine.read_data(function, '1day')
+            data = expected['data']
+            self.assertEquals(len(got), len(data), function)
+            for d, e in zip(got, data):
+                self.assertEquals(d.t, convert_iso_stamp(e['t']))
+                self.assertAlmostEquals(d.v, e['v'], 9, function)
+
+    def test_day_rollup_follows_local_midnight(self):
+        start = datetime.datetime(2013, 11, 3)
+        end = datetime.datetime(2013, 11, 4)
+        t = convert_iso_stamp('2013-11-03T23:30:00-06:00')
+        engine = RollupEngine([datetime_to_epoch_ms(t)], [1.0], start, end,
+                              'America/Chicago')
+        got = engine.read_data('count', '1day')
+        self.assertEquals(len(got), 1)
+        self.assertEquals(got[0].t.isoformat(), '2013-11-03T00:00:00-05:00')
+
+    def test_read_multi_rollups(self):
+        got = self.engine.read_multi_rollups(['min', 'max'], '1day')
+        self.assertEquals(len(got), 4)
+        self.assertEquals(got[0].v, {'min': 1.0, 'max': 5.0})
+
+    def test_empty_intervals_are_skipped(self):
+        engine = RollupEngine([0, 1000, 7200000], [1.0, 2.0, 3.0])
+        ts, vs = engine.rollup('sum', '1hour')
+        self.assertEquals(list(ts), [0, 7200000])
+        self.assertEquals(list(vs), [3.0, 3.0])
+
+    def test_single_point_stddev(self):
+        engine = RollupEngine([0], [4.0])
+        ts, vs = engine.rollup('stddev', '1min')
+        self.assertEquals(list(vs), [0.0])
+
+    def test_empty_engine(self):
+        engine = RollupEngine([], [])
+        ts, vs = engine.rollup('max', '1min')
+        self.assertEquals(len(ts), 0)
+        self.assertEquals(len(vs), 0)
@@ -0,0 +1,159 @@
+import math
+import random
+import unittest
+import datetime
+import pytz
+from tempodb.protocol.objects import DataPoint, MultiPoint, Summary
+from tempodb.temporal.stream import RunningStats, QuantileSketch
+from tempodb.temporal.stream import summarize, summarize_multi, tumbling
+from tempodb.temporal.stream import sliding
+
+
+BASE = datetime.datetime(2013, 1, 1)
+
+
+def points(values, minutes=1):
+    return [DataPoint.from_data(BASE + datetime.timedelta(minutes=i * minutes),
+                                v) for i, v in enumerate(values)]
+
+
+def reference(values):
+    n = len(values)
+    mean = sum(values) / float(n)
+    var = sum((v - mean) ** 2 for v in values) / (n - 1)
+    return mean, math.sqrt(var)
+
+
+class TestStream(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(0)
+        self.values = [rand.random() * 50.0 for i in range(1000)]
+
+    def test_running_stats(self):
+        stats = RunningStats()
+        for v in self.values:
+            stats.update(v)
+        mean, stddev = reference(self.values)
+        self.assertEquals(stats.count, 1000)
+        self.assertAlmostEquals(stats.mean, mean)
+        self.assertAlmostEquals(stats.stddev, stddev)
+        self.assertAlmostEquals(stats.sum, sum(self.values))
+        self.assertEquals(stats.min, min(self.values))
+        self.assertEquals(stats.max, max(self.values))
+
+    def test_running_stats_merge(self):
+        a = RunningStats()
+        b = RunningStats()
+        for v in self.values[:300]:
+            a.update(v)
+        for v in self.values[300:]:
+            b.update(v)
+        a.merge(b).merge(RunningStats())
+        mean, stddev = reference(self.values)
+        self.assertEquals(a.count, 1000)
+        self.assertAlmostEquals(a.mean, mean)
+        self.assertAlmostEquals(a.stddev, stddev)
+        self.assertEquals(RunningStats().merge(b).count, 700)
+
+    def test_summarize_to_summary(self):
+        s = summarize(points(self.values)).to_summary()
+        self.assertTrue(isinstance(s, Summary))
+        self.assertEquals(s.count, 1000)
+        self.assertAlmostEquals(s.mean, reference(self.values)[0])
+
+    def test_summarize_multi(self):
+        stream = [MultiPoint.from_data(BASE, {'a': 1.0, 'b': 2.0}),
+                  MultiPoint.from_data(BASE, {'a': 3.0, 'b': None})]
+        ret = summarize_multi(stream)
+        self.assertEquals(ret['a'].mean, 2.0)
+        self.assertEquals(ret['b'].count, 1)
+
+    def test_sketch_accuracy(self):
+        sketch = QuantileSketch(0.01)
+        summarize(points(self.values), sketch)
+        ordered = sorted(self.values)
+        for p in [10, 50, 90, 99]:
+            exact = ordered[int(p / 100.0 * 999)]
+            self.assertTrue(abs(sketch.percentile(p) - exact) <=
+                            0.011 * exact)
+
+    def test_sketch_negative_and_zero(self):
+        sketch = QuantileSketch(0.01)
+        for v in [-10.0, 0.0, 10.0]:
+            sketch.add(v)
+        self.assertAlmostEquals(sketch.quantile(0), -10.0, delta=0.1)
+        self.assertEquals(sketch.quantile(0.5), 0.0)
+        self.assertAlmostEquals(sketch.quantile(1), 10.0, delta=0.1)
+
+    def test_sketch_merge(self):
+        a = QuantileSketch()
+        b = QuantileSketch()
+        for v in self.values[:500]:
+            a.add(v)
+        for v in self.values[500:]:
+            b.add(v)
+        whole = QuantileSketch()
+        for v in self.values:
+            whole.add(v)
+        a.merge(b)
+        self.assertEquals(a.count, 1000)
+        self.assertEquals(a.quantile(0.5), whole.quantile(0.5))
+        self.assertRaises(ValueError, a.merge, QuantileSketch(0.05))
+
+    def test_sketch_max_bins(self):
+        sketch = QuantileSketch(0.01, max_bins=10)
+        for i in range(1, 1000):
+            sketch.add(float(i))
+        self.assertTrue(len(sketch.positive) <= 10)
+        self.assertAlmostEquals(sketch.quantile(1), 999.0, delta=10)
+
+    def test_tumbling(self):
+        windows = list(tumbling(points(range(10)), '3min'))
+        self.assertEquals(len(windows), 4)
+        self.assertEquals([w.count for t, w in windows], [3, 3, 3, 1])
+        self.assertEquals(windows[1][0].minute, 3)
+        self.assertEquals(windows[1][1].mean, 4.0)
+
+    def test_tumbling_skips_empty_windows(self):
+        stream = points([1.0, 2.0], minutes=10)
+        windows = list(tumbling(stream, '1min'))
+        self.assertEquals(len(windows), 2)
+        self.assertEquals(windows[1][0].minute, 10)
+
+    def test_tumbling_calendar_period(self):
+        #hourly from midnight Nov 2 2013 in Chicago, across the DST change
+        start = datetime.datetime(2013, 11, 2, 5, tzinfo=pytz.utc)
+        stream = [DataPoint.from_data(start + datetime.timedelta(hours=i),
+                                      1.0) for i in range(72)]
+        windows = list(tumbling(stream, '1day', tz='America/Chicago'))
+        self.assertEquals([w.count for t, w in windows], [24, 25, 23])
+        self.assertEquals(windows[2][0].isoformat(),
+                          '2013-11-04T00:00:00-06:00')
+
+    def test_tumbling_multi(self):
+        stream = [MultiPoint.from_data(BASE, {'a': 1.0}),
+                  MultiPoint.from_data(BASE, {'a': 3.0, 'b': 1.0})]
+        windows = list(tumbling(stream, '1min'))
+        self.assertEquals(windows[0][1]['a'].mean, 2.0)
+
+    def test_sliding(self):
+        ret = [(w.count, w.min, w.max, w.mean)
+               for t, w in sliding(points([5, 1, 3, 4, 2]), '2min')]
+        self.assertEquals(ret, [(1, 5, 5, 5.0), (2, 1, 5, 3.0),
+                                (2, 1, 3, 2.0), (2, 3, 4, 3.5),
+                                (2, 2, 4, 3.0)])
+
+    def test_sliding_stddev_large_values(self):
+        #a sum of squares would cancel to nothing at this magnitude
+        values = [1e9 + v for v in self.values[:200]]
+        for i, (t, w) in enumerate(sliding(points(values), '10min')):
+            if i == 0:
+                continue
+            expected = reference(values[max(0, i - 9):i + 1])
+            self.assertEquals(w.count, min(i + 1, 10))
+            self.assertAlmostEquals(w.mean, expected[0], 4)
+            self.assertTrue(abs(w.stddev - expected[1]) <=
+                                1e-6 * expected[1])
+
+    def test_sliding_invalid_width(self):
+        self.assertRaises(ValueError, list, sliding([], '1month'))
@@ -0,0 +1,131 @@
+import json
+import unittest
+import datetime
+from tempodb.client import Client
+from tempodb.response import ResponseException, PARTIAL
+from tempodb.protocol import DataPoint
+from tempodb.testing import FakeTempoDB
+
+
+START = datetime.datetime(2013, 1, 1)
+END = datetime.datetime(2013, 1, 2)
+
+
+class TestFakeServer(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTempoDB(page_size=100).start()
+        self.client = Client('my_id', 'foo', 'bar', self.server.url)
+        self.points = [DataPoint.from_data(
+            START + datetime.timedelta(minutes=i), float(i))
+            for i in range(250)]
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_write_and_read_paginates(self):
+        self.client.write_data('foo', self.points)
+        cursor = self.client.read_data('foo', START, END, limit=100)
+        d = [p for p in cursor]
+        self.assertEquals(len(d), 250)
+        self.assertEquals(d[-1].v, 249.0)
+        self.assertEquals(d[10].t.minute, 10)
+        reads = [r for r in self.server.requests if r[1].endswith('segment')]
+        self.assertEquals(len(reads), 3)
+
+    def test_series_crud(self):
+        self.client.create_series('foo', tags=['a', 'b'], attrs={'x': '1'})
+        self.client.create_series('bar', tags=['a'])
+        s = self.client.get_series('foo').data
+        self.assertEquals(s.tags, ['a', 'b'])
+        self.assertEquals([x.key for x in self.client.list_series(tags='b')],
+                          ['foo'])
+        self.assertEquals([x.key for x in self.client.list_series(
+            attrs={'x': '1'})], ['foo'])
+        s.name = 'Foo'
+        self.assertEquals(self.client.update_series(s).data.name, 'Foo')
+        self.client.delete_series(keys='foo')
+        self.assertRaises(ResponseException, self.client.get_series, 'foo')
+
+    def test_list_series_paginates(self):
+        for i in range(150):
+            self.server.store.create_series('s%03d' % i)
+        self.assertEquals(len([s for s in self.client.list_series()]), 150)
+
+    def test_write_multi_partial(self):
+        points = [DataPoint.from_data(START, 1.0, key='foo'),
+                  DataPoint.from_data(START, 2.0)]
+        try:
+            self.client.write_multi(points)
+        except ResponseException, e:
+            self.assertEquals(e.response.successful, PARTIAL)
+            statuses = json.loads(e.response.error)['multistatus']
+            self.assertEquals([s['status'] for s in statuses], [200, 422])
+        else:
+            self.fail('Expected a partial write')
+
+    def test_read_multi_and_aggregate(self):
+        multi = [DataPoint.from_data(START, 1.0, key='a'),
+                 DataPoint.from_data(START, 3.0, key='b')]
+        self.client.write_multi(multi)
+        rows = [r for r in self.client.read_multi(START, END,
+                                                  keys=['a', 'b'])]
+        self.assertEquals(rows[0].v, {'a': 1.0, 'b': 3.0})
+        agg = [d for d in self.client.aggregate_data(START, END, 'sum',
+                                                     keys=['a', 'b'])]
+        self.assertEquals(agg[0].v, 4.0)
+
+    def test_aggregate_parallel_stddev(self):
+        values = [1.0, 2.0, 4.0, 8.0, 16.0]
+        self.client.write_multi([DataPoint.from_data(START, v, key='k%d' % i)
+                                 for i, v in enumerate(values)])
+        mean = sum(values) / len(values)
+        expected = (sum((v - mean) ** 2 for v in values) / 4) ** 0.5
+        agg = self.client.aggregate_data_parallel(
+            START, END, 'stddev', keys=['k%d' % i for i in range(5)],
+            group_size=2)
+        self.assertAlmostEquals(agg[0].v, expected)
+
+    def test_rollup_summary_find_single(self):
+        self.client.write_data('foo', self.points)
+        rolled = [d for d in self.client.read_data('foo', START, END,
+                                                   rollup='max',
+                                                   period='1hour')]
+        self.assertEquals([d.v for d in rolled], [59.0, 119.0, 179.0, 239.0,
+                                                  249.0])
+        summary = self.client.get_summary('foo', START, END).data.summary
+        self.assertEquals(summary.count, 250)
+        found = [d for d in self.client.find_data('foo', START, END, 'max',
+                                                  '1hour')]
+        self.assertEquals(found[0].v, 59.0)
+        single = self.client.single_value('foo', START, 'after').data
+        self.assertEquals(single.data.v, 0.0)
+        multi = [s for s in self.client.multi_series_single_value(
+            keys=['foo'], ts=START)]
+        self.assertEquals(multi[0].data.v, 0.0)
+
+    def test_delete(self):
+        self.client.write_data('foo', self.points)
+        self.client.delete('foo', START,
+                           START + datetime.timedelta(minutes=100))
+        d = [p for p in self.client.read_data('foo', START, END)]
+        self.assertEquals(len(d), 150)
+
+    def test_injected_errors(self):
+        self.server.fail_next(1, 500)
+        self.assertRaises(ResponseException, self.client.get_series, 'foo')
+        self.assertEquals(self.server.requests[-1][1], 'series/key/foo')
+
+    def test_rate_limit(self):
+        server = FakeTempoDB(rate_limit=1).start()
+        try:
+            client = Client('my_id', 'foo', 'bar', server.url)
+            server.store.create_series('foo')
+            client.get_series('foo')
+            try:
+                client.get_series('foo')
+            except ResponseException, e:
+                self.assertEquals(e.response.status, 429)
+            else:
+                self.fail('Expected to be rate limited')
+        finally:
+            server.stop()
@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+from tempodb.client import Client
+from tempodb.testing import FakeTempoDB
+from tempodb.tools import backfill
+from tempodb.tools.backfill import (Backfill, BackfillError, parse_time,
+                                    parse_chunk, read_chunks)
+
+
+START = 1356998400000
+
+
+class TestParse(unittest.TestCase):
+    def test_parse_time(self):
+        self.assertEquals(parse_time(' 1356998400000'), START)
+        self.assertEquals(parse_time('2013-01-01T00:00:01Z'), START + 1000)
+
+    def test_long(self):
+        rows = parse_chunk(('long', None, 'foo,%d,1.5\n\nbar,%d,2\n' %
+                            (START, START + 1)))
+        self.assertEquals(rows, [('foo', START, 1.5), ('bar', START + 1, 2)])
+        self.assertRaises(ValueError, parse_chunk, ('long', None, 'foo,1\n'))
+
+    def test_wide(self):
+        rows = parse_chunk(('wide', ['t', 'a', 'b'],
+                            '%d,1,\n%d,3,4\n' % (START, START + 1)))
+        self.assertEquals(rows, [('a', START, 1.0), ('a', START + 1, 3.0),
+                                 ('b', START + 1, 4.0)])
+
+
+class BackfillTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.server = FakeTempoDB().start()
+        self.client = Client('db', 'key', 'secret', self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def write_file(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def long_file(self, name='data.csv', n=100, header=True):
+        lines = ['key,t,v'] if header else []
+        lines += ['s%d,%d,%d' % (i % 3, START + i, i) for i in range(n)]
+        return self.write_file(name, '\n'.join(lines) + '\n')
+
+    def stored(self, key):
+        return len(self.server.store.times.get(key, []))
+
+
+class TestReadChunks(BackfillTestCase):
+    def test_header_detection(self):
+        for header in [True, False]:
+            path = self.long_file(n=5, header=header)
+            chunks = list(read_chunks(path, 'long', 2))
+            self.assertEquals([len(parse_chunk(job)) for end, job in chunks],
+                              [2, 2, 1])
+            self.assertEquals(chunks[-1][0], os.path.getsize(path))
+
+    def test_resume_offset(self):
+        path = self.long_file(n=5)
+        end, job = list(read_chunks(path, 'long', 2))[0]
+        rest = list(read_chunks(path, 'long', 2, end))
+        self.assertEquals(sum(len(parse_chunk(j)) for e, j in rest), 3)
+
+    def test_quoted_newline(self):
+        path = self.write_file('data.csv', 'key,t,v\n'
+                               's0,%d,1\n"s\n1",%d,2\n"s""2",%d,3\n' %
+                               (START, START + 1, START + 2))
+        chunks = list(read_chunks(path, 'long', 1))
+        self.assertEquals([parse_chunk(job) for end, job in chunks],
+                          [[('s0', START, 1.0)], [('s\n1', START + 1, 2.0)],
+                           [('s"2', START + 2, 3.0)]])
+        rest = list(read_chunks(path, 'long', 1, chunks[0][0]))
+        self.assertEquals(len(rest), 2)
+
+
+class TestBackfill(BackfillTestCase):
+    def test_long(self):
+        path = self.long_file()
+        progress = []
+        stats = Backfill(self.client, batch_size=10, workers=4, processes=0,
+                         chunk_lines=40, progress=progress.append).run([path])
+        self.assertEquals(stats.points, 100)
+        self.assertEquals(stats.batches, 10)
+        self.assertEquals(stats.files, 1)
+        self.assertEquals(stats.bytes, os.path.getsize(path))
+        self.assertEquals(len(progress), 3)
+        self.assertEquals([self.stored('s%d' % i) for i in range(3)],
+                          [34, 33, 33])
+        self.assertTrue(stats.to_dictionary()['points_per_second'] > 0)
+
+    def test_wide_with_processes(self):
+        lines = ['timestamp,a,b'] + ['%d,%d,%d' % (START + i, i, -i)
+                                     for i in range(50)]
+        path = self.write_file('wide.csv', '\n'.join(lines) + '\n')
+        stats = Backfill(self.client, 'wide', batch_size=20, processes=2,
+                         chunk_lines=10).run([path])
+        self.assertEquals(stats.points, 100)
+        self.assertEquals(self.stored('a'), 50)
+        self.assertEquals(self.stored('b'), 50)
+
+    def test_resume(self):
+        path = self.long_file()
+        checkpoint = os.path.join(self.dir, 'checkpoint.json')
+        run = Backfill(self.client, batch_size=10, workers=1, processes=0,
+                       chunk_lines=40, checkpoint=checkpoint, retries=0)
+        original = run._write
+        calls = []
+
+        #the second chunk fails after its first batch is written
+        def write(batch):
+            calls.append(batch)
+            if len(calls) == 6:
+                self.server.fail_next(1, 503)
+            original(batch)
+        run._write = write
+        self.assertRaises(BackfillError, run.run, [path])
+        with open(checkpoint) as f:
+            offsets = json.load(f)
+        first_chunk = list(read_chunks(path, 'long', 40))[0][0]
+        self.assertEquals(offsets.values(), [first_chunk])
+
+        stats = Backfill(self.client, batch_size=10, processes=0,
+                         chunk_lines=40, checkpoint=checkpoint).run([path])
+        self.assertEquals(stats.points, 60)
+        self.assertEquals(sum(self.stored('s%d' % i) for i in range(3)), 100)
+        #a finished file is not read again
+        stats = Backfill(self.client, processes=0,
+                         checkpoint=checkpoint).run([path])
+        self.assertEquals(stats.points, 0)
+
+    def test_invalid_layout(self):
+        self.assertRaises(ValueError, Backfill, self.client, 'tall')
+
+
+class TestMain(BackfillTestCase):
+    def test_main(self):
+        path = self.long_file()
+        checkpoint = os.path.join(self.dir, 'checkpoint.json')
+        ret = backfill.main(['--database-id', 'db', '--key', 'key',
+                             '--secret', 'secret', '--base-url',
+                             self.server.url, '-p', '0', '-q', '-c',
+                             checkpoint, path])
+        self.assertEquals(ret, 0)
+        self.assertEquals(self.stored('s0'), 34)
+        self.assertTrue(os.path.exists(checkpoint))
+
+    def test_missing_credentials(self):
+        os.environ.pop('TEMPODB_API_SECRET', None)
+        stderr = StringIO()
+        try:
+            sys.stderr, old = stderr, sys.stderr
+            try:
+                backfill.main(['--database-id', 'db', '--key', 'key', 'x'])
+            finally:
+                sys.stderr = old
+            self.fail('SystemExit not raised')
+        except SystemExit, e:
+            self.assertEquals(e.code, 2)
+        self.assertTrue('--secret is required' in stderr.getvalue())
@@ -0,0 +1,118 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from tempodb.client import Client
+from tempodb.storage.tsfile import ExportReader
+from tempodb.testing import FakeTempoDB
+from tempodb.tools import export
+from tempodb.tools.backfill import Backfill
+from tempodb.tools.export import Export, part_name
+
+
+START = 1356998400000
+DAY = 86400000
+
+
+class TestPartName(unittest.TestCase):
+    def test_escaped(self):
+        self.assertEquals(part_name('a/b c', 5, 'csv'), 'a%2Fb%20c.5.csv')
+        self.assertEquals(part_name(u'caf\xe9', 5, 'tsf'), 'caf%C3%A9.5.tsf')
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.out = os.path.join(self.dir, 'out')
+        self.server = FakeTempoDB(page_size=7).start()
+        for i, key in enumerate(['foo', 'bar', 'baz,qux']):
+            self.server.store.write(key, [(START + j * DAY / 4, float(i * j))
+                                          for j in range(40)])
+        self.server.store.series['bar']['tags'] = ['x']
+        self.client = Client('db', 'key', 'secret', self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def run_export(self, format='csv', keys=None):
+        exp = Export(self.client, self.out, format, workers=4,
+                     shard='4day', limit=10)
+        keys = keys or exp.list_keys()
+        return exp.run(keys, START, START + 10 * DAY)
+
+    def reads(self):
+        return [r for r in self.server.requests if r[1].endswith('/segment')]
+
+    def test_csv(self):
+        stats = self.run_export()
+        self.assertEquals(stats.total, 9)
+        self.assertEquals(stats.parts, 9)
+        self.assertEquals(stats.points, 120)
+        with open(os.path.join(self.out, part_name('bar', START + 4 * DAY,
+                                                   'csv'))) as f:
+            lines = f.read().splitlines()
+        self.assertEquals(lines[0], 'key,t,v')
+        self.assertEquals(len(lines), 17)
+        self.assertEquals(lines[1].split(',')[0], 'bar')
+        self.assertEquals(lines[1].split(',')[2], '16.0')
+
+    def test_csv_round_trip(self):
+        self.run_export()
+        target = FakeTempoDB().start()
+        try:
+            client = Client('db', 'key', 'secret', target.url)
+            paths = [os.path.join(self.out, name)
+                     for name in sorted(os.listdir(self.out))
+                     if name.endswith('.csv')]
+            Backfill(client, processes=0).run(paths)
+            for key in ['foo', 'bar', 'baz,qux']:
+                self.assertEquals(target.store.values[key],
+                                  self.server.store.values[key])
+        finally:
+            target.stop()
+
+    def test_jsonl(self):
+        self.run_export('jsonl', ['bar'])
+        with open(os.path.join(self.out, part_name('bar', START,
+                                                   'jsonl'))) as f:
+            rows = [json.loads(l) for l in f]
+        self.assertEquals(len(rows), 16)
+        self.assertEquals(rows[1]['key'], 'bar')
+        self.assertEquals(rows[1]['v'], 1.0)
+
+    def test_tsf(self):
+        self.run_export('tsf', ['foo'])
+        path = os.path.join(self.out, part_name('foo', START + 8 * DAY,
+                                                'tsf'))
+        with ExportReader(path) as r:
+            self.assertEquals(r.count('foo'), 8)
+
+    def test_resume(self):
+        self.run_export(keys=['foo'])
+        manifest = json.load(open(os.path.join(self.out, 'manifest.json')))
+        self.assertEquals(len(manifest['parts']), 3)
+        os.remove(os.path.join(self.out, manifest['parts'][1]['file']))
+        before = len(self.reads())
+
+        stats = self.run_export(keys=['foo'])
+        self.assertEquals(stats.skipped, 2)
+        self.assertEquals(stats.parts, 1)
+        self.assertEquals(len(self.reads()) - before, 2)
+        manifest = json.load(open(os.path.join(self.out, 'manifest.json')))
+        self.assertEquals(len(manifest['parts']), 3)
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, Export, self.client, self.out, 'xml')
+
+    def test_main(self):
+        ret = export.main(['--database-id', 'db', '--key', 'key',
+                           '--secret', 'secret', '--base-url',
+                           self.server.url, '-t', 'x', '-s', str(START),
+                           '-e', str(START + 10 * DAY), '-q', '-f', 'jsonl',
+                           self.out])
+        self.assertEquals(ret, 0)
+        parts = [n for n in os.listdir(self.out) if n.endswith('.jsonl')]
+        self.assertEquals(len(parts), 1)
+        self.assertTrue(parts[0].startswith('bar.'))